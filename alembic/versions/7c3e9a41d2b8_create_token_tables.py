@@ -0,0 +1,54 @@
+"""Create token revocation tables
+
+Revision ID: 7c3e9a41d2b8
+Revises: 1594d7fe2ca9, init
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c3e9a41d2b8'
+down_revision: Union[str, Sequence[str], None] = ('1594d7fe2ca9', 'init')
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'refresh_tokens',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('token_hash', sa.String(255), unique=True, index=True, nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('is_revoked', sa.Boolean, nullable=False, server_default=sa.false()),
+        sa.Column('device_info', sa.Text, nullable=True),
+        sa.Column('ip_address', sa.String(45), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_table(
+        'token_blacklist',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('token_jti', sa.String(255), unique=True, index=True, nullable=False),
+        sa.Column('token_type', sa.String(20), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('blacklisted_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('reason', sa.String(100), nullable=True)
+    )
+    # Инкрементальная загрузка индекса отзыва и фоновая чистка
+    op.create_index('ix_token_blacklist_blacklisted_at', 'token_blacklist', ['blacklisted_at'])
+    op.create_index('ix_token_blacklist_expires_at', 'token_blacklist', ['expires_at'])
+    op.create_index('ix_refresh_tokens_revoked_at', 'refresh_tokens', ['revoked_at'])
+    op.create_index('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('token_blacklist')
+    op.drop_table('refresh_tokens')
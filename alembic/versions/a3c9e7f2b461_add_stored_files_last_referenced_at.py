@@ -0,0 +1,36 @@
+"""Add last_referenced_at to stored files
+
+Revision ID: a3c9e7f2b461
+Revises: f6a2d8c4e519
+Create Date: 2026-10-18 05:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e7f2b461'
+down_revision: Union[str, Sequence[str], None] = 'f6a2d8c4e519'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.batch_alter_table('stored_files') as batch_op:
+        batch_op.add_column(sa.Column('last_referenced_at', sa.DateTime(timezone=True), nullable=True))
+    op.execute("UPDATE stored_files SET last_referenced_at = created_at")
+    # SQLite не добавляет колонку с неконстантным значением по умолчанию - задаётся отдельно
+    with op.batch_alter_table('stored_files') as batch_op:
+        batch_op.alter_column(
+            'last_referenced_at', existing_type=sa.DateTime(timezone=True), server_default=sa.func.now()
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('stored_files') as batch_op:
+        batch_op.drop_column('last_referenced_at')
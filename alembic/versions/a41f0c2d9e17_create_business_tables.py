@@ -0,0 +1,101 @@
+"""Create organizations, clients and applications tables
+
+Revision ID: a41f0c2d9e17
+Revises: 7c3e9a41d2b8
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41f0c2d9e17'
+down_revision: Union[str, Sequence[str], None] = '7c3e9a41d2b8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'organizations',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('name', sa.String(255), nullable=False, index=True),
+        sa.Column('type', sa.Enum('TRAVEL_AGENCY', 'TOUR_OPERATOR', 'HOTEL', 'AIRLINE', 'OTHER', name='organizationtype'), nullable=False),
+        sa.Column('registration_number', sa.String(50), unique=True, nullable=True),
+        sa.Column('tax_number', sa.String(50), nullable=True),
+        sa.Column('phone', sa.String(20), nullable=True),
+        sa.Column('email', sa.String(255), nullable=True),
+        sa.Column('address', sa.Text, nullable=True),
+        sa.Column('website', sa.String(255), nullable=True),
+        sa.Column('is_active', sa.Boolean, nullable=False, server_default=sa.true()),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), onupdate=sa.func.now())
+    )
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('organization_id', sa.Integer, nullable=True))
+        batch_op.create_foreign_key('fk_users_organization_id', 'organizations', ['organization_id'], ['id'])
+
+    op.create_table(
+        'clients',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('organization_id', sa.Integer, sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('first_name', sa.String(100), nullable=False),
+        sa.Column('last_name', sa.String(100), nullable=False),
+        sa.Column('middle_name', sa.String(100), nullable=True),
+        sa.Column('email', sa.String(255), nullable=True, index=True),
+        sa.Column('phone', sa.String(20), nullable=True),
+        sa.Column('date_of_birth', sa.DateTime, nullable=True),
+        sa.Column('passport_number', sa.String(20), nullable=True),
+        sa.Column('passport_issued_date', sa.DateTime, nullable=True),
+        sa.Column('passport_expires_date', sa.DateTime, nullable=True),
+        sa.Column('status', sa.Enum('ACTIVE', 'INACTIVE', 'BLOCKED', 'VIP', name='clientstatus'), nullable=False, server_default='ACTIVE'),
+        sa.Column('notes', sa.Text, nullable=True),
+        sa.Column('preferences', sa.Text, nullable=True),
+        sa.Column('created_by', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), onupdate=sa.func.now())
+    )
+
+    op.create_table(
+        'applications',
+        sa.Column('id', sa.Integer, primary_key=True, index=True),
+        sa.Column('organization_id', sa.Integer, sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('client_id', sa.Integer, sa.ForeignKey('clients.id'), nullable=False),
+        sa.Column('application_number', sa.String(50), unique=True, nullable=False, index=True),
+        sa.Column('type', sa.Enum('TOUR_PACKAGE', 'FLIGHT', 'HOTEL', 'TRANSFER', 'EXCURSION', 'INSURANCE', 'VISA', 'OTHER', name='applicationtype'), nullable=False),
+        sa.Column('status', sa.Enum('DRAFT', 'SUBMITTED', 'PROCESSING', 'CONFIRMED', 'PAID', 'COMPLETED', 'CANCELLED', 'REFUNDED', name='applicationstatus'), nullable=False, server_default='DRAFT'),
+        sa.Column('title', sa.String(255), nullable=False),
+        sa.Column('description', sa.Text, nullable=True),
+        sa.Column('destination', sa.String(255), nullable=True),
+        sa.Column('departure_date', sa.DateTime, nullable=True),
+        sa.Column('return_date', sa.DateTime, nullable=True),
+        sa.Column('adults_count', sa.Integer, nullable=False, server_default='1'),
+        sa.Column('children_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('estimated_cost', sa.Numeric(10, 2), nullable=True),
+        sa.Column('final_cost', sa.Numeric(10, 2), nullable=True),
+        sa.Column('currency', sa.String(3), nullable=False, server_default='RUB'),
+        sa.Column('special_requirements', sa.Text, nullable=True),
+        sa.Column('internal_notes', sa.Text, nullable=True),
+        sa.Column('assigned_to', sa.Integer, sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('created_by', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), onupdate=sa.func.now())
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('applications')
+    op.drop_table('clients')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_constraint('fk_users_organization_id', type_='foreignkey')
+        batch_op.drop_column('organization_id')
+    op.drop_table('organizations')
+    if op.get_bind().dialect.name == 'postgresql':
+        for enum_name in ('applicationstatus', 'applicationtype', 'clientstatus', 'organizationtype'):
+            op.execute(f'DROP TYPE IF EXISTS {enum_name}')
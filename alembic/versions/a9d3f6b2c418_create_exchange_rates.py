@@ -0,0 +1,33 @@
+"""Create exchange rates table
+
+Revision ID: a9d3f6b2c418
+Revises: f2c8a5d1e937
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3f6b2c418'
+down_revision: Union[str, Sequence[str], None] = 'f2c8a5d1e937'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'exchange_rates',
+        sa.Column('currency', sa.String(3), primary_key=True),
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('rate', sa.Numeric(18, 8), nullable=False)
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('exchange_rates')
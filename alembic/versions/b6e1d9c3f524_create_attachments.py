@@ -0,0 +1,64 @@
+"""Create stored files and attachments tables
+
+Revision ID: b6e1d9c3f524
+Revises: a9d3f6b2c418
+Create Date: 2026-10-17 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e1d9c3f524'
+down_revision: Union[str, Sequence[str], None] = 'a9d3f6b2c418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'stored_files',
+        sa.Column('sha256', sa.String(64), primary_key=True),
+        sa.Column('size', sa.BigInteger, nullable=False),
+        sa.Column('content_type', sa.String(127), nullable=False),
+        sa.Column('object_key', sa.String(255), nullable=False),
+        sa.Column('thumbnail_key', sa.String(255), nullable=True),
+        sa.Column('thumbnail_status', sa.String(16), nullable=False, server_default='pending'),
+        sa.Column('thumbnail_attempted_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index('ix_stored_files_thumbnail_status', 'stored_files', ['thumbnail_status'])
+
+    op.create_table(
+        'attachments',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('organization_id', sa.Integer, sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('client_id', sa.Integer, sa.ForeignKey('clients.id'), nullable=True),
+        sa.Column('application_id', sa.Integer, sa.ForeignKey('applications.id'), nullable=True),
+        sa.Column('sha256', sa.String(64), sa.ForeignKey('stored_files.sha256'), nullable=False),
+        sa.Column('filename', sa.String(255), nullable=False),
+        sa.Column('category', sa.Enum('PASSPORT_SCAN', 'VISA', 'VOUCHER', 'TICKET', 'CONTRACT', 'OTHER',
+                                      name='attachmentcategory'), nullable=False, server_default='OTHER'),
+        sa.Column('uploaded_by', sa.Integer, sa.ForeignKey('users.id'), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.CheckConstraint('(client_id IS NULL) <> (application_id IS NULL)', name='ck_attachments_owner')
+    )
+    op.create_index('ix_attachments_org_client', 'attachments', ['organization_id', 'client_id', 'id'])
+    op.create_index('ix_attachments_org_application', 'attachments', ['organization_id', 'application_id', 'id'])
+    op.create_index('ix_attachments_sha256', 'attachments', ['sha256'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_attachments_sha256', table_name='attachments')
+    op.drop_index('ix_attachments_org_application', table_name='attachments')
+    op.drop_index('ix_attachments_org_client', table_name='attachments')
+    op.drop_table('attachments')
+    op.drop_index('ix_stored_files_thumbnail_status', table_name='stored_files')
+    op.drop_table('stored_files')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP TYPE IF EXISTS attachmentcategory')
@@ -0,0 +1,34 @@
+"""Create organization statistics counters
+
+Revision ID: b83d5e6f1a20
+Revises: a41f0c2d9e17
+Create Date: 2026-10-17 13:10:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b83d5e6f1a20'
+down_revision: Union[str, Sequence[str], None] = 'a41f0c2d9e17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'organization_stat_counters',
+        sa.Column('organization_id', sa.Integer, sa.ForeignKey('organizations.id'), primary_key=True),
+        sa.Column('metric', sa.String(32), primary_key=True),
+        sa.Column('key', sa.String(32), primary_key=True),
+        sa.Column('value', sa.Numeric(14, 2), nullable=False, server_default='0')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('organization_stat_counters')
@@ -0,0 +1,52 @@
+"""Create jobs table
+
+Revision ID: c4f7a2e8d913
+Revises: b6e1d9c3f524
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4f7a2e8d913'
+down_revision: Union[str, Sequence[str], None] = 'b6e1d9c3f524'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'jobs',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('kind', sa.String(64), nullable=False),
+        sa.Column('payload', sa.Text, nullable=False, server_default='{}'),
+        sa.Column('priority', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('status', sa.String(16), nullable=False, server_default='queued'),
+        sa.Column('attempts', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('max_attempts', sa.Integer, nullable=False),
+        sa.Column('run_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('locked_by', sa.String(64), nullable=True),
+        sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('idempotency_key', sa.String(128), nullable=True, unique=True),
+        sa.Column('result', sa.Text, nullable=True),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('created_by', sa.Integer, sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True)
+    )
+    op.create_index('ix_jobs_claim', 'jobs', ['status', 'priority', 'run_at', 'id'])
+    op.create_index('ix_jobs_status_locked_until', 'jobs', ['status', 'locked_until'])
+    op.create_index('ix_jobs_finished_at', 'jobs', ['finished_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_jobs_finished_at', table_name='jobs')
+    op.drop_index('ix_jobs_status_locked_until', table_name='jobs')
+    op.drop_index('ix_jobs_claim', table_name='jobs')
+    op.drop_table('jobs')
@@ -0,0 +1,32 @@
+"""Add composite indexes for keyset pagination of clients
+
+Revision ID: c5e2b7a9f031
+Revises: b83d5e6f1a20
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5e2b7a9f031'
+down_revision: Union[str, Sequence[str], None] = 'b83d5e6f1a20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_clients_org_last_name_id', 'clients', ['organization_id', 'last_name', 'id'])
+    op.create_index('ix_clients_org_status_last_name_id', 'clients', ['organization_id', 'status', 'last_name', 'id'])
+    op.create_index('ix_clients_org_creator_last_name_id', 'clients', ['organization_id', 'created_by', 'last_name', 'id'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_clients_org_creator_last_name_id', table_name='clients')
+    op.drop_index('ix_clients_org_status_last_name_id', table_name='clients')
+    op.drop_index('ix_clients_org_last_name_id', table_name='clients')
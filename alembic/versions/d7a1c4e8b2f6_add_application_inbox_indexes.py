@@ -0,0 +1,53 @@
+"""Add application inbox indexes and inbox versions
+
+Revision ID: d7a1c4e8b2f6
+Revises: c5e2b7a9f031
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a1c4e8b2f6'
+down_revision: Union[str, Sequence[str], None] = 'c5e2b7a9f031'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OPEN_STATUSES = "status IN ('DRAFT', 'SUBMITTED', 'PROCESSING', 'CONFIRMED', 'PAID')"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_applications_org_assignee_status_departure',
+        'applications',
+        ['organization_id', 'assigned_to', 'status', 'departure_date', 'id'],
+        postgresql_include=['application_number', 'title', 'type', 'destination', 'return_date', 'client_id'],
+    )
+    op.create_index(
+        'ix_applications_open_inbox',
+        'applications',
+        ['organization_id', 'assigned_to', 'departure_date', 'id'],
+        sqlite_where=sa.text(OPEN_STATUSES),
+        postgresql_where=sa.text(OPEN_STATUSES),
+        postgresql_include=['application_number', 'title', 'type', 'status', 'destination', 'return_date', 'client_id'],
+    )
+    op.create_table(
+        'application_inbox_versions',
+        sa.Column('organization_id', sa.Integer(), nullable=False),
+        sa.Column('assignee_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id']),
+        sa.PrimaryKeyConstraint('organization_id', 'assignee_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('application_inbox_versions')
+    op.drop_index('ix_applications_open_inbox', table_name='applications')
+    op.drop_index('ix_applications_org_assignee_status_departure', table_name='applications')
@@ -0,0 +1,39 @@
+"""Create application number sequences and organization codes
+
+Revision ID: d9b3e6f1a274
+Revises: c4f7a2e8d913
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9b3e6f1a274'
+down_revision: Union[str, Sequence[str], None] = 'c4f7a2e8d913'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'application_number_sequences',
+        sa.Column('organization_id', sa.Integer, sa.ForeignKey('organizations.id'), primary_key=True),
+        sa.Column('year', sa.Integer, primary_key=True),
+        sa.Column('next_value', sa.BigInteger, nullable=False, server_default='1')
+    )
+    with op.batch_alter_table('organizations') as batch_op:
+        batch_op.add_column(sa.Column('code', sa.String(16), nullable=True))
+        batch_op.create_unique_constraint('uq_organizations_code', ['code'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('organizations') as batch_op:
+        batch_op.drop_constraint('uq_organizations_code', type_='unique')
+        batch_op.drop_column('code')
+    op.drop_table('application_number_sequences')
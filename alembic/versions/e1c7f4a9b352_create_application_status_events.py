@@ -0,0 +1,52 @@
+"""Create application status events table
+
+Revision ID: e1c7f4a9b352
+Revises: d9b3e6f1a274
+Create Date: 2026-10-18 02:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1c7f4a9b352'
+down_revision: Union[str, Sequence[str], None] = 'd9b3e6f1a274'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Тип applicationstatus уже создан вместе с таблицей applications
+APPLICATION_STATUS = postgresql.ENUM(
+    'DRAFT', 'SUBMITTED', 'PROCESSING', 'CONFIRMED', 'PAID', 'COMPLETED', 'CANCELLED', 'REFUNDED',
+    name='applicationstatus', create_type=False
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'application_status_events',
+        sa.Column('id', sa.Integer, primary_key=True),
+        sa.Column('organization_id', sa.Integer, sa.ForeignKey('organizations.id'), nullable=False),
+        sa.Column('application_id', sa.Integer, nullable=False),
+        sa.Column('from_status', APPLICATION_STATUS, nullable=True),
+        sa.Column('to_status', APPLICATION_STATUS, nullable=False),
+        sa.Column('changed_by', sa.Integer, sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('batch_id', sa.String(32), nullable=True),
+        sa.Column('comment', sa.Text, nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now())
+    )
+    op.create_index('ix_application_status_events_org_id', 'application_status_events', ['organization_id', 'id'])
+    op.create_index(
+        'ix_application_status_events_application_id', 'application_status_events', ['application_id', 'id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_application_status_events_application_id', table_name='application_status_events')
+    op.drop_index('ix_application_status_events_org_id', table_name='application_status_events')
+    op.drop_table('application_status_events')
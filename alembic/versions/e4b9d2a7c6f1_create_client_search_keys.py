@@ -0,0 +1,150 @@
+"""Create client search keys and index existing clients
+
+Revision ID: e4b9d2a7c6f1
+Revises: d7a1c4e8b2f6
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+import re
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b9d2a7c6f1'
+down_revision: Union[str, Sequence[str], None] = 'd7a1c4e8b2f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Построение ключей зафиксировано в том виде, в каком оно было на этой
+# ревизии (src.services.client_search может измениться позже)
+LAST_NAME, FIRST_NAME, MIDDLE_NAME, PHONE, PASSPORT, EMAIL = 1, 2, 3, 4, 5, 6
+KEY_LENGTH = 64
+
+_TRANSLIT = str.maketrans({
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "і": "i", "ї": "i", "є": "e", "ґ": "g",
+})
+_SKELETON_RULES = [
+    (re.compile(r"s?shch|sch|sh"), "X"),
+    (re.compile(r"t?ch"), "Q"),
+    (re.compile(r"t[sz]"), "C"),
+    (re.compile(r"zh"), "J"),
+    (re.compile(r"kh"), "h"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ck|c|q"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"[yj]"), "i"),
+    (re.compile(r"([a-z])\1+"), r"\1"),
+    (re.compile(r"^ie"), "e"),
+]
+_PLACEHOLDERS = str.maketrans({"X": "x", "Q": "q", "C": "c", "J": "j"})
+_APOSTROPHES = re.compile(r"['’ʼ`]")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_PASSPORT_SEPARATORS = re.compile(r"[\s\-№#]+")
+
+
+def _fold_token(token):
+    for pattern, replacement in _SKELETON_RULES:
+        token = pattern.sub(replacement, token)
+    return token.translate(_PLACEHOLDERS)[:KEY_LENGTH]
+
+
+def _name_keys(value):
+    if not value:
+        return []
+    words = _NON_ALNUM.split(_APOSTROPHES.sub("", value.lower()).translate(_TRANSLIT))
+    return [_fold_token(token) for token in words if token]
+
+
+def _phone_keys(value):
+    digits = re.sub(r"\D", "", value or "")
+    if len(digits) == 11 and digits[0] == "8":
+        digits = "7" + digits[1:]
+    if len(digits) < 5:
+        return []
+    keys = [digits[:KEY_LENGTH]]
+    if len(digits) > 10:
+        keys.append(digits[-10:])
+    return keys
+
+
+def _passport_key(value):
+    if not value:
+        return None
+    digits = _PASSPORT_SEPARATORS.sub("", value)
+    if digits.isdigit():
+        return digits[:KEY_LENGTH]
+    return "".join(_name_keys(value))[:KEY_LENGTH] or None
+
+
+def _client_keys(client):
+    keys = set()
+    for field, name in ((LAST_NAME, 'last_name'), (FIRST_NAME, 'first_name'), (MIDDLE_NAME, 'middle_name')):
+        keys.update((key, field) for key in _name_keys(client[name]))
+    keys.update((key, PHONE) for key in _phone_keys(client['phone']))
+    passport = _passport_key(client['passport_number'])
+    if passport:
+        keys.add((passport, PASSPORT))
+    email = (client['email'] or "").strip().lower()[:KEY_LENGTH]
+    if email:
+        keys.add((email, EMAIL))
+    return keys
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'client_search_keys',
+        sa.Column('organization_id', sa.Integer(), nullable=False),
+        sa.Column('key', sa.String(length=64).with_variant(sa.String(length=64, collation='C'), 'postgresql'), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('field', sa.SmallInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['organization_id'], ['organizations.id']),
+        sa.PrimaryKeyConstraint('organization_id', 'key', 'client_id', 'field')
+    )
+    op.create_index('ix_client_search_keys_client_id', 'client_search_keys', ['client_id', 'key', 'field'], unique=False)
+
+    # Ключи для уже существующих клиентов
+    clients = sa.table(
+        'clients',
+        sa.column('id', sa.Integer), sa.column('organization_id', sa.Integer),
+        sa.column('first_name', sa.String), sa.column('last_name', sa.String), sa.column('middle_name', sa.String),
+        sa.column('phone', sa.String), sa.column('email', sa.String), sa.column('passport_number', sa.String),
+    )
+    search_keys = sa.table(
+        'client_search_keys',
+        sa.column('organization_id', sa.Integer), sa.column('key', sa.String),
+        sa.column('client_id', sa.Integer), sa.column('field', sa.SmallInteger),
+    )
+    bind = op.get_bind()
+    last_id = 0
+    while True:
+        batch = bind.execute(
+            sa.select(clients).where(clients.c.id > last_id).order_by(clients.c.id).limit(BATCH_SIZE)
+        ).mappings().all()
+        if not batch:
+            break
+        rows = [
+            {'organization_id': client['organization_id'], 'key': key, 'client_id': client['id'], 'field': field}
+            for client in batch
+            for key, field in _client_keys(client)
+        ]
+        if rows:
+            bind.execute(search_keys.insert(), rows)
+        last_id = batch[-1]['id']
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_client_search_keys_client_id', table_name='client_search_keys')
+    op.drop_table('client_search_keys')
@@ -0,0 +1,61 @@
+"""Create daily revenue rollups and refresh watermark state
+
+Revision ID: f2c8a5d1e937
+Revises: e4b9d2a7c6f1
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c8a5d1e937'
+down_revision: Union[str, Sequence[str], None] = 'e4b9d2a7c6f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'revenue_daily_rollups',
+        sa.Column('organization_id', sa.Integer, sa.ForeignKey('organizations.id'), primary_key=True),
+        sa.Column('day', sa.Date, primary_key=True),
+        sa.Column('type', sa.String(32), primary_key=True),
+        sa.Column('destination', sa.String(255), primary_key=True),
+        sa.Column('manager_id', sa.Integer, primary_key=True),
+        sa.Column('currency', sa.String(3), primary_key=True),
+        sa.Column('applications', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('paid_applications', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('revenue', sa.Numeric(16, 2), nullable=False, server_default='0')
+    )
+    op.create_table(
+        'revenue_rollup_dirty_days',
+        sa.Column('organization_id', sa.Integer, primary_key=True),
+        sa.Column('day', sa.Date, primary_key=True)
+    )
+    state = op.create_table(
+        'report_refresh_state',
+        sa.Column('name', sa.String(32), primary_key=True),
+        sa.Column('watermark', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('last_id', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('version', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True)
+    )
+    # Первое обновление (refreshed_at пуст) строит сводку целиком
+    op.bulk_insert(state, [{'name': 'revenue_daily', 'watermark': None, 'last_id': 0, 'version': 0}])
+
+    op.create_index('ix_applications_updated_at', 'applications', ['updated_at'])
+    op.create_index('ix_applications_created_at', 'applications', ['created_at'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_applications_created_at', table_name='applications')
+    op.drop_index('ix_applications_updated_at', table_name='applications')
+    op.drop_table('report_refresh_state')
+    op.drop_table('revenue_rollup_dirty_days')
+    op.drop_table('revenue_daily_rollups')
@@ -0,0 +1,56 @@
+"""Make organization_id the leading column of per-tenant indexes
+
+Revision ID: f6a2d8c4e519
+Revises: e1c7f4a9b352
+Create Date: 2026-10-18 04:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f6a2d8c4e519'
+down_revision: Union[str, Sequence[str], None] = 'e1c7f4a9b352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.drop_index('ix_clients_email', table_name='clients')
+    op.create_index('ix_clients_org_email', 'clients', ['organization_id', 'email'])
+    op.create_index('ix_clients_org_id', 'clients', ['organization_id', 'id'])
+
+    op.drop_index('ix_applications_created_at', table_name='applications')
+    op.create_index('ix_applications_org_created_at', 'applications', ['organization_id', 'created_at'])
+    op.create_index('ix_applications_org_id', 'applications', ['organization_id', 'id'])
+    op.create_index('ix_applications_org_client', 'applications', ['organization_id', 'client_id', 'id'])
+
+    op.create_index('ix_users_org_id', 'users', ['organization_id', 'id'])
+
+    op.drop_index('ix_application_status_events_application_id', table_name='application_status_events')
+    op.create_index(
+        'ix_application_status_events_org_application', 'application_status_events',
+        ['organization_id', 'application_id', 'id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_application_status_events_org_application', table_name='application_status_events')
+    op.create_index(
+        'ix_application_status_events_application_id', 'application_status_events', ['application_id', 'id']
+    )
+
+    op.drop_index('ix_users_org_id', table_name='users')
+
+    op.drop_index('ix_applications_org_client', table_name='applications')
+    op.drop_index('ix_applications_org_id', table_name='applications')
+    op.drop_index('ix_applications_org_created_at', table_name='applications')
+    op.create_index('ix_applications_created_at', 'applications', ['created_at'])
+
+    op.drop_index('ix_clients_org_id', table_name='clients')
+    op.drop_index('ix_clients_org_email', table_name='clients')
+    op.create_index('ix_clients_email', 'clients', ['email'])
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Client search benchmark
+
+Fills a temporary SQLite database with synthetic clients of one organization
+(Cyrillic and Latin spellings, phones, passports, emails), builds the search
+keys in bulk and measures search_clients latency for typeahead-style queries.
+The target is p95 under 50 ms at 1M clients.
+
+    python benchmarks/client_search.py --clients 1000000 --repeat 20
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+LAST_NAMES = [
+    "Иванов", "Петров", "Сидоров", "Смирнов", "Кузнецов", "Попов", "Васильев", "Соколов", "Михайлов",
+    "Новиков", "Фёдоров", "Морозов", "Волков", "Алексеев", "Лебедев", "Семёнов", "Егоров", "Павлов",
+    "Козлов", "Степанов", "Николаев", "Орлов", "Андреев", "Макаров", "Никитин", "Захаров", "Зайцев",
+    "Соловьёв", "Борисов", "Яковлев", "Григорьев", "Романов", "Воробьёв", "Сергеев", "Кузьмин", "Фролов",
+    "Щукин", "Жуков", "Цветков", "Хабаров", "Чайковский", "Юдин",
+]
+FIRST_NAMES = [
+    "Александр", "Алексей", "Андрей", "Сергей", "Дмитрий", "Иван", "Михаил", "Евгений", "Николай", "Пётр",
+    "Юлия", "Наталья", "Елена", "Ольга", "Татьяна", "Мария", "Анна", "Ирина", "Светлана", "Ксения",
+]
+MIDDLE_NAMES = ["Александрович", "Сергеевич", "Иванович", "Петрович", "Андреевна", "Николаевна", "Викторовна"]
+LATIN = {
+    "Иванов": "Ivanov", "Петров": "Petrov", "Щукин": "Schukin", "Жуков": "Zhukov", "Хабаров": "Habarov",
+    "Юлия": "Julia", "Наталья": "Natalia", "Алексей": "Alexey", "Евгений": "Yevgeniy", "Александр": "Alexander",
+}
+QUERIES = ["ив", "иванов", "ivanov ale", "петров сер", "щук", "shchukin", "julia", "наталья пет",
+           "+7 916 12", "8916", "45 12", "ivan.petrov@", "zzz"]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def setup_database(args):
+    tmpdir = tempfile.mkdtemp(prefix="client-search-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    sys.path.insert(0, ROOT)
+
+    import src.models  # noqa: F401  регистрирует все модели
+    from src.database import Base, engine
+    from src.models.business import Client, Organization
+    from src.models.search import ClientSearchKey
+    from src.models.user import User
+    from src.services.client_search import client_search_keys
+
+    Base.metadata.create_all(engine)
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(Organization.__table__.insert(), [{"id": 1, "name": "Bench", "type": "TRAVEL_AGENCY", "is_active": True}])
+        conn.execute(User.__table__.insert(), [{"id": 1, "email": "bench@example.com", "password_hash": "-", "role": "ADMIN"}])
+
+    batch = 20000
+    for start in range(1, args.clients + 1, batch):
+        clients, keys = [], []
+        for client_id in range(start, min(start + batch, args.clients + 1)):
+            last_name, first_name = rng.choice(LAST_NAMES), rng.choice(FIRST_NAMES)
+            if rng.random() < 0.2:
+                last_name, first_name = LATIN.get(last_name, last_name), LATIN.get(first_name, first_name)
+            row = {
+                "id": client_id, "organization_id": 1, "created_by": 1, "status": "ACTIVE",
+                "first_name": first_name, "last_name": last_name, "middle_name": rng.choice(MIDDLE_NAMES),
+                "phone": f"+7 9{rng.randint(0, 99):02d} {rng.randint(0, 9999999):07d}",
+                "email": f"client{client_id}@example.com" if rng.random() < 0.5 else None,
+                "passport_number": f"{rng.randint(1000, 9999)} {rng.randint(0, 999999):06d}",
+            }
+            clients.append(row)
+            keys.extend(
+                {"organization_id": 1, "key": key, "client_id": client_id, "field": field}
+                for key, field in client_search_keys(
+                    row["first_name"], row["last_name"], row["middle_name"],
+                    row["phone"], row["email"], row["passport_number"],
+                )
+            )
+        with engine.begin() as conn:
+            conn.execute(Client.__table__.insert(), clients)
+            conn.execute(ClientSearchKey.__table__.insert(), keys)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print(f"loaded {args.clients} clients in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    setup_database(args)
+    from src.database import SessionLocal
+    from src.services.client_search import search_clients
+
+    overall = []
+    print(f"{'query':<16} {'hits':>5} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+    for query in QUERIES:
+        timings, hits = [], 0
+        for _ in range(args.repeat):
+            db = SessionLocal()
+            try:
+                started = time.perf_counter()
+                hits = len(search_clients(db, 1, query, limit=args.limit))
+                timings.append((time.perf_counter() - started) * 1000)
+            finally:
+                db.close()
+        overall.extend(timings)
+        print(f"{query:<16} {hits:>5} {statistics.median(timings):>8.2f} "
+              f"{percentile(timings, 95):>8.2f} {max(timings):>8.2f}")
+    p95 = percentile(overall, 95)
+    print(f"overall p95 {p95:.2f} ms ({'ok' if p95 < 50 else 'over'} 50 ms target)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Job queue check
+
+Runs a worker with several threads against the database queue (temporary
+SQLite) and the Redis queue (fakeredis) and checks that:
+
+- every job runs exactly once even with concurrent workers, and reports
+  throughput;
+- a failing job is retried with backoff and succeeds on a later attempt;
+- a job that always fails ends up dead after max_attempts;
+- enqueue with the same idempotency key returns the existing job, also
+  when several requests enqueue it at the same time;
+- higher priority jobs are taken first.
+
+Exits with code 1 if a check fails.
+
+    python benchmarks/job_queue.py --jobs 500 --concurrency 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup():
+    tmpdir = tempfile.mkdtemp(prefix="job-queue-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/jobs.db"
+    os.environ["JOB_BACKOFF_SECONDS"] = "0.05"
+    os.environ["JOB_BACKOFF_MAX_SECONDS"] = "0.2"
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    import src.models  # noqa: F401  регистрирует все модели
+    from src.database import Base, engine
+    from src.jobs import job_handler
+
+    Base.metadata.create_all(engine)
+
+    runs = Counter()
+    lock = threading.Lock()
+    order = []
+
+    @job_handler("check.count")
+    def count(payload):
+        with lock:
+            runs[payload["n"]] += 1
+        return {"n": payload["n"]}
+
+    @job_handler("check.flaky")
+    def flaky(payload):
+        with lock:
+            runs[("flaky", payload["n"])] += 1
+            attempt = runs[("flaky", payload["n"])]
+        if attempt < payload["succeed_on"]:
+            raise RuntimeError(f"attempt {attempt} failed")
+        return {"attempt": attempt}
+
+    @job_handler("check.order")
+    def ordered(payload):
+        with lock:
+            order.append(payload["priority"])
+
+    return runs, order
+
+
+def run_until_idle(worker, expected_done, timeout=60.0):
+    stop = threading.Event()
+    thread = threading.Thread(target=worker.run, args=(stop,))
+    started = time.perf_counter()
+    thread.start()
+    while time.perf_counter() - started < timeout and expected_done() is False:
+        time.sleep(0.05)
+    stop.set()
+    thread.join()
+    return time.perf_counter() - started
+
+
+def check_queue(queue, args, runs, order) -> bool:
+    from src.jobs import JobWorker, configure_job_queue, enqueue
+
+    configure_job_queue(queue)
+    runs.clear()
+    order.clear()
+    ok = True
+
+    def report(name, passed, details=""):
+        nonlocal ok
+        ok &= passed
+        print(f"  {name:<28} {'ok' if passed else 'FAIL'}  {details}")
+
+    print(f"{queue.name} queue")
+    for n in range(args.jobs):
+        enqueue("check.count", {"n": n}, priority=n % 5)
+    worker = JobWorker(queue, concurrency=args.concurrency, poll_seconds=0.01)
+    elapsed = run_until_idle(worker, lambda: sum(runs[n] for n in range(args.jobs)) >= args.jobs)
+    duplicates = sum(1 for n in range(args.jobs) if runs[n] > 1)
+    missing = sum(1 for n in range(args.jobs) if runs[n] == 0)
+    report("exactly once", duplicates == 0 and missing == 0,
+           f"{args.jobs} jobs in {elapsed:.2f}s ({args.jobs / elapsed:.0f}/s), "
+           f"{duplicates} duplicated, {missing} missing")
+
+    retried = enqueue("check.flaky", {"n": 1, "succeed_on": 3}, max_attempts=5)
+    dead = enqueue("check.flaky", {"n": 2, "succeed_on": 99}, max_attempts=3)
+    run_until_idle(
+        JobWorker(queue, concurrency=2, poll_seconds=0.01),
+        lambda: queue.get(retried.id).status == "succeeded" and queue.get(dead.id).status == "dead",
+    )
+    retried, dead = queue.get(retried.id), queue.get(dead.id)
+    report("retry with backoff", retried.status == "succeeded" and retried.attempts == 3,
+           f"{retried.status} after {retried.attempts} attempts")
+    report("dead after max_attempts", dead.status == "dead" and dead.attempts == 3,
+           f"{dead.status}, last error: {dead.last_error}")
+
+    first = enqueue("check.count", {"n": -1}, idempotency_key="check-key")
+    second = enqueue("check.count", {"n": -2}, idempotency_key="check-key")
+    report("idempotency key", first.id == second.id and second.payload == {"n": -1})
+
+    # Одновременная постановка с одним ключом: одна задача на всех
+    barrier = threading.Barrier(args.concurrency)
+
+    def enqueue_concurrently(n):
+        barrier.wait()
+        return enqueue("check.count", {"n": -100 - n}, idempotency_key="check-concurrent-key").id
+
+    with ThreadPoolExecutor(args.concurrency) as executor:
+        ids = set(executor.map(enqueue_concurrently, range(args.concurrency)))
+    report("concurrent idempotency key", len(ids) == 1, f"{len(ids)} jobs for {args.concurrency} requests")
+
+    for priority in (0, -10, 10, 5, -5):
+        enqueue("check.order", {"priority": priority}, priority=priority)
+    run_until_idle(JobWorker(queue, concurrency=1, poll_seconds=0.01), lambda: len(order) == 5)
+    report("priority order", order == [10, 5, 0, -5, -10], str(order))
+    configure_job_queue(None)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    args = parser.parse_args()
+
+    runs, order = setup()
+    import fakeredis
+    from src.jobs import DatabaseJobQueue, RedisJobQueue
+
+    ok = check_queue(DatabaseJobQueue(), args, runs, order)
+    ok &= check_queue(RedisJobQueue(fakeredis.FakeRedis(), "job-check"), args, runs, order)
+    print("\nall job queue checks passed" if ok else "\njob queue check failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
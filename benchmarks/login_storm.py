@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Login storm benchmark
+
+Fires concurrent /auth/login requests at an in-process app and meanwhile polls
+/health, then prints p50/p99 latency of /health during the storm and the login
+throughput. Run with --inline-hashing to reproduce the old behaviour where
+argon2 ran directly on the event loop.
+
+    python benchmarks/login_storm.py --logins 200 --concurrency 50
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def setup_app(args):
+    tmpdir = tempfile.mkdtemp(prefix="login-storm-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/bench.db"
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ["PASSWORD_HASH_QUEUE_LIMIT"] = str(args.queue_limit)
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    import src.models  # noqa: F401  регистрирует все модели
+    from src.database import Base, SessionLocal, engine
+    from src.models.user import User, UserRole
+    from src.auth import core
+    from src.main import app
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    db.add(User(email="storm@example.com", password_hash=core.get_password_hash("storm-password"), role=UserRole.OPERATOR))
+    db.commit()
+    db.close()
+
+    if args.inline_hashing:
+        async def inline_verify(plain_password, hashed_password):
+            return core.pwd_context.verify(plain_password, hashed_password)
+
+        from src.routers import auth as auth_router_module
+        auth_router_module.verify_password_async = inline_verify
+    return app
+
+
+async def run(args):
+    import httpx
+
+    app = setup_app(args)
+    transport = httpx.ASGITransport(app=app)
+    health_latencies = []
+    login_statuses = {}
+    stop = asyncio.Event()
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def poll_health():
+            # Latency is measured from the scheduled probe time, so probes
+            # delayed by a blocked event loop are counted (no coordinated omission)
+            interval = args.poll_interval / 1000
+            scheduled = time.perf_counter()
+            while not stop.is_set():
+                await asyncio.sleep(max(0.0, scheduled - time.perf_counter()))
+                await client.get("/health")
+                now = time.perf_counter()
+                health_latencies.append((now - scheduled) * 1000)
+                scheduled += interval
+                while scheduled < now - interval:
+                    # Probes that should have fired while the loop was blocked
+                    health_latencies.append((now - scheduled) * 1000)
+                    scheduled += interval
+
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def login():
+            async with semaphore:
+                response = await client.post(
+                    "/auth/login",
+                    data={"username": "storm@example.com", "password": "storm-password"},
+                )
+                login_statuses[response.status_code] = login_statuses.get(response.status_code, 0) + 1
+
+        poller = asyncio.create_task(poll_health())
+        started = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(args.logins)))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await poller
+
+    mode = "inline (event loop)" if args.inline_hashing else f"executor ({args.workers} workers)"
+    print(f"mode:               {mode}")
+    print(f"logins:             {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s)")
+    print(f"login statuses:     {dict(sorted(login_statuses.items()))}")
+    print(f"/health samples:    {len(health_latencies)}")
+    if health_latencies:
+        print(f"/health p50:        {percentile(health_latencies, 50):.2f} ms")
+        print(f"/health p99:        {percentile(health_latencies, 99):.2f} ms")
+        print(f"/health max:        {max(health_latencies):.2f} ms")
+        print(f"/health mean:       {statistics.mean(health_latencies):.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-limit", type=int, default=256)
+    parser.add_argument("--poll-interval", type=float, default=5.0, help="ms between /health probes")
+    parser.add_argument("--inline-hashing", action="store_true")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
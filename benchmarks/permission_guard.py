@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Permission guard micro-benchmark
+
+Compares the per-request cost of the old guard (list membership in
+ROLE_PERMISSIONS plus an isinstance scan over the handler kwargs) with the
+precompiled bitmask check used by require_permission/has_permission.
+
+    python benchmarks/permission_guard.py --number 200000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.auth.identity import AuthenticatedUser  # noqa: E402
+from src.auth.permissions import (  # noqa: E402
+    ROLE_PERMISSIONS,
+    ROLE_PERMISSION_MASKS,
+    Permissions,
+    check_permissions,
+    has_permission,
+    permission_mask,
+)
+from src.models.user import User, UserRole  # noqa: E402
+
+
+def legacy_guard(kwargs, permission):
+    current_user = None
+    for key, value in kwargs.items():
+        if isinstance(value, User):
+            current_user = value
+            break
+    return permission in ROLE_PERMISSIONS.get(current_user.role, [])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=200000)
+    args = parser.parse_args()
+
+    # Разрешение из конца списка - худший случай для линейного поиска
+    permission = Permissions.GENERATE_REPORTS
+    legacy_user = User(id=1, email="bench@example.com", role=UserRole.ACCOUNTANT)
+    user = AuthenticatedUser(id=1, email="bench@example.com", role=UserRole.ACCOUNTANT)
+    kwargs = {
+        "request": object(),
+        "db": object(),
+        "format": "csv",
+        "date_from": None,
+        "date_to": None,
+        "current_user": legacy_user,
+    }
+    required = permission_mask(permission)
+    batch = [Permissions.VIEW_FINANCIAL_DATA, Permissions.EDIT_FINANCIAL_DATA, Permissions.GENERATE_REPORTS,
+             Permissions.VIEW_ALL_CLIENTS, Permissions.VIEW_ALL_APPLICATIONS]
+
+    cases = {
+        "legacy: kwargs scan + list membership": lambda: legacy_guard(kwargs, permission),
+        "has_permission (bitmask)": lambda: has_permission(user, permission),
+        "require_permission check (precomputed mask)": lambda: ROLE_PERMISSION_MASKS.get(user.role, 0) & required == required,
+        "legacy: 5 permissions, list membership": lambda: [p in ROLE_PERMISSIONS[legacy_user.role] for p in batch],
+        "check_permissions (5 permissions)": lambda: check_permissions(user, batch),
+    }
+    for name, case in cases.items():
+        elapsed = min(timeit.repeat(case, number=args.number, repeat=5))
+        print(f"{name:<48} {elapsed / args.number * 1e9:8.1f} ns/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Bulk application status transition check
+
+Creates --applications applications in a temporary SQLite database and
+moves them through the status workflow with transition_applications,
+comparing against changing the status object by object through the ORM.
+Checks that:
+
+- a bulk move issues a fixed number of statements, independent of the
+  number of applications (one UPDATE per target status);
+- every applied transition has exactly one event in application_status_events;
+- dashboard counters after the bulk move match a full rebuild;
+- forbidden transitions are rejected and leave the rows untouched, also
+  when attempted through the ORM;
+- inbox versions of the affected assignees are bumped.
+
+Exits with code 1 if a check fails.
+
+    python benchmarks/status_transitions.py --applications 5000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from decimal import Decimal
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup(args):
+    tmpdir = tempfile.mkdtemp(prefix="status-transitions-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/transitions.db"
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    import src.models  # noqa: F401  регистрирует все модели
+    import src.services  # noqa: F401  обработчики сессии
+    from sqlalchemy import insert
+    from src.database import Base, SessionLocal, engine
+    from src.models.business import (
+        Application, ApplicationStatus, ApplicationType, Client, Organization, OrganizationType,
+    )
+    from src.models.user import User, UserRole
+    from src.services.statistics import rebuild_organization_stats
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    org = Organization(name="Transitions", type=OrganizationType.TRAVEL_AGENCY, code="TRN")
+    db.add(org)
+    db.flush()
+    users = [
+        User(email=f"manager{i}@example.com", password_hash="-", role=UserRole.OPERATOR, organization_id=org.id)
+        for i in range(4)
+    ]
+    db.add_all(users)
+    db.flush()
+    client = Client(organization_id=org.id, first_name="Иван", last_name="Петров", created_by=users[0].id)
+    db.add(client)
+    db.flush()
+    db.connection().execute(insert(Application.__table__), [
+        {
+            "organization_id": org.id,
+            "client_id": client.id,
+            "application_number": f"TRN-{n:06d}",
+            "type": ApplicationType.TOUR_PACKAGE,
+            "status": ApplicationStatus.SUBMITTED,
+            "title": f"Тур {n}",
+            "final_cost": Decimal("1000.00") + n,
+            "currency": "RUB" if n % 3 else "EUR",
+            "assigned_to": users[n % len(users)].id,
+            "created_by": users[0].id,
+        }
+        for n in range(args.applications)
+    ])
+    db.commit()
+    rebuild_organization_stats(db, org.id)
+    organization_id, user_ids = org.id, [user.id for user in users]
+    db.close()
+    return organization_id, user_ids
+
+
+class StatementCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--applications", type=int, default=5000)
+    parser.add_argument("--orm-sample", type=int, default=500, help="applications moved one by one via ORM")
+    args = parser.parse_args()
+
+    organization_id, user_ids = setup(args)
+    from sqlalchemy import func, select
+    from src.database import SessionLocal, engine
+    from src.models.business import Application, ApplicationStatus
+    from src.models.inbox import ApplicationInboxVersion
+    from src.models.status_events import ApplicationStatusEvent
+    from src.services.application_status import (
+        MAX_TRANSITION_BATCH, InvalidTransition, transition_applications,
+    )
+    from src.services.statistics import get_dashboard_stats, rebuild_organization_stats
+
+    ok = True
+
+    def report(name, passed, details=""):
+        nonlocal ok
+        ok &= passed
+        print(f"  {name:<30} {'ok' if passed else 'FAIL'}  {details}")
+
+    counter = StatementCounter(engine)
+    db = SessionLocal()
+    ids = list(db.scalars(select(Application.id).order_by(Application.id)))
+    orm_ids, bulk_ids = ids[:args.orm_sample], ids[args.orm_sample:]
+
+    started = time.perf_counter()
+    for application in db.scalars(select(Application).where(Application.id.in_(orm_ids))):
+        application.status = ApplicationStatus.PROCESSING
+        db.commit()
+    orm_elapsed = time.perf_counter() - started
+    print(f"ORM, one by one: {len(orm_ids)} applications in {orm_elapsed:.2f}s "
+          f"({len(orm_ids) / orm_elapsed:.0f}/s)")
+
+    inbox_before = dict(db.execute(select(ApplicationInboxVersion.assignee_id, ApplicationInboxVersion.version)).all())
+    statements, applied, elapsed = [], 0, 0.0
+    for start in range(0, len(bulk_ids), MAX_TRANSITION_BATCH):
+        chunk = bulk_ids[start:start + MAX_TRANSITION_BATCH]
+        counter.count = 0
+        started = time.perf_counter()
+        result = transition_applications(
+            db, organization_id, [(application_id, ApplicationStatus.PROCESSING) for application_id in chunk],
+            changed_by=user_ids[0], comment="bulk check",
+        )
+        elapsed += time.perf_counter() - started
+        statements.append(counter.count)
+        applied += len(result.applied)
+    print(f"bulk, {MAX_TRANSITION_BATCH} per request: {applied} applications in {elapsed:.2f}s "
+          f"({applied / elapsed:.0f}/s)\n")
+
+    report("all applied", applied == len(bulk_ids), f"{applied}/{len(bulk_ids)}")
+    report("fixed statements per batch", len(set(statements)) == 1, f"{statements[0]} statements per request")
+
+    events = db.scalar(select(func.count()).select_from(ApplicationStatusEvent))
+    report("one event per transition", events == len(ids), f"{events} events for {len(ids)} transitions")
+
+    # Две группы целевых статусов в одном запросе: один UPDATE на каждую
+    counter.count = 0
+    mixed = [(application_id, ApplicationStatus.CONFIRMED) for application_id in bulk_ids[:200]]
+    mixed += [(application_id, ApplicationStatus.CANCELLED) for application_id in bulk_ids[200:400]]
+    result = transition_applications(db, organization_id, mixed, changed_by=user_ids[0])
+    report("two targets, one request", len(result.applied) == 400 and counter.count == statements[0] + 1,
+           f"{counter.count} statements")
+    # Оплата меняет выручку
+    result = transition_applications(
+        db, organization_id, [(application_id, ApplicationStatus.PAID) for application_id in bulk_ids[:100]]
+    )
+    report("paid", len(result.applied) == 100, f"{len(result.applied)} applied")
+
+    forbidden = [bulk_ids[150], bulk_ids[250]]
+    result = transition_applications(db, organization_id, [
+        (forbidden[0], ApplicationStatus.REFUNDED),
+        (forbidden[1], ApplicationStatus.PAID),
+        (-1, ApplicationStatus.PAID),
+    ])
+    statuses = dict(db.execute(
+        select(Application.id, Application.status).where(Application.id.in_(forbidden))
+    ).all())
+    report("forbidden transitions rejected",
+           not result.applied and len(result.rejected) == 3
+           and statuses == {forbidden[0]: ApplicationStatus.CONFIRMED, forbidden[1]: ApplicationStatus.CANCELLED},
+           "; ".join(item.reason for item in result.rejected))
+
+    application = db.get(Application, bulk_ids[500])
+    try:
+        application.status = ApplicationStatus.COMPLETED
+        report("forbidden ORM transition", False, "no error")
+    except InvalidTransition as e:
+        report("forbidden ORM transition", True, str(e))
+    db.rollback()
+
+    inbox_after = dict(db.execute(select(ApplicationInboxVersion.assignee_id, ApplicationInboxVersion.version)).all())
+    bumped = all(inbox_after.get(user_id, 0) > inbox_before.get(user_id, 0) for user_id in user_ids)
+    report("inbox versions bumped", bumped, str(inbox_after))
+
+    incremental = get_dashboard_stats(db, organization_id)
+    rebuild_organization_stats(db, organization_id)
+    rebuilt = get_dashboard_stats(db, organization_id)
+    report("dashboard counters consistent",
+           incremental.applications_by_status == rebuilt.applications_by_status
+           and incremental.revenue_by_currency == rebuilt.revenue_by_currency,
+           f"{incremental.applications_by_status}, revenue {incremental.revenue_by_currency}")
+    db.close()
+
+    print("\nall status transition checks passed" if ok else "\nstatus transition check failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Tenant scoping check
+
+Fills a temporary SQLite database with --organizations organizations and
+checks that a session scoped to one of them (as the current user dependency
+does for non-admin users):
+
+- sees only its organization's clients, applications, users and events,
+  including db.get() and column selects that forget the filter;
+- cannot update or delete other organizations' rows through the ORM;
+- sees everything with execution_options(all_tenants=True) and for ADMIN;
+- sees nothing for a user without an organization.
+
+It also checks with EXPLAIN QUERY PLAN that per-tenant queries (exports,
+client applications, rollup day rebuild, status history, user list, email
+lookup) search an index led by organization_id instead of scanning the
+table, and reports the per-query overhead of the scoping hook.
+
+Exits with code 1 if a check fails.
+
+    python benchmarks/tenant_scoping.py --organizations 20 --clients 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup(args):
+    tmpdir = tempfile.mkdtemp(prefix="tenant-scoping-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmpdir}/tenants.db"
+    sys.path.insert(0, ROOT)
+    os.chdir(ROOT)
+
+    import src.models  # noqa: F401  регистрирует все модели
+    from sqlalchemy import insert
+    from src.database import Base, SessionLocal, engine
+    from src.models.business import (
+        Application, ApplicationStatus, ApplicationType, Client, Organization, OrganizationType,
+    )
+    from src.models.status_events import ApplicationStatusEvent
+    from src.models.user import User, UserRole
+
+    Base.metadata.create_all(engine)
+    db = SessionLocal()
+    connection = db.connection()
+    for n in range(args.organizations):
+        org = Organization(name=f"Agency {n}", type=OrganizationType.TRAVEL_AGENCY, code=f"A{n}")
+        db.add(org)
+        db.flush()
+        user = User(email=f"manager{n}@example.com", password_hash="-", role=UserRole.OPERATOR, organization_id=org.id)
+        db.add(user)
+        db.flush()
+        connection.execute(insert(Client.__table__), [
+            {
+                "organization_id": org.id, "first_name": "Иван", "last_name": f"Клиент {i}",
+                "email": f"client{i}@agency{n}.example", "created_by": user.id,
+            }
+            for i in range(args.clients)
+        ])
+        client_ids = [row.id for row in db.query(Client.id).filter(Client.organization_id == org.id)]
+        connection.execute(insert(Application.__table__), [
+            {
+                "organization_id": org.id, "client_id": client_id, "application_number": f"A{n}-{client_id}",
+                "type": ApplicationType.FLIGHT, "status": ApplicationStatus.SUBMITTED,
+                "title": "Перелёт", "created_by": user.id,
+            }
+            for client_id in client_ids
+        ])
+        connection.execute(insert(ApplicationStatusEvent.__table__), [
+            {"organization_id": org.id, "application_id": client_id, "to_status": ApplicationStatus.SUBMITTED}
+            for client_id in client_ids
+        ])
+    db.add(User(email="nobody@example.com", password_hash="-", role=UserRole.OPERATOR))
+    db.add(User(email="admin@example.com", password_hash="-", role=UserRole.ADMIN))
+    db.commit()
+    db.close()
+    connection = engine.connect()
+    connection.exec_driver_sql("ANALYZE")
+    connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--organizations", type=int, default=20)
+    parser.add_argument("--clients", type=int, default=200, help="clients (and applications) per organization")
+    parser.add_argument("--queries", type=int, default=2000, help="queries for the overhead measurement")
+    args = parser.parse_args()
+
+    setup(args)
+    from datetime import datetime, timedelta
+    from sqlalchemy import delete, func, select, update
+    from src.auth.permissions import scope_session_to_user
+    from src.database import SessionLocal, engine
+    from src.models.business import Application, Client
+    from src.models.status_events import ApplicationStatusEvent
+    from src.models.user import User
+    from src.services.exports import EXPORTS, ExportFilter
+    from src.tenancy import ALL_TENANTS, tenant_scope
+
+    ok = True
+
+    def report(name, passed, details=""):
+        nonlocal ok
+        ok &= passed
+        print(f"  {name:<34} {'ok' if passed else 'FAIL'}  {details}")
+
+    db = SessionLocal()
+    user = db.scalars(select(User).where(User.email == "manager0@example.com")).one()
+    organization_id = user.organization_id
+    other_client = db.scalars(select(Client.id).where(Client.organization_id != organization_id).limit(1)).one()
+    other_application = db.scalars(
+        select(Application.id).where(Application.organization_id != organization_id).limit(1)
+    ).one()
+    db.close()
+
+    print("isolation")
+    db = SessionLocal()
+    scope_session_to_user(db, user)
+    organizations = {
+        model.__name__: set(db.scalars(select(model.organization_id).distinct()))
+        for model in (Client, Application, User, ApplicationStatusEvent)
+    }
+    report("selects see one organization", all(found == {organization_id} for found in organizations.values()),
+           str(organizations))
+    report("db.get of another organization", db.get(Client, other_client) is None)
+    client = db.scalars(select(Client).limit(1)).one()
+    report("relationship loads scoped", all(a.organization_id == organization_id for a in client.applications),
+           f"{len(client.applications)} applications")
+    updated = db.execute(
+        update(Application).where(Application.id == other_application).values(title="чужая")
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    deleted = db.execute(
+        delete(ApplicationStatusEvent).where(ApplicationStatusEvent.application_id == other_application)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.rollback()
+    report("update/delete of other rows", updated == 0 and deleted == 0, f"{updated} updated, {deleted} deleted")
+    total = db.scalar(select(func.count(Client.id)).execution_options(**{ALL_TENANTS: True}))
+    report("all_tenants bypass", total == args.organizations * args.clients, f"{total} clients")
+    with tenant_scope(db, None):
+        nothing = db.scalar(select(func.count(Client.id)))
+    report("no organization sees nothing", nothing == 0, f"{nothing} clients")
+    db.close()
+
+    db = SessionLocal()
+    admin = db.scalars(select(User).where(User.email == "admin@example.com")).one()
+    scope_session_to_user(db, admin)
+    total = db.scalar(select(func.count(Client.id)))
+    report("admin sees all organizations", total == args.organizations * args.clients, f"{total} clients")
+    db.close()
+
+    print("\nquery plans")
+    day = datetime(2026, 1, 1)
+    plans = {
+        "clients export": EXPORTS["clients"][1](ExportFilter(organization_id=organization_id)),
+        "applications export": EXPORTS["applications"][1](ExportFilter(organization_id=organization_id)),
+        "client applications": select(Application.id).where(
+            Application.organization_id == organization_id, Application.client_id == 1
+        ),
+        "rollup day rebuild": select(Application.id).where(
+            Application.organization_id == organization_id,
+            Application.created_at >= day, Application.created_at < day + timedelta(days=1),
+        ),
+        "status history": select(ApplicationStatusEvent.id).where(
+            ApplicationStatusEvent.organization_id == organization_id, ApplicationStatusEvent.application_id == 1
+        ).order_by(ApplicationStatusEvent.id),
+        "organization users": select(User.id).where(User.organization_id == organization_id).order_by(User.id),
+        "client by email": select(Client.id).where(
+            Client.organization_id == organization_id, Client.email == "client1@agency0.example"
+        ),
+    }
+    with engine.connect() as connection:
+        for name, query in plans.items():
+            compiled = query.compile(engine, compile_kwargs={"literal_binds": True})
+            plan = [row[-1] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}")]
+            # Первый шаг - таблица из FROM; соединения (JOIN clients) ищутся по первичному ключу
+            first = plan[0]
+            passed = "USING" in first and "INDEX" in first and "TEMP B-TREE" not in " ".join(plan)
+            report(name, passed, first)
+
+    print("\noverhead")
+    for label, scoped in (("unscoped", False), ("scoped", True)):
+        db = SessionLocal()
+        if scoped:
+            scope_session_to_user(db, user)
+        query = select(Client.id, Client.last_name).where(Client.organization_id == organization_id).limit(20)
+        db.execute(query).all()
+        started = time.perf_counter()
+        for _ in range(args.queries):
+            db.execute(query).all()
+        elapsed = time.perf_counter() - started
+        print(f"  {label:<10} {elapsed / args.queries * 1e6:.0f} us per query")
+        db.close()
+
+    print("\nall tenant scoping checks passed" if ok else "\ntenant scoping check failed")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
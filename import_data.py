@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Bulk import of clients or applications from CSV/XLSX
+
+    python import_data.py clients clients.csv --organization-id 1 --user admin@travelcrm.com
+    python import_data.py applications orders.xlsx --organization-id 1 --user admin@travelcrm.com --batch-size 5000
+"""
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.database import SessionLocal
+from src.models.user import User
+from src.services.imports import APPLICATIONS, CLIENTS, MAX_BATCH_SIZE, ImportFormatError, run_import
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("kind", choices=[CLIENTS, APPLICATIONS])
+    parser.add_argument("path")
+    parser.add_argument("--organization-id", type=int, required=True)
+    parser.add_argument("--user", required=True, help="email of the user recorded as creator")
+    parser.add_argument("--batch-size", type=int, default=None, help=f"rows per transaction (max {MAX_BATCH_SIZE})")
+    parser.add_argument("--encoding", default="utf-8-sig", help="CSV encoding, e.g. cp1251")
+    parser.add_argument("--errors-file", default=None, help="write per-row errors to this file")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        creator = db.query(User).filter(User.email == args.user).first()
+        if creator is None:
+            sys.exit(f"User {args.user} not found")
+
+        started = time.perf_counter()
+        with open(args.path, "rb") as stream:
+            try:
+                reports = run_import(
+                    db, args.kind, stream, args.path, args.organization_id, creator.id,
+                    args.batch_size, args.encoding,
+                )
+                for report in reports:
+                    elapsed = time.perf_counter() - started
+                    print(
+                        f"\r{report.rows} rows, {report.inserted} inserted, {report.duplicates} duplicates, "
+                        f"{report.failed} failed ({report.rows / elapsed if elapsed else 0:.0f} rows/s)",
+                        end="", flush=True,
+                    )
+            except ImportFormatError as e:
+                sys.exit(f"Cannot read {args.path}: {e}")
+        print()
+
+        if report.error:
+            print(report.error)
+        for error in report.errors[:20]:
+            print(f"line {error.line}: {'; '.join(error.errors)}")
+        if report.failed > 20:
+            print(f"... {report.failed - 20} more failed rows")
+        if args.errors_file and report.errors:
+            with open(args.errors_file, "w", encoding="utf-8") as target:
+                for error in report.errors:
+                    target.write(f"{error.line}\t{'; '.join(error.errors)}\n")
+        sys.exit(1 if report.error else 0)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
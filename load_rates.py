@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Load exchange rates from a local CSV file (works offline)
+
+    python load_rates.py rates.csv
+    python load_rates.py cbr_rates.csv --encoding cp1251
+
+The file needs a header with date, currency and rate columns (comma or
+semicolon separated); an optional nominal column divides the rate, e.g.
+"2026-10-01;JPY;52,31;100". Rates are the price of one unit in BASE_CURRENCY.
+"""
+import argparse
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from src.database import SessionLocal
+from src.services.currency import RateFileError, load_rates_file
+from src.settings import settings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("path")
+    parser.add_argument("--encoding", default="utf-8-sig", help="file encoding, e.g. cp1251")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        loaded = load_rates_file(db, args.path, args.encoding)
+    except (OSError, RateFileError) as e:
+        sys.exit(f"Cannot load {args.path}: {e}")
+    finally:
+        db.close()
+    print(f"{loaded} rates loaded (base currency {settings.base_currency})")
+
+
+if __name__ == "__main__":
+    main()
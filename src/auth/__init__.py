@@ -5,39 +5,77 @@
 from .core import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    PasswordHashingOverloaded,
+    password_hasher,
     create_access_token,
     create_refresh_token,
-    verify_token
+    verify_token,
+    purge_token,
+    token_cache_stats
 )
 
+# Отзыв токенов
+from .revocation import revocation_index, revoke_token
+
+# Разрешение текущего пользователя
+from .identity import AuthenticatedUser, invalidate_identity
+
 # Импортируем систему прав
 from .permissions import (
     PermissionDenied,
     RoleHierarchy,
     Permissions,
     has_permission,
+    has_permissions,
+    check_permissions,
+    filter_permitted,
+    permission_mask,
     require_permission,
     require_role,
     get_current_user_with_permissions,
     can_create_user_with_role,
-    get_allowed_roles_for_user
+    organization_for_new_user,
+    get_allowed_roles_for_user,
+    resolve_organization_scope,
+    scope_session_to_user
 )
 
 __all__ = [
     # Основные функции аутентификации
     "verify_password",
     "get_password_hash", 
+    "verify_password_async",
+    "get_password_hash_async",
+    "PasswordHashingOverloaded",
+    "password_hasher",
     "create_access_token",
     "create_refresh_token",
     "verify_token",
+    "purge_token",
+    "token_cache_stats",
+    # Отзыв токенов
+    "revocation_index",
+    "revoke_token",
+    # Текущий пользователь
+    "AuthenticatedUser",
+    "invalidate_identity",
     # Система прав
     "PermissionDenied",
     "RoleHierarchy", 
     "Permissions",
     "has_permission",
+    "has_permissions",
+    "check_permissions",
+    "filter_permitted",
+    "permission_mask",
     "require_permission",
     "require_role",
     "get_current_user_with_permissions",
     "can_create_user_with_role",
-    "get_allowed_roles_for_user"
+    "organization_for_new_user",
+    "get_allowed_roles_for_user",
+    "resolve_organization_scope",
+    "scope_session_to_user"
 ]
@@ -1,19 +1,119 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
-from typing import Optional
+from typing import Callable, Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi import HTTPException, status
+from sqlalchemy import event
+from ..cache import TTLCache
+from ..metrics import observe_password_hash
+from ..models.token import TokenBlacklist
 from ..settings import settings
+from .revocation import revocation_index
+
+logger = logging.getLogger(__name__)
 
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 
 
+class PasswordHashingOverloaded(HTTPException):
+    """Очередь хеширования паролей переполнена"""
+    def __init__(self):
+        super().__init__(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Сервис перегружен, повторите попытку позже",
+            headers={"Retry-After": "1"},
+        )
+
+
+class PasswordHashExecutor:
+    """
+    Ограниченный пул потоков для argon2.
+
+    argon2-cffi отпускает GIL на время вычисления хеша, поэтому пул потоков
+    снимает нагрузку с event loop. Число одновременно принятых задач
+    ограничено workers + queue_limit, сверх этого - 503 без ожидания.
+    Время вычисления и ожидания в очереди попадает в метрики.
+    """
+
+    def __init__(self, workers: int, queue_limit: int):
+        self.workers = max(1, workers)
+        self.queue_limit = max(0, queue_limit)
+        self._slots = threading.BoundedSemaphore(self.workers + self.queue_limit)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.workers,
+                        thread_name_prefix="password-hash",
+                    )
+        return self._executor
+
+    def submit(self, fn: Callable, *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            logger.warning("Password hashing queue is full, rejecting request")
+            raise PasswordHashingOverloaded()
+        try:
+            future = self._get_executor().submit(self._timed, fn, time.perf_counter(), *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    @staticmethod
+    def _timed(fn: Callable, submitted: float, *args):
+        started = time.perf_counter()
+        try:
+            return fn(*args)
+        finally:
+            observe_password_hash(getattr(fn, "__name__", "call"), time.perf_counter() - started, started - submitted)
+
+    def run(self, fn: Callable, *args):
+        """Выполнить в пуле и дождаться результата (для синхронного кода)"""
+        return self.submit(fn, *args).result()
+
+    async def run_async(self, fn: Callable, *args):
+        """Выполнить в пуле, не блокируя event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args))
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+
+password_hasher = PasswordHashExecutor(
+    workers=settings.password_hash_workers,
+    queue_limit=settings.password_hash_queue_limit,
+)
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return password_hasher.run(pwd_context.verify, plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return password_hasher.run(pwd_context.hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.run_async(pwd_context.verify, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_hasher.run_async(pwd_context.hash, password)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
@@ -22,7 +122,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
         expire = datetime.now(timezone.utc) + expires_delta
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=settings.access_token_expire_minutes)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "access"})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
@@ -30,18 +130,86 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
 def create_refresh_token(data: dict):
     to_encode = data.copy()
     expire = datetime.now(timezone.utc) + timedelta(days=settings.refresh_token_expire_days)
-    to_encode.update({"exp": expire})
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex, "type": "refresh"})
     encoded_jwt = jwt.encode(to_encode, settings.secret_key, algorithm=settings.algorithm)
     return encoded_jwt
 
 
-def verify_token(token: str) -> dict:
-    try:
-        payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
-        return payload
-    except JWTError:
+# Кэш проверенных access-токенов: sha256(token) -> payload, запись живёт до exp
+token_cache = TTLCache(
+    maxsize=settings.token_cache_size,
+    ttl=settings.access_token_expire_minutes * 60,
+)
+# jti -> sha256(token), чтобы мгновенно вычистить отозванный токен
+_token_digests = TTLCache(
+    maxsize=settings.token_cache_size,
+    ttl=settings.access_token_expire_minutes * 60,
+)
+
+
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def _remember_token(digest: bytes, payload: dict) -> None:
+    # refresh-токены используются однократно, кэшировать их бессмысленно
+    if payload.get("type") == "refresh" or "exp" not in payload:
+        return
+    ttl = payload["exp"] - time.time()
+    token_cache.set(digest, payload, ttl=ttl)
+    if payload.get("jti"):
+        _token_digests.set(payload["jti"], digest, ttl=ttl)
+
+
+def purge_token(jti: str) -> None:
+    """Удалить токен с указанным jti из кэша проверенных токенов"""
+    digest = _token_digests.pop(jti)
+    if digest is not None:
+        token_cache.pop(digest)
+
+
+def token_cache_stats() -> dict:
+    return token_cache.stats()
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def verify_token(token: str, token_type: str = "access") -> dict:
+    """
+    Проверить подпись, срок, вид токена (access/refresh) и отзыв.
+
+    Пока индекс отзывов не загружен (БД была недоступна при старте), токены
+    не принимаются: отозванный токен нельзя отличить от действующего.
+    """
+    if not revocation_index.loaded:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Token revocation list is not loaded yet",
+            headers={"Retry-After": str(max(1, round(settings.revocation_refresh_seconds)))},
         )
+    digest = _token_digest(token)
+    payload = token_cache.get(digest)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, settings.secret_key, algorithms=[settings.algorithm])
+        except JWTError:
+            raise _credentials_exception()
+        _remember_token(digest, payload)
+    # Refresh-токен не должен открывать API, access-токен - продлевать сессию
+    if payload.get("type") != token_type:
+        raise _credentials_exception()
+    # Отзыв проверяется и для закэшированных токенов: индекс обновляется с других воркеров
+    if revocation_index.is_revoked(payload.get("jti")):
+        raise _credentials_exception()
+    return payload
+
+
+@event.listens_for(TokenBlacklist, "after_insert")
+def _purge_blacklisted_token(mapper, connection, target: TokenBlacklist):
+    purge_token(target.token_jti)
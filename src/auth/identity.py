@@ -0,0 +1,184 @@
+"""
+Разрешение текущего пользователя по токену
+
+Снимок пользователя (id/email/роль/организация) кэшируется по subject токена
+в пространстве имён "identity" (общем для воркеров при cache_backend redis /
+two_tier) и сбрасывается после коммита изменений роли, пароля, email или
+организации. В пределах одного запроса пользователь разрешается один раз.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional, Union
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import event, inspect, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+from ..cache import cache_namespace
+from ..models.user import User, UserRole
+from ..settings import settings
+from ..tenancy import ALL_TENANTS
+from .core import verify_token
+
+_IDENTITY_FIELDS = ("email", "role", "password_hash", "organization_id")
+_PENDING_KEY = "identity_invalidations"
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """Неизменяемый снимок аутентифицированного пользователя"""
+    id: int
+    email: str
+    role: UserRole
+    organization_id: Optional[int] = None
+    created_at: Optional[datetime] = None
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            role=user.role,
+            organization_id=user.organization_id,
+            created_at=user.created_at,
+        )
+
+
+identity_cache = cache_namespace(
+    "identity",
+    maxsize=settings.identity_cache_size,
+    ttl=settings.identity_cache_ttl_seconds,
+)
+
+
+def extract_token(request: Request) -> Optional[str]:
+    """Токен из заголовка Authorization (API) или cookie (веб-интерфейс)"""
+    authorization = request.headers.get("Authorization")
+    if authorization and authorization.startswith("Bearer "):
+        return authorization[7:]
+    return extract_cookie_token(request)
+
+
+def extract_cookie_token(request: Request) -> Optional[str]:
+    token = request.cookies.get("access_token")
+    if token and token.startswith("Bearer "):
+        token = token[7:]
+    return token or None
+
+
+def select_user_by_email(email: str):
+    """
+    Запрос пользователя по email во всех организациях: email уникален
+    глобально, а сессия запроса может быть уже ограничена организацией
+    """
+    return select(User).where(User.email == email).execution_options(**{ALL_TENANTS: True})
+
+
+def _query_user(db: Session, email: str) -> Optional[User]:
+    return db.execute(select_user_by_email(email)).scalars().first()
+
+
+def _remember(user: Optional[User]) -> Optional[AuthenticatedUser]:
+    if user is None:
+        return None
+    identity = AuthenticatedUser.from_user(user)
+    identity_cache.set(identity.email, identity)
+    return identity
+
+
+def load_identity(db: Session, email: str) -> Optional[AuthenticatedUser]:
+    """Снимок пользователя из кэша или, при промахе, из БД"""
+    identity = identity_cache.get(email)
+    if identity is not None:
+        return identity
+    return _remember(_query_user(db, email))
+
+
+async def load_identity_async(db: Union[Session, AsyncSession], email: str) -> Optional[AuthenticatedUser]:
+    """То же, что load_identity, без блокировки event loop"""
+    identity = identity_cache.get(email)
+    if identity is not None:
+        return identity
+    if isinstance(db, AsyncSession):
+        result = await db.execute(select_user_by_email(email))
+        user = result.scalars().first()
+    else:
+        user = await run_in_threadpool(_query_user, db, email)
+    return _remember(user)
+
+
+def _memoized(request: Request, token: str):
+    memo = getattr(request.state, "identity", None)
+    if memo is not None and memo[0] == token:
+        return memo
+    return None
+
+
+def resolve_identity(request: Request, db: Session, token: str) -> Optional[AuthenticatedUser]:
+    """
+    Разрешить пользователя по токену не более одного раза за запрос.
+
+    Ошибки проверки токена пробрасываются как HTTPException из verify_token.
+    """
+    memo = _memoized(request, token)
+    if memo is not None:
+        return memo[1]
+
+    payload = verify_token(token)
+    email: Optional[str] = payload.get("sub")
+    identity = load_identity(db, email) if email is not None else None
+    request.state.identity = (token, identity)
+    return identity
+
+
+async def resolve_identity_async(
+    request: Request, db: Union[Session, AsyncSession], token: str
+) -> Optional[AuthenticatedUser]:
+    """Асинхронный вариант resolve_identity для сессии из get_session"""
+    memo = _memoized(request, token)
+    if memo is not None:
+        return memo[1]
+
+    payload = verify_token(token)
+    email: Optional[str] = payload.get("sub")
+    identity = await load_identity_async(db, email) if email is not None else None
+    request.state.identity = (token, identity)
+    return identity
+
+
+def invalidate_identity(email: str) -> None:
+    identity_cache.delete(email)
+
+
+@event.listens_for(User, "after_update")
+def _collect_identity_changes(mapper, connection, target: User):
+    state = inspect(target)
+    changed = set()
+    for field in _IDENTITY_FIELDS:
+        history = state.attrs[field].history
+        if not history.has_changes():
+            continue
+        changed.add(target.email)
+        if field == "email":
+            changed.update(history.deleted)
+    if changed and state.session is not None:
+        state.session.info.setdefault(_PENDING_KEY, set()).update(changed)
+
+
+@event.listens_for(User, "after_delete")
+def _collect_identity_delete(mapper, connection, target: User):
+    session = inspect(target).session
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).add(target.email)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_identity_invalidations(session: Session):
+    # Сбрасываем после коммита, чтобы параллельный запрос не закэшировал старую строку
+    for email in session.info.pop(_PENDING_KEY, ()):
+        invalidate_identity(email)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_identity_invalidations(session: Session):
+    session.info.pop(_PENDING_KEY, None)
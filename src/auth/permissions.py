@@ -1,17 +1,19 @@
 """
 Система авторизации и проверки прав доступа
 """
-from functools import wraps
-from typing import List, Optional
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, TypeVar
 from fastapi import HTTPException, status, Depends, Request
 from sqlalchemy.orm import Session
 from ..models.user import User, UserRole
-from ..database import get_db
-from .core import verify_token
+from ..database import get_session
+from ..tenancy import clear_tenant_scope, set_tenant_scope
+from .identity import AuthenticatedUser, extract_token, resolve_identity_async
 import logging
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 
 class PermissionDenied(HTTPException):
     """Исключение для отказа в доступе"""
@@ -146,87 +148,109 @@ ROLE_PERMISSIONS = {
 }
 
 
+# Матрица компилируется при импорте: каждое разрешение - бит, роль - битовая маска
+ALL_PERMISSIONS = tuple(
+    value for name, value in vars(Permissions).items() if name.isupper()
+)
+PERMISSION_BITS: Dict[str, int] = {
+    permission: 1 << index for index, permission in enumerate(ALL_PERMISSIONS)
+}
+
+
+def permission_mask(*permissions: str) -> int:
+    """Битовая маска набора разрешений"""
+    mask = 0
+    for permission in permissions:
+        try:
+            mask |= PERMISSION_BITS[permission]
+        except KeyError:
+            raise ValueError(f"Неизвестное разрешение: {permission}") from None
+    return mask
+
+
+ROLE_PERMISSION_MASKS: Dict[UserRole, int] = {
+    role: permission_mask(*permissions) for role, permissions in ROLE_PERMISSIONS.items()
+}
+ROLE_PERMISSION_SETS: Dict[UserRole, FrozenSet[str]] = {
+    role: frozenset(permissions) for role, permissions in ROLE_PERMISSIONS.items()
+}
+
+
 def has_permission(user: User, permission: str) -> bool:
     """Проверяет, имеет ли пользователь определенное разрешение"""
-    user_permissions = ROLE_PERMISSIONS.get(user.role, [])
-    return permission in user_permissions
-
-
-def require_permission(permission: str):
-    """Декоратор для проверки разрешений"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # Получаем текущего пользователя из зависимостей
-            current_user = None
-            for key, value in kwargs.items():
-                if isinstance(value, User):
-                    current_user = value
-                    break
-            
-            if not current_user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Требуется аутентификация"
-                )
-            
-            if not has_permission(current_user, permission):
-                logger.warning(f"User {current_user.email} ({current_user.role.value}) denied access to {permission}")
-                raise PermissionDenied(f"Недостаточно прав для операции: {permission}")
-            
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
+    bit = PERMISSION_BITS.get(permission, 0)
+    return bit != 0 and ROLE_PERMISSION_MASKS.get(user.role, 0) & bit == bit
+
+
+def has_permissions(user: User, *permissions: str) -> bool:
+    """Проверяет, имеет ли пользователь все перечисленные разрешения"""
+    required = permission_mask(*permissions)
+    return ROLE_PERMISSION_MASKS.get(user.role, 0) & required == required
+
+
+def check_permissions(user: User, permissions: Iterable[str]) -> Dict[str, bool]:
+    """Проверка набора разрешений за один вызов"""
+    granted = ROLE_PERMISSION_MASKS.get(user.role, 0)
+    return {
+        permission: bool(granted & PERMISSION_BITS.get(permission, 0))
+        for permission in permissions
+    }
+
+
+def filter_permitted(user: User, items: Iterable[T], permission_of: Callable[[T], str]) -> List[T]:
+    """Оставить только элементы, для которых у пользователя есть требуемое разрешение"""
+    granted = ROLE_PERMISSION_MASKS.get(user.role, 0)
+    return [
+        item for item in items
+        if granted & PERMISSION_BITS.get(permission_of(item), 0)
+    ]
+
+
+def require_permission(*permissions: str):
+    """
+    Зависимость FastAPI для проверки разрешений.
+
+    Возвращает текущего пользователя, если у него есть все разрешения:
+    current_user = Depends(require_permission(Permissions.GENERATE_REPORTS))
+    """
+    required = permission_mask(*permissions)
+
+    async def dependency(
+        current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+    ) -> AuthenticatedUser:
+        if ROLE_PERMISSION_MASKS.get(current_user.role, 0) & required != required:
+            logger.warning(f"User {current_user.email} ({current_user.role.value}) denied access to {permissions}")
+            raise PermissionDenied(f"Недостаточно прав для операции: {', '.join(permissions)}")
+        return current_user
+    return dependency
 
 
 def require_role(*allowed_roles: UserRole):
-    """Декоратор для проверки роли пользователя"""
-    def decorator(func):
-        @wraps(func)
-        async def wrapper(*args, **kwargs):
-            # Получаем текущего пользователя из зависимостей
-            current_user = None
-            for key, value in kwargs.items():
-                if isinstance(value, User):
-                    current_user = value
-                    break
-            
-            if not current_user:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail="Требуется аутентификация"
-                )
-            
-            if current_user.role not in allowed_roles:
-                logger.warning(
-                    f"User {current_user.email} ({current_user.role.value}) "
-                    f"denied access. Required roles: {[r.value for r in allowed_roles]}"
-                )
-                raise PermissionDenied(
-                    f"Требуется одна из ролей: {', '.join([r.value for r in allowed_roles])}"
-                )
-            
-            return await func(*args, **kwargs)
-        return wrapper
-    return decorator
+    """Зависимость FastAPI для проверки роли пользователя"""
+    roles = frozenset(allowed_roles)
+
+    async def dependency(
+        current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+    ) -> AuthenticatedUser:
+        if current_user.role not in roles:
+            logger.warning(
+                f"User {current_user.email} ({current_user.role.value}) "
+                f"denied access. Required roles: {[r.value for r in allowed_roles]}"
+            )
+            raise PermissionDenied(
+                f"Требуется одна из ролей: {', '.join([r.value for r in allowed_roles])}"
+            )
+        return current_user
+    return dependency
 
 
 async def get_current_user_with_permissions(
     request: Request, 
-    db: Session = Depends(get_db)
-) -> User:
+    db: Session = Depends(get_session)
+) -> AuthenticatedUser:
     """Получение текущего пользователя с проверкой токена"""
-    # Для API - проверяем Bearer token
-    authorization = request.headers.get("Authorization")
-    token = None
-    
-    if authorization and authorization.startswith("Bearer "):
-        token = authorization[7:]
-    else:
-        # Для веб-интерфейса - проверяем cookie
-        token = request.cookies.get("access_token")
-        if token and token.startswith("Bearer "):
-            token = token[7:]
+    # Для API - Bearer token, для веб-интерфейса - cookie
+    token = extract_token(request)
     
     if not token:
         raise HTTPException(
@@ -236,24 +260,21 @@ async def get_current_user_with_permissions(
         )
     
     try:
-        payload = verify_token(token)
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Недействительный токен"
-            )
-        
-        user = db.query(User).filter(User.email == email).first()
+        user = await resolve_identity_async(request, db, token)
         if user is None:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Пользователь не найден"
             )
         
+        # Сессия запроса общая с обработчиком (get_session кэшируется FastAPI)
+        scope_session_to_user(db, user)
         return user
         
     except Exception as e:
+        if isinstance(e, HTTPException) and e.status_code == status.HTTP_503_SERVICE_UNAVAILABLE:
+            # Индекс отзывов не загружен: запрос нужно повторить, а не входить заново
+            raise
         logger.error(f"Token verification failed: {e}")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -261,6 +282,23 @@ async def get_current_user_with_permissions(
         )
 
 
+def scope_session_to_user(db, user: User) -> None:
+    """Ограничить ORM-запросы сессии организацией пользователя; администратор видит все"""
+    if user.role == UserRole.ADMIN:
+        clear_tenant_scope(db)
+    else:
+        set_tenant_scope(db, user.organization_id)
+
+
+def resolve_organization_scope(user: User, organization_id: Optional[int] = None) -> Optional[int]:
+    """Организация, в пределах которой работает пользователь; администратор может выбрать любую"""
+    if user.role == UserRole.ADMIN:
+        return organization_id if organization_id is not None else user.organization_id
+    if organization_id is not None and organization_id != user.organization_id:
+        raise PermissionDenied("Нет доступа к данным другой организации")
+    return user.organization_id
+
+
 def can_create_user_with_role(creator: User, target_role: UserRole) -> bool:
     """Проверяет, может ли пользователь создать аккаунт с указанной ролью"""
     # Админ может создавать любые роли
@@ -275,6 +313,13 @@ def can_create_user_with_role(creator: User, target_role: UserRole) -> bool:
     return False
 
 
+def organization_for_new_user(creator: User) -> Optional[int]:
+    """Организация создаваемого аккаунта: не-админ создаёт пользователей только своей организации"""
+    if creator.role == UserRole.ADMIN:
+        return None
+    return creator.organization_id
+
+
 def get_allowed_roles_for_user(user: User) -> List[UserRole]:
     """Возвращает список ролей, которые может назначить пользователь"""
     if user.role == UserRole.ADMIN:
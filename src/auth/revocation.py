@@ -0,0 +1,164 @@
+"""
+In-process индекс отозванных токенов
+
+Таблица TokenBlacklist загружается при старте до приёма запросов, затем
+дочитывается инкрементально по high-water mark (blacklisted_at). Проверка
+отзыва - поиск в словаре, без запроса к БД. Access- и refresh-токены
+отзываются одинаково - по jti (refresh-токен при ротации и выходе).
+Просроченные записи удаляются фоновой задачей.
+"""
+import asyncio
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.token import TokenBlacklist
+from ..settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Перекрытие при инкрементальной загрузке: строка, вставленная транзакцией,
+# которая закоммитилась позже более новой, всё равно будет прочитана
+_WATERMARK_OVERLAP = timedelta(seconds=60)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite возвращает naive datetime в UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+class RevocationIndex:
+    """Множество отозванных jti со сроками истечения"""
+
+    def __init__(self):
+        self._revoked_jti: Dict[str, datetime] = {}
+        self._blacklist_watermark: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def is_revoked(self, jti: Optional[str]) -> bool:
+        return jti is not None and jti in self._revoked_jti
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._revoked_jti[jti] = _as_utc(expires_at)
+
+    def refresh(self, db: Session) -> int:
+        """Дочитать новые записи начиная с high-water mark, вернуть число прочитанных"""
+        now = datetime.now(timezone.utc)
+
+        blacklist_query = db.query(
+            TokenBlacklist.token_jti, TokenBlacklist.expires_at, TokenBlacklist.blacklisted_at
+        )
+        if self._blacklist_watermark is None:
+            blacklist_query = blacklist_query.filter(TokenBlacklist.expires_at > now)
+        else:
+            blacklist_query = blacklist_query.filter(
+                TokenBlacklist.blacklisted_at >= self._blacklist_watermark - _WATERMARK_OVERLAP
+            )
+
+        blacklisted = blacklist_query.all()
+
+        with self._lock:
+            for jti, expires_at, blacklisted_at in blacklisted:
+                self._revoked_jti[jti] = _as_utc(expires_at)
+                if blacklisted_at is not None:
+                    blacklisted_at = _as_utc(blacklisted_at)
+                    if self._blacklist_watermark is None or blacklisted_at > self._blacklist_watermark:
+                        self._blacklist_watermark = blacklisted_at
+            if self._blacklist_watermark is None:
+                self._blacklist_watermark = now
+            self.loaded = True
+
+        return len(blacklisted)
+
+    def prune(self, db: Session) -> int:
+        """Удалить просроченные записи из БД и из памяти"""
+        now = datetime.now(timezone.utc)
+        deleted = db.query(TokenBlacklist).filter(TokenBlacklist.expires_at < now).delete(synchronize_session=False)
+        db.commit()
+
+        with self._lock:
+            for key in [key for key, expires_at in self._revoked_jti.items() if expires_at < now]:
+                del self._revoked_jti[key]
+        return deleted
+
+    def stats(self) -> dict:
+        return {
+            "revoked_jti": len(self._revoked_jti),
+            "loaded": self.loaded,
+        }
+
+
+revocation_index = RevocationIndex()
+
+
+def revoke_token(db: Session, payload: dict, reason: Optional[str] = None) -> bool:
+    """Внести проверенный токен в TokenBlacklist; False, если у токена нет jti"""
+    jti = payload.get("jti")
+    if not jti or "exp" not in payload:
+        return False
+    expires_at = datetime.fromtimestamp(payload["exp"], tz=timezone.utc)
+    if not revocation_index.is_revoked(jti):
+        db.add(TokenBlacklist(
+            token_jti=jti,
+            token_type=payload.get("type", "access"),
+            expires_at=expires_at,
+            reason=reason,
+        ))
+        try:
+            db.commit()
+        except IntegrityError:
+            # Токен уже отозван другим запросом/воркером
+            db.rollback()
+    revocation_index.add(jti, expires_at)
+    return True
+
+
+def _sync_revocations(prune: bool) -> bool:
+    db = SessionLocal()
+    try:
+        revocation_index.refresh(db)
+        if prune:
+            deleted = revocation_index.prune(db)
+            if deleted:
+                logger.info(f"Pruned {deleted} expired revocation records")
+        return True
+    except SQLAlchemyError as e:
+        db.rollback()
+        logger.warning(f"Revocation index sync failed: {e}")
+        return False
+    finally:
+        db.close()
+
+
+async def load_revocation_index() -> bool:
+    """
+    Первичная загрузка индекса при старте. При ошибке токены не принимаются
+    (verify_token отвечает 503), пока фоновая задача не загрузит индекс.
+    """
+    loaded = await run_in_threadpool(_sync_revocations, False)
+    if not loaded:
+        logger.error("Token revocation list is not loaded, tokens are rejected until the next sync")
+    return loaded
+
+
+async def run_revocation_maintenance(stop: asyncio.Event) -> None:
+    """Фоновая задача: инкрементальная подгрузка отзывов и периодическая чистка"""
+    refresh_interval = settings.revocation_refresh_seconds
+    prune_every = max(1, int(settings.revocation_prune_seconds // refresh_interval))
+    tick = 0
+    while not stop.is_set():
+        # Первая загрузка выполнена load_revocation_index до приёма запросов
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=refresh_interval)
+        except asyncio.TimeoutError:
+            pass
+        if stop.is_set():
+            break
+        tick += 1
+        await run_in_threadpool(_sync_revocations, tick % prune_every == 0)
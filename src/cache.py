@@ -0,0 +1,450 @@
+"""
+Кэши
+
+TTLCache - потокобезопасный LRU процесса для значений, которые не могут
+устареть между воркерами (например, проверенные JWT).
+
+Общие данные (пользователи, статистика) кэшируются через пространства имён
+cache_namespace(): хранилище подключается настройкой cache_backend -
+
+- memory - LRU в процессе (по умолчанию, для одного воркера и скриптов);
+- redis - общий Redis (или совместимый сервер), значения в pickle;
+- two_tier - LRU процесса поверх Redis с коротким сроком жизни локальных
+  копий; изменения и удаления рассылаются через pub/sub, и остальные
+  воркеры сразу сбрасывают свои локальные копии. Без Redis работает
+  как LRU процесса и переподключается сам.
+
+Ошибки Redis не ломают запросы: чтение считается промахом, запись
+пропускается. Статистика попаданий по пространствам имён - cache_stats().
+"""
+import json
+import logging
+import pickle
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Потокобезопасный LRU-кэш с ограничением размера и временем жизни записей"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key, _MISSING)
+            if item is _MISSING:
+                self.misses += 1
+                return default
+            value, expires_at = item
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохранить значение; ttl переопределяет время жизни по умолчанию"""
+        lifetime = self.ttl if ttl is None else ttl
+        if lifetime <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + lifetime)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.pop(key, _MISSING)
+        return default if item is _MISSING else item[0]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+        }
+
+
+def _key_str(key: Hashable) -> str:
+    if isinstance(key, bytes):
+        return key.hex()
+    return str(key)
+
+
+class CacheBackend(ABC):
+    """Хранилище значений пространств имён; ключи уже приведены к строкам"""
+    name = "base"
+
+    @abstractmethod
+    def get(self, namespace: "CacheNamespace", key: str) -> Any:
+        """Значение или _MISSING"""
+
+    @abstractmethod
+    def set(self, namespace: "CacheNamespace", key: str, value: Any, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, namespace: "CacheNamespace", key: str) -> None:
+        ...
+
+    @abstractmethod
+    def clear(self, namespace: "CacheNamespace") -> None:
+        ...
+
+    def stats(self, namespace: "CacheNamespace") -> dict:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """LRU в памяти процесса: отдельный TTLCache на пространство имён"""
+    name = "memory"
+
+    def __init__(self):
+        self._caches: Dict[str, TTLCache] = {}
+        self._lock = threading.Lock()
+
+    def _cache(self, namespace: "CacheNamespace") -> TTLCache:
+        cache = self._caches.get(namespace.name)
+        if cache is None:
+            with self._lock:
+                cache = self._caches.setdefault(namespace.name, TTLCache(namespace.maxsize, namespace.ttl))
+        return cache
+
+    def get(self, namespace, key):
+        return self._cache(namespace).get(key, _MISSING)
+
+    def set(self, namespace, key, value, ttl):
+        self._cache(namespace).set(key, value, ttl)
+
+    def delete(self, namespace, key):
+        self._cache(namespace).pop(key)
+
+    def clear(self, namespace):
+        self._cache(namespace).clear()
+
+    def stats(self, namespace):
+        cache = self._caches.get(namespace.name)
+        if cache is None:
+            return {}
+        return {"size": len(cache), "maxsize": cache.maxsize, "evictions": cache.evictions}
+
+
+class RedisBackend(CacheBackend):
+    """
+    Общий кэш в Redis: ключ '<prefix>:<пространство>:<ключ>', значение - pickle.
+
+    Принимает готовый клиент redis-py (или совместимый, например fakeredis).
+    """
+    name = "redis"
+    _LOG_INTERVAL = 30.0
+
+    def __init__(self, client, prefix: str):
+        import redis
+
+        self.client = client
+        self.prefix = prefix
+        self.errors = 0
+        self._error_types = (redis.RedisError, OSError)
+        self._logged_at = 0.0
+
+    def _key(self, namespace, key: str) -> str:
+        return f"{self.prefix}:{namespace.name}:{key}"
+
+    def _failed(self, operation: str, error: Exception) -> None:
+        self.errors += 1
+        now = time.monotonic()
+        if now - self._logged_at >= self._LOG_INTERVAL:
+            self._logged_at = now
+            logger.warning(f"Redis cache {operation} failed ({self.errors} errors so far): {error}")
+
+    def get(self, namespace, key):
+        try:
+            data = self.client.get(self._key(namespace, key))
+        except self._error_types as e:
+            self._failed("get", e)
+            return _MISSING
+        return _MISSING if data is None else pickle.loads(data)
+
+    def set(self, namespace, key, value, ttl):
+        if ttl <= 0:
+            return
+        try:
+            self.client.set(self._key(namespace, key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL), px=int(ttl * 1000))
+        except self._error_types as e:
+            self._failed("set", e)
+
+    def delete(self, namespace, key):
+        try:
+            self.client.delete(self._key(namespace, key))
+        except self._error_types as e:
+            self._failed("delete", e)
+
+    def clear(self, namespace):
+        try:
+            keys = list(self.client.scan_iter(match=self._key(namespace, "*"), count=1000))
+            for i in range(0, len(keys), 500):
+                self.client.delete(*keys[i:i + 500])
+        except self._error_types as e:
+            self._failed("clear", e)
+
+    def stats(self, namespace):
+        return {"errors": self.errors}
+
+    def close(self):
+        self.client.close()
+
+
+class TwoTierBackend(CacheBackend):
+    """
+    LRU процесса поверх Redis.
+
+    Локальная копия живёт не дольше local_ttl; запись и удаление
+    публикуются в канал, и другие процессы удаляют свою копию ключа.
+
+    Пока подписка на канал не работает (Redis недоступен при старте или
+    соединение оборвалось), кэш работает только локально, а подписка
+    повторяется с растущей паузой. После переподписки локальные копии
+    сбрасываются: сообщения за время простоя могли быть пропущены.
+    """
+    name = "two_tier"
+    _RETRY_MIN = 1.0
+    _RETRY_MAX = 30.0
+
+    def __init__(self, remote: RedisBackend, local_ttl: float, channel: Optional[str] = None):
+        self.remote = remote
+        self.local = MemoryBackend()
+        self.local_ttl = local_ttl
+        self.channel = channel or f"{remote.prefix}:invalidate"
+        self._origin = uuid.uuid4().hex
+        self._namespaces: Dict[str, "CacheNamespace"] = {}
+        self._local_hits: Dict[str, int] = {}
+        self._remote_hits: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._pubsub = None
+        self._listener = None
+        self._retry_timer: Optional[threading.Timer] = None
+        self._retry_delay = self._RETRY_MIN
+        self._closed = False
+        self.subscribed = False
+        self._subscribe()
+
+    def _subscribe(self) -> None:
+        with self._lock:
+            self._retry_timer = None
+            if self._closed:
+                return
+            pubsub = self.remote.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(**{self.channel: self._on_message})
+            except self.remote._error_types as e:
+                pubsub.close()
+                self._schedule_retry(e)
+                return
+            self._pubsub = pubsub
+            self._listener = pubsub.run_in_thread(
+                sleep_time=1.0, daemon=True, exception_handler=self._on_listener_error
+            )
+            self._retry_delay = self._RETRY_MIN
+            self.local = MemoryBackend()
+            self.subscribed = True
+
+    def _schedule_retry(self, error: Exception) -> None:
+        """Повторить подписку позже; вызывается под self._lock"""
+        self.subscribed = False
+        self.remote._failed("subscribe", error)
+        self._retry_timer = threading.Timer(self._retry_delay, self._subscribe)
+        self._retry_timer.daemon = True
+        self._retry_timer.start()
+        self._retry_delay = min(self._retry_delay * 2, self._RETRY_MAX)
+
+    def _on_listener_error(self, error: BaseException, pubsub, thread) -> None:
+        # Поток слушателя завершается; подписка восстанавливается заново
+        thread.stop()
+        with self._lock:
+            if self._closed or thread is not self._listener:
+                return
+            self._listener = self._pubsub = None
+            self._schedule_retry(error)
+
+    def _publish(self, namespace, key: Optional[str]) -> None:
+        message = json.dumps({"origin": self._origin, "namespace": namespace.name, "key": key})
+        try:
+            self.remote.client.publish(self.channel, message)
+        except self.remote._error_types as e:
+            self.remote._failed("publish", e)
+
+    def _on_message(self, message) -> None:
+        try:
+            data = json.loads(message["data"])
+        except (TypeError, ValueError):
+            return
+        namespace = self._namespaces.get(data.get("namespace"))
+        if namespace is None or data.get("origin") == self._origin:
+            return
+        if data.get("key") is None:
+            self.local.clear(namespace)
+        else:
+            self.local.delete(namespace, data["key"])
+
+    def get(self, namespace, key):
+        self._namespaces.setdefault(namespace.name, namespace)
+        value = self.local.get(namespace, key)
+        if value is not _MISSING:
+            self._local_hits[namespace.name] = self._local_hits.get(namespace.name, 0) + 1
+            return value
+        if not self.subscribed:
+            return _MISSING
+        value = self.remote.get(namespace, key)
+        if value is not _MISSING:
+            self._remote_hits[namespace.name] = self._remote_hits.get(namespace.name, 0) + 1
+            self.local.set(namespace, key, value, min(self.local_ttl, namespace.ttl))
+        return value
+
+    def set(self, namespace, key, value, ttl):
+        self._namespaces.setdefault(namespace.name, namespace)
+        self.local.set(namespace, key, value, min(self.local_ttl, ttl))
+        if self.subscribed:
+            self.remote.set(namespace, key, value, ttl)
+            self._publish(namespace, key)
+
+    def delete(self, namespace, key):
+        self.local.delete(namespace, key)
+        self.remote.delete(namespace, key)
+        self._publish(namespace, key)
+
+    def clear(self, namespace):
+        self.local.clear(namespace)
+        self.remote.clear(namespace)
+        self._publish(namespace, None)
+
+    def stats(self, namespace):
+        return {
+            "local_hits": self._local_hits.get(namespace.name, 0),
+            "remote_hits": self._remote_hits.get(namespace.name, 0),
+            "subscribed": self.subscribed,
+            **self.remote.stats(namespace),
+        }
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self.subscribed = False
+            if self._retry_timer is not None:
+                self._retry_timer.cancel()
+            listener, pubsub = self._listener, self._pubsub
+        if listener is not None:
+            listener.stop()
+            pubsub.close()
+        self.remote.close()
+
+
+_backend: CacheBackend = MemoryBackend()
+_namespaces: Dict[str, "CacheNamespace"] = {}
+
+
+class CacheNamespace:
+    """Именованный кэш поверх текущего хранилища со своей статистикой попаданий"""
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        value = _backend.get(self, _key_str(key))
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        lifetime = self.ttl if ttl is None else ttl
+        if lifetime > 0:
+            _backend.set(self, _key_str(key), value, lifetime)
+
+    def delete(self, key: Hashable) -> None:
+        _backend.delete(self, _key_str(key))
+
+    def clear(self) -> None:
+        _backend.clear(self)
+
+    def stats(self) -> dict:
+        requests = self.hits + self.misses
+        return {
+            "backend": _backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+            **_backend.stats(self),
+        }
+
+
+def cache_namespace(name: str, maxsize: int, ttl: float) -> CacheNamespace:
+    """Зарегистрировать пространство имён (одно на имя)"""
+    namespace = _namespaces.get(name)
+    if namespace is None:
+        namespace = _namespaces[name] = CacheNamespace(name, maxsize, ttl)
+    return namespace
+
+
+def cache_stats() -> Dict[str, dict]:
+    """Статистика попаданий по пространствам имён"""
+    return {name: namespace.stats() for name, namespace in sorted(_namespaces.items())}
+
+
+def build_cache_backend(kind: str, redis_url: str, prefix: str, local_ttl: float, client=None) -> CacheBackend:
+    """Хранилище по настройке cache_backend; client - готовый клиент Redis (например, fakeredis)"""
+    if kind == "memory":
+        return MemoryBackend()
+    if kind not in ("redis", "two_tier"):
+        raise ValueError(f"Unknown cache backend: {kind}")
+    if client is None:
+        import redis
+
+        client = redis.Redis.from_url(redis_url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    remote = RedisBackend(client, prefix)
+    return remote if kind == "redis" else TwoTierBackend(remote, local_ttl)
+
+
+def configure_cache(backend: CacheBackend) -> None:
+    """Подключить хранилище для всех пространств имён (прежнее закрывается)"""
+    global _backend
+    previous, _backend = _backend, backend
+    for namespace in _namespaces.values():
+        namespace.hits = namespace.misses = 0
+    if previous is not backend:
+        previous.close()
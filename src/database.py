@@ -1,16 +1,365 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from types import SimpleNamespace
+from typing import Callable, Dict, List, Optional, Sequence
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Table, and_, create_engine, event, literal, update
+from sqlalchemy.engine import Connection, Engine, make_url
+from sqlalchemy.exc import IntegrityError, TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import QueuePool, StaticPool
+from . import metrics
 from .settings import settings
 
-engine = create_engine(settings.database_url)
+
+class PoolMetrics:
+    """Время ожидания соединения из пула, таймауты и загрузка пула"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def observe_wait(self, seconds: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.wait_seconds_total += seconds
+            if seconds > self.wait_seconds_max:
+                self.wait_seconds_max = seconds
+        metrics.observe_pool_wait(seconds)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self, engine: Engine) -> dict:
+        pool = engine.pool
+        data = {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+        if isinstance(pool, QueuePool):
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            data.update({
+                "pool_size": pool.size(),
+                "checked_out": checked_out,
+                "overflow": max(pool.overflow(), 0),
+                "capacity": capacity,
+                "saturation": checked_out / capacity if capacity else 0.0,
+            })
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool, измеряющий время ожидания свободного соединения"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.record_timeout()
+            raise
+        finally:
+            pool_metrics.observe_wait(time.perf_counter() - started)
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    cursor.execute(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.close()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    metrics.observe_query(statement, time.perf_counter() - started)
+
+
+def _handle_error(exception_context):
+    # after_cursor_execute не вызывается для упавшего запроса
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_started") and exception_context.execution_context is not None:
+        started = conn.info["query_started"].pop()
+        metrics.observe_query(exception_context.statement or "", time.perf_counter() - started)
+
+
+def instrument_engine(engine: Engine) -> Engine:
+    """Число и время SQL-запросов в метриках (и в логе медленных HTTP-запросов)"""
+    if settings.metrics_enabled:
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+    return engine
+
+
+def _sqlite_engine(url) -> Engine:
+    if url.database in (None, "", ":memory:"):
+        # In-memory база живёт в одном соединении: StaticPool отдаёт его всем
+        # потокам threadpool (пул по умолчанию открыл бы каждому потоку свою
+        # пустую базу), прагмы WAL не нужны
+        return create_engine(url, poolclass=StaticPool, connect_args={"check_same_thread": False})
+
+    engine = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        connect_args={
+            # Соединения из пула используются разными потоками threadpool
+            "check_same_thread": False,
+            "timeout": settings.sqlite_busy_timeout_ms / 1000,
+        },
+    )
+
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+    return engine
+
+
+def _postgres_engine(url) -> Engine:
+    connect_args = {}
+    if settings.db_statement_timeout_ms and url.get_driver_name() in ("psycopg2", "psycopg"):
+        connect_args["options"] = f"-c statement_timeout={int(settings.db_statement_timeout_ms)}"
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+
+def _normalize_url(database_url: str):
+    if database_url.startswith("postgres://"):
+        # SQLAlchemy expects postgresql://
+        database_url = database_url.replace("postgres://", "postgresql://", 1)
+    return make_url(database_url)
+
+
+def create_app_engine(database_url: Optional[str] = None) -> Engine:
+    """Engine с профилем настроек под конкретную СУБД"""
+    url = _normalize_url(database_url or settings.database_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite":
+        return _sqlite_engine(url)
+    if backend == "postgresql":
+        return _postgres_engine(url)
+    return create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+    )
+
+
+engine = instrument_engine(create_app_engine(settings.database_url))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
 
+def get_pool_metrics() -> dict:
+    return pool_metrics.snapshot(engine)
+
+
+def _dialect_insert(connection: Connection):
+    """insert() с ON CONFLICT для PostgreSQL и SQLite; None - для остальных СУБД"""
+    dialect_name = connection.dialect.name
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        return None
+    return insert
+
+
+def upsert(
+    connection: Connection,
+    table: Table,
+    rows: List[dict],
+    index_elements: Sequence[str],
+    set_: Callable[[object], Dict[str, object]],
+) -> None:
+    """
+    INSERT ... ON CONFLICT (index_elements) DO UPDATE для строк rows.
+
+    set_(excluded) возвращает обновляемые колонки; excluded - значения
+    вставляемой строки (excluded.<колонка>), например
+    lambda excluded: {"value": table.c.value + excluded.value}.
+    """
+    if not rows:
+        return
+    insert = _dialect_insert(connection)
+    if insert is not None:
+        stmt = insert(table).values(rows)
+        connection.execute(stmt.on_conflict_do_update(index_elements=index_elements, set_=set_(stmt.excluded)))
+        return
+
+    # Общий вариант для остальных СУБД: UPDATE, при отсутствии строки - INSERT
+    for row in rows:
+        excluded = SimpleNamespace(**{name: literal(value, table.c[name].type) for name, value in row.items()})
+        result = connection.execute(
+            update(table)
+            .where(and_(*[table.c[name] == row[name] for name in index_elements]))
+            .values(set_(excluded))
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def insert_ignore(connection: Connection, table: Table, rows: List[dict]) -> int:
+    """INSERT строк, пропуская конфликтующие по уникальным ключам; возвращает число вставленных"""
+    if not rows:
+        return 0
+    insert = _dialect_insert(connection)
+    if insert is not None:
+        return connection.execute(insert(table).values(rows).on_conflict_do_nothing()).rowcount
+
+    # Общий вариант для остальных СУБД: каждая строка в своей точке сохранения
+    inserted = 0
+    for row in rows:
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(**row))
+        except IntegrityError:
+            continue
+        inserted += 1
+    return inserted
+
+
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+
+# Асинхронный слой (aiosqlite / asyncpg), включается настройкой database_async.
+# Engine создаётся лениво, чтобы драйверы были нужны только при включённой настройке.
+_ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+_async_engine = None
+_async_session_factory = None
+
+
+def create_async_app_engine(database_url: Optional[str] = None):
+    """AsyncEngine с тем же профилем настроек, что и синхронный engine"""
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    url = _normalize_url(database_url or settings.database_url)
+    backend = url.get_backend_name()
+    driver = _ASYNC_DRIVERS.get(backend)
+    if driver is None:
+        raise ValueError(f"Async database layer is not supported for {backend}")
+    url = url.set(drivername=f"{backend}+{driver}")
+
+    if backend == "sqlite":
+        if url.database in (None, "", ":memory:"):
+            return create_async_engine(url)
+        async_engine = create_async_engine(
+            url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            connect_args={"timeout": settings.sqlite_busy_timeout_ms / 1000},
+        )
+
+        event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        return async_engine
+
+    connect_args = {}
+    if settings.db_statement_timeout_ms:
+        connect_args["server_settings"] = {"statement_timeout": str(int(settings.db_statement_timeout_ms))}
+    return create_async_engine(
+        url,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle,
+        pool_pre_ping=settings.db_pool_pre_ping,
+        connect_args=connect_args,
+    )
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_app_engine(settings.database_url)
+        instrument_engine(_async_engine.sync_engine)
+    return _async_engine
+
+
+def get_async_session_factory():
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+
+        _async_session_factory = async_sessionmaker(
+            bind=get_async_engine(), autoflush=False, expire_on_commit=False
+        )
+    return _async_session_factory
+
+
+async def get_async_db():
+    async with get_async_session_factory()() as db:
+        yield db
+
+
+async def get_session():
+    """
+    Сессия для async-обработчиков.
+
+    AsyncSession при database_async=True, иначе обычная Session; работать
+    с ней следует через *_async-функции, которые для синхронной сессии
+    уводят запрос в threadpool.
+    """
+    if settings.database_async:
+        async with get_async_session_factory()() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Выполнить синхронную функцию fn(session, ...) над сессией из get_session,
+    не блокируя event loop: через AsyncSession.run_sync или в threadpool.
+    """
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(lambda session: fn(session, *args, **kwargs))
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+async def dispose_async_engine() -> None:
+    global _async_engine, _async_session_factory
+    if _async_engine is not None:
+        await _async_engine.dispose()
+        _async_engine = None
+        _async_session_factory = None
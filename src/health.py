@@ -0,0 +1,174 @@
+"""
+Проверки готовности (readiness)
+
+Зависимости проверяются фоновой задачей раз в readiness_check_seconds, а
+/ready отдаёт последний результат из памяти: пробы балансировщика ничего
+не стоят и не встают в очередь за обычными запросами. Проверяются:
+
+- database - SELECT 1 через пул приложения;
+- pool - запас свободных соединений (загрузка не выше readiness_max_pool_saturation);
+- migrations - ревизия БД совпадает с head миграций Alembic;
+- storage - бакет MinIO доступен (отключается readiness_check_storage=False).
+
+Если фоновая проверка давно не завершалась, результат считается устаревшим
+и сервис - неготовым.
+"""
+import asyncio
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import inspect, text
+from .database import engine, get_pool_metrics
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+_ALEMBIC_INI = Path(__file__).resolve().parent.parent / "alembic.ini"
+
+CheckResult = Tuple[bool, Dict]
+
+
+def check_database() -> CheckResult:
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+    return True, {}
+
+
+def check_pool() -> CheckResult:
+    pool = get_pool_metrics()
+    saturation = pool.get("saturation")
+    if saturation is None:
+        return True, {}
+    details = {"checked_out": pool["checked_out"], "capacity": pool["capacity"], "saturation": round(saturation, 3)}
+    return saturation <= settings.readiness_max_pool_saturation, details
+
+
+_migration_heads: Optional[Tuple[str, ...]] = None
+
+
+def _alembic_heads() -> Tuple[str, ...]:
+    # Набор миграций не меняется во время работы процесса
+    global _migration_heads
+    if _migration_heads is None:
+        from alembic.config import Config
+        from alembic.script import ScriptDirectory
+
+        script = ScriptDirectory.from_config(Config(str(_ALEMBIC_INI)))
+        _migration_heads = tuple(sorted(script.get_heads()))
+    return _migration_heads
+
+
+def check_migrations() -> CheckResult:
+    heads = _alembic_heads()
+    with engine.connect() as connection:
+        # Таблица читается напрямую: MigrationContext пишет в лог при каждом создании
+        if inspect(connection).has_table("alembic_version"):
+            rows = connection.execute(text("SELECT version_num FROM alembic_version")).scalars()
+            current = tuple(sorted(rows))
+        else:
+            current = ()
+    return current == heads, {"current": list(current), "head": list(heads)}
+
+
+_storage_client = None
+
+
+def _minio_client():
+    global _storage_client
+    if _storage_client is None:
+        import urllib3
+        from minio import Minio
+
+        http_client = urllib3.PoolManager(
+            timeout=urllib3.Timeout(total=settings.readiness_check_timeout_seconds),
+            retries=urllib3.Retry(total=0),
+        )
+        _storage_client = Minio(
+            settings.minio_endpoint,
+            access_key=settings.minio_access_key,
+            secret_key=settings.minio_secret_key,
+            secure=settings.minio_secure,
+            http_client=http_client,
+        )
+    return _storage_client
+
+
+def check_storage() -> CheckResult:
+    details = {"bucket": settings.minio_bucket_name}
+    if not _minio_client().bucket_exists(settings.minio_bucket_name):
+        details["error"] = "bucket not found"
+        return False, details
+    return True, details
+
+
+def readiness_checks() -> Dict[str, Callable[[], CheckResult]]:
+    checks = {
+        "database": check_database,
+        "pool": check_pool,
+        "migrations": check_migrations,
+    }
+    if settings.readiness_check_storage:
+        checks["storage"] = check_storage
+    return checks
+
+
+class ReadinessState:
+    """Последний результат проверок зависимостей"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checks: Dict[str, Dict] = {}
+        self._checked_at: Optional[datetime] = None
+        self._checked_monotonic = 0.0
+
+    def run_checks(self) -> None:
+        results = {}
+        for name, check in readiness_checks().items():
+            started = time.perf_counter()
+            try:
+                ok, details = check()
+            except Exception as e:
+                ok, details = False, {"error": f"{type(e).__name__}: {e}"}
+            results[name] = {"ok": ok, "duration_ms": round((time.perf_counter() - started) * 1000, 1), **details}
+            if not ok and self._checks.get(name, {}).get("ok", True):
+                logger.warning(f"Readiness check '{name}' failed: {details}")
+        with self._lock:
+            self._checks = results
+            self._checked_at = datetime.now(timezone.utc)
+            self._checked_monotonic = time.monotonic()
+
+    def snapshot(self) -> Tuple[bool, Dict]:
+        """(готов ли сервис, тело ответа /ready) без обращения к зависимостям"""
+        with self._lock:
+            checks, checked_at, checked_monotonic = self._checks, self._checked_at, self._checked_monotonic
+        if checked_at is None:
+            return False, {"status": "starting", "checks": {}}
+        age = time.monotonic() - checked_monotonic
+        stale = age > max(3 * settings.readiness_check_seconds, 30.0)
+        ready = not stale and all(result["ok"] for result in checks.values())
+        body = {
+            "status": "ready" if ready else "not_ready",
+            "checked_at": checked_at.isoformat(),
+            "age_seconds": round(age, 1),
+            "checks": checks,
+        }
+        if stale:
+            body["stale"] = True
+        return ready, body
+
+
+readiness = ReadinessState()
+
+
+async def run_readiness_checks(stop: asyncio.Event) -> None:
+    """Фоновая задача: периодическая проверка зависимостей"""
+    while not stop.is_set():
+        await run_in_threadpool(readiness.run_checks)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.readiness_check_seconds)
+        except asyncio.TimeoutError:
+            pass
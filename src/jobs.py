@@ -0,0 +1,686 @@
+"""
+Очередь отложенных задач
+
+Обработчик запроса ставит медленную работу в очередь (enqueue) и сразу
+отвечает; задачи выполняет отдельный процесс python -m src.worker, число
+воркеров масштабируется независимо от веб-процессов. Хранилище очереди
+выбирается настройкой job_backend:
+
+- database - таблица jobs (по умолчанию): задача переживает перезапуск
+  воркеров и Redis. Воркер забирает задачу условным UPDATE (в PostgreSQL -
+  SELECT ... FOR UPDATE SKIP LOCKED), так что одну задачу получает один
+  воркер без блокировок очереди;
+- redis - отсортированные множества в Redis: меньше нагрузки на БД, но
+  задача, взятая воркером, который упал до записи аренды, теряется.
+
+Обработчики регистрируются декоратором job_handler("вид") и получают
+payload (dict, сериализуемый в JSON); возвращаемое значение сохраняется
+как результат задачи. Первой берётся задача с наибольшим priority. При
+исключении задача повторяется с экспоненциальной задержкой (job_backoff_*),
+после job_max_attempts попыток она получает статус dead. Пока обработчик
+работает, воркер продлевает аренду задачи каждую треть job_lease_seconds;
+задача воркера, который упал или завис, выдаётся снова по истечении аренды.
+
+idempotency_key защищает от повторной постановки: пока задача с этим
+ключом хранится (job_retention_seconds после завершения), enqueue
+возвращает её вместо новой.
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import and_, delete, or_, select, update
+from sqlalchemy.exc import IntegrityError
+from .database import SessionLocal
+from .models.jobs import Job, JobStatus
+from .schemas.jobs import JobInfo
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+MIN_PRIORITY = -50
+MAX_PRIORITY = 50
+HIGH_PRIORITY = 10
+LOW_PRIORITY = -10
+
+# Длина сохраняемого текста ошибки
+_MAX_ERROR = 2000
+# Кандидатов на один условный UPDATE при выборе задачи (не PostgreSQL)
+_CLAIM_CANDIDATES = 5
+_PURGE_INTERVAL = 600.0
+
+JobHandler = Callable[[dict], Any]
+_handlers: Dict[str, JobHandler] = {}
+
+
+class UnknownJobKind(LookupError):
+    """Для вида задачи не зарегистрирован обработчик"""
+
+
+def job_handler(kind: str):
+    """Зарегистрировать функцию обработчиком задач вида kind"""
+    def register(fn: JobHandler) -> JobHandler:
+        if _handlers.get(kind, fn) is not fn:
+            raise ValueError(f"Job handler for {kind} is already registered")
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def registered_kinds() -> List[str]:
+    return sorted(_handlers)
+
+
+def retry_delay(attempts: int) -> float:
+    """Задержка перед следующей попыткой: удвоение с каждой попыткой и случайный разброс"""
+    delay = min(settings.job_backoff_max_seconds, settings.job_backoff_seconds * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # SQLite возвращает время без часового пояса
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _clamp_priority(priority: int) -> int:
+    return max(MIN_PRIORITY, min(MAX_PRIORITY, priority))
+
+
+class JobQueue(ABC):
+    """Хранилище задач"""
+    name = "base"
+
+    @abstractmethod
+    def enqueue(self, kind: str, payload: dict, priority: int, run_at: datetime, max_attempts: int,
+                idempotency_key: Optional[str] = None, created_by: Optional[int] = None) -> JobInfo:
+        ...
+
+    @abstractmethod
+    def claim(self, worker_id: str, lease: float) -> Optional[JobInfo]:
+        """Взять следующую готовую задачу (status running, attempts уже увеличен)"""
+
+    @abstractmethod
+    def renew(self, job: JobInfo, worker_id: str, lease: float) -> bool:
+        """Продлить аренду на lease секунд от текущего момента; False - задача уже не у этого воркера"""
+
+    @abstractmethod
+    def complete(self, job: JobInfo, worker_id: str, result: Any) -> None:
+        ...
+
+    @abstractmethod
+    def fail(self, job: JobInfo, worker_id: str, error: str, retry: bool = True) -> Optional[float]:
+        """Записать ошибку; возвращает задержку до повтора или None, если задача dead"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[JobInfo]:
+        ...
+
+    def purge(self, older_than: datetime) -> int:
+        """Удалить завершённые задачи старше older_than"""
+        return 0
+
+    def close(self) -> None:
+        pass
+
+    @staticmethod
+    def _retry_or_dead(job: JobInfo, retry: bool) -> Optional[float]:
+        if retry and job.attempts < job.max_attempts:
+            return retry_delay(job.attempts)
+        return None
+
+
+def _job_info(job: Job) -> JobInfo:
+    return JobInfo(
+        id=str(job.id),
+        kind=job.kind,
+        status=job.status,
+        priority=job.priority,
+        payload=json.loads(job.payload or "{}"),
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        run_at=_aware(job.run_at),
+        created_by=job.created_by,
+        created_at=_aware(job.created_at),
+        finished_at=_aware(job.finished_at),
+        last_error=job.last_error,
+        result=json.loads(job.result) if job.result is not None else None,
+    )
+
+
+class DatabaseJobQueue(JobQueue):
+    """Очередь в таблице jobs"""
+    name = "database"
+
+    def __init__(self, session_factory=SessionLocal):
+        self.session_factory = session_factory
+
+    def enqueue(self, kind, payload, priority, run_at, max_attempts, idempotency_key=None, created_by=None):
+        db = self.session_factory()
+        try:
+            if idempotency_key is not None:
+                existing = db.execute(select(Job).where(Job.idempotency_key == idempotency_key)).scalar_one_or_none()
+                if existing is not None:
+                    return _job_info(existing)
+            job = Job(
+                kind=kind,
+                payload=json.dumps(payload, ensure_ascii=False),
+                priority=priority,
+                status=JobStatus.QUEUED,
+                max_attempts=max_attempts,
+                run_at=run_at,
+                idempotency_key=idempotency_key,
+                created_by=created_by,
+            )
+            db.add(job)
+            try:
+                db.commit()
+            except IntegrityError:
+                # Задачу с тем же ключом одновременно поставил другой запрос
+                db.rollback()
+                if idempotency_key is None:
+                    raise
+                return _job_info(db.execute(select(Job).where(Job.idempotency_key == idempotency_key)).scalar_one())
+            return _job_info(job)
+        finally:
+            db.close()
+
+    @staticmethod
+    def _claimable(now: datetime):
+        return or_(
+            and_(Job.status == JobStatus.QUEUED, Job.run_at <= now),
+            and_(Job.status == JobStatus.RUNNING, Job.locked_until < now),
+        )
+
+    def _claim_id(self, db, worker_id: str, lease: float) -> Optional[int]:
+        now = _now()
+        claimable = self._claimable(now)
+        order = (Job.priority.desc(), Job.run_at, Job.id)
+        values = dict(
+            status=JobStatus.RUNNING,
+            attempts=Job.attempts + 1,
+            locked_by=worker_id,
+            locked_until=now + timedelta(seconds=lease),
+        )
+        if db.get_bind().dialect.name == "postgresql":
+            job_id = db.execute(
+                select(Job.id).where(claimable).order_by(*order).limit(1).with_for_update(skip_locked=True)
+            ).scalar_one_or_none()
+            if job_id is not None:
+                db.execute(update(Job).where(Job.id == job_id).values(**values))
+            return job_id
+
+        candidates = db.execute(select(Job.id).where(claimable).order_by(*order).limit(_CLAIM_CANDIDATES)).scalars()
+        for job_id in list(candidates):
+            # Условный UPDATE: при нескольких воркерах задача достаётся одному
+            result = db.execute(update(Job).where(Job.id == job_id, claimable).values(**values))
+            if result.rowcount == 1:
+                return job_id
+        return None
+
+    def claim(self, worker_id, lease):
+        db = self.session_factory()
+        try:
+            while True:
+                job_id = self._claim_id(db, worker_id, lease)
+                db.commit()
+                if job_id is None:
+                    return None
+                job = db.get(Job, job_id)
+                if job.attempts <= job.max_attempts:
+                    return _job_info(job)
+                # Аренда истекла на последней попытке (воркер упал или завис)
+                job.status = JobStatus.DEAD
+                job.locked_by = job.locked_until = None
+                job.finished_at = _now()
+                job.last_error = job.last_error or "Job lease expired"
+                db.commit()
+                logger.warning(f"Job {job_id} ({job.kind}) is dead: lease expired after {job.max_attempts} attempts")
+        finally:
+            db.close()
+
+    def renew(self, job, worker_id, lease):
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                update(Job)
+                .where(Job.id == int(job.id), Job.locked_by == worker_id, Job.status == JobStatus.RUNNING)
+                .values(locked_until=_now() + timedelta(seconds=lease))
+            )
+            db.commit()
+            return result.rowcount == 1
+        finally:
+            db.close()
+
+    def _finish(self, job_id: str, worker_id: str, **values) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(
+                update(Job)
+                .where(Job.id == int(job_id), Job.locked_by == worker_id, Job.status == JobStatus.RUNNING)
+                .values(locked_by=None, locked_until=None, **values)
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    def complete(self, job, worker_id, result):
+        self._finish(
+            job.id, worker_id,
+            status=JobStatus.SUCCEEDED,
+            result=json.dumps(result, ensure_ascii=False, default=str) if result is not None else None,
+            finished_at=_now(),
+        )
+
+    def fail(self, job, worker_id, error, retry=True):
+        delay = self._retry_or_dead(job, retry)
+        if delay is None:
+            self._finish(job.id, worker_id, status=JobStatus.DEAD, last_error=error, finished_at=_now())
+        else:
+            self._finish(job.id, worker_id, status=JobStatus.QUEUED, last_error=error,
+                         run_at=_now() + timedelta(seconds=delay))
+        return delay
+
+    def get(self, job_id):
+        if not job_id.isdigit():
+            return None
+        db = self.session_factory()
+        try:
+            job = db.get(Job, int(job_id))
+            return _job_info(job) if job is not None else None
+        finally:
+            db.close()
+
+    def purge(self, older_than):
+        db = self.session_factory()
+        try:
+            result = db.execute(
+                delete(Job).where(Job.status.in_([JobStatus.SUCCEEDED, JobStatus.DEAD]), Job.finished_at < older_than)
+            )
+            db.commit()
+            return result.rowcount
+        finally:
+            db.close()
+
+
+class RedisJobQueue(JobQueue):
+    """
+    Очередь в Redis.
+
+    '<prefix>:job:<id>' - hash задачи; ready - готовые задачи (оценка:
+    приоритет, затем время запуска), delayed - отложенные по времени
+    запуска, running - взятые воркерами по сроку аренды. Завершённые
+    задачи удаляются по EXPIRE через job_retention_seconds.
+    """
+    name = "redis"
+    _BATCH = 100
+
+    def __init__(self, client, prefix: str):
+        from redis.exceptions import WatchError
+
+        self.client = client
+        self.prefix = prefix
+        self._watch_error = WatchError
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix,) + parts)
+
+    @staticmethod
+    def _score(priority: int, run_at: float) -> float:
+        # Старшие разряды - приоритет (больше - раньше), младшие - время в мс
+        return (MAX_PRIORITY - priority) * 1e13 + run_at * 1000
+
+    def _load(self, job_id: str) -> Optional[dict]:
+        data = self.client.hgetall(self._key("job", job_id))
+        if not data:
+            return None
+        return {
+            (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+            for k, v in data.items()
+        }
+
+    @staticmethod
+    def _info(job_id: str, data: dict) -> JobInfo:
+        def timestamp(name):
+            value = data.get(name)
+            return datetime.fromtimestamp(float(value), timezone.utc) if value else None
+
+        return JobInfo(
+            id=job_id,
+            kind=data["kind"],
+            status=data["status"],
+            priority=int(data["priority"]),
+            payload=json.loads(data.get("payload") or "{}"),
+            attempts=int(data.get("attempts", 0)),
+            max_attempts=int(data["max_attempts"]),
+            run_at=timestamp("run_at"),
+            created_by=int(data["created_by"]) if data.get("created_by") else None,
+            created_at=timestamp("created_at"),
+            finished_at=timestamp("finished_at"),
+            last_error=data.get("last_error") or None,
+            result=json.loads(data["result"]) if data.get("result") else None,
+        )
+
+    def enqueue(self, kind, payload, priority, run_at, max_attempts, idempotency_key=None, created_by=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        run_ts = run_at.timestamp()
+        data = {
+            "kind": kind,
+            "payload": json.dumps(payload, ensure_ascii=False),
+            "priority": priority,
+            "status": JobStatus.QUEUED,
+            "attempts": 0,
+            "max_attempts": max_attempts,
+            "run_at": run_ts,
+            "created_by": created_by or "",
+            "created_at": now,
+        }
+        key = self._key("idempotency", idempotency_key) if idempotency_key is not None else None
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    if key is not None:
+                        # Ключ и задача пишутся одной транзакцией: параллельный enqueue
+                        # с тем же ключом получит WatchError и вернёт уже созданную задачу
+                        pipe.watch(key)
+                        existing = pipe.get(key)
+                        existing = existing.decode() if isinstance(existing, bytes) else existing
+                        if existing:
+                            existing_data = self._load(existing)
+                            if existing_data is not None:
+                                pipe.reset()
+                                return self._info(existing, existing_data)
+                        pipe.multi()
+                        pipe.set(key, job_id, ex=settings.job_retention_seconds)
+                    pipe.hset(self._key("job", job_id), mapping=data)
+                    if run_ts <= now:
+                        pipe.zadd(self._key("ready"), {job_id: self._score(priority, run_ts)})
+                    else:
+                        pipe.zadd(self._key("delayed"), {job_id: run_ts})
+                    pipe.execute()
+                    break
+                except self._watch_error:
+                    continue
+        return self._info(job_id, {k: str(v) for k, v in data.items()})
+
+    def _promote(self, source: str, now: float) -> None:
+        """Перенести в ready наступившие отложенные задачи и задачи с истёкшей арендой"""
+        for raw in self.client.zrangebyscore(self._key(source), 0, now, start=0, num=self._BATCH):
+            job_id = raw.decode() if isinstance(raw, bytes) else raw
+            # ZREM удаётся одному воркеру
+            if not self.client.zrem(self._key(source), job_id):
+                continue
+            data = self._load(job_id)
+            if data is None:
+                continue
+            self.client.zadd(self._key("ready"), {job_id: self._score(int(data["priority"]), float(data["run_at"]))})
+
+    def claim(self, worker_id, lease):
+        now = time.time()
+        self._promote("delayed", now)
+        self._promote("running", now)
+        while True:
+            popped = self.client.zpopmin(self._key("ready"), 1)
+            if not popped:
+                return None
+            raw = popped[0][0]
+            job_id = raw.decode() if isinstance(raw, bytes) else raw
+            key = self._key("job", job_id)
+            if not self.client.exists(key):
+                continue
+            pipe = self.client.pipeline()
+            pipe.zadd(self._key("running"), {job_id: now + lease})
+            pipe.hincrby(key, "attempts", 1)
+            pipe.hset(key, mapping={"status": JobStatus.RUNNING, "locked_by": worker_id})
+            pipe.execute()
+            info = self._info(job_id, self._load(job_id))
+            if info.attempts <= info.max_attempts:
+                return info
+            self.client.zrem(self._key("running"), job_id)
+            self._close_job(job_id, status=JobStatus.DEAD, last_error=info.last_error or "Job lease expired")
+
+    def renew(self, job, worker_id, lease):
+        locked_by = self.client.hget(self._key("job", job.id), "locked_by")
+        locked_by = locked_by.decode() if isinstance(locked_by, bytes) else locked_by
+        if locked_by != worker_id:
+            return False
+        # XX: задачу, которую _promote уже вернул в ready, в running не добавляем
+        return bool(self.client.zadd(self._key("running"), {job.id: time.time() + lease}, xx=True, ch=True))
+
+    def _close_job(self, job_id: str, **values) -> None:
+        key = self._key("job", job_id)
+        pipe = self.client.pipeline()
+        pipe.hset(key, mapping={**values, "finished_at": time.time(), "locked_by": ""})
+        pipe.expire(key, settings.job_retention_seconds)
+        pipe.execute()
+
+    def _release(self, job_id: str, worker_id: str) -> bool:
+        """Снять аренду; False - задача уже выдана другому воркеру"""
+        locked_by = self.client.hget(self._key("job", job_id), "locked_by")
+        locked_by = locked_by.decode() if isinstance(locked_by, bytes) else locked_by
+        if locked_by != worker_id:
+            return False
+        self.client.zrem(self._key("running"), job_id)
+        return True
+
+    def complete(self, job, worker_id, result):
+        if self._release(job.id, worker_id):
+            self._close_job(
+                job.id,
+                status=JobStatus.SUCCEEDED,
+                result=json.dumps(result, ensure_ascii=False, default=str) if result is not None else "",
+            )
+
+    def fail(self, job, worker_id, error, retry=True):
+        delay = self._retry_or_dead(job, retry)
+        if not self._release(job.id, worker_id):
+            return delay
+        if delay is None:
+            self._close_job(job.id, status=JobStatus.DEAD, last_error=error)
+        else:
+            run_at = time.time() + delay
+            pipe = self.client.pipeline()
+            pipe.hset(self._key("job", job.id), mapping={
+                "status": JobStatus.QUEUED, "last_error": error, "run_at": run_at, "locked_by": "",
+            })
+            pipe.zadd(self._key("delayed"), {job.id: run_at})
+            pipe.execute()
+        return delay
+
+    def get(self, job_id):
+        data = self._load(job_id)
+        return self._info(job_id, data) if data is not None else None
+
+    def close(self):
+        self.client.close()
+
+
+def build_job_queue(kind: str, redis_url: str, prefix: str, client=None) -> JobQueue:
+    """Очередь по настройке job_backend; client - готовый клиент Redis (например, fakeredis)"""
+    if kind == "database":
+        return DatabaseJobQueue()
+    if kind != "redis":
+        raise ValueError(f"Unknown job backend: {kind}")
+    if client is None:
+        import redis
+
+        client = redis.Redis.from_url(redis_url, socket_timeout=5, socket_connect_timeout=2)
+    return RedisJobQueue(client, prefix)
+
+
+_queue: Optional[JobQueue] = None
+
+
+def get_job_queue() -> JobQueue:
+    global _queue
+    if _queue is None:
+        _queue = build_job_queue(settings.job_backend, settings.job_redis_url, settings.job_key_prefix)
+    return _queue
+
+
+def configure_job_queue(queue: Optional[JobQueue]) -> None:
+    """Подключить очередь (None - снова создать по настройкам при обращении)"""
+    global _queue
+    previous, _queue = _queue, queue
+    if previous is not None and previous is not queue:
+        previous.close()
+
+
+def enqueue(
+    kind: str,
+    payload: Optional[dict] = None,
+    priority: int = 0,
+    delay: float = 0.0,
+    idempotency_key: Optional[str] = None,
+    max_attempts: Optional[int] = None,
+    created_by: Optional[int] = None,
+) -> JobInfo:
+    """
+    Поставить задачу в очередь. Обращается к БД или Redis - из async-кода
+    вызывать через run_in_threadpool.
+    """
+    if kind not in _handlers:
+        raise UnknownJobKind(f"No handler registered for job kind {kind}")
+    return get_job_queue().enqueue(
+        kind,
+        payload or {},
+        _clamp_priority(priority),
+        _now() + timedelta(seconds=max(0.0, delay)),
+        max_attempts or settings.job_max_attempts,
+        idempotency_key=idempotency_key,
+        created_by=created_by,
+    )
+
+
+class JobWorker:
+    """
+    Выполнение задач в concurrency потоках.
+
+    Каждый поток берёт задачу, вызывает обработчик и записывает результат
+    или ошибку; пустая очередь опрашивается раз в job_poll_seconds. Пока
+    обработчик работает, отдельный поток продлевает аренду задачи: иначе
+    задачу дольше job_lease_seconds выдали бы второму воркеру, а при
+    max_attempts=1 она стала бы dead и результат первого был бы потерян.
+    """
+
+    def __init__(self, queue: Optional[JobQueue] = None, concurrency: Optional[int] = None,
+                 poll_seconds: Optional[float] = None, lease_seconds: Optional[float] = None):
+        self.queue = queue or get_job_queue()
+        self.concurrency = max(1, concurrency or settings.job_worker_concurrency)
+        self.poll_seconds = settings.job_poll_seconds if poll_seconds is None else poll_seconds
+        self.lease_seconds = lease_seconds or settings.job_lease_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.processed = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def run_once(self) -> bool:
+        """Выполнить одну задачу; False - готовых задач нет"""
+        job = self.queue.claim(self.worker_id, self.lease_seconds)
+        if job is None:
+            return False
+        handler = _handlers.get(job.kind)
+        if handler is None:
+            self.queue.fail(job, self.worker_id, f"No handler registered for job kind {job.kind}", retry=False)
+            logger.error(f"Job {job.id}: unknown kind {job.kind}")
+            return True
+        started = time.perf_counter()
+        try:
+            with self._lease_renewal(job):
+                result = handler(job.payload)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:_MAX_ERROR]
+            delay = self.queue.fail(job, self.worker_id, error)
+            with self._lock:
+                self.failed += 1
+            if delay is None:
+                logger.exception(f"Job {job.id} ({job.kind}) failed permanently after {job.attempts} attempts")
+            else:
+                logger.warning(f"Job {job.id} ({job.kind}) attempt {job.attempts} failed, retry in {delay:.0f}s: {error}")
+            return True
+        self.queue.complete(job, self.worker_id, result)
+        with self._lock:
+            self.processed += 1
+        logger.info(f"Job {job.id} ({job.kind}) done in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+    @contextmanager
+    def _lease_renewal(self, job: JobInfo) -> Iterator[None]:
+        done = threading.Event()
+
+        def renew() -> None:
+            while not done.wait(self.lease_seconds / 3):
+                try:
+                    if not self.queue.renew(job, self.worker_id, self.lease_seconds):
+                        logger.warning(f"Job {job.id} ({job.kind}): lease lost, the job was handed to another worker")
+                        return
+                except Exception as e:
+                    # Очередь недоступна: следующая попытка через треть аренды
+                    logger.warning(f"Job {job.id} ({job.kind}): lease renewal failed: {e}")
+
+        thread = threading.Thread(target=renew, name=f"job-lease-{job.id}", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _loop(self, stop: threading.Event, purge: bool) -> None:
+        purged_at = 0.0
+        while not stop.is_set():
+            try:
+                if purge and time.monotonic() - purged_at >= _PURGE_INTERVAL:
+                    purged_at = time.monotonic()
+                    removed = self.queue.purge(_now() - timedelta(seconds=settings.job_retention_seconds))
+                    if removed:
+                        logger.info(f"Purged {removed} finished jobs")
+                if self.run_once():
+                    continue
+            except Exception as e:
+                # Очередь недоступна: пауза и новая попытка
+                logger.warning(f"Job worker error: {e}")
+            stop.wait(self.poll_seconds)
+
+    def run(self, stop: threading.Event) -> None:
+        """Работать до установки stop; текущие задачи доводятся до конца"""
+        logger.info(
+            f"Job worker {self.worker_id} started: {self.concurrency} threads, "
+            f"{self.queue.name} queue, kinds: {', '.join(registered_kinds()) or '-'}"
+        )
+        threads = [
+            threading.Thread(target=self._loop, args=(stop, i == 0), name=f"job-worker-{i}", daemon=True)
+            for i in range(self.concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        logger.info(f"Job worker {self.worker_id} stopped: {self.processed} done, {self.failed} failed")
+
+
+async def run_embedded_worker(stop: asyncio.Event) -> None:
+    """Воркер внутри веб-процесса (job_worker_embedded): работает до stop"""
+    thread_stop = threading.Event()
+    worker = JobWorker()
+    thread = threading.Thread(target=worker.run, args=(thread_stop,), name="job-worker", daemon=True)
+    thread.start()
+    await stop.wait()
+    thread_stop.set()
+    await run_in_threadpool(thread.join)
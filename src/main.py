@@ -1,13 +1,29 @@
+import asyncio
 import logging
-from fastapi import FastAPI, HTTPException
+import secrets
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import FileResponse
-from .routers import auth_router
+from fastapi.responses import FileResponse, JSONResponse, Response
+from .routers import auth_router, clients_router, applications_router, imports_router, exports_router, reports_router
+from .routers import attachments_router, jobs_router
 from .routers import web
-from .database import engine, Base
+from .database import engine, Base, dispose_async_engine
 from .settings import settings
+from .auth import password_hasher
+from .auth.revocation import load_revocation_index, run_revocation_maintenance
+from .cache import MemoryBackend, build_cache_backend, configure_cache
+from .health import readiness, run_readiness_checks
+from .jobs import configure_job_queue, run_embedded_worker
+from .metrics import MetricsMiddleware, mark_process_dead, render_metrics
+from .nplusone import NPlusOneMiddleware, detection_enabled
+from .templating import HTMLGZipMiddleware, precompile_templates
+from .services.currency import load_configured_rates
+from .services.attachments import run_attachment_worker
+from .services.reports import run_rollup_refresh
 import os
 
 # Configure logging  
@@ -19,13 +35,48 @@ logger = logging.getLogger(__name__)
 
 # Database tables are created via Alembic migrations
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Startup/shutdown hooks"""
+    stop = asyncio.Event()
+    configure_cache(build_cache_backend(
+        settings.cache_backend,
+        settings.cache_redis_url,
+        settings.cache_key_prefix,
+        settings.cache_local_ttl_seconds,
+    ))
+    await run_in_threadpool(load_configured_rates)
+    await run_in_threadpool(precompile_templates)
+    await load_revocation_index()
+    revocation_task = asyncio.create_task(run_revocation_maintenance(stop))
+    rollup_task = asyncio.create_task(run_rollup_refresh(stop))
+    readiness_task = asyncio.create_task(run_readiness_checks(stop))
+    attachment_task = asyncio.create_task(run_attachment_worker(stop))
+    job_task = asyncio.create_task(run_embedded_worker(stop)) if settings.job_worker_embedded else None
+    yield
+    stop.set()
+    await revocation_task
+    await rollup_task
+    await readiness_task
+    await attachment_task
+    if job_task is not None:
+        await job_task
+    configure_job_queue(None)
+    configure_cache(MemoryBackend())
+    await dispose_async_engine()
+    password_hasher.shutdown()
+    mark_process_dead()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Travel CRM API",
     description="Travel CRM platform for managing bookings, clients, and services",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # Mount static files
@@ -41,9 +92,26 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Include routers
+# Сжатие HTML-страниц
+app.add_middleware(HTMLGZipMiddleware, minimum_size=settings.html_gzip_min_size, compresslevel=settings.html_gzip_level)
+
+# Ленивые загрузки связей на запрос (только development/test)
+if detection_enabled():
+    app.add_middleware(NPlusOneMiddleware)
+
+# Метрики запросов (внешний слой - учитывает и CORS)
+if settings.metrics_enabled:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
+app.include_router(clients_router, prefix="/api")
+app.include_router(applications_router, prefix="/api")
+app.include_router(imports_router, prefix="/api")
+app.include_router(exports_router, prefix="/api")
+app.include_router(reports_router, prefix="/api")
+app.include_router(attachments_router, prefix="/api")
+app.include_router(jobs_router, prefix="/api")
 app.include_router(web.router, tags=["web"])
 
 
@@ -74,17 +142,31 @@ async def robots():
 
 @app.get("/health", tags=["Health"])
 async def health_check():
-    """Health check endpoint"""
-    try:
-        # Basic health check - can be extended with DB connectivity check
-        return {
-            "status": "healthy",
-            "environment": settings.environment,
-            "service": "travel-crm-api"
-        }
-    except Exception as e:
-        logger.error(f"Health check failed: {str(e)}")
-        raise HTTPException(status_code=503, detail="Service unavailable")
+    """Liveness: процесс жив и обслуживает запросы, зависимости не проверяются"""
+    return {
+        "status": "healthy",
+        "environment": settings.environment,
+        "service": "travel-crm-api"
+    }
+
+
+@app.get("/ready", tags=["Health"])
+async def readiness_check():
+    """Readiness: последний результат фоновой проверки БД, пула, миграций и MinIO"""
+    ready, body = readiness.snapshot()
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+
+if settings.metrics_enabled:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        """Метрики в текстовом формате Prometheus"""
+        if settings.metrics_token:
+            expected = f"Bearer {settings.metrics_token}"
+            if not secrets.compare_digest(request.headers.get("authorization", ""), expected):
+                raise HTTPException(status_code=401, detail="Unauthorized")
+        body, content_type = render_metrics()
+        return Response(content=body, media_type=content_type)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,237 @@
+"""
+Метрики в формате Prometheus
+
+- HTTP: гистограмма длительности по шаблону маршрута (/api/clients/{client_id},
+  а не конкретный путь), счётчик ответов по статусам, число запросов в работе;
+- БД: число и время SQL-запросов (события engine в database.py), в том
+  числе в расчёте на один HTTP-запрос, ожидание соединения из пула;
+- argon2: время хеширования и проверки паролей и ожидание в очереди пула;
+- состояние пула соединений и кэшей снимается в момент опроса /metrics.
+
+Запросы дольше settings.slow_request_ms пишутся в лог вместе с выполненными
+в них SQL-выражениями.
+
+Без PROMETHEUS_MULTIPROC_DIR метрики считаются в пределах процесса. При
+нескольких воркерах uvicorn переменная окружения (читается prometheus_client
+до создания первой метрики, поэтому не из .env) указывает на общий пустой
+каталог: каждый воркер пишет значения в свои файлы, а /metrics любого из
+них собирает MultiProcessCollector по всем. Состояние пула и кэшей в этом
+режиме - процесса, ответившего на опрос.
+"""
+import logging
+import os
+import time
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get("prometheus_multiproc_dir")
+
+registry = CollectorRegistry(auto_describe=True)
+
+_LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+_QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+_QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+_HASH_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# Ограничение длины SQL в логе медленных запросов
+_STATEMENT_LOG_LENGTH = 1000
+
+http_requests = Counter(
+    "http_requests_total", "HTTP responses by route and status",
+    ["method", "route", "status"], registry=registry,
+)
+http_request_duration = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route",
+    ["method", "route"], buckets=_LATENCY_BUCKETS, registry=registry,
+)
+http_requests_in_progress = Gauge(
+    "http_requests_in_progress", "HTTP requests being processed",
+    ["method"], registry=registry, multiprocess_mode="livesum",
+)
+http_request_db_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per HTTP request",
+    ["method", "route"], buckets=_QUERY_COUNT_BUCKETS, registry=registry,
+)
+http_request_db_duration = Histogram(
+    "http_request_db_duration_seconds", "Time spent in SQL per HTTP request",
+    ["method", "route"], buckets=_LATENCY_BUCKETS, registry=registry,
+)
+db_query_duration = Histogram(
+    "db_query_duration_seconds", "SQL statement execution time",
+    ["operation"], buckets=_QUERY_BUCKETS, registry=registry,
+)
+db_pool_checkout_wait = Histogram(
+    "db_pool_checkout_wait_seconds", "Time waiting for a pooled connection",
+    buckets=_QUERY_BUCKETS, registry=registry,
+)
+password_hash_duration = Histogram(
+    "password_hash_duration_seconds", "argon2 hash/verify time",
+    ["operation"], buckets=_HASH_BUCKETS, registry=registry,
+)
+password_hash_queue_wait = Histogram(
+    "password_hash_queue_wait_seconds", "Time a password hashing task waited for a worker",
+    buckets=_HASH_BUCKETS, registry=registry,
+)
+
+_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK", "PRAGMA"}
+
+
+class RequestStats:
+    """SQL, выполненный в рамках одного HTTP-запроса"""
+
+    __slots__ = ("queries", "db_seconds", "statements", "dropped")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements: List[Tuple[float, str]] = []
+        self.dropped = 0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def _operation(statement: str) -> str:
+    word = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else ""
+    return word if word in _OPERATIONS else "OTHER"
+
+
+def observe_query(statement: str, seconds: float) -> None:
+    """Учесть выполненное SQL-выражение (вызывается из событий engine)"""
+    db_query_duration.labels(_operation(statement)).observe(seconds)
+    stats = _request_stats.get()
+    if stats is None:
+        return
+    stats.queries += 1
+    stats.db_seconds += seconds
+    if len(stats.statements) < settings.slow_request_max_statements:
+        stats.statements.append((seconds, statement))
+    else:
+        stats.dropped += 1
+
+
+def observe_pool_wait(seconds: float) -> None:
+    db_pool_checkout_wait.observe(seconds)
+
+
+def observe_password_hash(operation: str, seconds: float, queued: float) -> None:
+    password_hash_duration.labels(operation).observe(seconds)
+    password_hash_queue_wait.observe(queued)
+
+
+def _route_label(scope) -> str:
+    # Шаблон пути ограничивает число серий; всё, что не нашло маршрут, - одна серия
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _log_slow_request(method: str, path: str, status: int, seconds: float, stats: RequestStats) -> None:
+    lines = [
+        f"Slow request {method} {path} -> {status} in {seconds * 1000:.0f} ms, "
+        f"{stats.queries} queries, {stats.db_seconds * 1000:.0f} ms in database"
+    ]
+    for duration, statement in stats.statements:
+        text = " ".join(statement.split())
+        if len(text) > _STATEMENT_LOG_LENGTH:
+            text = text[:_STATEMENT_LOG_LENGTH] + "..."
+        lines.append(f"  [{duration * 1000:.1f} ms] {text}")
+    if stats.dropped:
+        lines.append(f"  ... and {stats.dropped} more statements")
+    logger.warning("\n".join(lines))
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware: длительность и статус запроса, число запросов в работе
+    и SQL, выполненный при обработке (включая потоковую отдачу тела ответа).
+    """
+
+    def __init__(self, app, slow_request_ms: Optional[float] = None):
+        self.app = app
+        self.slow_request_ms = settings.slow_request_ms if slow_request_ms is None else slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_progress = http_requests_in_progress.labels(method)
+        in_progress.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_progress.dec()
+            _request_stats.reset(token)
+            route = _route_label(scope)
+            http_requests.labels(method, route, str(status)).inc()
+            http_request_duration.labels(method, route).observe(elapsed)
+            http_request_db_queries.labels(method, route).observe(stats.queries)
+            http_request_db_duration.labels(method, route).observe(stats.db_seconds)
+            if self.slow_request_ms and elapsed * 1000 >= self.slow_request_ms:
+                _log_slow_request(method, scope["path"], status, elapsed, stats)
+
+
+class _StateCollector:
+    """Состояние пула соединений и кэшей на момент опроса"""
+
+    def describe(self):
+        return []
+
+    def collect(self):
+        from .auth import token_cache_stats
+        from .cache import cache_stats
+        from .database import get_pool_metrics
+
+        pool = GaugeMetricFamily("db_pool", "Connection pool state", labels=["field"])
+        for field, value in get_pool_metrics().items():
+            pool.add_metric([field], float(value))
+        yield pool
+
+        cache = GaugeMetricFamily("cache", "Cache counters by namespace", labels=["namespace", "field"])
+        namespaces = dict(cache_stats())
+        namespaces["token"] = token_cache_stats()
+        for name, values in namespaces.items():
+            for field, value in values.items():
+                if isinstance(value, (int, float)):
+                    cache.add_metric([name, field], float(value))
+        yield cache
+
+
+registry.register(_StateCollector())
+
+# Метрики всех воркеров: файлы каталога читаются заново при каждом опросе
+_scrape_registry = registry
+if MULTIPROC_DIR:
+    _scrape_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(_scrape_registry, MULTIPROC_DIR)
+    _scrape_registry.register(_StateCollector())
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    """Текст для /metrics и его Content-Type"""
+    return generate_latest(_scrape_registry), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead() -> None:
+    """Убрать значения livesum-метрик остановленного воркера (многопроцессный режим)"""
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(os.getpid(), MULTIPROC_DIR)
@@ -1,13 +1,31 @@
 from .user import User, UserRole
 from .token import RefreshToken, TokenBlacklist
 from .business import Organization, Client, Application, OrganizationType, ClientStatus, ApplicationStatus, ApplicationType
+from .stats import OrganizationStatCounter
+from .inbox import ApplicationInboxVersion
+from .search import ClientSearchKey
+from .reports import RevenueDailyRollup, RevenueRollupDirtyDay, ReportRefreshState
+from .currency import ExchangeRate
+from .attachments import Attachment, AttachmentCategory, StoredFile
+from .jobs import Job, JobStatus
+from .numbering import ApplicationNumberSequence
+from .status_events import ApplicationStatusEvent
 
 __all__ = [
     "User", "UserRole",
     "RefreshToken", "TokenBlacklist", 
     "Organization", "OrganizationType",
     "Client", "ClientStatus",
-    "Application", "ApplicationStatus", "ApplicationType"
+    "Application", "ApplicationStatus", "ApplicationType",
+    "OrganizationStatCounter",
+    "ApplicationInboxVersion",
+    "ClientSearchKey",
+    "RevenueDailyRollup", "RevenueRollupDirtyDay", "ReportRefreshState",
+    "ExchangeRate",
+    "Attachment", "AttachmentCategory", "StoredFile",
+    "Job", "JobStatus",
+    "ApplicationNumberSequence",
+    "ApplicationStatusEvent"
 ], UserRole
 
 __all__ = ["User", "UserRole"]
@@ -0,0 +1,76 @@
+"""
+Вложения клиентов и заявок (сканы паспортов, ваучеры, билеты)
+"""
+import enum
+from sqlalchemy import BigInteger, CheckConstraint, Column, DateTime, Enum, ForeignKey, Index, Integer, String
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+from ..database import Base
+from ..tenancy import TenantScoped
+
+
+class AttachmentCategory(enum.Enum):
+    PASSPORT_SCAN = "passport_scan"
+    VISA = "visa"
+    VOUCHER = "voucher"
+    TICKET = "ticket"
+    CONTRACT = "contract"
+    OTHER = "other"
+
+
+class ThumbnailStatus:
+    PENDING = "pending"
+    PROCESSING = "processing"
+    READY = "ready"
+    SKIPPED = "skipped"  # не изображение или слишком большой файл
+    FAILED = "failed"
+
+
+class StoredFile(Base):
+    """
+    Содержимое файла в объектном хранилище - одна запись на sha256.
+
+    Одинаковые файлы, загруженные к разным клиентам или заявкам, хранятся
+    один раз; запись без вложений удаляется фоновой задачей вместе с
+    объектами. last_referenced_at обновляет каждая загрузка, нашедшая
+    файл по sha256: от него отсчитывается задержка удаления.
+    """
+    __tablename__ = "stored_files"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String(127), nullable=False)
+    object_key = Column(String(255), nullable=False)
+    thumbnail_key = Column(String(255), nullable=True)
+    thumbnail_status = Column(String(16), nullable=False, default=ThumbnailStatus.PENDING)
+    thumbnail_attempted_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    last_referenced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_stored_files_thumbnail_status", "thumbnail_status"),
+    )
+
+
+class Attachment(TenantScoped, Base):
+    """Файл, прикреплённый к клиенту или к заявке (ровно к одному из них)"""
+    __tablename__ = "attachments"
+
+    id = Column(Integer, primary_key=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    client_id = Column(Integer, ForeignKey("clients.id"), nullable=True)
+    application_id = Column(Integer, ForeignKey("applications.id"), nullable=True)
+    sha256 = Column(String(64), ForeignKey("stored_files.sha256"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    category = Column(Enum(AttachmentCategory), nullable=False, default=AttachmentCategory.OTHER)
+    uploaded_by = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    stored_file = relationship("StoredFile")
+
+    __table_args__ = (
+        CheckConstraint("(client_id IS NULL) <> (application_id IS NULL)", name="ck_attachments_owner"),
+        Index("ix_attachments_org_client", "organization_id", "client_id", "id"),
+        Index("ix_attachments_org_application", "organization_id", "application_id", "id"),
+        Index("ix_attachments_sha256", "sha256"),
+    )
@@ -1,10 +1,11 @@
 """
 Модели для организаций, клиентов и заявок
 """
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum, Numeric
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, ForeignKey, Enum, Numeric, Index, text
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
+from ..tenancy import TenantScoped
 import enum
 
 
@@ -23,6 +24,7 @@ class Organization(Base):
     name = Column(String(255), nullable=False, index=True)
     type = Column(Enum(OrganizationType), nullable=False)
     registration_number = Column(String(50), unique=True, nullable=True)
+    code = Column(String(16), unique=True, nullable=True)  # Префикс номеров заявок (ORG-2026-000123)
     tax_number = Column(String(50), nullable=True)
     phone = Column(String(20), nullable=True)
     email = Column(String(255), nullable=True)
@@ -45,7 +47,7 @@ class ClientStatus(enum.Enum):
     VIP = "vip"
 
 
-class Client(Base):
+class Client(TenantScoped, Base):
     __tablename__ = "clients"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -55,7 +57,7 @@ class Client(Base):
     first_name = Column(String(100), nullable=False)
     last_name = Column(String(100), nullable=False)
     middle_name = Column(String(100), nullable=True)
-    email = Column(String(255), nullable=True, index=True)
+    email = Column(String(255), nullable=True)
     phone = Column(String(20), nullable=True)
     date_of_birth = Column(DateTime, nullable=True)
     
@@ -79,6 +81,16 @@ class Client(Base):
     creator = relationship("User", foreign_keys=[created_by])
     applications = relationship("Application", back_populates="client")
 
+    __table_args__ = (
+        # Keyset-пагинация списка клиентов: (organization_id[, фильтр], last_name, id)
+        Index("ix_clients_org_last_name_id", "organization_id", "last_name", "id"),
+        Index("ix_clients_org_status_last_name_id", "organization_id", "status", "last_name", "id"),
+        Index("ix_clients_org_creator_last_name_id", "organization_id", "created_by", "last_name", "id"),
+        # Запросы в пределах организации: выгрузка по id, поиск дубликатов по email
+        Index("ix_clients_org_id", "organization_id", "id"),
+        Index("ix_clients_org_email", "organization_id", "email"),
+    )
+
 
 class ApplicationStatus(enum.Enum):
     DRAFT = "draft"
@@ -91,6 +103,28 @@ class ApplicationStatus(enum.Enum):
     REFUNDED = "refunded"
 
 
+# Незакрытые заявки - входящие менеджера
+OPEN_APPLICATION_STATUSES = (
+    ApplicationStatus.DRAFT,
+    ApplicationStatus.SUBMITTED,
+    ApplicationStatus.PROCESSING,
+    ApplicationStatus.CONFIRMED,
+    ApplicationStatus.PAID,
+)
+
+# Условие частичного индекса; запрос должен содержать его дословно, иначе
+# SQLite не сможет доказать, что индекс применим
+OPEN_APPLICATION_STATUS_CLAUSE = "status IN ({})".format(
+    ", ".join(f"'{status.name}'" for status in OPEN_APPLICATION_STATUSES)
+)
+
+# Колонки строки входящих; в PostgreSQL включены в индексы (INCLUDE) для index-only scan
+INBOX_COLUMNS = (
+    "id", "application_number", "title", "type", "status",
+    "destination", "departure_date", "return_date", "client_id",
+)
+
+
 class ApplicationType(enum.Enum):
     TOUR_PACKAGE = "tour_package"
     FLIGHT = "flight"
@@ -102,7 +136,7 @@ class ApplicationType(enum.Enum):
     OTHER = "other"
 
 
-class Application(Base):
+class Application(TenantScoped, Base):
     __tablename__ = "applications"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -143,3 +177,25 @@ class Application(Base):
     client = relationship("Client", back_populates="applications")
     assigned_manager = relationship("User", foreign_keys=[assigned_to])
     creator = relationship("User", foreign_keys=[created_by])
+
+    # Индексы входящих: заявки ответственного в порядке даты вылета
+    __table_args__ = (
+        Index(
+            "ix_applications_org_assignee_status_departure",
+            "organization_id", "assigned_to", "status", "departure_date", "id",
+            postgresql_include=[c for c in INBOX_COLUMNS if c not in ("id", "status", "departure_date")],
+        ),
+        Index(
+            "ix_applications_open_inbox",
+            "organization_id", "assigned_to", "departure_date", "id",
+            sqlite_where=text(OPEN_APPLICATION_STATUS_CLAUSE),
+            postgresql_where=text(OPEN_APPLICATION_STATUS_CLAUSE),
+            postgresql_include=[c for c in INBOX_COLUMNS if c not in ("id", "departure_date")],
+        ),
+        # Сводка выручки: водяной знак изменений (по всем организациям) и пересчёт дней организации
+        Index("ix_applications_updated_at", "updated_at"),
+        Index("ix_applications_org_created_at", "organization_id", "created_at"),
+        # Выгрузка по id и заявки клиента в пределах организации
+        Index("ix_applications_org_id", "organization_id", "id"),
+        Index("ix_applications_org_client", "organization_id", "client_id", "id"),
+    )
@@ -0,0 +1,18 @@
+"""
+Курсы валют
+"""
+from sqlalchemy import Column, Date, Numeric, String
+from ..database import Base
+
+
+class ExchangeRate(Base):
+    """
+    Курс валюты на дату: сколько единиц базовой валюты (settings.base_currency)
+    стоит одна единица currency. На дату без курса действует последний
+    известный курс до неё.
+    """
+    __tablename__ = "exchange_rates"
+
+    currency = Column(String(3), primary_key=True)
+    day = Column(Date, primary_key=True)
+    rate = Column(Numeric(18, 8), nullable=False)
@@ -0,0 +1,20 @@
+"""
+Версии входящих заявок для условных GET-запросов
+"""
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+from ..database import Base
+
+
+class ApplicationInboxVersion(Base):
+    """
+    Номер версии входящих ответственного.
+
+    Увеличивается в той же транзакции, что и любое изменение заявок
+    ответственного; assignee_id = 0 - нераспределённые заявки. ETag списка
+    строится из версии, поэтому 304 отдаётся после одного чтения по ключу.
+    """
+    __tablename__ = "application_inbox_versions"
+
+    organization_id = Column(Integer, ForeignKey("organizations.id"), primary_key=True)
+    assignee_id = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,49 @@
+"""
+Очередь отложенных задач
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.sql import func
+from ..database import Base
+
+
+class JobStatus:
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    DEAD = "dead"  # попытки исчерпаны
+
+
+class Job(Base):
+    """
+    Задача для воркера (python -m src.worker).
+
+    Берётся задача с наибольшим priority среди готовых к запуску (run_at
+    наступил); running с истёкшим locked_until - упавший воркер, такая
+    задача выдаётся снова. idempotency_key уникален: повторная постановка
+    с тем же ключом возвращает уже созданную задачу.
+    """
+    __tablename__ = "jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(64), nullable=False)
+    payload = Column(Text, nullable=False, default="{}")
+    priority = Column(Integer, nullable=False, default=0)
+    status = Column(String(16), nullable=False, default=JobStatus.QUEUED)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime(timezone=True), nullable=False)
+    locked_by = Column(String(64), nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)
+    idempotency_key = Column(String(128), nullable=True, unique=True)
+    result = Column(Text, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Выбор следующей задачи: статус, приоритет (по убыванию), время запуска
+        Index("ix_jobs_claim", "status", "priority", "run_at", "id"),
+        Index("ix_jobs_status_locked_until", "status", "locked_until"),
+        Index("ix_jobs_finished_at", "finished_at"),
+    )
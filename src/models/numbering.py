@@ -0,0 +1,19 @@
+"""
+Счётчики номеров заявок
+"""
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+from ..database import Base
+
+
+class ApplicationNumberSequence(Base):
+    """
+    Следующий свободный порядковый номер заявки организации за год.
+
+    Воркеры резервируют из счётчика блоки номеров (см.
+    services/application_numbers.py) и выдают их из памяти.
+    """
+    __tablename__ = "application_number_sequences"
+
+    organization_id = Column(Integer, ForeignKey("organizations.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    next_value = Column(BigInteger, nullable=False, default=1)
@@ -0,0 +1,51 @@
+"""
+Материализованные сводки для отчётов
+"""
+from sqlalchemy import Column, Date, DateTime, Integer, Numeric, String, ForeignKey
+from ..database import Base
+
+
+class RevenueDailyRollup(Base):
+    """
+    Дневная сводка заявок организации.
+
+    Разрез: день создания заявки (UTC), тип, направление, ответственный
+    менеджер (0 - не назначен) и валюта. revenue - сумма final_cost заявок
+    в статусах выручки. Строки пересчитываются целиком по дням, затронутым
+    изменениями с последнего водяного знака.
+    """
+    __tablename__ = "revenue_daily_rollups"
+
+    organization_id = Column(Integer, ForeignKey("organizations.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    type = Column(String(32), primary_key=True)
+    destination = Column(String(255), primary_key=True)
+    manager_id = Column(Integer, primary_key=True)
+    currency = Column(String(3), primary_key=True)
+    applications = Column(Integer, nullable=False, default=0)
+    paid_applications = Column(Integer, nullable=False, default=0)
+    revenue = Column(Numeric(16, 2), nullable=False, default=0)
+
+
+class RevenueRollupDirtyDay(Base):
+    """День организации, сводку которого нужно пересчитать (удаление или перенос заявки)"""
+    __tablename__ = "revenue_rollup_dirty_days"
+
+    organization_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True)
+
+
+class ReportRefreshState(Base):
+    """
+    Состояние инкрементального обновления сводки.
+
+    watermark - наибольший учтённый updated_at (изменения заявок),
+    last_id - наибольший учтённый id (новые заявки), version растёт при каждом обновлении, изменившем данные (ключ кэша отчётов).
+    """
+    __tablename__ = "report_refresh_state"
+
+    name = Column(String(32), primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=True)
+    last_id = Column(Integer, nullable=False, default=0)
+    version = Column(Integer, nullable=False, default=0)
+    refreshed_at = Column(DateTime(timezone=True), nullable=True)
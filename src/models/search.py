@@ -0,0 +1,30 @@
+"""
+Поисковый индекс клиентов
+"""
+from sqlalchemy import Column, ForeignKey, Index, Integer, SmallInteger, String
+from ..database import Base
+
+# Ключи - ASCII; в PostgreSQL побайтовое сравнение, чтобы префиксный
+# диапазон key >= 'iv' AND key < 'iw' совпадал с порядком B-tree индекса
+SearchKey = String(64).with_variant(String(64, collation="C"), "postgresql")
+
+
+class ClientSearchKey(Base):
+    """
+    Нормализованный поисковый ключ клиента.
+
+    Для ФИО - слова, приведённые к общему латинскому "скелету" (Иванов,
+    Ivanov и Iwanow дают один ключ), для телефона - цифры, для паспорта -
+    буквы и цифры, для email - адрес в нижнем регистре. Поиск - префиксный
+    диапазон по первичному ключу (organization_id, key, ...).
+    """
+    __tablename__ = "client_search_keys"
+    __table_args__ = (
+        # Ключи кандидата для остальных слов запроса читаются из индекса, без обращения к таблице
+        Index("ix_client_search_keys_client_id", "client_id", "key", "field"),
+    )
+
+    organization_id = Column(Integer, ForeignKey("organizations.id"), primary_key=True)
+    key = Column(SearchKey, primary_key=True)
+    client_id = Column(Integer, ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    field = Column(SmallInteger, primary_key=True)  # Поле клиента, см. services.client_search
@@ -0,0 +1,21 @@
+"""
+Агрегированная статистика организаций для дашборда
+"""
+from sqlalchemy import Column, Integer, String, Numeric, ForeignKey
+from ..database import Base
+
+
+class OrganizationStatCounter(Base):
+    """
+    Счётчик статистики организации.
+
+    metric - вид показателя (clients, applications_by_status, revenue, ...),
+    key - его разрез (статус, валюта, день). Значения поддерживаются
+    инкрементально, чтение дашборда - выборка по первичному ключу.
+    """
+    __tablename__ = "organization_stat_counters"
+
+    organization_id = Column(Integer, ForeignKey("organizations.id"), primary_key=True)
+    metric = Column(String(32), primary_key=True)
+    key = Column(String(32), primary_key=True)
+    value = Column(Numeric(14, 2), nullable=False, default=0)
@@ -0,0 +1,36 @@
+"""
+Журнал смены статусов заявок
+"""
+from sqlalchemy import Column, DateTime, Enum, ForeignKey, Index, Integer, String, Text
+from sqlalchemy.sql import func
+from ..database import Base
+from ..tenancy import TenantScoped
+from .business import ApplicationStatus
+
+
+class ApplicationStatusEvent(TenantScoped, Base):
+    """
+    Переход заявки из from_status в to_status.
+
+    Таблица только дополняется: строки пишутся пачкой в той же транзакции,
+    что и UPDATE заявок (см. services/application_status.py), и не
+    меняются. application_id - не внешний ключ: история переживает
+    удаление заявки. batch_id объединяет переходы одного массового запроса.
+    """
+    __tablename__ = "application_status_events"
+
+    id = Column(Integer, primary_key=True)
+    organization_id = Column(Integer, ForeignKey("organizations.id"), nullable=False)
+    application_id = Column(Integer, nullable=False)
+    from_status = Column(Enum(ApplicationStatus), nullable=True)
+    to_status = Column(Enum(ApplicationStatus), nullable=False)
+    changed_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    batch_id = Column(String(32), nullable=True)
+    comment = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Лента организации (keyset по id) и история одной заявки
+        Index("ix_application_status_events_org_id", "organization_id", "id"),
+        Index("ix_application_status_events_org_application", "organization_id", "application_id", "id"),
+    )
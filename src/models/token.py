@@ -13,12 +13,12 @@ class RefreshToken(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     token_hash = Column(String(255), unique=True, index=True, nullable=False)
-    expires_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
     is_revoked = Column(Boolean, default=False, nullable=False)
     device_info = Column(Text, nullable=True)  # Информация об устройстве
     ip_address = Column(String(45), nullable=True)  # IPv4/IPv6
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    revoked_at = Column(DateTime(timezone=True), nullable=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=True, index=True)
 
     # Связь с пользователем
     user = relationship("User", back_populates="refresh_tokens")
@@ -30,6 +30,6 @@ class TokenBlacklist(Base):
     id = Column(Integer, primary_key=True, index=True)
     token_jti = Column(String(255), unique=True, index=True, nullable=False)  # JWT ID
     token_type = Column(String(20), nullable=False)  # 'access' or 'refresh'
-    expires_at = Column(DateTime(timezone=True), nullable=False)
-    blacklisted_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    blacklisted_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     reason = Column(String(100), nullable=True)  # Причина блокировки
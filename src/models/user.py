@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Enum, ForeignKey, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database import Base
+from ..tenancy import TenantScoped
 import enum
 
 
@@ -12,7 +13,7 @@ class UserRole(enum.Enum):
     SUPERVISOR = "supervisor"
 
 
-class User(Base):
+class User(TenantScoped, Base):
     __tablename__ = "users"
 
     id = Column(Integer, primary_key=True, index=True)
@@ -26,3 +27,8 @@ class User(Base):
     # Связи
     refresh_tokens = relationship("RefreshToken", back_populates="user")
     organization = relationship("Organization", back_populates="users")
+
+    __table_args__ = (
+        # Пользователи организации
+        Index("ix_users_org_id", "organization_id", "id"),
+    )
@@ -0,0 +1,118 @@
+"""
+Поиск N+1 запросов (режим разработки и тестов)
+
+Каждая ленивая загрузка связи, дошедшая до БД (Session "do_orm_execute" с
+lazy_loaded_from), учитывается в счётчике текущего HTTP-запроса по имени
+связи, например Application.client. Если одна и та же связь загружена
+лениво nplusone_threshold раз за запрос, это N+1: в режиме log в лог
+пишется предупреждение с маршрутом, в режиме raise выбрасывается
+NPlusOneError прямо в месте загрузки (удобно в тестах и скриптах проверки).
+
+Связи, уже находящиеся в identity map, запроса не выполняют и не считаются.
+Исправление - загрузить связи заранее опциями запроса: joinedload для
+связей "многие к одному", selectinload для коллекций.
+"""
+import logging
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+MODES = ("off", "log", "raise")
+
+
+class NPlusOneError(RuntimeError):
+    """Связь загружается лениво в цикле"""
+
+
+class LazyLoadTracker:
+    """Ленивые загрузки связей в пределах одного запроса"""
+
+    def __init__(self, threshold: int, mode: str):
+        self.threshold = max(2, threshold)
+        self.mode = mode
+        self.loads: Counter = Counter()
+
+    def record(self, relationship: str) -> None:
+        self.loads[relationship] += 1
+        if self.mode == "raise" and self.loads[relationship] == self.threshold:
+            raise NPlusOneError(
+                f"{relationship} lazily loaded {self.threshold} times in one request; "
+                f"load it eagerly (selectinload/joinedload)"
+            )
+
+    @property
+    def total(self) -> int:
+        return sum(self.loads.values())
+
+    def suspects(self) -> Dict[str, int]:
+        """Связи, загруженные лениво не меньше threshold раз"""
+        return {name: count for name, count in self.loads.most_common() if count >= self.threshold}
+
+
+_tracker: ContextVar[Optional[LazyLoadTracker]] = ContextVar("lazy_load_tracker", default=None)
+
+
+def _on_orm_execute(orm_execute_state) -> None:
+    tracker = _tracker.get()
+    # У UPDATE/DELETE нет параметров загрузки, lazy_loaded_from для них - ошибка
+    if tracker is None or not orm_execute_state.is_select or orm_execute_state.lazy_loaded_from is None:
+        return
+    path = orm_execute_state.loader_strategy_path
+    tracker.record(str(path[-1]) if path else orm_execute_state.lazy_loaded_from.class_.__name__)
+
+
+_installed = False
+
+
+def install_nplusone_detection() -> None:
+    """Подключить обработчик событий сессий (один раз на процесс)"""
+    global _installed
+    if not _installed:
+        event.listen(Session, "do_orm_execute", _on_orm_execute)
+        _installed = True
+
+
+def detection_enabled() -> bool:
+    """Только для development/test и при nplusone_mode, отличном от off"""
+    return settings.environment in ("development", "test") and settings.nplusone_mode != "off"
+
+
+@contextmanager
+def track_lazy_loads(threshold: Optional[int] = None, mode: Optional[str] = None) -> Iterator[LazyLoadTracker]:
+    """Считать ленивые загрузки в блоке кода (скрипты, фоновые задачи)"""
+    install_nplusone_detection()
+    tracker = LazyLoadTracker(
+        settings.nplusone_threshold if threshold is None else threshold,
+        settings.nplusone_mode if mode is None else mode,
+    )
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+
+
+class NPlusOneMiddleware:
+    """ASGI-middleware: счётчик ленивых загрузок на HTTP-запрос"""
+
+    def __init__(self, app):
+        self.app = app
+        install_nplusone_detection()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with track_lazy_loads() as tracker:
+            await self.app(scope, receive, send)
+        suspects = tracker.suspects()
+        if suspects:
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            loads = ", ".join(f"{name} x{count}" for name, count in suspects.items())
+            logger.warning(f"Possible N+1 in {scope['method']} {route}: {loads}")
@@ -1,3 +1,11 @@
 from .auth import router as auth_router
+from .clients import router as clients_router
+from .applications import router as applications_router
+from .imports import router as imports_router
+from .exports import router as exports_router
+from .reports import router as reports_router
+from .attachments import router as attachments_router
+from .jobs import router as jobs_router
 
-__all__ = ["auth_router"]
+__all__ = ["auth_router", "clients_router", "applications_router", "imports_router", "exports_router", "reports_router",
+           "attachments_router", "jobs_router"]
@@ -0,0 +1,224 @@
+"""
+API заявок
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session
+
+from ..auth import AuthenticatedUser, Permissions, has_permission, resolve_organization_scope
+from ..auth.permissions import get_current_user_with_permissions
+from ..database import get_session, run_db
+from ..models.business import OPEN_APPLICATION_STATUSES, ApplicationStatus
+from ..schemas.application import (
+    ApplicationInbox,
+    ApplicationInboxItem,
+    ApplicationStatusEventItem,
+    ApplicationStatusEventList,
+    StatusChangeRequest,
+    StatusTransitionRequest,
+    StatusTransitionResponse,
+)
+from ..services.application_status import (
+    MAX_TRANSITION_BATCH,
+    NOT_FOUND,
+    get_application_access,
+    list_status_events,
+    transition_applications,
+)
+from ..services.inbox import UNASSIGNED, etag_matches, get_inbox_version, inbox_etag, list_inbox
+from ..services.pagination import MAX_PAGE_SIZE
+
+router = APIRouter(tags=["applications"])
+
+# Ответ зависит от данных пользователя: кэшировать можно только в браузере
+# и только с обязательной ревалидацией по ETag
+INBOX_CACHE_CONTROL = "private, no-cache"
+
+
+def inbox_assignee(current_user: AuthenticatedUser, assigned_to: Optional[int] = None) -> Optional[int]:
+    """
+    Чьи входящие смотреть: по умолчанию свои; чужие и нераспределённые
+    (assigned_to=0) - только с VIEW_ALL_APPLICATIONS.
+    """
+    if assigned_to is None or assigned_to == current_user.id:
+        return current_user.id
+    if not has_permission(current_user, Permissions.VIEW_ALL_APPLICATIONS):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для просмотра чужих заявок"
+        )
+    return None if assigned_to == UNASSIGNED else assigned_to
+
+
+@router.get("/applications/inbox", response_model=ApplicationInbox)
+async def application_inbox(
+    request: Request,
+    response: Response,
+    status_filter: Optional[List[ApplicationStatus]] = Query(None, alias="status"),
+    assigned_to: Optional[int] = Query(None, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    organization_id: Optional[int] = None,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """
+    Входящие заявки ответственного в порядке даты вылета.
+
+    По умолчанию - незакрытые заявки текущего пользователя. Поддерживает
+    If-None-Match: при неизменной версии входящих возвращается 304 без
+    выборки заявок.
+    """
+    scope = resolve_organization_scope(current_user, organization_id)
+    if scope is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указана организация"
+        )
+    assignee = inbox_assignee(current_user, assigned_to)
+    statuses = sorted(set(status_filter or OPEN_APPLICATION_STATUSES), key=lambda item: item.name)
+
+    # Версия читается до списка: изменение между запросами даст лишний 200, но не устаревший 304
+    version = await run_db(db, get_inbox_version, scope, assignee)
+    etag = inbox_etag(scope, assignee, version, statuses, limit)
+    headers = {"ETag": etag, "Cache-Control": INBOX_CACHE_CONTROL}
+    if etag_matches(request.headers.get("If-None-Match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    rows = await run_db(db, list_inbox, scope, assignee, statuses, limit)
+    response.headers.update(headers)
+    return ApplicationInbox(
+        items=[ApplicationInboxItem.model_validate(row) for row in rows],
+        assigned_to=assignee,
+        statuses=statuses,
+        limit=limit,
+    )
+
+
+def _transition_owner(current_user: AuthenticatedUser) -> Optional[int]:
+    """Менять статус можно с EDIT_APPLICATION; без VIEW_ALL_APPLICATIONS - только своих заявок"""
+    if not has_permission(current_user, Permissions.EDIT_APPLICATION):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для изменения заявок"
+        )
+    return None if has_permission(current_user, Permissions.VIEW_ALL_APPLICATIONS) else current_user.id
+
+
+def _events_page(rows, limit: int) -> ApplicationStatusEventList:
+    return ApplicationStatusEventList(
+        items=[ApplicationStatusEventItem.model_validate(row) for row in rows],
+        next_after_id=rows[-1].id if len(rows) == limit else None,
+    )
+
+
+@router.post("/applications/status-transitions", response_model=StatusTransitionResponse)
+async def bulk_status_transition(
+    payload: StatusTransitionRequest,
+    organization_id: Optional[int] = None,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """
+    Массовая смена статусов: группы заявок с целевым статусом.
+
+    На каждый целевой статус выполняется один UPDATE. Недопустимые переходы
+    и ненайденные заявки не прерывают остальные и возвращаются в rejected.
+    """
+    owner_id = _transition_owner(current_user)
+    scope = resolve_organization_scope(current_user, organization_id)
+    if scope is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указана организация"
+        )
+    changes = [
+        (application_id, group.status)
+        for group in payload.transitions
+        for application_id in group.application_ids
+    ]
+    if len(changes) > MAX_TRANSITION_BATCH:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Не больше {MAX_TRANSITION_BATCH} заявок за один запрос"
+        )
+    result = await run_db(
+        db, transition_applications, scope, changes,
+        changed_by=current_user.id, comment=payload.comment, owner_id=owner_id,
+    )
+    return StatusTransitionResponse.model_validate(result)
+
+
+@router.get("/applications/status-events", response_model=ApplicationStatusEventList)
+async def organization_status_events(
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    organization_id: Optional[int] = None,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """Журнал смены статусов организации в порядке id; следующая страница - after_id=next_after_id"""
+    if not (has_permission(current_user, Permissions.VIEW_ALL_APPLICATIONS)
+            or has_permission(current_user, Permissions.VIEW_LOGS)):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для просмотра журнала"
+        )
+    scope = resolve_organization_scope(current_user, organization_id)
+    if scope is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указана организация"
+        )
+    rows = await run_db(db, list_status_events, scope, after_id=after_id, limit=limit)
+    return _events_page(rows, limit)
+
+
+async def _accessible_application(db: Session, current_user: AuthenticatedUser, application_id: int):
+    application = await run_db(db, get_application_access, application_id)
+    if application is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=NOT_FOUND)
+    resolve_organization_scope(current_user, application.organization_id)
+    own = current_user.id in (application.created_by, application.assigned_to)
+    if not own and not has_permission(current_user, Permissions.VIEW_ALL_APPLICATIONS):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=NOT_FOUND)
+    return application
+
+
+@router.post("/applications/{application_id}/status", response_model=StatusTransitionResponse)
+async def change_application_status(
+    application_id: int,
+    payload: StatusChangeRequest,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """Сменить статус одной заявки; недопустимый переход - 409"""
+    owner_id = _transition_owner(current_user)
+    application = await _accessible_application(db, current_user, application_id)
+    result = await run_db(
+        db, transition_applications, application.organization_id, [(application_id, payload.status)],
+        changed_by=current_user.id, comment=payload.comment, owner_id=owner_id,
+    )
+    if result.rejected:
+        rejected = result.rejected[0]
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND if rejected.reason == NOT_FOUND else status.HTTP_409_CONFLICT,
+            detail=rejected.reason
+        )
+    return StatusTransitionResponse.model_validate(result)
+
+
+@router.get("/applications/{application_id}/status-events", response_model=ApplicationStatusEventList)
+async def application_status_events(
+    application_id: int,
+    after_id: Optional[int] = Query(None, ge=0),
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """История статусов заявки"""
+    application = await _accessible_application(db, current_user, application_id)
+    rows = await run_db(
+        db, list_status_events, application.organization_id,
+        application_id=application_id, after_id=after_id, limit=limit,
+    )
+    return _events_page(rows, limit)
@@ -0,0 +1,244 @@
+"""
+API вложений клиентов и заявок
+
+Файл передаётся телом запроса как есть (Content-Type - тип файла, имя - в
+параметре filename) и по частям уходит в хранилище, не накапливаясь в
+памяти. Скачивание - редирект на presigned-ссылку хранилища.
+"""
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import RedirectResponse
+from sqlalchemy.orm import Session
+
+from ..auth import AuthenticatedUser, Permissions, has_permission, resolve_organization_scope
+from ..auth.permissions import get_current_user_with_permissions
+from ..database import get_session, run_db
+from ..jobs import HIGH_PRIORITY, enqueue
+from ..models.attachments import AttachmentCategory, ThumbnailStatus
+from ..schemas.attachment import AttachmentDownload, AttachmentList, AttachmentResponse
+from ..services.attachments import (
+    AttachmentTooLarge,
+    EmptyUpload,
+    attach_file,
+    delete_attachment,
+    get_application,
+    get_attachment,
+    get_client,
+    list_attachments,
+    normalize_content_type,
+    receive_upload,
+)
+from ..settings import settings
+from ..storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(tags=["attachments"])
+
+CLIENT = "client"
+APPLICATION = "application"
+
+
+def _owner_access(current_user: AuthenticatedUser, kind: str, owner, edit: bool = False) -> None:
+    """
+    Доступ к вложениям клиента или заявки: своя организация и право видеть
+    все записи либо своя запись (для заявки - созданная или назначенная).
+    """
+    if owner is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Не найдено")
+    resolve_organization_scope(current_user, owner.organization_id)
+    if kind == CLIENT:
+        view_all, edit_permission = Permissions.VIEW_ALL_CLIENTS, Permissions.EDIT_CLIENT
+        own = owner.created_by == current_user.id
+    else:
+        view_all, edit_permission = Permissions.VIEW_ALL_APPLICATIONS, Permissions.EDIT_APPLICATION
+        own = current_user.id in (owner.created_by, owner.assigned_to)
+    if not own and not has_permission(current_user, view_all):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Не найдено")
+    if edit and not has_permission(current_user, edit_permission):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Недостаточно прав для изменения вложений"
+        )
+
+
+async def _load_owner(db: Session, kind: str, owner_id: int):
+    return await run_db(db, get_client if kind == CLIENT else get_application, owner_id)
+
+
+def _response(row) -> AttachmentResponse:
+    thumbnail_url = None
+    if row.thumbnail_status == ThumbnailStatus.READY and row.thumbnail_key:
+        # Подпись считается локально, без обращения к хранилищу
+        thumbnail_url = get_storage().presigned_url(
+            row.thumbnail_key, settings.attachment_url_ttl_seconds, content_type="image/jpeg"
+        )
+    return AttachmentResponse(
+        id=row.id,
+        client_id=row.client_id,
+        application_id=row.application_id,
+        filename=row.filename,
+        category=row.category,
+        content_type=row.content_type,
+        size=row.size,
+        sha256=row.sha256,
+        uploaded_by=row.uploaded_by,
+        created_at=row.created_at,
+        thumbnail_status=row.thumbnail_status,
+        thumbnail_url=thumbnail_url,
+    )
+
+
+async def _upload(
+    request: Request,
+    db: Session,
+    current_user: AuthenticatedUser,
+    kind: str,
+    owner_id: int,
+    filename: str,
+    category: AttachmentCategory,
+) -> AttachmentResponse:
+    owner = await _load_owner(db, kind, owner_id)
+    _owner_access(current_user, kind, owner, edit=True)
+
+    declared = request.headers.get("content-length")
+    if declared and declared.isdigit() and int(declared) > settings.attachment_max_bytes:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Файл больше {settings.attachment_max_bytes} байт"
+        )
+    content_type = normalize_content_type(request.headers.get("content-type"), filename)
+    try:
+        uploaded = await receive_upload(request.stream(), content_type)
+    except AttachmentTooLarge as e:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=str(e))
+    except EmptyUpload as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    try:
+        attachment_id, duplicate_key = await run_db(
+            db, attach_file, uploaded, owner.organization_id, filename, category, current_user.id,
+            client_id=owner_id if kind == CLIENT else None,
+            application_id=owner_id if kind == APPLICATION else None,
+        )
+    except Exception:
+        # Объект ещё ни на что не ссылается
+        await run_in_threadpool(get_storage().delete, [uploaded.object_key])
+        raise
+    if duplicate_key is None and uploaded.content_type.startswith("image/"):
+        try:
+            await run_in_threadpool(
+                enqueue, "attachments.thumbnails", priority=HIGH_PRIORITY,
+                idempotency_key=f"thumbnail:{uploaded.sha256}",
+            )
+        except Exception as e:
+            # Миниатюру построит периодический проход run_attachment_worker
+            logger.warning(f"Failed to enqueue thumbnail for {uploaded.sha256}: {e}")
+    if duplicate_key:
+        try:
+            await run_in_threadpool(get_storage().delete, [duplicate_key])
+        except Exception as e:
+            # Лишняя копия не мешает работе; её ключа нет в БД, и она останется в бакете
+            logger.warning(f"Failed to delete duplicate upload {duplicate_key}: {e}")
+    row = await run_db(db, get_attachment, attachment_id)
+    return _response(row)
+
+
+@router.post("/clients/{client_id}/attachments", response_model=AttachmentResponse,
+             status_code=status.HTTP_201_CREATED)
+async def upload_client_attachment(
+    client_id: int,
+    request: Request,
+    filename: str = Query(..., min_length=1, max_length=255),
+    category: AttachmentCategory = AttachmentCategory.OTHER,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """
+    Прикрепить файл к клиенту (скан паспорта, виза и т.п.).
+
+    Тело запроса - содержимое файла. Одинаковые файлы хранятся один раз.
+    """
+    return await _upload(request, db, current_user, CLIENT, client_id, filename, category)
+
+
+@router.post("/applications/{application_id}/attachments", response_model=AttachmentResponse,
+             status_code=status.HTTP_201_CREATED)
+async def upload_application_attachment(
+    application_id: int,
+    request: Request,
+    filename: str = Query(..., min_length=1, max_length=255),
+    category: AttachmentCategory = AttachmentCategory.OTHER,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """Прикрепить файл к заявке (ваучер, билет, договор). Тело запроса - содержимое файла"""
+    return await _upload(request, db, current_user, APPLICATION, application_id, filename, category)
+
+
+@router.get("/clients/{client_id}/attachments", response_model=AttachmentList)
+async def list_client_attachments(
+    client_id: int,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """Вложения клиента"""
+    client = await _load_owner(db, CLIENT, client_id)
+    _owner_access(current_user, CLIENT, client)
+    rows = await run_db(db, list_attachments, client.organization_id, client_id=client_id)
+    return AttachmentList(items=[_response(row) for row in rows])
+
+
+@router.get("/applications/{application_id}/attachments", response_model=AttachmentList)
+async def list_application_attachments(
+    application_id: int,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """Вложения заявки"""
+    application = await _load_owner(db, APPLICATION, application_id)
+    _owner_access(current_user, APPLICATION, application)
+    rows = await run_db(db, list_attachments, application.organization_id, application_id=application_id)
+    return AttachmentList(items=[_response(row) for row in rows])
+
+
+async def _accessible_attachment(db: Session, current_user: AuthenticatedUser, attachment_id: int,
+                                 edit: bool = False):
+    row = await run_db(db, get_attachment, attachment_id)
+    if row is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Не найдено")
+    kind, owner_id = (CLIENT, row.client_id) if row.client_id is not None else (APPLICATION, row.application_id)
+    _owner_access(current_user, kind, await _load_owner(db, kind, owner_id), edit=edit)
+    return row
+
+
+@router.get("/attachments/{attachment_id}/download")
+async def download_attachment(
+    attachment_id: int,
+    redirect: bool = True,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """
+    Скачать вложение: редирект на presigned-ссылку хранилища
+    (redirect=false - ссылка в JSON). Файл отдаёт само хранилище.
+    """
+    row = await _accessible_attachment(db, current_user, attachment_id)
+    ttl = settings.attachment_url_ttl_seconds
+    url = get_storage().presigned_url(row.object_key, ttl, filename=row.filename, content_type=row.content_type)
+    if not redirect:
+        return AttachmentDownload(url=url, expires_in=ttl)
+    return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+                            headers={"Cache-Control": "private, no-store"})
+
+
+@router.delete("/attachments/{attachment_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_attachment_api(
+    attachment_id: int,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """Удалить вложение; файл удаляется из хранилища, когда на него не остаётся ссылок"""
+    await _accessible_attachment(db, current_user, attachment_id, edit=True)
+    await run_db(db, delete_attachment, attachment_id)
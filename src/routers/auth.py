@@ -1,16 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from pydantic import BaseModel
-from ..database import get_db
+from typing import Optional, Union
+from ..database import get_db, get_session
 from ..models.user import User, UserRole
 from ..schemas.user import UserCreate, UserResponse, Token, PublicUserCreate
-from ..auth import verify_password, get_password_hash, create_access_token, create_refresh_token, verify_token
+from ..auth import (
+    verify_password,
+    verify_password_async,
+    get_password_hash,
+    create_access_token,
+    create_refresh_token,
+    verify_token,
+    AuthenticatedUser,
+    revoke_token
+)
+from ..auth.identity import resolve_identity_async, select_user_by_email
 from ..auth.permissions import (
     get_current_user_with_permissions,
     require_permission,
     Permissions,
     can_create_user_with_role,
+    organization_for_new_user,
     PermissionDenied
 )
 
@@ -19,15 +34,16 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
 def get_user_by_email(db: Session, email: str):
-    return db.query(User).filter(User.email == email).first()
+    return db.execute(select_user_by_email(email)).scalars().first()
 
 
-def create_user(db: Session, user: UserCreate):
+def create_user(db: Session, user: UserCreate, organization_id: Optional[int] = None):
     hashed_password = get_password_hash(user.password)
     db_user = User(
         email=user.email,
         password_hash=hashed_password,
-        role=user.role
+        role=user.role,
+        organization_id=organization_id
     )
     db.add(db_user)
     db.commit()
@@ -57,16 +73,46 @@ def authenticate_user(db: Session, email: str, password: str):
     return user
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    payload = verify_token(token)
-    email: str = payload.get("sub")
-    if email is None:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Could not validate credentials",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    user = get_user_by_email(db, email=email)
+async def get_user_by_email_async(db: Union[Session, AsyncSession], email: str):
+    """get_user_by_email для сессии из get_session: AsyncSession или Session в threadpool"""
+    if isinstance(db, AsyncSession):
+        result = await db.execute(select_user_by_email(email))
+        return result.scalars().first()
+    return await run_in_threadpool(get_user_by_email, db, email)
+
+
+async def authenticate_user_async(db: Union[Session, AsyncSession], email: str, password: str):
+    """Аутентификация без блокировки event loop: запрос асинхронно, argon2 в пуле хеширования"""
+    user = await get_user_by_email_async(db, email)
+    if not user:
+        return False
+    if not await verify_password_async(password, user.password_hash):
+        return False
+    return user
+
+
+async def add_user_async(db: Union[Session, AsyncSession], db_user: User) -> User:
+    """Сохранить нового пользователя через сессию из get_session"""
+    if isinstance(db, AsyncSession):
+        db.add(db_user)
+        await db.commit()
+        await db.refresh(db_user)
+        return db_user
+
+    def _save():
+        db.add(db_user)
+        db.commit()
+        db.refresh(db_user)
+        return db_user
+    return await run_in_threadpool(_save)
+
+
+async def get_current_user(
+    request: Request,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_session)
+):
+    user = await resolve_identity_async(request, db, token)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -93,7 +139,7 @@ def public_register(user: PublicUserCreate, db: Session = Depends(get_db)):
 def register(
     user: UserCreate, 
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user_with_permissions)
+    current_user: AuthenticatedUser = Depends(require_permission(Permissions.CREATE_USER))
 ):
     """Регистрация нового пользователя - только для авторизованных с правами"""
     
@@ -109,13 +155,12 @@ def register(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
-    return create_user(db=db, user=user)
+    return create_user(db=db, user=user, organization_id=organization_for_new_user(current_user))
 
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    # Простой асинхронный обработчик: верификация синхронная, но занимает миллисекунды на argon2
-    user = authenticate_user(db, form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_session)):
+    user = await authenticate_user_async(db, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -128,7 +173,7 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
 
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user_with_permissions)):
+def read_users_me(current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)):
     return current_user
 
 
@@ -137,7 +182,7 @@ class RefreshTokenRequest(BaseModel):
 
 @router.post("/refresh", response_model=Token)
 def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
-    payload = verify_token(request.refresh_token)
+    payload = verify_token(request.refresh_token, token_type="refresh")
     email: str = payload.get("sub")
     if email is None:
         raise HTTPException(
@@ -150,6 +195,26 @@ def refresh_token(request: RefreshTokenRequest, db: Session = Depends(get_db)):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials"
         )
+    # Ротация: использованный refresh-токен больше не действителен
+    revoke_token(db, payload, reason="rotated")
     access_token = create_access_token(data={"sub": user.email})
     new_refresh_token = create_refresh_token(data={"sub": user.email})
     return {"access_token": access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+def logout(
+    body: Optional[LogoutRequest] = None,
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db)
+):
+    """Отзыв текущего access-токена и, если передан, refresh-токена"""
+    revoke_token(db, verify_token(token), reason="logout")
+    if body and body.refresh_token:
+        try:
+            revoke_token(db, verify_token(body.refresh_token, token_type="refresh"), reason="logout")
+        except HTTPException:
+            pass
@@ -0,0 +1,73 @@
+"""
+API клиентов
+"""
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from ..auth import AuthenticatedUser, Permissions, has_permission, resolve_organization_scope
+from ..auth.permissions import get_current_user_with_permissions
+from ..database import get_session, run_db
+from ..models.business import ClientStatus
+from ..schemas.client import ClientPage, ClientResponse, ClientSearchResult
+from ..services.client_search import MAX_RESULTS, search_clients
+from ..services.clients import list_clients
+from ..services.pagination import MAX_PAGE_SIZE
+
+router = APIRouter(tags=["clients"])
+
+
+def client_list_scope(current_user: AuthenticatedUser, organization_id: Optional[int] = None):
+    """Организация и, для ролей без VIEW_ALL_CLIENTS, автор клиентов"""
+    scope = resolve_organization_scope(current_user, organization_id)
+    created_by = None if has_permission(current_user, Permissions.VIEW_ALL_CLIENTS) else current_user.id
+    return scope, created_by
+
+
+@router.get("/clients", response_model=ClientPage)
+async def list_clients_api(
+    status_filter: Optional[ClientStatus] = Query(None, alias="status"),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    organization_id: Optional[int] = None,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """Список клиентов с keyset-пагинацией по (last_name, id)"""
+    scope, created_by = client_list_scope(current_user, organization_id)
+    if scope is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указана организация"
+        )
+    rows, next_cursor = await run_db(db, list_clients, scope, status_filter, created_by, cursor, limit)
+    return ClientPage(
+        items=[ClientResponse.model_validate(row) for row in rows],
+        next_cursor=next_cursor,
+        limit=limit,
+    )
+
+
+@router.get("/clients/search", response_model=List[ClientSearchResult])
+async def search_clients_api(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=MAX_RESULTS),
+    organization_id: Optional[int] = None,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """
+    Поиск клиентов для подсказок при вводе: ФИО (в кириллице или латинице),
+    телефон, номер паспорта или email. Результаты упорядочены по релевантности.
+    """
+    scope, created_by = client_list_scope(current_user, organization_id)
+    if scope is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указана организация"
+        )
+    results = await run_db(db, search_clients, scope, q, created_by, limit)
+    return [
+        ClientSearchResult(**ClientResponse.model_validate(client).model_dump(), score=round(score, 3))
+        for client, score in results
+    ]
@@ -0,0 +1,100 @@
+"""
+API выгрузки клиентов и заявок
+"""
+from datetime import date, datetime
+from typing import Annotated, Iterator, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from pydantic import BeforeValidator
+
+from ..auth import AuthenticatedUser, Permissions, has_permission, require_permission, resolve_organization_scope
+from ..database import SessionLocal
+from ..models.business import ApplicationStatus
+from ..services.exports import CSV, FORMATS, MEDIA_TYPES, ExportFilter, export_stream
+
+router = APIRouter(tags=["exports"])
+
+
+def _blank_to_none(value):
+    return None if value == "" else value
+
+
+# Форма выгрузки отправляет незаполненную дату как created_from= - без ограничения
+FormDatetime = Annotated[Optional[datetime], BeforeValidator(_blank_to_none)]
+
+
+def _export_response(kind: str, filters: ExportFilter, fmt: str, compress: bool) -> StreamingResponse:
+    def body() -> Iterator[bytes]:
+        # Сессия живёт, пока читается курсор: своя, а не сессия запроса
+        db = SessionLocal()
+        try:
+            yield from export_stream(db, kind, filters, fmt, compress)
+        finally:
+            db.close()
+
+    filename = f"{kind}-{filters.organization_id}-{date.today().isoformat()}.{fmt}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}{".gz" if compress else ""}"'}
+    media_type = "application/gzip" if compress else MEDIA_TYPES[fmt]
+    return StreamingResponse(body(), media_type=media_type, headers=headers)
+
+
+def _export_filter(
+    current_user: AuthenticatedUser,
+    organization_id: Optional[int],
+    created_from: Optional[datetime],
+    created_to: Optional[datetime],
+    statuses: Optional[List[ApplicationStatus]] = None,
+    own_only_without: Optional[str] = None,
+) -> ExportFilter:
+    scope = resolve_organization_scope(current_user, organization_id)
+    if scope is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указана организация"
+        )
+    created_by = None
+    if own_only_without and not has_permission(current_user, own_only_without):
+        created_by = current_user.id
+    return ExportFilter(
+        organization_id=scope,
+        statuses=statuses or (),
+        created_from=created_from,
+        created_to=created_to,
+        created_by=created_by,
+    )
+
+
+@router.get("/exports/applications")
+def export_applications(
+    format: str = Query(CSV, pattern=f"^({'|'.join(FORMATS)})$"),
+    gzip: bool = False,
+    status_filter: Optional[List[ApplicationStatus]] = Query(None, alias="status"),
+    created_from: FormDatetime = None,
+    created_to: FormDatetime = None,
+    organization_id: Optional[int] = None,
+    current_user: AuthenticatedUser = Depends(require_permission(Permissions.GENERATE_REPORTS))
+):
+    """
+    Выгрузка заявок организации с final_cost, валютой и ФИО клиента.
+
+    Строки передаются по мере чтения из БД (CSV или JSONL, gzip=true - сжатие).
+    """
+    filters = _export_filter(current_user, organization_id, created_from, created_to, status_filter)
+    return _export_response("applications", filters, format, gzip)
+
+
+@router.get("/exports/clients")
+def export_clients(
+    format: str = Query(CSV, pattern=f"^({'|'.join(FORMATS)})$"),
+    gzip: bool = False,
+    created_from: FormDatetime = None,
+    created_to: FormDatetime = None,
+    organization_id: Optional[int] = None,
+    current_user: AuthenticatedUser = Depends(require_permission(Permissions.GENERATE_REPORTS))
+):
+    """Выгрузка клиентов организации; без VIEW_ALL_CLIENTS - только созданные пользователем"""
+    filters = _export_filter(
+        current_user, organization_id, created_from, created_to,
+        own_only_without=Permissions.VIEW_ALL_CLIENTS,
+    )
+    return _export_response("clients", filters, format, gzip)
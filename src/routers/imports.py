@@ -0,0 +1,121 @@
+"""
+API импорта клиентов и заявок из CSV/XLSX
+"""
+import mimetypes
+import os
+import tempfile
+import uuid
+from typing import Optional
+from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+
+from ..auth import AuthenticatedUser, Permissions, require_permission, resolve_organization_scope
+from ..jobs import enqueue
+from ..schemas.jobs import JobInfo
+from ..services.imports import (
+    APPLICATIONS, CLIENTS, IMPORT_JOB, MAX_BATCH_SIZE, ImportFormatError, check_header,
+)
+from ..storage import get_storage
+
+router = APIRouter(tags=["imports"])
+
+_UPLOAD_CHUNK = 1024 * 1024
+
+
+async def _spool_upload(upload: UploadFile) -> str:
+    """Сохранить загрузку во временный файл по частям, не держа её в памяти"""
+    suffix = os.path.splitext(upload.filename or "")[1] or ".csv"
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=suffix)
+    with os.fdopen(fd, "wb") as target:
+        while True:
+            chunk = await upload.read(_UPLOAD_CHUNK)
+            if not chunk:
+                break
+            await run_in_threadpool(target.write, chunk)
+    return path
+
+
+def _enqueue_import(
+    kind: str, path: str, filename: str, organization_id: int, created_by: int,
+    batch_size: Optional[int], encoding: str,
+) -> JobInfo:
+    """Проверить заголовок, отправить файл в хранилище и поставить импорт в очередь"""
+    with open(path, "rb") as stream:
+        check_header(stream, filename, kind, encoding)
+    suffix = os.path.splitext(filename)[1].lower() or ".csv"
+    object_key = f"imports/{uuid.uuid4().hex}{suffix}"
+    get_storage().upload_file(
+        path, object_key, mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    )
+    return enqueue(
+        IMPORT_JOB,
+        {
+            "kind": kind,
+            "object_key": object_key,
+            "filename": filename or f"import{suffix}",
+            "organization_id": organization_id,
+            "created_by": created_by,
+            "batch_size": batch_size,
+            "encoding": encoding,
+        },
+        # Повтор импорта заявок без номеров создал бы их заново
+        max_attempts=1,
+        created_by=created_by,
+    )
+
+
+async def _start_import(
+    kind: str,
+    upload: UploadFile,
+    current_user: AuthenticatedUser,
+    organization_id: Optional[int],
+    batch_size: Optional[int],
+    encoding: str,
+) -> JSONResponse:
+    scope = resolve_organization_scope(current_user, organization_id)
+    if scope is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указана организация"
+        )
+    path = await _spool_upload(upload)
+    try:
+        job = await run_in_threadpool(
+            _enqueue_import, kind, path, upload.filename or "", scope, current_user.id, batch_size, encoding
+        )
+    except ImportFormatError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    finally:
+        os.unlink(path)
+    return JSONResponse(job.model_dump(mode="json"), status_code=status.HTTP_202_ACCEPTED)
+
+
+@router.post("/imports/clients", response_model=JobInfo, status_code=status.HTTP_202_ACCEPTED)
+async def import_clients(
+    file: UploadFile = File(...),
+    organization_id: Optional[int] = None,
+    batch_size: Optional[int] = Query(None, ge=1, le=MAX_BATCH_SIZE),
+    encoding: str = Query("utf-8-sig", pattern=r"^(utf-8-sig|utf-8|cp1251)$"),
+    current_user: AuthenticatedUser = Depends(require_permission(Permissions.CREATE_CLIENT))
+):
+    """
+    Импорт клиентов из CSV/XLSX.
+
+    Файл с нераспознанным заголовком отклоняется сразу (400), иначе импорт
+    ставится в очередь задач (202); итоговый отчёт с ошибками строк -
+    result задачи в GET /api/jobs/{id}. Дубликаты по email/паспорту пропускаются.
+    """
+    return await _start_import(CLIENTS, file, current_user, organization_id, batch_size, encoding)
+
+
+@router.post("/imports/applications", response_model=JobInfo, status_code=status.HTTP_202_ACCEPTED)
+async def import_applications(
+    file: UploadFile = File(...),
+    organization_id: Optional[int] = None,
+    batch_size: Optional[int] = Query(None, ge=1, le=MAX_BATCH_SIZE),
+    encoding: str = Query("utf-8-sig", pattern=r"^(utf-8-sig|utf-8|cp1251)$"),
+    current_user: AuthenticatedUser = Depends(require_permission(Permissions.CREATE_APPLICATION))
+):
+    """Импорт заявок из CSV/XLSX в очереди задач; клиент указывается client_id, client_email или client_passport"""
+    return await _start_import(APPLICATIONS, file, current_user, organization_id, batch_size, encoding)
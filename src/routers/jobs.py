@@ -0,0 +1,28 @@
+"""
+API состояния отложенных задач
+"""
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
+
+from ..auth import AuthenticatedUser, Permissions, has_permission
+from ..auth.permissions import get_current_user_with_permissions
+from ..jobs import get_job_queue
+from ..schemas.jobs import JobInfo
+
+router = APIRouter(tags=["jobs"])
+
+
+@router.get("/jobs/{job_id}", response_model=JobInfo)
+async def job_status(
+    job_id: str,
+    current_user: AuthenticatedUser = Depends(get_current_user_with_permissions)
+):
+    """Состояние задачи очереди: свои задачи или любые с SYSTEM_SETTINGS"""
+    job = await run_in_threadpool(get_job_queue().get, job_id)
+    if job is None or (job.created_by != current_user.id
+                       and not has_permission(current_user, Permissions.SYSTEM_SETTINGS)):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача не найдена"
+        )
+    return job
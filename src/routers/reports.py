@@ -0,0 +1,97 @@
+"""
+API отчётов
+"""
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from ..auth import AuthenticatedUser, PermissionDenied, Permissions, require_permission, resolve_organization_scope
+from ..database import SessionLocal, get_session, run_db
+from ..jobs import enqueue
+from ..schemas.reports import ReportJob, RevenueReportRequest, RollupRefreshResult
+from ..services.reports import REVENUE, get_report_job, get_rollup_version, refresh_revenue_rollups, submit_report
+
+router = APIRouter(tags=["reports"])
+
+_financial_reports = require_permission(Permissions.GENERATE_REPORTS, Permissions.VIEW_FINANCIAL_DATA)
+
+
+@router.post("/reports/revenue", response_model=ReportJob, status_code=status.HTTP_202_ACCEPTED)
+async def revenue_report(
+    params: RevenueReportRequest,
+    response: Response,
+    organization_id: Optional[int] = None,
+    db: Session = Depends(get_session),
+    current_user: AuthenticatedUser = Depends(_financial_reports)
+):
+    """
+    Отчёт о выручке по месяцам, кварталам или годам с разрезами и сравнением с прошлым годом.
+
+    Отчёт строится задачей очереди по дневной сводке; готовый результат
+    с той же версией сводки возвращается сразу (200), иначе - задача (202),
+    состояние которой читается через GET /api/reports/jobs/{id} (или
+    GET /api/jobs/{id}) в любом процессе.
+    """
+    scope = resolve_organization_scope(current_user, organization_id)
+    if scope is None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Не указана организация"
+        )
+    version = await run_db(db, get_rollup_version)
+    job = await run_in_threadpool(submit_report, REVENUE, scope, params, version, current_user.id)
+    if job.status == "done":
+        response.status_code = status.HTTP_200_OK
+    return job
+
+
+@router.get("/reports/jobs/{job_id}", response_model=ReportJob)
+async def report_job(
+    job_id: str,
+    current_user: AuthenticatedUser = Depends(_financial_reports)
+):
+    """Состояние и результат фоновой задачи отчёта"""
+    job = await run_in_threadpool(get_report_job, job_id)
+    try:
+        visible = job is not None and resolve_organization_scope(current_user, job.organization_id) == job.organization_id
+    except PermissionDenied:
+        # Задача другой организации неотличима от несуществующей, как в /api/jobs
+        visible = False
+    if not visible:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Задача отчёта не найдена"
+        )
+    return job
+
+
+def _refresh() -> RollupRefreshResult:
+    db = SessionLocal()
+    try:
+        return refresh_revenue_rollups(db)
+    finally:
+        db.close()
+
+
+@router.post("/reports/rollups/refresh", response_model=RollupRefreshResult)
+async def refresh_rollups(
+    defer: bool = False,
+    idempotency_key: Optional[str] = Header(None, max_length=100),
+    current_user: AuthenticatedUser = Depends(require_permission(Permissions.SYSTEM_SETTINGS))
+):
+    """
+    Внеочередное обновление дневной сводки (обычно выполняется фоновой задачей).
+
+    defer=true - поставить обновление в очередь задач и сразу вернуть задачу
+    (202); состояние - GET /api/jobs/{id}. Повтор с тем же Idempotency-Key
+    возвращает ту же задачу.
+    """
+    if defer:
+        job = await run_in_threadpool(
+            enqueue, "reports.refresh_rollups", created_by=current_user.id,
+            idempotency_key=f"reports.refresh_rollups:{idempotency_key}" if idempotency_key else None,
+        )
+        return JSONResponse(job.model_dump(mode="json"), status_code=status.HTTP_202_ACCEPTED)
+    return await run_in_threadpool(_refresh)
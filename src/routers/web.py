@@ -5,49 +5,61 @@ Handles HTML page rendering and form processing
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Request, Form, HTTPException, Depends, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import Optional
 
-from ..database import get_db
+from ..database import get_db, get_session, run_db
 from ..models.user import User, UserRole
+from ..models.business import ApplicationStatus, ClientStatus
 from ..schemas.user import UserCreate
-from ..auth import get_password_hash, verify_password, create_access_token, create_refresh_token
+from ..settings import settings
+from ..templating import templates
+from ..auth import (
+    get_password_hash_async,
+    create_access_token,
+    create_refresh_token,
+    PasswordHashingOverloaded,
+    AuthenticatedUser,
+    Permissions,
+    has_permission,
+    resolve_organization_scope,
+    scope_session_to_user,
+    verify_token,
+    revoke_token
+)
+from ..auth.identity import extract_cookie_token, resolve_identity_async
 from ..auth.permissions import (
     get_current_user_with_permissions, 
     can_create_user_with_role, 
     get_allowed_roles_for_user,
+    organization_for_new_user,
     PermissionDenied
 )
+from ..services.client_search import search_clients
+from ..services.currency import convert_revenue_total
+from ..services.clients import list_clients
+from ..services.inbox import list_inbox
+from ..services.statistics import DashboardStats, format_revenue, get_cached_dashboard_stats
+from .clients import client_list_scope
+from .auth import authenticate_user_async, get_user_by_email_async, add_user_async
 import logging
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-templates = Jinja2Templates(directory="templates")
 
 
 # Dependency для получения текущего пользователя из cookies
-async def get_current_user_from_cookie(request: Request, db: Session = Depends(get_db)) -> Optional[User]:
+async def get_current_user_from_cookie(request: Request, db: Session = Depends(get_session)) -> Optional[AuthenticatedUser]:
     """Get current user from JWT token in cookie"""
-    token = request.cookies.get("access_token")
+    token = extract_cookie_token(request)
     if not token:
         return None
     
     try:
-        # Remove 'Bearer ' prefix if present
-        if token.startswith("Bearer "):
-            token = token[7:]
-        
-        # Verify JWT token properly
-        from ..auth import verify_token
-        payload = verify_token(token)
-        email: str = payload.get("sub")
-        
-        if email is None:
-            return None
-            
-        user = db.query(User).filter(User.email == email).first()
+        user = await resolve_identity_async(request, db, token)
+        if user is not None:
+            scope_session_to_user(db, user)
         return user
         
     except Exception as e:
@@ -56,18 +68,19 @@ async def get_current_user_from_cookie(request: Request, db: Session = Depends(g
 
 
 # Context processor для шаблонов
-def get_template_context(request: Request, user: Optional[User] = None, messages: list = None):
+def get_template_context(request: Request, user: Optional[AuthenticatedUser] = None, messages: list = None):
     """Get common template context"""
     return {
         "request": request,
         "current_user": user,
+        "locale": settings.ui_locale,
         "datetime": datetime,
         "messages": messages or [],
     }
 
 
 @router.get("/", response_class=HTMLResponse)
-async def home(request: Request, current_user: Optional[User] = Depends(get_current_user_from_cookie)):
+async def home(request: Request, current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie)):
     """Home page - redirect to dashboard if authenticated, otherwise to login"""
     if current_user:
         return RedirectResponse(url="/dashboard", status_code=302)
@@ -88,14 +101,14 @@ async def login_submit(
     response: Response,
     email: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_session)
 ):
     """Process login form"""
     try:
         # Authenticate user
-        user = db.query(User).filter(User.email == email).first()
+        user = await authenticate_user_async(db, email, password)
         
-        if not user or not verify_password(password, user.password_hash):
+        if not user:
             context = get_template_context(request)
             context.update({
                 "error": "Неверный email или пароль",
@@ -129,6 +142,8 @@ async def login_submit(
         logger.info(f"User {email} logged in successfully")
         return response
         
+    except PasswordHashingOverloaded:
+        raise
     except Exception as e:
         logger.error(f"Login error: {e}")
         context = get_template_context(request)
@@ -142,7 +157,7 @@ async def login_submit(
 @router.get("/register", response_class=HTMLResponse)
 async def register_page(
     request: Request, 
-    current_user: Optional[User] = Depends(get_current_user_from_cookie)
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie)
 ):
     """Display registration form - только для авторизованных пользователей с правами"""
     # Если пользователь не авторизован, перенаправляем на логин
@@ -169,8 +184,8 @@ async def register_submit(
     password: str = Form(...),
     password_confirm: str = Form(...),
     role: str = Form(default="OPERATOR"),
-    current_user: Optional[User] = Depends(get_current_user_from_cookie),
-    db: Session = Depends(get_db)
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie),
+    db: Session = Depends(get_session)
 ):
     """Process registration form - с проверкой прав"""
     errors = []
@@ -188,7 +203,7 @@ async def register_submit(
             errors.append("Пароль должен содержать минимум 6 символов")
             
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == email).first()
+        existing_user = await get_user_by_email_async(db, email)
         if existing_user:
             errors.append("Пользователь с таким email уже существует")
         
@@ -214,22 +229,22 @@ async def register_submit(
             return templates.TemplateResponse("register.html", context)
         
         # Create new user
-        hashed_password = get_password_hash(password)
+        hashed_password = await get_password_hash_async(password)
         new_user = User(
             email=email,
             password_hash=hashed_password,
-            role=user_role
+            role=user_role,
+            organization_id=organization_for_new_user(current_user)
         )
-        
-        db.add(new_user)
-        db.commit()
-        db.refresh(new_user)
+        await add_user_async(db, new_user)
         
         logger.info(f"User {current_user.email} created new user: {email} with role {role}")
         
         # Redirect to dashboard with success message
         return RedirectResponse(url="/dashboard?user_created=1", status_code=302)
         
+    except PasswordHashingOverloaded:
+        raise
     except Exception as e:
         logger.error(f"Registration error: {e}")
         errors.append("Ошибка сервера. Попробуйте позже.")
@@ -247,19 +262,34 @@ async def register_submit(
 @router.get("/dashboard", response_class=HTMLResponse)
 async def dashboard(
     request: Request, 
-    current_user: Optional[User] = Depends(get_current_user_from_cookie),
-    db: Session = Depends(get_db)
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie),
+    db: Session = Depends(get_session)
 ):
     """Dashboard page"""
     if not current_user:
         return RedirectResponse(url="/login", status_code=302)
     
-    # Get dashboard statistics
+    # Статистика из инкрементальных счётчиков; администратор без организации видит сводку
+    if current_user.organization_id is None and current_user.role != UserRole.ADMIN:
+        snapshot = DashboardStats()
+    else:
+        snapshot = await run_db(db, get_cached_dashboard_stats, current_user.organization_id)
+    
+    # Выручка в нескольких валютах - дополнительно итог в базовой валюте по текущему курсу
+    revenue_total = None
+    if len([amount for amount in snapshot.revenue_by_currency.values() if amount]) > 1:
+        total, missing = await run_db(db, convert_revenue_total, snapshot.revenue_by_currency)
+        if not missing:
+            revenue_total = format_revenue({settings.base_currency: total})
+    
     stats = {
-        "clients": 0,  # Will be populated from actual Client model later
-        "applications": 0,  # Will be populated from Application model later  
+        "clients": snapshot.clients,
+        "applications": snapshot.applications,
         "orders": 0,  # Will be populated from Order model later
-        "revenue": "0 ₽"  # Will be calculated from payments later
+        "revenue": format_revenue(snapshot.revenue_by_currency),
+        "revenue_total": revenue_total,
+        "applications_by_status": snapshot.applications_by_status,
+        "new_clients_by_day": snapshot.new_clients_by_day,
     }
     
     # Get recent activity (mock data for now)
@@ -283,8 +313,18 @@ async def dashboard(
 
 
 @router.get("/logout")
-async def logout(request: Request):
+def logout(request: Request, db: Session = Depends(get_db)):
     """Logout user"""
+    # Отзываем токены из cookies, чтобы их нельзя было переиспользовать
+    cookies = ((extract_cookie_token(request), "access"), (request.cookies.get("refresh_token"), "refresh"))
+    for token, token_type in cookies:
+        if not token:
+            continue
+        try:
+            revoke_token(db, verify_token(token, token_type=token_type), reason="logout")
+        except HTTPException:
+            pass
+    
     response = RedirectResponse(url="/login", status_code=302)
     response.delete_cookie("access_token")
     response.delete_cookie("refresh_token")
@@ -293,27 +333,68 @@ async def logout(request: Request):
 
 # Placeholder routes for future features
 @router.get("/clients", response_class=HTMLResponse)
-async def clients_page(request: Request, current_user: Optional[User] = Depends(get_current_user_from_cookie)):
+async def clients_page(
+    request: Request,
+    status: Optional[str] = None,
+    cursor: Optional[str] = None,
+    q: Optional[str] = None,
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie),
+    db: Session = Depends(get_session)
+):
     """Clients management page"""
     if not current_user:
         return RedirectResponse(url="/login", status_code=302)
     
-    # TODO: Implement clients list page in Stage 2
-    return HTMLResponse(content="<h1>Клиенты</h1><p>Раздел будет реализован на этапе 2</p><a href='/dashboard'>← Назад</a>")
+    try:
+        status_filter = ClientStatus(status) if status else None
+    except ValueError:
+        status_filter = None
+    
+    clients, next_cursor = [], None
+    scope, created_by = client_list_scope(current_user)
+    if scope is not None and q:
+        results = await run_db(db, search_clients, scope, q, created_by)
+        clients = [client for client, _ in results]
+    elif scope is not None:
+        clients, next_cursor = await run_db(db, list_clients, scope, status_filter, created_by, cursor)
+    
+    context = get_template_context(request, current_user)
+    context.update({
+        "clients": clients,
+        "next_cursor": next_cursor,
+        "q": q or "",
+        "status": status_filter.value if status_filter else "",
+        "statuses": list(ClientStatus),
+        "has_organization": scope is not None,
+    })
+    return templates.TemplateResponse("clients.html", context)
 
 
 @router.get("/applications", response_class=HTMLResponse) 
-async def applications_page(request: Request, current_user: Optional[User] = Depends(get_current_user_from_cookie)):
-    """Applications management page"""
+async def applications_page(
+    request: Request,
+    current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie),
+    db: Session = Depends(get_session)
+):
+    """Applications inbox page: open applications assigned to the current user"""
     if not current_user:
         return RedirectResponse(url="/login", status_code=302)
-        
-    # TODO: Implement applications list page in Stage 2
-    return HTMLResponse(content="<h1>Заявки</h1><p>Раздел будет реализован на этапе 2</p><a href='/dashboard'>← Назад</a>")
+    
+    applications = []
+    scope = resolve_organization_scope(current_user)
+    if scope is not None:
+        applications = await run_db(db, list_inbox, scope, current_user.id)
+    
+    context = get_template_context(request, current_user)
+    context.update({
+        "applications": applications,
+        "has_organization": scope is not None,
+    })
+    return templates.TemplateResponse("applications.html", context)
 
 
 @router.get("/orders", response_class=HTMLResponse)
-async def orders_page(request: Request, current_user: Optional[User] = Depends(get_current_user_from_cookie)):
+async def orders_page(request: Request, current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie)):
     """Orders management page"""
     if not current_user:
         return RedirectResponse(url="/login", status_code=302)
@@ -323,17 +404,22 @@ async def orders_page(request: Request, current_user: Optional[User] = Depends(g
 
 
 @router.get("/reports", response_class=HTMLResponse)
-async def reports_page(request: Request, current_user: Optional[User] = Depends(get_current_user_from_cookie)):
+async def reports_page(request: Request, current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie)):
     """Reports page"""
     if not current_user:
         return RedirectResponse(url="/login", status_code=302)
         
-    # TODO: Implement reports page in Stage 5
-    return HTMLResponse(content="<h1>Отчёты</h1><p>Раздел будет реализован на этапе 5</p><a href='/dashboard'>← Назад</a>")
+    context = get_template_context(request, current_user)
+    context.update({
+        "can_export": has_permission(current_user, Permissions.GENERATE_REPORTS),
+        "has_organization": resolve_organization_scope(current_user) is not None,
+        "application_statuses": list(ApplicationStatus),
+    })
+    return templates.TemplateResponse("reports.html", context)
 
 
 @router.get("/profile", response_class=HTMLResponse)
-async def profile_page(request: Request, current_user: Optional[User] = Depends(get_current_user_from_cookie)):
+async def profile_page(request: Request, current_user: Optional[AuthenticatedUser] = Depends(get_current_user_from_cookie)):
     """User profile page"""
     if not current_user:
         return RedirectResponse(url="/login", status_code=302)
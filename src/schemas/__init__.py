@@ -1,3 +1,10 @@
 from .user import UserCreate, UserResponse, Token, TokenData
+from .client import ClientResponse, ClientPage, ClientSearchResult
+from .application import ApplicationInboxItem, ApplicationInbox
+from .imports import ClientImportRow, ApplicationImportRow, ImportReport, ImportRowError
+from .reports import RevenueReportRequest, RevenueReportRow, RevenueReport, ReportJob, RollupRefreshResult
 
-__all__ = ["UserCreate", "UserResponse", "Token", "TokenData"]
+__all__ = ["UserCreate", "UserResponse", "Token", "TokenData", "ClientResponse", "ClientPage", "ClientSearchResult",
+           "ApplicationInboxItem", "ApplicationInbox",
+           "ClientImportRow", "ApplicationImportRow", "ImportReport", "ImportRowError",
+           "RevenueReportRequest", "RevenueReportRow", "RevenueReport", "ReportJob", "RollupRefreshResult"]
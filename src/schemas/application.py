@@ -0,0 +1,82 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict, Field
+from typing import List, Optional
+from ..models.business import ApplicationStatus, ApplicationType
+
+
+class ApplicationInboxItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    application_number: str
+    title: str
+    type: ApplicationType
+    status: ApplicationStatus
+    destination: Optional[str] = None
+    departure_date: Optional[datetime] = None
+    return_date: Optional[datetime] = None
+    client_id: int
+
+
+class ApplicationInbox(BaseModel):
+    items: List[ApplicationInboxItem]
+    assigned_to: Optional[int] = None
+    statuses: List[ApplicationStatus]
+    limit: int
+
+
+class StatusTransitionGroup(BaseModel):
+    status: ApplicationStatus
+    application_ids: List[int] = Field(..., min_length=1)
+
+
+class StatusTransitionRequest(BaseModel):
+    transitions: List[StatusTransitionGroup] = Field(..., min_length=1)
+    comment: Optional[str] = Field(None, max_length=1000)
+
+
+class StatusChangeRequest(BaseModel):
+    status: ApplicationStatus
+    comment: Optional[str] = Field(None, max_length=1000)
+
+
+class AppliedStatusTransition(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    application_id: int
+    from_status: ApplicationStatus
+    to_status: ApplicationStatus
+
+
+class RejectedStatusTransition(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    application_id: int
+    status: Optional[ApplicationStatus] = None
+    reason: str
+
+
+class StatusTransitionResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    batch_id: str
+    applied: List[AppliedStatusTransition]
+    rejected: List[RejectedStatusTransition]
+
+
+class ApplicationStatusEventItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    application_id: int
+    from_status: Optional[ApplicationStatus] = None
+    to_status: ApplicationStatus
+    changed_by: Optional[int] = None
+    batch_id: Optional[str] = None
+    comment: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class ApplicationStatusEventList(BaseModel):
+    items: List[ApplicationStatusEventItem]
+    next_after_id: Optional[int] = None
@@ -0,0 +1,31 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
+from ..models.attachments import AttachmentCategory
+
+
+class AttachmentResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    client_id: Optional[int] = None
+    application_id: Optional[int] = None
+    filename: str
+    category: AttachmentCategory
+    content_type: str
+    size: int
+    sha256: str
+    uploaded_by: int
+    created_at: Optional[datetime] = None
+    thumbnail_status: str
+    # Presigned-ссылка на миниатюру, пока она действительна
+    thumbnail_url: Optional[str] = None
+
+
+class AttachmentList(BaseModel):
+    items: List[AttachmentResponse]
+
+
+class AttachmentDownload(BaseModel):
+    url: str
+    expires_in: int
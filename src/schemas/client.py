@@ -0,0 +1,28 @@
+from datetime import datetime
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
+from ..models.business import ClientStatus
+
+
+class ClientResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    organization_id: int
+    first_name: str
+    last_name: str
+    middle_name: Optional[str] = None
+    email: Optional[str] = None
+    phone: Optional[str] = None
+    status: ClientStatus
+    created_at: Optional[datetime] = None
+
+
+class ClientSearchResult(ClientResponse):
+    score: float
+
+
+class ClientPage(BaseModel):
+    items: List[ClientResponse]
+    next_cursor: Optional[str] = None
+    limit: int
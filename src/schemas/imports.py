@@ -0,0 +1,152 @@
+from datetime import date, datetime
+from decimal import Decimal
+import re
+from email_validator import EmailNotValidError, validate_email
+from pydantic import AfterValidator, BaseModel, ConfigDict, Field, field_validator, model_validator
+from typing import Annotated, Any, ClassVar, Dict, List, Optional
+from ..models.business import ApplicationStatus, ApplicationType, ClientStatus
+
+_DATE_FORMATS = ("%d.%m.%Y", "%d.%m.%Y %H:%M", "%d/%m/%Y")
+_SIMPLE_EMAIL = re.compile(r"[A-Za-z0-9._%+\-]+@(?:[A-Za-z0-9](?:[A-Za-z0-9\-]*[A-Za-z0-9])?\.)+[A-Za-z]{2,}")
+
+
+def _check_email(value: str) -> str:
+    """
+    Проверка email: обычные ASCII-адреса - регулярным выражением, остальные
+    (IDN, кавычки) - email-validator, как EmailStr. Полная проверка доменов
+    через IDNA занимает большую часть времени импорта.
+    """
+    if _SIMPLE_EMAIL.fullmatch(value) and ".." not in value:
+        local, domain = value.rsplit("@", 1)
+        return f"{local}@{domain.lower()}"
+    try:
+        return validate_email(value, check_deliverability=False).normalized
+    except EmailNotValidError as e:
+        raise ValueError(f"некорректный email: {e}")
+
+
+ImportEmail = Annotated[str, AfterValidator(_check_email)]
+
+
+def _clean_cell(value: Any) -> Any:
+    """Пустые ячейки - None; числа из Excel в текстовых полях - строки"""
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _parse_date(value: Any) -> Any:
+    if isinstance(value, str):
+        for fmt in _DATE_FORMATS:
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                continue
+    if isinstance(value, date) and not isinstance(value, datetime):
+        return datetime(value.year, value.month, value.day)
+    return value
+
+
+def _parse_enum(enum_cls, value: Any) -> Any:
+    if isinstance(value, str):
+        for item in enum_cls:
+            if value.lower() in (item.value, item.name.lower()):
+                return item
+    return value
+
+
+class _ImportRow(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True, coerce_numbers_to_str=True)
+
+    # Поля, для которых ячейки разбираются как даты / значения перечислений
+    date_fields: ClassVar[tuple] = ()
+    enum_fields: ClassVar[Dict[str, type]] = {}
+
+    @model_validator(mode="before")
+    @classmethod
+    def _clean(cls, data: Any) -> Any:
+        if not isinstance(data, dict):
+            return data
+        data = {key: _clean_cell(value) for key, value in data.items()}
+        for name in cls.date_fields:
+            if data.get(name) is not None:
+                data[name] = _parse_date(data[name])
+        for name, enum_cls in cls.enum_fields.items():
+            if data.get(name) is not None:
+                data[name] = _parse_enum(enum_cls, data[name])
+        return {key: value for key, value in data.items() if value is not None}
+
+
+class ClientImportRow(_ImportRow):
+    """Строка импорта клиента"""
+    date_fields = ("date_of_birth", "passport_issued_date", "passport_expires_date")
+    enum_fields = {"status": ClientStatus}
+
+    first_name: str = Field(min_length=1, max_length=100)
+    last_name: str = Field(min_length=1, max_length=100)
+    middle_name: Optional[str] = Field(None, max_length=100)
+    email: Optional[ImportEmail] = None
+    phone: Optional[str] = Field(None, max_length=20)
+    date_of_birth: Optional[datetime] = None
+    passport_number: Optional[str] = Field(None, max_length=20)
+    passport_issued_date: Optional[datetime] = None
+    passport_expires_date: Optional[datetime] = None
+    status: ClientStatus = ClientStatus.ACTIVE
+    notes: Optional[str] = None
+
+
+class ApplicationImportRow(_ImportRow):
+    """
+    Строка импорта заявки; клиент указывается id, email или номером паспорта.
+    Без application_number номер выдаётся при импорте.
+    """
+    date_fields = ("departure_date", "return_date")
+    enum_fields = {"type": ApplicationType, "status": ApplicationStatus}
+
+    application_number: Optional[str] = Field(None, min_length=1, max_length=50)
+    title: str = Field(min_length=1, max_length=255)
+    type: ApplicationType
+    status: ApplicationStatus = ApplicationStatus.DRAFT
+    client_id: Optional[int] = None
+    client_email: Optional[ImportEmail] = None
+    client_passport: Optional[str] = Field(None, max_length=20)
+    description: Optional[str] = None
+    destination: Optional[str] = Field(None, max_length=255)
+    departure_date: Optional[datetime] = None
+    return_date: Optional[datetime] = None
+    adults_count: int = Field(1, ge=0)
+    children_count: int = Field(0, ge=0)
+    estimated_cost: Optional[Decimal] = Field(None, max_digits=10, decimal_places=2)
+    final_cost: Optional[Decimal] = Field(None, max_digits=10, decimal_places=2)
+    currency: str = Field("RUB", min_length=3, max_length=3)
+    special_requirements: Optional[str] = None
+
+    @field_validator("currency")
+    @classmethod
+    def _upper_currency(cls, value: str) -> str:
+        return value.upper()
+
+    @model_validator(mode="after")
+    def _client_reference(self) -> "ApplicationImportRow":
+        if self.client_id is None and self.client_email is None and self.client_passport is None:
+            raise ValueError("Не указан клиент: client_id, client_email или client_passport")
+        return self
+
+
+class ImportRowError(BaseModel):
+    line: int
+    errors: List[str]
+
+
+class ImportReport(BaseModel):
+    kind: str
+    rows: int = 0
+    inserted: int = 0
+    duplicates: int = 0
+    failed: int = 0
+    finished: bool = False
+    error: Optional[str] = None
+    errors: List[ImportRowError] = []
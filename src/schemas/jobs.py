@@ -0,0 +1,19 @@
+from datetime import datetime
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional
+
+
+class JobInfo(BaseModel):
+    id: str
+    kind: str
+    status: Literal["queued", "running", "succeeded", "dead"]
+    priority: int = 0
+    payload: Dict[str, Any] = Field(default_factory=dict)
+    attempts: int = 0
+    max_attempts: int
+    run_at: datetime
+    created_by: Optional[int] = None
+    created_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    result: Any = None
@@ -0,0 +1,80 @@
+from datetime import date, datetime
+from decimal import Decimal
+from pydantic import BaseModel, Field, model_validator
+from typing import Dict, List, Literal, Optional
+from ..models.business import ApplicationType
+
+ReportPeriod = Literal["month", "quarter", "year"]
+ReportDimension = Literal["type", "destination", "manager"]
+
+# Наибольший охват отчёта
+MAX_REPORT_YEARS = 10
+
+
+class RevenueReportRequest(BaseModel):
+    """Параметры отчёта о выручке; date_to не включается"""
+    period: ReportPeriod = "month"
+    date_from: date
+    date_to: date
+    group_by: List[ReportDimension] = Field(default_factory=list)
+    compare_previous_year: bool = True
+    # Пересчитать выручку в одну валюту по курсу дня заявки
+    convert_to: Optional[str] = Field(None, pattern=r"^[A-Z]{3}$")
+
+    @model_validator(mode="after")
+    def _check_range(self):
+        if self.date_to <= self.date_from:
+            raise ValueError("date_to должна быть позже date_from")
+        if (self.date_to - self.date_from).days > MAX_REPORT_YEARS * 366:
+            raise ValueError(f"Период отчёта не может превышать {MAX_REPORT_YEARS} лет")
+        # Порядок разрезов не влияет на результат - единый ключ кэша
+        self.group_by = sorted(set(self.group_by))
+        return self
+
+
+class RevenueReportRow(BaseModel):
+    period: str
+    period_start: date
+    type: Optional[ApplicationType] = None
+    destination: Optional[str] = None
+    manager_id: Optional[int] = None
+    currency: str
+    applications: int = 0
+    paid_applications: int = 0
+    revenue: Decimal = Decimal(0)
+    previous_revenue: Optional[Decimal] = None
+    change_percent: Optional[float] = None
+
+
+class RevenueReport(BaseModel):
+    organization_id: int
+    period: ReportPeriod
+    date_from: date
+    date_to: date
+    group_by: List[ReportDimension]
+    rows: List[RevenueReportRow]
+    totals: Dict[str, Decimal]
+    convert_to: Optional[str] = None
+    # Валюты без курса - их суммы оставлены в исходной валюте
+    missing_rates: List[str] = Field(default_factory=list)
+    rollup_version: int
+    generated_at: datetime
+
+
+class ReportJob(BaseModel):
+    id: str
+    kind: str
+    status: Literal["pending", "running", "done", "failed"]
+    organization_id: int
+    created_at: datetime
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[RevenueReport] = None
+
+
+class RollupRefreshResult(BaseModel):
+    days: int
+    full_rebuild: bool
+    version: int
+    watermark: Optional[datetime] = None
+    last_id: int = 0
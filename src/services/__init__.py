@@ -0,0 +1,7 @@
+"""
+Сервисный слой: бизнес-логика поверх моделей
+"""
+# Импорт регистрирует обработчики событий сессии, поддерживающие счётчики
+# статистики, версии входящих заявок, поисковые ключи клиентов, отметки
+# дней для пересчёта сводки выручки и журнал статусов заявок
+from . import application_status, client_search, inbox, reports, statistics  # noqa: F401
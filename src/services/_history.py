@@ -0,0 +1,30 @@
+"""
+История атрибутов ORM для обработчиков сессии
+
+Счётчики дашборда, версии входящих и сводки выручки при flush сравнивают
+прежние и новые значения атрибутов. Прежнее значение доступно в истории
+атрибута, только если оно было загружено до присваивания;
+track_previous_values включает active_history, чтобы оно подгружалось и
+для expired-атрибутов.
+"""
+from sqlalchemy import event
+
+
+def previous_value(state, attr: str):
+    """Значение атрибута до изменений в текущем flush (или текущее, если не менялось)"""
+    history = state.attrs[attr].history
+    if history.deleted:
+        return history.deleted[0]
+    if history.unchanged:
+        return history.unchanged[0]
+    return history.added[0] if history.added else None
+
+
+def _keep_previous_value(target, value, oldvalue, initiator):
+    return value
+
+
+def track_previous_values(*attributes) -> None:
+    """Загружать прежнее значение атрибутов при присваивании (active_history)"""
+    for attribute in attributes:
+        event.listen(attribute, "set", _keep_previous_value, active_history=True, retval=True)
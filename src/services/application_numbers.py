@@ -0,0 +1,168 @@
+"""
+Номера заявок: ORG-2026-000123
+
+Номер - код организации (Organization.code, без него - ORG<id>), год и
+порядковый номер в пределах организации и года. Счётчики хранятся в
+application_number_sequences, но номер не берётся из БД на каждую
+заявку: воркер одним атомарным UPDATE сдвигает счётчик на
+application_number_block_size и выдаёт зарезервированный блок из памяти.
+Проверять уникальность и повторять вставку при конфликте не нужно - блоки
+разных воркеров не пересекаются, а счётчик блокируется только на время
+резервирования.
+
+Номера, оставшиеся в блоке при остановке воркера, пропускаются: нумерация
+монотонна внутри воркера, но может иметь пропуски.
+
+Блок резервируется в отдельной транзакции на своём соединении, поэтому в
+SQLite номера нужно получать до записи в транзакции сессии, иначе
+резервирование будет ждать её же блокировку.
+
+Заявка, добавленная через ORM без application_number, получает номер при
+flush (before_flush). В SQLite номера для flush сдвигают счётчик на
+соединении сессии ровно на нужное число, без блока в памяти: при откате
+транзакции откатывается и счётчик.
+"""
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from ..database import engine as default_engine, insert_ignore
+from ..models.business import Application, Organization
+from ..models.numbering import ApplicationNumberSequence
+from ..settings import settings
+
+NUMBER_FORMAT = "{code}-{year}-{seq:06d}"
+
+
+def format_application_number(code: str, year: int, seq: int) -> str:
+    return NUMBER_FORMAT.format(code=code, year=year, seq=seq)
+
+
+@dataclass
+class _Block:
+    code: str
+    next: int
+    end: int  # не включается
+
+    @property
+    def remaining(self) -> int:
+        return self.end - self.next
+
+
+class ApplicationNumberAllocator:
+    """Выдача номеров заявок из блоков, зарезервированных в счётчике"""
+
+    def __init__(self, engine: Optional[Engine] = None, block_size: Optional[int] = None):
+        self.engine = engine or default_engine
+        self.block_size = max(1, block_size or settings.application_number_block_size)
+        self.reservations = 0
+        self._blocks: Dict[Tuple[int, int], _Block] = {}
+        self._locks: Dict[Tuple[int, int], threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def _lock(self, key: Tuple[int, int]) -> threading.Lock:
+        lock = self._locks.get(key)
+        if lock is None:
+            with self._guard:
+                lock = self._locks.setdefault(key, threading.Lock())
+        return lock
+
+    def _reserve(self, organization_id: int, year: int, size: int) -> _Block:
+        """Сдвинуть счётчик на size одним UPDATE в своей транзакции; возвращает полученный блок"""
+        with self.engine.begin() as connection:
+            return self._reserve_on(connection, organization_id, year, size)
+
+    def _reserve_on(self, connection: Connection, organization_id: int, year: int, size: int) -> _Block:
+        table = ApplicationNumberSequence.__table__
+        where = (table.c.organization_id == organization_id, table.c.year == year)
+        shift = update(table).where(*where).values(next_value=table.c.next_value + size)
+        end = self._shift(connection, shift, where)
+        if end is None:
+            # Первый блок организации за год
+            if insert_ignore(connection, table, [
+                {"organization_id": organization_id, "year": year, "next_value": 1 + size}
+            ]):
+                end = 1 + size
+            else:
+                end = self._shift(connection, shift, where)
+        code = connection.execute(
+            select(Organization.code).where(Organization.id == organization_id)
+        ).scalar_one_or_none()
+        self.reservations += 1
+        return _Block(code=code or f"ORG{organization_id}", next=end - size, end=end)
+
+    @staticmethod
+    def _shift(connection: Connection, shift, where) -> Optional[int]:
+        table = ApplicationNumberSequence.__table__
+        if connection.dialect.update_returning:
+            return connection.execute(shift.returning(table.c.next_value)).scalar_one_or_none()
+        # Без RETURNING: строка остаётся заблокированной UPDATE до конца транзакции
+        if connection.execute(shift).rowcount == 0:
+            return None
+        return connection.execute(select(table.c.next_value).where(*where)).scalar_one()
+
+    def allocate(self, organization_id: int, count: int, year: Optional[int] = None) -> List[str]:
+        """count номеров организации подряд (в пределах блоков этого процесса)"""
+        if count <= 0:
+            return []
+        year = year or datetime.now(timezone.utc).year
+        key = (organization_id, year)
+        numbers: List[str] = []
+        with self._lock(key):
+            block = self._blocks.get(key)
+            while len(numbers) < count:
+                if block is None or block.remaining == 0:
+                    # Большой запрос (импорт) получает блок сразу нужного размера
+                    block = self._reserve(organization_id, year, max(self.block_size, count - len(numbers)))
+                    self._blocks[key] = block
+                take = min(block.remaining, count - len(numbers))
+                numbers.extend(
+                    format_application_number(block.code, year, seq) for seq in range(block.next, block.next + take)
+                )
+                block.next += take
+        return numbers
+
+    def allocate_in(self, connection: Connection, organization_id: int, count: int,
+                    year: Optional[int] = None) -> List[str]:
+        """count номеров в транзакции connection, без блока в памяти (откатываются вместе с ней)"""
+        if count <= 0:
+            return []
+        year = year or datetime.now(timezone.utc).year
+        block = self._reserve_on(connection, organization_id, year, count)
+        return [format_application_number(block.code, year, seq) for seq in range(block.next, block.end)]
+
+    def next_number(self, organization_id: int, year: Optional[int] = None) -> str:
+        return self.allocate(organization_id, 1, year)[0]
+
+    def reset(self) -> None:
+        """Забыть зарезервированные блоки (например, после смены кода организации)"""
+        with self._guard:
+            self._blocks.clear()
+
+
+application_numbers = ApplicationNumberAllocator()
+
+
+@event.listens_for(Session, "before_flush")
+def _number_new_applications(session: Session, flush_context, instances) -> None:
+    """Номера заявкам, добавленным через ORM без application_number"""
+    unnumbered: Dict[int, List[Application]] = defaultdict(list)
+    for obj in session.new:
+        if isinstance(obj, Application) and obj.application_number is None and obj.organization_id is not None:
+            unnumbered[obj.organization_id].append(obj)
+    if not unnumbered:
+        return
+    connection = session.connection()
+    # SQLite: транзакция сессии может уже держать блокировку записи
+    in_session = connection.dialect.name == "sqlite"
+    for organization_id, applications in unnumbered.items():
+        if in_session:
+            numbers = application_numbers.allocate_in(connection, organization_id, len(applications))
+        else:
+            numbers = application_numbers.allocate(organization_id, len(applications))
+        for application, number in zip(applications, numbers):
+            application.application_number = number
@@ -0,0 +1,276 @@
+"""
+Переходы статусов заявок
+
+Допустимые переходы заданы таблицей ALLOWED_TRANSITIONS; при импорте она
+разворачивается в SOURCE_STATUSES - из каких статусов можно попасть в
+каждый целевой, так что проверка перехода - поиск во frozenset.
+
+Массовый переход (transition_applications) читает текущие статусы
+выбранных заявок одним SELECT (в PostgreSQL - FOR UPDATE), отсеивает
+недопустимые переходы и для каждого целевого статуса выполняет один
+UPDATE ... WHERE (id, status) IN (...): заявка, статус которой успели
+изменить между чтением и записью, не обновляется и попадает в отказы.
+Затем одним executemany-INSERT пишется журнал application_status_events,
+а счётчики дашборда и версии входящих обновляются по тем же строкам, без
+повторного чтения заявок. updated_at проставляет onupdate, поэтому
+сводка выручки подхватывает переходы сама.
+
+Смена статуса через ORM тоже проверяется по таблице и попадает в журнал
+обработчиками сессии (без автора).
+"""
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from sqlalchemy import event, inspect, insert, or_, select, tuple_, update
+from sqlalchemy.orm import Session
+from ..models.business import Application, ApplicationStatus
+from ..models.status_events import ApplicationStatusEvent
+from .inbox import bump_inbox_versions, inbox_key
+from .pagination import MAX_PAGE_SIZE
+from .statistics import application_deltas, apply_stat_deltas, invalidate_dashboards_on_commit
+
+ALLOWED_TRANSITIONS: Dict[ApplicationStatus, FrozenSet[ApplicationStatus]] = {
+    ApplicationStatus.DRAFT: frozenset({ApplicationStatus.SUBMITTED, ApplicationStatus.CANCELLED}),
+    # DRAFT - возврат на доработку
+    ApplicationStatus.SUBMITTED: frozenset({
+        ApplicationStatus.DRAFT, ApplicationStatus.PROCESSING, ApplicationStatus.CANCELLED,
+    }),
+    ApplicationStatus.PROCESSING: frozenset({ApplicationStatus.CONFIRMED, ApplicationStatus.CANCELLED}),
+    ApplicationStatus.CONFIRMED: frozenset({ApplicationStatus.PAID, ApplicationStatus.CANCELLED}),
+    ApplicationStatus.PAID: frozenset({ApplicationStatus.COMPLETED, ApplicationStatus.REFUNDED}),
+    ApplicationStatus.COMPLETED: frozenset({ApplicationStatus.REFUNDED}),
+    ApplicationStatus.CANCELLED: frozenset({ApplicationStatus.DRAFT}),  # восстановление отменённой заявки
+    ApplicationStatus.REFUNDED: frozenset(),
+}
+
+# Из каких статусов разрешён переход в целевой
+SOURCE_STATUSES: Dict[ApplicationStatus, FrozenSet[ApplicationStatus]] = {
+    target: frozenset(source for source, targets in ALLOWED_TRANSITIONS.items() if target in targets)
+    for target in ApplicationStatus
+}
+
+# Заявок в одном массовом переходе: SELECT и UPDATE на целевой статус - по одному запросу
+MAX_TRANSITION_BATCH = 1000
+
+NOT_FOUND = "Заявка не найдена"
+CONCURRENT_CHANGE = "Статус заявки изменился, повторите переход"
+
+
+def can_transition(from_status: ApplicationStatus, to_status: ApplicationStatus) -> bool:
+    return from_status in SOURCE_STATUSES[to_status]
+
+
+class InvalidTransition(ValueError):
+    def __init__(self, from_status: ApplicationStatus, to_status: ApplicationStatus):
+        super().__init__(f"Переход {from_status.value} → {to_status.value} не разрешён")
+        self.from_status = from_status
+        self.to_status = to_status
+
+
+@dataclass
+class AppliedTransition:
+    application_id: int
+    from_status: ApplicationStatus
+    to_status: ApplicationStatus
+
+
+@dataclass
+class RejectedTransition:
+    application_id: int
+    status: Optional[ApplicationStatus]  # текущий статус; None - заявка не найдена
+    reason: str
+
+
+@dataclass
+class TransitionResult:
+    batch_id: str
+    applied: List[AppliedTransition] = field(default_factory=list)
+    rejected: List[RejectedTransition] = field(default_factory=list)
+
+
+def _rejection_reason(current: ApplicationStatus, target: ApplicationStatus) -> str:
+    if current == target:
+        return f"Заявка уже в статусе {target.value}"
+    return str(InvalidTransition(current, target))
+
+
+def _supports_tuple_in(connection) -> bool:
+    # (id, status) IN ((...), ...): PostgreSQL, SQLite 3.15+, MySQL
+    return connection.dialect.name in ("postgresql", "sqlite", "mysql", "mariadb")
+
+
+def _update_target(connection, organization_id: int, target: ApplicationStatus, rows: list) -> List[int]:
+    """
+    Один UPDATE на целевой статус; обновляются только строки, статус
+    которых не изменился после чтения. Возвращает id обновлённых заявок.
+    """
+    table = Application.__table__
+    if _supports_tuple_in(connection):
+        guard = tuple_(table.c.id, table.c.status).in_([(row.id, row.status) for row in rows])
+    else:
+        guard = or_(*[(table.c.id == row.id) & (table.c.status == row.status) for row in rows])
+    stmt = update(table).where(table.c.organization_id == organization_id, guard).values(status=target)
+    if connection.dialect.update_returning:
+        return list(connection.execute(stmt.returning(table.c.id)).scalars())
+    # Без RETURNING строки заблокированы SELECT ... FOR UPDATE: обновились все или ни одна не менялась
+    if connection.execute(stmt).rowcount != len(rows):
+        raise RuntimeError("Заявки изменились между чтением и UPDATE")
+    return [row.id for row in rows]
+
+
+def transition_applications(
+    db: Session,
+    organization_id: int,
+    changes: Iterable[Tuple[int, ApplicationStatus]],
+    changed_by: Optional[int] = None,
+    comment: Optional[str] = None,
+    owner_id: Optional[int] = None,
+) -> TransitionResult:
+    """
+    Перевести заявки организации в новые статусы и зафиксировать транзакцию.
+
+    changes - пары (id заявки, целевой статус), не больше
+    MAX_TRANSITION_BATCH. owner_id ограничивает выбор заявками, созданными
+    пользователем или назначенными ему; остальные считаются ненайденными.
+    Недопустимые переходы не прерывают пачку, а возвращаются в rejected.
+    """
+    result = TransitionResult(batch_id=uuid.uuid4().hex)
+    targets: Dict[int, ApplicationStatus] = {}
+    conflicting = set()
+    for application_id, target in changes:
+        if targets.setdefault(application_id, target) != target:
+            conflicting.add(application_id)
+    for application_id in sorted(conflicting):
+        del targets[application_id]
+        result.rejected.append(RejectedTransition(application_id, None, "Указано несколько целевых статусов"))
+    if len(targets) > MAX_TRANSITION_BATCH:
+        raise ValueError(f"Не больше {MAX_TRANSITION_BATCH} заявок за один переход")
+    if not targets:
+        return result
+
+    table = Application.__table__
+    query = select(
+        table.c.id, table.c.status, table.c.assigned_to, table.c.final_cost, table.c.currency
+    ).where(table.c.organization_id == organization_id, table.c.id.in_(list(targets)))
+    if owner_id is not None:
+        query = query.where(or_(table.c.created_by == owner_id, table.c.assigned_to == owner_id))
+    connection = db.connection()
+    current = {row.id: row for row in connection.execute(query.with_for_update())}
+
+    by_target: Dict[ApplicationStatus, list] = defaultdict(list)
+    for application_id, target in targets.items():
+        row = current.get(application_id)
+        if row is None:
+            result.rejected.append(RejectedTransition(application_id, None, NOT_FOUND))
+        elif not can_transition(row.status, target):
+            result.rejected.append(
+                RejectedTransition(application_id, row.status, _rejection_reason(row.status, target))
+            )
+        else:
+            by_target[target].append(row)
+
+    applied_rows = []
+    for target, rows in by_target.items():
+        updated = set(_update_target(connection, organization_id, target, rows))
+        for row in rows:
+            if row.id in updated:
+                applied_rows.append((row, target))
+                result.applied.append(AppliedTransition(row.id, row.status, target))
+            else:
+                result.rejected.append(RejectedTransition(row.id, None, CONCURRENT_CHANGE))
+
+    if applied_rows:
+        connection.execute(insert(ApplicationStatusEvent.__table__), [
+            {
+                "organization_id": organization_id,
+                "application_id": row.id,
+                "from_status": row.status,
+                "to_status": target,
+                "changed_by": changed_by,
+                "batch_id": result.batch_id,
+                "comment": comment,
+            }
+            for row, target in applied_rows
+        ])
+        deltas: Counter = Counter()
+        for row, target in applied_rows:
+            deltas.update(application_deltas(organization_id, row.status, row.final_cost, row.currency, -1))
+            deltas.update(application_deltas(organization_id, target, row.final_cost, row.currency))
+        apply_stat_deltas(connection, {key: value for key, value in deltas.items() if value})
+        bump_inbox_versions(connection, [inbox_key(organization_id, row.assigned_to) for row, _ in applied_rows])
+        invalidate_dashboards_on_commit(db, [organization_id])
+    db.commit()
+    result.rejected.sort(key=lambda item: item.application_id)
+    return result
+
+
+def get_application_access(db: Session, application_id: int):
+    """Организация, автор и ответственный заявки - для проверки доступа"""
+    return db.execute(
+        select(Application.organization_id, Application.created_by, Application.assigned_to)
+        .where(Application.id == application_id)
+    ).first()
+
+
+def list_status_events(
+    db: Session,
+    organization_id: int,
+    application_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+    limit: int = 100,
+) -> List[ApplicationStatusEvent]:
+    """
+    События организации (или одной заявки) в порядке id, начиная после
+    after_id: keyset-чтение ленты по индексам (organization_id, id) и
+    (application_id, id).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(ApplicationStatusEvent).where(ApplicationStatusEvent.organization_id == organization_id)
+    if application_id is not None:
+        query = query.where(ApplicationStatusEvent.application_id == application_id)
+    if after_id is not None:
+        query = query.where(ApplicationStatusEvent.id > after_id)
+    return list(db.scalars(query.order_by(ApplicationStatusEvent.id).limit(limit)))
+
+
+def _check_transition(target, value, oldvalue, initiator):
+    # Новые заявки и первая загрузка значения не проверяются
+    if inspect(target).key is None or not isinstance(oldvalue, ApplicationStatus):
+        return value
+    if value != oldvalue and not can_transition(oldvalue, value):
+        raise InvalidTransition(oldvalue, value)
+    return value
+
+
+event.listen(Application.status, "set", _check_transition, active_history=True, retval=True)
+
+_PENDING_KEY = "application_status_events"
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_status_events(session: Session, flush_context, instances):
+    changes = []
+    for obj in session.dirty:
+        if not isinstance(obj, Application):
+            continue
+        history = inspect(obj).attrs.status.history
+        if history.deleted and history.added and history.deleted[0] != history.added[0]:
+            changes.append((obj, history.deleted[0]))
+    if changes:
+        session.info.setdefault(_PENDING_KEY, []).extend(changes)
+
+
+@event.listens_for(Session, "after_flush")
+def _store_status_events(session: Session, flush_context):
+    changes = session.info.pop(_PENDING_KEY, None)
+    if changes:
+        session.connection().execute(insert(ApplicationStatusEvent.__table__), [
+            {
+                "organization_id": obj.organization_id,
+                "application_id": obj.id,
+                "from_status": previous,
+                "to_status": obj.status,
+            }
+            for obj, previous in changes
+        ])
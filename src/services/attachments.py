@@ -0,0 +1,385 @@
+"""
+Вложения: загрузка в объектное хранилище, дедупликация, миниатюры
+
+Тело запроса читается потоком и уходит в хранилище multipart-загрузкой
+частями по attachment_part_size: в памяти воркера не больше одной части,
+файл целиком не буферизуется ни в памяти, ни на диске. По пути считается
+sha256; если такой файл уже хранится, новая копия удаляется, а вложение
+ссылается на существующий объект (stored_files).
+
+Скачивание - через presigned-ссылки хранилища, байты файла через
+приложение не проходят.
+
+Фоновая задача run_attachment_worker строит миниатюры изображений
+(Pillow) и удаляет из хранилища файлы, на которые не осталось вложений.
+Для нового изображения миниатюра сразу ставится в очередь задач
+(attachments.thumbnails), фоновый проход подбирает пропущенные.
+"""
+import asyncio
+import hashlib
+import io
+import logging
+import mimetypes
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import delete, exists, func, or_, select, update
+from sqlalchemy.orm import Session
+from ..database import SessionLocal, insert_ignore
+from ..jobs import job_handler
+from ..models.attachments import Attachment, AttachmentCategory, StoredFile, ThumbnailStatus
+from ..models.business import Application, Client
+from ..settings import settings
+from ..storage import ObjectStorage, get_storage
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONTENT_TYPE = "application/octet-stream"
+# S3 требует не меньше 5 МБ на часть, кроме последней
+MIN_PART_SIZE = 5 * 1024 * 1024
+# Миниатюра, зависшая в processing дольше этого (упавший воркер), берётся снова
+_STALE_THUMBNAIL = timedelta(minutes=10)
+_THUMBNAIL_BATCH = 20
+_GC_BATCH = 500
+
+
+class AttachmentTooLarge(ValueError):
+    """Файл больше attachment_max_bytes"""
+
+
+class EmptyUpload(ValueError):
+    """Тело запроса пустое"""
+
+
+@dataclass
+class UploadedObject:
+    sha256: str
+    size: int
+    content_type: str
+    object_key: str
+
+
+def normalize_content_type(content_type: Optional[str], filename: str) -> str:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if not content_type or content_type in (DEFAULT_CONTENT_TYPE, "application/x-www-form-urlencoded"):
+        content_type = mimetypes.guess_type(filename)[0] or DEFAULT_CONTENT_TYPE
+    return content_type[:127]
+
+
+async def receive_upload(
+    chunks: AsyncIterator[bytes],
+    content_type: str,
+    storage: Optional[ObjectStorage] = None,
+    max_bytes: Optional[int] = None,
+    part_size: Optional[int] = None,
+) -> UploadedObject:
+    """Перенести поток байтов в хранилище, посчитав размер и sha256"""
+    storage = storage or get_storage()
+    max_bytes = settings.attachment_max_bytes if max_bytes is None else max_bytes
+    part_size = max(MIN_PART_SIZE, part_size or settings.attachment_part_size)
+    key = f"files/{uuid.uuid4().hex}"
+    digest = hashlib.sha256()
+    buffer = bytearray()
+    size = 0
+    upload_id: Optional[str] = None
+    parts: List[dict] = []
+
+    async def flush_part() -> None:
+        nonlocal upload_id
+        if upload_id is None:
+            upload_id = await run_in_threadpool(storage.create_multipart, key, content_type)
+        data = bytes(buffer[:part_size])
+        del buffer[:part_size]
+        parts.append(await run_in_threadpool(storage.upload_part, key, upload_id, len(parts) + 1, data))
+
+    try:
+        async for chunk in chunks:
+            if not chunk:
+                continue
+            size += len(chunk)
+            if size > max_bytes:
+                raise AttachmentTooLarge(f"Файл больше {max_bytes} байт")
+            digest.update(chunk)
+            buffer += chunk
+            # Крупный фрагмент тела режется на части ровно по part_size
+            while len(buffer) >= part_size:
+                await flush_part()
+        if size == 0:
+            raise EmptyUpload("Пустой файл")
+        if upload_id is None:
+            # Маленький файл - одним запросом
+            await run_in_threadpool(storage.put, key, bytes(buffer), content_type)
+        else:
+            if buffer:
+                await flush_part()
+            await run_in_threadpool(storage.complete_multipart, key, upload_id, parts)
+    except BaseException:
+        if upload_id is not None:
+            try:
+                await run_in_threadpool(storage.abort_multipart, key, upload_id)
+            except Exception as e:
+                logger.warning(f"Failed to abort multipart upload {key}: {e}")
+        raise
+    return UploadedObject(sha256=digest.hexdigest(), size=size, content_type=content_type, object_key=key)
+
+
+def _register_stored_file(db: Session, uploaded: UploadedObject) -> bool:
+    """Запись stored_files для загруженного объекта; False - такой файл уже хранится"""
+    row = {
+        "sha256": uploaded.sha256,
+        "size": uploaded.size,
+        "content_type": uploaded.content_type,
+        "object_key": uploaded.object_key,
+        "thumbnail_status": (
+            ThumbnailStatus.PENDING if uploaded.content_type.startswith("image/") else ThumbnailStatus.SKIPPED
+        ),
+    }
+    while True:
+        if insert_ignore(db.connection(), StoredFile.__table__, [row]) == 1:
+            return True
+        # Файл уже хранится: отметить ссылку до фиксации вложения, чтобы сборщик
+        # мусора не удалил его (UPDATE держит блокировку строки до конца транзакции)
+        refreshed = db.execute(
+            update(StoredFile)
+            .where(StoredFile.sha256 == uploaded.sha256)
+            .values(last_referenced_at=func.now())
+        )
+        if refreshed.rowcount == 1:
+            return False
+        # Сборщик мусора удалил запись между вставкой и обновлением - хранить свою копию
+
+
+def attach_file(
+    db: Session,
+    uploaded: UploadedObject,
+    organization_id: int,
+    filename: str,
+    category: AttachmentCategory,
+    uploaded_by: int,
+    client_id: Optional[int] = None,
+    application_id: Optional[int] = None,
+) -> Tuple[int, Optional[str]]:
+    """
+    Создать вложение для загруженного объекта.
+
+    Возвращает id вложения и ключ лишней копии в хранилище (файл с тем же
+    sha256 уже хранится) - её нужно удалить после фиксации транзакции.
+    """
+    created = _register_stored_file(db, uploaded)
+    attachment = Attachment(
+        organization_id=organization_id,
+        client_id=client_id,
+        application_id=application_id,
+        sha256=uploaded.sha256,
+        filename=filename,
+        category=category,
+        uploaded_by=uploaded_by,
+    )
+    db.add(attachment)
+    db.commit()
+    return attachment.id, None if created else uploaded.object_key
+
+
+def _attachment_query():
+    return select(
+        Attachment.id,
+        Attachment.organization_id,
+        Attachment.client_id,
+        Attachment.application_id,
+        Attachment.filename,
+        Attachment.category,
+        Attachment.uploaded_by,
+        Attachment.created_at,
+        Attachment.sha256,
+        StoredFile.size,
+        StoredFile.content_type,
+        StoredFile.object_key,
+        StoredFile.thumbnail_key,
+        StoredFile.thumbnail_status,
+    ).join(StoredFile, StoredFile.sha256 == Attachment.sha256)
+
+
+def get_attachment(db: Session, attachment_id: int):
+    return db.execute(_attachment_query().where(Attachment.id == attachment_id)).first()
+
+
+def list_attachments(
+    db: Session,
+    organization_id: int,
+    client_id: Optional[int] = None,
+    application_id: Optional[int] = None,
+) -> list:
+    query = _attachment_query().where(Attachment.organization_id == organization_id)
+    if client_id is not None:
+        query = query.where(Attachment.client_id == client_id)
+    else:
+        query = query.where(Attachment.application_id == application_id)
+    return list(db.execute(query.order_by(Attachment.id)).all())
+
+
+def delete_attachment(db: Session, attachment_id: int) -> None:
+    """Удалить вложение; сам файл уберёт фоновая задача, если ссылок не осталось"""
+    db.execute(delete(Attachment).where(Attachment.id == attachment_id))
+    db.commit()
+
+
+def get_client(db: Session, client_id: int) -> Optional[Client]:
+    return db.get(Client, client_id)
+
+
+def get_application(db: Session, application_id: int) -> Optional[Application]:
+    return db.get(Application, application_id)
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    """JPEG-миниатюра не больше size x size с учётом ориентации из EXIF"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=80, optimize=True)
+    return output.getvalue()
+
+
+def _claim_thumbnails(db: Session, limit: int) -> List[tuple]:
+    """Отметить до limit файлов как обрабатываемые этим воркером"""
+    now = datetime.now(timezone.utc)
+    claimable = or_(
+        StoredFile.thumbnail_status == ThumbnailStatus.PENDING,
+        (StoredFile.thumbnail_status == ThumbnailStatus.PROCESSING)
+        & (StoredFile.thumbnail_attempted_at < now - _STALE_THUMBNAIL),
+    )
+    candidates = db.execute(
+        select(StoredFile.sha256, StoredFile.object_key, StoredFile.size).where(claimable).limit(limit)
+    ).all()
+    claimed = []
+    for sha256, object_key, size in candidates:
+        # Условный UPDATE: при нескольких воркерах файл достаётся одному
+        result = db.execute(
+            update(StoredFile)
+            .where(StoredFile.sha256 == sha256, claimable)
+            .values(thumbnail_status=ThumbnailStatus.PROCESSING, thumbnail_attempted_at=now)
+        )
+        if result.rowcount == 1:
+            claimed.append((sha256, object_key, size))
+    db.commit()
+    return claimed
+
+
+def _finish_thumbnail(db: Session, sha256: str, status: str, key: Optional[str] = None) -> None:
+    db.execute(
+        update(StoredFile)
+        .where(StoredFile.sha256 == sha256)
+        .values(thumbnail_status=status, thumbnail_key=key)
+    )
+    db.commit()
+
+
+def process_thumbnails(storage: Optional[ObjectStorage] = None, limit: int = _THUMBNAIL_BATCH) -> int:
+    """Построить миниатюры для очередной порции изображений; возвращает число обработанных"""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return 0
+    storage = storage or get_storage()
+    db = SessionLocal()
+    try:
+        claimed = _claim_thumbnails(db, limit)
+        for sha256, object_key, size in claimed:
+            if size > settings.thumbnail_max_source_bytes:
+                _finish_thumbnail(db, sha256, ThumbnailStatus.SKIPPED)
+                continue
+            try:
+                thumbnail = make_thumbnail(storage.get(object_key), settings.thumbnail_size)
+                key = f"thumbnails/{sha256}.jpg"
+                storage.put(key, thumbnail, "image/jpeg")
+            except Exception as e:
+                logger.warning(f"Thumbnail for {sha256} failed: {e}")
+                _finish_thumbnail(db, sha256, ThumbnailStatus.FAILED)
+                continue
+            _finish_thumbnail(db, sha256, ThumbnailStatus.READY, key)
+        return len(claimed)
+    finally:
+        db.close()
+
+
+@job_handler("attachments.thumbnails")
+def thumbnails_job(payload: dict) -> dict:
+    """Задача очереди: миниатюры сразу после загрузки, не дожидаясь фонового прохода"""
+    return {"processed": process_thumbnails()}
+
+
+def collect_garbage(storage: Optional[ObjectStorage] = None, grace: Optional[float] = None) -> int:
+    """
+    Удалить файлы без вложений, на которые не ссылались grace секунд
+    (объект и миниатюру).
+
+    Задержка отсчитывается от last_referenced_at и защищает загрузку, которая
+    уже нашла файл по sha256, но ещё не зафиксировала своё вложение; условие
+    повторяется в DELETE, поэтому строка, обновлённая такой загрузкой после
+    выборки, не удаляется.
+    """
+    storage = storage or get_storage()
+    grace = settings.attachment_gc_grace_seconds if grace is None else grace
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=grace)
+    collectable = ~exists().where(Attachment.sha256 == StoredFile.sha256) & (StoredFile.last_referenced_at < cutoff)
+    db = SessionLocal()
+    try:
+        rows = db.execute(
+            select(StoredFile.sha256, StoredFile.object_key, StoredFile.thumbnail_key)
+            .where(collectable)
+            .limit(_GC_BATCH)
+        ).all()
+        if not rows:
+            return 0
+        db.execute(delete(StoredFile).where(StoredFile.sha256.in_([row[0] for row in rows]), collectable))
+        db.commit()
+    finally:
+        db.close()
+    # Если между выборкой и удалением появилось вложение или файл нашла
+    # загрузка, строка осталась, и её объекты не трогаем
+    db = SessionLocal()
+    try:
+        remaining = set(db.execute(
+            select(StoredFile.sha256).where(StoredFile.sha256.in_([row[0] for row in rows]))
+        ).scalars())
+    finally:
+        db.close()
+    keys = [key for sha256, object_key, thumbnail_key in rows if sha256 not in remaining
+            for key in (object_key, thumbnail_key)]
+    storage.delete(keys)
+    return len(rows) - len(remaining)
+
+
+def _attachment_maintenance(state: dict) -> None:
+    storage = get_storage()
+    try:
+        if not state.get("bucket_ready"):
+            storage.ensure_bucket()
+            state["bucket_ready"] = True
+        while process_thumbnails(storage) == _THUMBNAIL_BATCH:
+            pass
+        state["runs"] = state.get("runs", 0) + 1
+        if state["runs"] % settings.attachment_gc_every == 0:
+            removed = collect_garbage(storage)
+            if removed:
+                logger.info(f"Removed {removed} unreferenced stored files")
+    except Exception as e:
+        logger.warning(f"Attachment maintenance failed: {e}")
+
+
+async def run_attachment_worker(stop: asyncio.Event) -> None:
+    """Фоновая задача: миниатюры и удаление файлов без вложений"""
+    state: dict = {}
+    while not stop.is_set():
+        await run_in_threadpool(_attachment_maintenance, state)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.thumbnail_interval_seconds)
+        except asyncio.TimeoutError:
+            pass
@@ -0,0 +1,347 @@
+"""
+Поиск клиентов по ФИО, телефону, паспорту и email
+
+Для каждого клиента хранятся нормализованные ключи (client_search_keys):
+
+- слова ФИО, транслитерированные и сведённые к латинскому "скелету", в
+  котором совпадают распространённые варианты записи (Юлия / Yulia / Julia,
+  Щукин / Schukin / Shukin, Алексей / Alexey);
+- цифры телефона, полностью и последние 10 (номер без кода страны);
+- серия и номер паспорта без пробелов;
+- email в нижнем регистре.
+
+Запрос нормализуется так же, каждое слово ищется префиксным диапазоном по
+первичному ключу индекса, клиент должен совпасть по всем словам: оценки
+слов считаются, пересекаются и ранжируются одним SQL-запросом.
+
+Кандидаты - первые MAX_CANDIDATES ключей самого длинного слова в порядке
+индекса (ключ, затем id клиента), поэтому время поиска не растёт с
+размером базы (p95 ~16 мс на 1M клиентов, benchmarks/client_search.py).
+Цена - полнота для неизбирательных запросов: если слово совпало с
+большим числом ключей ("ив" или "иванов алексей" среди миллиона
+клиентов), рассматриваются только первые из них. Точное совпадение ключа
+идёт раньше его продолжений, так что первыми теряются совпадения по
+префиксу, а затем клиенты с большими id; такой запрос нужно уточнить.
+
+Ключи обновляются в той же транзакции, что и изменение клиента. Массовые
+вставки в обход ORM должны вызывать replace_client_search_keys сами.
+"""
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, List, Mapping, Optional, Sequence, Set, Tuple
+from sqlalchemy import Float, case, cast, delete, event, func, inspect, literal, or_, select, union_all
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from ..models.business import Client
+from ..models.search import ClientSearchKey
+
+# Поля, из которых получен ключ
+LAST_NAME = 1
+FIRST_NAME = 2
+MIDDLE_NAME = 3
+PHONE = 4
+PASSPORT = 5
+EMAIL = 6
+
+FIELD_WEIGHTS = {LAST_NAME: 4, FIRST_NAME: 3, MIDDLE_NAME: 1, PHONE: 4, PASSPORT: 4, EMAIL: 4}
+
+KEY_LENGTH = 64
+MIN_TERM_LENGTH = 2
+MAX_TERMS = 4
+MAX_RESULTS = 50
+# Ключей самого длинного слова, из которых выбираются кандидаты
+MAX_CANDIDATES = 2000
+
+_INDEXED_FIELDS = (
+    "organization_id", "first_name", "last_name", "middle_name", "phone", "email", "passport_number",
+)
+
+_CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "е": "e", "ё": "e", "ж": "zh",
+    "з": "z", "и": "i", "й": "i", "к": "k", "л": "l", "м": "m", "н": "n", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "kh", "ц": "ts",
+    "ч": "ch", "ш": "sh", "щ": "shch", "ъ": "", "ы": "y", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya", "і": "i", "ї": "i", "є": "e", "ґ": "g",
+}
+_TRANSLIT = str.maketrans(_CYRILLIC)
+
+# Правила "скелета" применяются по порядку к транслитерированному слову.
+# Шипящие и ц кодируются освободившимися буквами: x = ш/щ, q = ч, c = ц, j = ж
+_SKELETON_RULES = [
+    (re.compile(r"s?shch|sch|sh"), "X"),
+    (re.compile(r"t?ch"), "Q"),
+    (re.compile(r"t[sz]"), "C"),
+    (re.compile(r"zh"), "J"),
+    (re.compile(r"kh"), "h"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"ck|c|q"), "k"),
+    (re.compile(r"x"), "ks"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"[yj]"), "i"),
+    (re.compile(r"([a-z])\1+"), r"\1"),
+    (re.compile(r"^ie"), "e"),
+]
+_PLACEHOLDERS = str.maketrans({"X": "x", "Q": "q", "C": "c", "J": "j"})
+_APOSTROPHES = re.compile(r"['’ʼ`]")
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_PHONE_QUERY = re.compile(r"[\d\s()+\-.]+")
+_PASSPORT_SEPARATORS = re.compile(r"[\s\-№#]+")
+
+
+def _transliterate(value: str) -> str:
+    return _APOSTROPHES.sub("", value.lower()).translate(_TRANSLIT)
+
+
+@lru_cache(maxsize=65536)
+def fold_token(token: str) -> str:
+    """Скелет одного слова (уже транслитерированного, a-z0-9); имена повторяются, результат кэшируется"""
+    for pattern, replacement in _SKELETON_RULES:
+        token = pattern.sub(replacement, token)
+    return token.translate(_PLACEHOLDERS)[:KEY_LENGTH]
+
+
+def name_keys(value: Optional[str]) -> List[str]:
+    """Ключи слов имени: 'Петров-Водкин' -> ['petrov', 'vodkin']"""
+    if not value:
+        return []
+    return [fold_token(token) for token in _NON_ALNUM.split(_transliterate(value)) if token]
+
+
+def phone_keys(value: Optional[str]) -> List[str]:
+    """Цифры номера; 8 в начале российского номера приводится к 7"""
+    digits = re.sub(r"\D", "", value or "")
+    if len(digits) == 11 and digits[0] == "8":
+        digits = "7" + digits[1:]
+    if len(digits) < 5:
+        return []
+    keys = [digits[:KEY_LENGTH]]
+    if len(digits) > 10:
+        keys.append(digits[-10:])
+    return keys
+
+
+def passport_key(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    digits = _PASSPORT_SEPARATORS.sub("", value)
+    if digits.isdigit():
+        return digits[:KEY_LENGTH]
+    key = "".join(name_keys(value))
+    return key[:KEY_LENGTH] or None
+
+
+def email_key(value: Optional[str]) -> Optional[str]:
+    key = (value or "").strip().lower()
+    return key[:KEY_LENGTH] or None
+
+
+def client_search_keys(
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    middle_name: Optional[str] = None,
+    phone: Optional[str] = None,
+    email: Optional[str] = None,
+    passport_number: Optional[str] = None,
+) -> Set[Tuple[str, int]]:
+    """Все ключи клиента как пары (key, field)"""
+    keys = set()
+    for field, value in ((LAST_NAME, last_name), (FIRST_NAME, first_name), (MIDDLE_NAME, middle_name)):
+        keys.update((key, field) for key in name_keys(value))
+    keys.update((key, PHONE) for key in phone_keys(phone))
+    passport = passport_key(passport_number)
+    if passport:
+        keys.add((passport, PASSPORT))
+    email = email_key(email)
+    if email:
+        keys.add((email, EMAIL))
+    return keys
+
+
+def replace_client_search_keys(
+    connection: Connection,
+    clients: Iterable[Mapping],
+    removed_ids: Iterable[int] = (),
+) -> None:
+    """
+    Перестроить ключи клиентов.
+
+    clients - отображения с id, organization_id и индексируемыми полями
+    (объекты Client подходят через client_index_row); removed_ids - удалённые клиенты.
+    """
+    rows = []
+    ids = set(removed_ids)
+    for client in clients:
+        ids.add(client["id"])
+        keys = client_search_keys(
+            client.get("first_name"), client.get("last_name"), client.get("middle_name"),
+            client.get("phone"), client.get("email"), client.get("passport_number"),
+        )
+        rows.extend(
+            {"organization_id": client["organization_id"], "key": key, "client_id": client["id"], "field": field}
+            for key, field in keys
+        )
+
+    table = ClientSearchKey.__table__
+    ids = sorted(ids)
+    for start in range(0, len(ids), 500):
+        connection.execute(delete(table).where(table.c.client_id.in_(ids[start:start + 500])))
+    if rows:
+        connection.execute(table.insert(), rows)
+
+
+def client_index_row(client: Client) -> Dict:
+    return {name: getattr(client, name) for name in ("id",) + _INDEXED_FIELDS}
+
+
+def _search_fields_changed(client: Client) -> bool:
+    state = inspect(client)
+    return any(state.attrs[name].history.has_changes() for name in _INDEXED_FIELDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_client_search_keys(session: Session, flush_context):
+    changed = [obj for obj in session.new if isinstance(obj, Client)]
+    changed += [obj for obj in session.dirty if isinstance(obj, Client) and _search_fields_changed(obj)]
+    removed = [obj.id for obj in session.deleted if isinstance(obj, Client)]
+    if changed or removed:
+        replace_client_search_keys(session.connection(), [client_index_row(obj) for obj in changed], removed)
+
+
+def rebuild_client_search_index(db: Session, organization_id: Optional[int] = None, batch_size: int = 5000) -> int:
+    """Полная перестройка ключей (после загрузки данных в обход ORM); возвращает число клиентов"""
+    columns = [Client.id] + [getattr(Client, name) for name in _INDEXED_FIELDS]
+    last_id, total = 0, 0
+    while True:
+        query = select(*columns).where(Client.id > last_id)
+        if organization_id is not None:
+            query = query.where(Client.organization_id == organization_id)
+        batch = db.execute(query.order_by(Client.id).limit(batch_size)).mappings().all()
+        if not batch:
+            break
+        replace_client_search_keys(db.connection(), batch)
+        db.commit()
+        last_id = batch[-1]["id"]
+        total += len(batch)
+    return total
+
+
+def query_terms(query: str) -> List[Tuple[str, ...]]:
+    """
+    Слова запроса как наборы альтернативных префиксов.
+
+    '8 (916) 12' -> [('891612', '791612', '91612')]; 'Иванов ан' -> [('ivanov',), ('an',)]
+    """
+    query = (query or "").strip()
+    if "@" in query:
+        key = email_key(query)
+        return [(key,)] if key else []
+
+    digits = re.sub(r"\D", "", query)
+    if len(digits) >= 3 and _PHONE_QUERY.fullmatch(query):
+        alternatives = [digits]
+        if digits[0] == "8":
+            alternatives += ["7" + digits[1:], digits[1:]]
+        elif digits[0] == "7":
+            alternatives.append(digits[1:])
+        return [tuple(dict.fromkeys(alt[:KEY_LENGTH] for alt in alternatives if len(alt) >= MIN_TERM_LENGTH))]
+
+    tokens = [token for token in name_keys(query) if len(token) >= MIN_TERM_LENGTH]
+    return [(token,) for token in list(dict.fromkeys(tokens))[:MAX_TERMS]]
+
+
+def _prefix_end(prefix: str) -> str:
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _term_match(alternatives: Sequence[str]):
+    """
+    Условия совпадения ключа с каждым из префиксов слова и оценка совпадения
+    (SQL-выражения): вес поля, умноженный на 2 при полном совпадении и от 1
+    до 2 по доле покрытого ключа для префикса. Более длинный префикс даёт
+    оценку не ниже, поэтому они проверяются первыми.
+    """
+    key = ClientSearchKey.key
+    prefixes = sorted(alternatives, key=len, reverse=True)
+    ranges = [(key >= prefix) & (key < _prefix_end(prefix)) for prefix in prefixes]
+    closeness = case(
+        *[(key == prefix, 2.0) for prefix in prefixes],
+        *[(in_range, 1.0 + literal(float(len(prefix))) / cast(func.length(key), Float))
+          for prefix, in_range in zip(prefixes, ranges)],
+        else_=None,
+    )
+    weight = case(FIELD_WEIGHTS, value=ClientSearchKey.field, else_=1)
+    return ranges, weight * closeness
+
+
+def search_clients(
+    db: Session,
+    organization_id: int,
+    query: str,
+    created_by: Optional[int] = None,
+    limit: int = 20,
+) -> List[Tuple[Client, float]]:
+    """
+    Клиенты организации, совпавшие со всеми словами запроса, по убыванию оценки.
+
+    Диапазоном по индексу ищется самое длинное (обычно самое избирательное)
+    слово, кандидаты - не более MAX_CANDIDATES его ключей в порядке индекса;
+    остальные слова оцениваются коррелированными подзапросами по ключам
+    каждого кандидата (индекс client_id). Пересечение, сумма оценок и
+    сортировка выполняются одним запросом. created_by ограничивает
+    кандидатов клиентами автора.
+    """
+    limit = max(1, min(limit, MAX_RESULTS))
+    terms = sorted(query_terms(query), key=lambda alternatives: -max(map(len, alternatives)))
+    if not terms:
+        return []
+
+    ranges, score = _term_match(terms[0])
+    # Каждый префикс - отдельный упорядоченный проход по индексу с LIMIT:
+    # для OR диапазонов СУБД пришлось бы собрать и отсортировать все совпадения
+    scans = []
+    for in_range in ranges:
+        scan = (
+            select(ClientSearchKey.client_id, score.label("score"))
+            .where(ClientSearchKey.organization_id == organization_id, in_range)
+        )
+        if created_by is not None:
+            scan = scan.join(Client, Client.id == ClientSearchKey.client_id).where(
+                Client.created_by == created_by
+            )
+        scan = scan.order_by(ClientSearchKey.key).limit(MAX_CANDIDATES).subquery()
+        scans.append(select(scan.c.client_id, scan.c.score))
+    matched = (scans[0] if len(scans) == 1 else union_all(*scans)).subquery("matched")
+    candidates = (
+        select(matched.c.client_id, func.max(matched.c.score).label("score"))
+        .group_by(matched.c.client_id)
+        .subquery("candidates")
+    )
+
+    term_scores = []
+    for i, alternatives in enumerate(terms[1:], start=1):
+        ranges, score = _term_match(alternatives)
+        term_scores.append(
+            select(func.max(score))
+            .where(ClientSearchKey.client_id == candidates.c.client_id, or_(*ranges))
+            .scalar_subquery()
+            .label(f"term{i}")
+        )
+    # MATERIALIZED: оценки слов вычисляются один раз на кандидата, а не в условии и в сумме
+    scored = select(candidates.c.client_id, candidates.c.score, *term_scores).cte("scored")
+    if term_scores:
+        scored = scored.prefix_with("MATERIALIZED")
+    total = sum((scored.c[f"term{i}"] for i in range(1, len(terms))), scored.c.score).label("total")
+    ranked = db.execute(
+        select(scored.c.client_id, total)
+        .where(*[scored.c[f"term{i}"].is_not(None) for i in range(1, len(terms))])
+        .order_by(total.desc(), scored.c.client_id)
+        .limit(limit)
+    ).all()
+    if not ranked:
+        return []
+
+    clients = {
+        client.id: client
+        for client in db.execute(select(Client).where(Client.id.in_([row[0] for row in ranked]))).scalars()
+    }
+    return [(clients[client_id], score) for client_id, score in ranked if client_id in clients]
@@ -0,0 +1,44 @@
+"""
+Выборки клиентов
+"""
+from typing import List, Optional, Tuple
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from ..models.business import Client, ClientStatus
+from .pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor
+
+
+def list_clients(
+    db: Session,
+    organization_id: int,
+    status: Optional[ClientStatus] = None,
+    created_by: Optional[int] = None,
+    cursor: Optional[str] = None,
+    limit: int = 50,
+) -> Tuple[List[Client], Optional[str]]:
+    """
+    Страница клиентов организации в порядке (last_name, id).
+
+    Keyset-пагинация по индексам ix_clients_org_*: каждая страница -
+    range scan от курсора, без OFFSET.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    query = select(Client).where(Client.organization_id == organization_id)
+    if status is not None:
+        query = query.where(Client.status == status)
+    if created_by is not None:
+        query = query.where(Client.created_by == created_by)
+
+    after = decode_cursor(cursor, 2)
+    if after is not None:
+        query = query.where(tuple_(Client.last_name, Client.id) > tuple_(after[0], after[1]))
+
+    query = query.order_by(Client.last_name, Client.id).limit(limit + 1)
+    rows = list(db.execute(query).scalars())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.last_name, last.id)
+    return rows, next_cursor
@@ -0,0 +1,251 @@
+"""
+Пересчёт сумм между валютами по локальной таблице курсов
+
+Таблица exchange_rates целиком держится в памяти процесса (RateTable):
+по каждой валюте - отсортированные дни и курсы, курс на дату ищется
+бинарным поиском (последний известный курс не позже даты). Кэш
+перечитывается раз в fx_cache_ttl_seconds и сразу после загрузки курсов.
+
+convert_amounts пересчитывает весь набор строк (сумма, валюта, дата) за
+один проход: курс ищется один раз на каждую различную пару (валюта, день),
+а не для каждой строки.
+
+Курсы загружаются из локального CSV (date,currency,rate[,nominal]) -
+командой load_rates.py или при старте из settings.fx_rates_file, так что
+всё работает без доступа к внешним сервисам.
+"""
+import csv
+import io
+import logging
+import threading
+import time
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from ..database import SessionLocal, upsert
+from ..models.currency import ExchangeRate
+from ..settings import settings
+
+logger = logging.getLogger(__name__)
+
+_CENT = Decimal("0.01")
+_RATE_PRECISION = Decimal("0.00000001")
+_BATCH_SIZE = 1000
+
+RateRow = Tuple[str, date, Decimal]
+
+
+class RateFileError(ValueError):
+    """Файл курсов не удаётся разобрать"""
+
+
+class RateTable:
+    """Курсы валют в памяти, индексированные по дате"""
+
+    def __init__(self, rows: Iterable[RateRow], base_currency: str):
+        self.base_currency = base_currency
+        series: Dict[str, List[Tuple[int, Decimal]]] = defaultdict(list)
+        for currency, day, rate in rows:
+            series[currency].append((day.toordinal(), Decimal(rate)))
+        self._days: Dict[str, List[int]] = {}
+        self._rates: Dict[str, List[Decimal]] = {}
+        for currency, points in series.items():
+            points.sort()
+            self._days[currency] = [day for day, _ in points]
+            self._rates[currency] = [rate for _, rate in points]
+
+    @property
+    def currencies(self) -> Set[str]:
+        return set(self._days) | {self.base_currency}
+
+    def _rate(self, currency: str, ordinal: int) -> Optional[Decimal]:
+        if currency == self.base_currency:
+            return Decimal(1)
+        days = self._days.get(currency)
+        if not days:
+            return None
+        i = bisect_right(days, ordinal) - 1
+        return self._rates[currency][i] if i >= 0 else None
+
+    def rate(self, currency: str, target: str, day: date) -> Optional[Decimal]:
+        """Курс currency -> target на дату (кросс-курс через базовую валюту)"""
+        if currency == target:
+            return Decimal(1)
+        ordinal = day.toordinal()
+        source_rate = self._rate(currency, ordinal)
+        target_rate = self._rate(target, ordinal)
+        if source_rate is None or not target_rate:
+            return None
+        return source_rate / target_rate
+
+    def convert_amounts(
+        self,
+        amounts: Sequence[Optional[Decimal]],
+        currencies: Sequence[str],
+        days: Sequence[date],
+        target: str,
+    ) -> Tuple[List[Optional[Decimal]], Set[str]]:
+        """
+        Пересчитать столбец сумм в валюту target.
+
+        Возвращает суммы (None - нет курса) и валюты, для которых курса не нашлось.
+        """
+        rates: Dict[Tuple[str, date], Optional[Decimal]] = {}
+        converted: List[Optional[Decimal]] = []
+        missing: Set[str] = set()
+        for amount, currency, day in zip(amounts, currencies, days):
+            if amount is None:
+                converted.append(None)
+                continue
+            key = (currency, day)
+            if key not in rates:
+                rates[key] = self.rate(currency, target, day)
+            rate = rates[key]
+            if rate is None:
+                missing.add(currency)
+                converted.append(None)
+            else:
+                converted.append((Decimal(amount) * rate).quantize(_CENT))
+        return converted, missing
+
+    def total(self, amounts: Dict[str, Decimal], target: str, day: Optional[date] = None) -> Tuple[Decimal, Set[str]]:
+        """Сумма по валютам в валюте target на дату (по умолчанию - сегодня)"""
+        day = day or date.today()
+        currencies = list(amounts)
+        converted, missing = self.convert_amounts(
+            [amounts[currency] for currency in currencies], currencies, [day] * len(currencies), target
+        )
+        return sum((value for value in converted if value is not None), Decimal(0)), missing
+
+
+class ExchangeRateCache:
+    """Таблица курсов процесса; перечитывается из БД по истечении ttl"""
+
+    def __init__(self, ttl: float, base_currency: str):
+        self.ttl = ttl
+        self.base_currency = base_currency
+        self._table: Optional[RateTable] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> RateTable:
+        table = self._table
+        if table is not None and time.monotonic() < self._expires_at:
+            return table
+        with self._lock:
+            if self._table is None or time.monotonic() >= self._expires_at:
+                rows = db.execute(
+                    select(ExchangeRate.currency, ExchangeRate.day, ExchangeRate.rate)
+                ).all()
+                self._table = RateTable(rows, self.base_currency)
+                self._expires_at = time.monotonic() + self.ttl
+            return self._table
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._expires_at = 0.0
+
+
+fx_rates = ExchangeRateCache(ttl=settings.fx_cache_ttl_seconds, base_currency=settings.base_currency)
+
+
+def _parse_day(value: str) -> date:
+    value = value.strip()
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"неверная дата '{value}'")
+
+
+def _parse_decimal(value: str) -> Decimal:
+    try:
+        return Decimal(value.strip().replace(" ", "").replace(",", "."))
+    except InvalidOperation:
+        raise ValueError(f"неверное число '{value}'")
+
+
+def read_rates(stream: io.TextIOBase) -> Iterator[RateRow]:
+    """
+    Строки CSV с заголовком date,currency,rate[,nominal].
+
+    rate - стоимость nominal единиц валюты в базовой валюте (как в
+    публикациях ЦБ: 100 JPY = 52,31 RUB), nominal по умолчанию 1.
+    """
+    sample = stream.read(4096)
+    stream.seek(0)
+    delimiter = ";" if sample.count(";") > sample.count(",") else ","
+    reader = csv.DictReader(stream, delimiter=delimiter)
+    fields = {name.strip().lower() for name in reader.fieldnames or []}
+    if not {"date", "currency", "rate"} <= fields:
+        raise RateFileError("Ожидаются колонки date, currency, rate")
+    for line, row in enumerate(reader, start=2):
+        row = {key.strip().lower(): (value or "") for key, value in row.items() if key}
+        try:
+            nominal = _parse_decimal(row["nominal"]) if row.get("nominal", "").strip() else Decimal(1)
+            rate = (_parse_decimal(row["rate"]) / nominal).quantize(_RATE_PRECISION)
+            currency = row["currency"].strip().upper()
+            if len(currency) != 3 or rate <= 0:
+                raise ValueError("неверная валюта или курс")
+            yield currency, _parse_day(row["date"]), rate
+        except (ValueError, ArithmeticError) as e:
+            raise RateFileError(f"Строка {line}: {e}")
+
+
+def store_rates(connection: Connection, rows: List[dict]) -> None:
+    """Записать курсы (upsert по валюте и дню)"""
+    upsert(
+        connection, ExchangeRate.__table__, rows,
+        index_elements=["currency", "day"],
+        set_=lambda excluded: {"rate": excluded.rate},
+    )
+
+
+def load_rates(db: Session, rates: Iterable[RateRow]) -> int:
+    """Загрузить курсы пачками в одной транзакции; возвращает число строк"""
+    loaded = 0
+    batch: Dict[Tuple[str, date], dict] = {}
+    connection = db.connection()
+    for currency, day, rate in rates:
+        batch[(currency, day)] = {"currency": currency, "day": day, "rate": rate}
+        if len(batch) >= _BATCH_SIZE:
+            store_rates(connection, list(batch.values()))
+            loaded += len(batch)
+            batch.clear()
+    if batch:
+        store_rates(connection, list(batch.values()))
+        loaded += len(batch)
+    db.commit()
+    fx_rates.invalidate()
+    return loaded
+
+
+def load_rates_file(db: Session, path: str, encoding: str = "utf-8-sig") -> int:
+    with open(path, encoding=encoding, newline="") as stream:
+        return load_rates(db, read_rates(stream))
+
+
+def load_configured_rates() -> None:
+    """Загрузка курсов из settings.fx_rates_file при старте"""
+    if not settings.fx_rates_file:
+        return
+    db = SessionLocal()
+    try:
+        loaded = load_rates_file(db, settings.fx_rates_file)
+        logger.info(f"Loaded {loaded} exchange rates from {settings.fx_rates_file}")
+    except (OSError, RateFileError) as e:
+        db.rollback()
+        logger.warning(f"Exchange rates not loaded from {settings.fx_rates_file}: {e}")
+    finally:
+        db.close()
+
+
+def convert_revenue_total(db: Session, revenue_by_currency: Dict[str, Decimal], target: Optional[str] = None) -> Tuple[Decimal, Set[str]]:
+    """Выручка по валютам в одной валюте по текущему курсу (для плитки дашборда)"""
+    return fx_rates.get(db).total(revenue_by_currency, target or settings.base_currency)
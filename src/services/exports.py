@@ -0,0 +1,174 @@
+"""
+Потоковая выгрузка клиентов и заявок в CSV / JSONL
+
+Строки читаются серверным курсором (yield_per) и кодируются порциями
+по ~64 КБ, при необходимости сжимаются gzip на лету. Результат выборки
+целиком в памяти не собирается ни на одном шаге, поэтому потребление
+памяти не зависит от объёма выгрузки.
+"""
+import csv
+import io
+import json
+import zlib
+from dataclasses import dataclass
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..models.business import Application, ApplicationStatus, Client
+
+CSV = "csv"
+JSONL = "jsonl"
+FORMATS = (CSV, JSONL)
+MEDIA_TYPES = {CSV: "text/csv; charset=utf-8", JSONL: "application/x-ndjson"}
+
+# Строк на одно чтение серверного курсора
+EXPORT_YIELD_PER = 2000
+_CHUNK_SIZE = 64 * 1024
+
+CLIENT_EXPORT_COLUMNS = (
+    ("id", Client.id),
+    ("last_name", Client.last_name),
+    ("first_name", Client.first_name),
+    ("middle_name", Client.middle_name),
+    ("email", Client.email),
+    ("phone", Client.phone),
+    ("passport_number", Client.passport_number),
+    ("date_of_birth", Client.date_of_birth),
+    ("status", Client.status),
+    ("created_at", Client.created_at),
+)
+
+APPLICATION_EXPORT_COLUMNS = (
+    ("id", Application.id),
+    ("application_number", Application.application_number),
+    ("title", Application.title),
+    ("type", Application.type),
+    ("status", Application.status),
+    ("client_id", Application.client_id),
+    ("client_last_name", Client.last_name),
+    ("client_first_name", Client.first_name),
+    ("client_middle_name", Client.middle_name),
+    ("destination", Application.destination),
+    ("departure_date", Application.departure_date),
+    ("return_date", Application.return_date),
+    ("adults_count", Application.adults_count),
+    ("children_count", Application.children_count),
+    ("estimated_cost", Application.estimated_cost),
+    ("final_cost", Application.final_cost),
+    ("currency", Application.currency),
+    ("assigned_to", Application.assigned_to),
+    ("created_at", Application.created_at),
+)
+
+
+@dataclass
+class ExportFilter:
+    organization_id: int
+    statuses: Sequence[ApplicationStatus] = ()
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
+    created_by: Optional[int] = None
+
+
+def _plain(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _client_query(filters: ExportFilter):
+    query = select(*[column for _, column in CLIENT_EXPORT_COLUMNS]).where(
+        Client.organization_id == filters.organization_id
+    )
+    if filters.created_by is not None:
+        query = query.where(Client.created_by == filters.created_by)
+    if filters.created_from is not None:
+        query = query.where(Client.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        query = query.where(Client.created_at < filters.created_to)
+    return query.order_by(Client.id)
+
+
+def _application_query(filters: ExportFilter):
+    query = (
+        select(*[column for _, column in APPLICATION_EXPORT_COLUMNS])
+        .join(Client, Client.id == Application.client_id)
+        .where(Application.organization_id == filters.organization_id)
+    )
+    if filters.statuses:
+        query = query.where(Application.status.in_(filters.statuses))
+    if filters.created_from is not None:
+        query = query.where(Application.created_at >= filters.created_from)
+    if filters.created_to is not None:
+        query = query.where(Application.created_at < filters.created_to)
+    return query.order_by(Application.id)
+
+
+EXPORTS = {
+    "clients": (CLIENT_EXPORT_COLUMNS, _client_query),
+    "applications": (APPLICATION_EXPORT_COLUMNS, _application_query),
+}
+
+
+def iter_export_rows(db: Session, kind: str, filters: ExportFilter) -> Tuple[List[str], Iterator[tuple]]:
+    """Заголовки и строки выгрузки; строки читаются серверным курсором порциями EXPORT_YIELD_PER"""
+    columns, build_query = EXPORTS[kind]
+    result = db.execute(build_query(filters).execution_options(yield_per=EXPORT_YIELD_PER))
+    return [name for name, _ in columns], iter(result)
+
+
+def encode_csv(header: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    """CSV в UTF-8 с BOM (корректно открывается в Excel), порциями ~64 КБ"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    buffer.write("﻿")
+    writer.writerow(header)
+    for row in rows:
+        writer.writerow([_plain(value) for value in row])
+        if buffer.tell() >= _CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def encode_jsonl(header: List[str], rows: Iterable[tuple]) -> Iterator[bytes]:
+    """Один JSON-объект на строку, порциями ~64 КБ"""
+    parts, size = [], 0
+    for row in rows:
+        line = json.dumps(
+            {name: _plain(value) for name, value in zip(header, row)}, ensure_ascii=False
+        ) + "\n"
+        parts.append(line)
+        size += len(line)
+        if size >= _CHUNK_SIZE:
+            yield "".join(parts).encode()
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts).encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Потоковое сжатие gzip без буферизации всего результата"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(
+    db: Session, kind: str, filters: ExportFilter, fmt: str = CSV, compress: bool = False
+) -> Iterator[bytes]:
+    """Байты выгрузки kind ('clients' / 'applications') в формате fmt"""
+    header, rows = iter_export_rows(db, kind, filters)
+    chunks = encode_csv(header, rows) if fmt == CSV else encode_jsonl(header, rows)
+    return gzip_chunks(chunks) if compress else chunks
@@ -0,0 +1,488 @@
+"""
+Потоковый импорт клиентов и заявок из CSV/XLSX
+
+Файл читается построчно и обрабатывается пачками по import_batch_size
+строк: пачка проверяется Pydantic-схемой, дубликаты отсеиваются по
+индексу ключей в памяти, оставшиеся строки вставляются одним
+executemany-INSERT в отдельной транзакции. Вставка идёт в обход ORM,
+поэтому счётчики статистики, версии входящих и поисковые ключи
+обновляются здесь явно. После каждой пачки выдаётся отчёт о ходе импорта.
+
+Импорт через API выполняет задача очереди "imports.run": загруженный файл
+кладётся в объектное хранилище, воркер скачивает его, импортирует и
+сохраняет итоговый отчёт результатом задачи.
+"""
+import csv
+import io
+import itertools
+import logging
+import os
+import re
+import tempfile
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Type
+from pydantic import BaseModel, TypeAdapter, ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..jobs import job_handler
+from ..models.business import Application, Client
+from ..schemas.imports import ApplicationImportRow, ClientImportRow, ImportReport, ImportRowError
+from ..settings import settings
+from ..storage import get_storage
+from .application_numbers import application_numbers
+from .client_search import email_key, passport_key, replace_client_search_keys
+from .inbox import bump_inbox_versions, inbox_key
+from .statistics import application_deltas, apply_stat_deltas, client_deltas
+
+logger = logging.getLogger(__name__)
+
+CLIENTS = "clients"
+APPLICATIONS = "applications"
+
+MAX_BATCH_SIZE = 20000
+
+# Допустимые заголовки колонок (без учёта регистра, пробелов и "_")
+CLIENT_COLUMNS = {
+    "first_name": ("first_name", "first name", "имя"),
+    "last_name": ("last_name", "last name", "surname", "фамилия"),
+    "middle_name": ("middle_name", "middle name", "patronymic", "отчество"),
+    "email": ("email", "e-mail", "почта", "эл. почта"),
+    "phone": ("phone", "телефон"),
+    "date_of_birth": ("date_of_birth", "birth_date", "дата рождения"),
+    "passport_number": ("passport_number", "passport", "паспорт", "номер паспорта"),
+    "passport_issued_date": ("passport_issued_date", "дата выдачи паспорта"),
+    "passport_expires_date": ("passport_expires_date", "паспорт действителен до"),
+    "status": ("status", "статус"),
+    "notes": ("notes", "заметки", "примечание"),
+}
+APPLICATION_COLUMNS = {
+    "application_number": ("application_number", "number", "номер", "номер заявки"),
+    "title": ("title", "название"),
+    "type": ("type", "тип"),
+    "status": ("status", "статус"),
+    "client_id": ("client_id",),
+    "client_email": ("client_email", "email клиента"),
+    "client_passport": ("client_passport", "паспорт клиента"),
+    "description": ("description", "описание"),
+    "destination": ("destination", "направление"),
+    "departure_date": ("departure_date", "дата вылета"),
+    "return_date": ("return_date", "дата возвращения"),
+    "adults_count": ("adults_count", "взрослых"),
+    "children_count": ("children_count", "детей"),
+    "estimated_cost": ("estimated_cost", "предварительная стоимость"),
+    "final_cost": ("final_cost", "стоимость"),
+    "currency": ("currency", "валюта"),
+    "special_requirements": ("special_requirements", "особые пожелания"),
+}
+
+Record = Tuple[int, Dict[str, object]]
+
+
+class ImportFormatError(ValueError):
+    """Файл не удаётся прочитать как таблицу"""
+
+
+def _normalize_header(value) -> str:
+    return re.sub(r"[\s_]+", " ", str(value or "").strip().lower())
+
+
+def _header_map(columns: Dict[str, Sequence[str]]) -> Dict[str, str]:
+    return {_normalize_header(alias): field for field, aliases in columns.items() for alias in aliases}
+
+
+def _field_names(header: Sequence, columns: Dict[str, Sequence[str]]) -> List[Optional[str]]:
+    aliases = _header_map(columns)
+    fields = [aliases.get(_normalize_header(name)) for name in header]
+    if not any(fields):
+        raise ImportFormatError("Не распознан ни один заголовок колонки")
+    return fields
+
+
+def _iter_records(fields: List[Optional[str]], rows: Iterable[Tuple[int, Sequence]]) -> Iterator[Record]:
+    for line, values in rows:
+        if not any(value not in (None, "") for value in values):
+            continue
+        yield line, {field: value for field, value in zip(fields, values) if field}
+
+
+def read_csv(stream: BinaryIO, columns: Dict[str, Sequence[str]], encoding: str = "utf-8-sig") -> Iterator[Record]:
+    """Строки CSV (разделитель , ; или табуляция определяется по заголовку)"""
+    text = io.TextIOWrapper(stream, encoding=encoding, newline="")
+    try:
+        header_line = text.readline()
+    except UnicodeDecodeError:
+        raise ImportFormatError(f"Файл не в кодировке {encoding}")
+    if not header_line:
+        raise ImportFormatError("Пустой файл")
+    delimiter = max(",;\t", key=header_line.count)
+    reader = csv.reader(itertools.chain([header_line], text), delimiter=delimiter)
+    fields = _field_names(next(reader), columns)
+    return _iter_records(fields, ((reader.line_num, row) for row in reader))
+
+
+def _closing_records(workbook, records: Iterator[Record]) -> Iterator[Record]:
+    try:
+        yield from records
+    finally:
+        workbook.close()
+
+
+def read_xlsx(stream: BinaryIO, columns: Dict[str, Sequence[str]]) -> Iterator[Record]:
+    """Строки первого листа XLSX в режиме read-only (лист не загружается целиком)"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportFormatError("Для импорта XLSX установите openpyxl")
+
+    try:
+        workbook = load_workbook(stream, read_only=True, data_only=True)
+    except Exception as e:
+        raise ImportFormatError(f"Не удалось открыть XLSX: {e}")
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            raise ImportFormatError("Пустой файл")
+        fields = _field_names(header, columns)
+    except Exception:
+        workbook.close()
+        raise
+    return _closing_records(workbook, _iter_records(fields, enumerate(rows, start=2)))
+
+
+def read_records(stream: BinaryIO, filename: str, kind: str, encoding: str = "utf-8-sig") -> Iterator[Record]:
+    """
+    Строки файла как (номер строки, {поле: значение}).
+
+    Заголовок читается сразу: ImportFormatError для нераспознанного файла
+    возникает до начала импорта.
+    """
+    columns = CLIENT_COLUMNS if kind == CLIENTS else APPLICATION_COLUMNS
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        return read_xlsx(stream, columns)
+    return read_csv(stream, columns, encoding)
+
+
+def check_header(stream: BinaryIO, filename: str, kind: str, encoding: str = "utf-8-sig") -> None:
+    """Проверить, что файл читается и заголовок распознан (до постановки импорта в очередь)"""
+    records = read_records(stream, filename, kind, encoding)
+    try:
+        next(records, None)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportFormatError(f"Ошибка чтения файла: {e}")
+    finally:
+        records.close()
+
+
+def _format_errors(error: ValidationError) -> List[str]:
+    messages = []
+    for item in error.errors():
+        location = ".".join(str(part) for part in item["loc"] if not isinstance(part, int))
+        messages.append(f"{location}: {item['msg']}" if location else item["msg"])
+    return messages
+
+
+@lru_cache(maxsize=None)
+def _batch_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    return TypeAdapter(List[model])
+
+
+def validate_batch(
+    model: Type[BaseModel], records: Sequence[Record]
+) -> Tuple[List[Tuple[int, BaseModel]], List[ImportRowError]]:
+    """Проверить пачку одним вызовом; при ошибках - построчно, чтобы собрать ошибки строк"""
+    try:
+        rows = _batch_adapter(model).validate_python([data for _, data in records])
+        return [(line, row) for (line, _), row in zip(records, rows)], []
+    except ValidationError:
+        pass
+
+    valid, errors = [], []
+    for line, data in records:
+        try:
+            valid.append((line, model.model_validate(data)))
+        except ValidationError as e:
+            errors.append(ImportRowError(line=line, errors=_format_errors(e)))
+    return valid, errors
+
+
+class ClientKeyIndex:
+    """Email и паспорт -> id клиента организации; загружается один раз на импорт"""
+
+    def __init__(self):
+        self.by_email: Dict[str, int] = {}
+        self.by_passport: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, db: Session, organization_id: int) -> "ClientKeyIndex":
+        index = cls()
+        rows = db.execute(
+            select(Client.id, Client.email, Client.passport_number)
+            .where(Client.organization_id == organization_id)
+            .execution_options(yield_per=10000)
+        )
+        for client_id, email, passport in rows:
+            index.add(client_id, email, passport)
+        return index
+
+    def find(self, email: Optional[str] = None, passport: Optional[str] = None) -> Optional[int]:
+        email, passport = email_key(email), passport_key(passport)
+        if email and email in self.by_email:
+            return self.by_email[email]
+        if passport and passport in self.by_passport:
+            return self.by_passport[passport]
+        return None
+
+    def add(self, client_id: int, email: Optional[str] = None, passport: Optional[str] = None) -> None:
+        email, passport = email_key(email), passport_key(passport)
+        if email:
+            self.by_email.setdefault(email, client_id)
+        if passport:
+            self.by_passport.setdefault(passport, client_id)
+
+    def __len__(self) -> int:
+        return len(self.by_email) + len(self.by_passport)
+
+
+class _Importer(ABC):
+    kind = ""
+    model: Type[BaseModel] = BaseModel
+
+    def __init__(self, db: Session, organization_id: int, created_by: int, batch_size: Optional[int] = None):
+        self.db = db
+        self.organization_id = organization_id
+        self.created_by = created_by
+        self.batch_size = max(1, min(batch_size or settings.import_batch_size, MAX_BATCH_SIZE))
+        self.report = ImportReport(kind=self.kind)
+
+    def add_errors(self, errors: Iterable[ImportRowError]) -> None:
+        for error in errors:
+            self.report.failed += 1
+            if len(self.report.errors) < settings.import_max_errors:
+                self.report.errors.append(error)
+
+    def run(self, records: Iterable[Record]) -> Iterator[ImportReport]:
+        """Выполнить импорт, выдавая отчёт после каждой пачки (последний - с finished=True)"""
+        records = iter(records)
+        while True:
+            try:
+                batch = list(itertools.islice(records, self.batch_size))
+            except (UnicodeDecodeError, csv.Error) as e:
+                # Уже импортированные пачки остаются; отчёт завершается ошибкой чтения
+                self.report.error = f"Ошибка чтения файла после строки {self.report.rows + 1}: {e}"
+                break
+            if not batch:
+                break
+            self.report.rows += len(batch)
+            valid, errors = validate_batch(self.model, batch)
+            self.add_errors(errors)
+            if valid:
+                try:
+                    self.insert_batch(valid)
+                    self.db.commit()
+                except SQLAlchemyError as e:
+                    self.db.rollback()
+                    self.rollback_batch()
+                    message = f"Ошибка записи пачки: {e.__class__.__name__}: {str(e).splitlines()[0]}"
+                    self.add_errors(ImportRowError(line=line, errors=[message]) for line, _ in valid)
+            yield self.report
+        self.report.finished = True
+        yield self.report
+
+    @abstractmethod
+    def insert_batch(self, rows: List[Tuple[int, BaseModel]]) -> None:
+        """Записать проверенные строки пачки (коммит делает run)"""
+
+    def rollback_batch(self) -> None:
+        pass
+
+
+class ClientImporter(_Importer):
+    """Импорт клиентов; дубликаты по email/паспорту (в базе и в файле) пропускаются"""
+    kind = CLIENTS
+    model = ClientImportRow
+
+    def __init__(self, db: Session, organization_id: int, created_by: int, batch_size: Optional[int] = None):
+        super().__init__(db, organization_id, created_by, batch_size)
+        self.index = ClientKeyIndex.load(db, organization_id)
+        self._pending: List[Tuple[int, Optional[str], Optional[str]]] = []
+
+    def insert_batch(self, rows: List[Tuple[int, ClientImportRow]]) -> None:
+        self._pending = []
+        values = []
+        batch_index = ClientKeyIndex()
+        for _, row in rows:
+            if self.index.find(row.email, row.passport_number) or batch_index.find(row.email, row.passport_number):
+                self.report.duplicates += 1
+                continue
+            batch_index.add(0, row.email, row.passport_number)
+            values.append({
+                **row.model_dump(),
+                "organization_id": self.organization_id,
+                "created_by": self.created_by,
+            })
+        if not values:
+            return
+
+        table = Client.__table__
+        connection = self.db.connection()
+        ids = connection.execute(
+            insert(table).returning(table.c.id, sort_by_parameter_order=True), values
+        ).scalars().all()
+        for client_id, value in zip(ids, values):
+            value["id"] = client_id
+
+        replace_client_search_keys(connection, values)
+        deltas: Counter = Counter()
+        for value in values:
+            deltas.update(client_deltas(self.organization_id, None))
+        apply_stat_deltas(connection, deltas)
+
+        self._pending = [(value["id"], value.get("email"), value.get("passport_number")) for value in values]
+        for client_id, email, passport in self._pending:
+            self.index.add(client_id, email, passport)
+        self.report.inserted += len(values)
+
+    def rollback_batch(self) -> None:
+        # Ключи пачки попадают в индекс только до коммита; при откате строим индекс заново
+        if self._pending:
+            self.index = ClientKeyIndex.load(self.db, self.organization_id)
+            self.report.inserted -= len(self._pending)
+        self._pending = []
+
+
+class ApplicationImporter(_Importer):
+    """
+    Импорт заявок; клиент ищется по id, email или паспорту, номер заявки не
+    должен повторяться. Строкам без номера номера выдаются из блока
+    application_numbers до записи пачки.
+    """
+    kind = APPLICATIONS
+    model = ApplicationImportRow
+
+    def __init__(self, db: Session, organization_id: int, created_by: int, batch_size: Optional[int] = None):
+        super().__init__(db, organization_id, created_by, batch_size)
+        self.index = ClientKeyIndex.load(db, organization_id)
+        self._inserted_in_batch = 0
+
+    def _known_client_ids(self, rows: Sequence[ApplicationImportRow]) -> Set[int]:
+        requested = {row.client_id for row in rows if row.client_id is not None}
+        if not requested:
+            return set()
+        return set(self.db.execute(
+            select(Client.id).where(Client.organization_id == self.organization_id, Client.id.in_(requested))
+        ).scalars())
+
+    def _existing_numbers(self, rows: Sequence[ApplicationImportRow]) -> Set[str]:
+        numbers = [row.application_number for row in rows if row.application_number is not None]
+        if not numbers:
+            return set()
+        return set(self.db.execute(
+            select(Application.application_number).where(Application.application_number.in_(numbers))
+        ).scalars())
+
+    def insert_batch(self, rows: List[Tuple[int, ApplicationImportRow]]) -> None:
+        models = [row for _, row in rows]
+        known_clients = self._known_client_ids(models)
+        taken = self._existing_numbers(models)
+
+        values, errors = [], []
+        for line, row in rows:
+            if row.application_number in taken:
+                self.report.duplicates += 1
+                continue
+            client_id = row.client_id if row.client_id in known_clients else self.index.find(
+                row.client_email, row.client_passport
+            )
+            if client_id is None:
+                errors.append(ImportRowError(line=line, errors=["Клиент не найден в организации"]))
+                continue
+            if row.application_number is not None:
+                taken.add(row.application_number)
+            data = row.model_dump(exclude={"client_id", "client_email", "client_passport"})
+            values.append({
+                **data,
+                "client_id": client_id,
+                "organization_id": self.organization_id,
+                "created_by": self.created_by,
+            })
+        self.add_errors(errors)
+        self._inserted_in_batch = 0
+        if not values:
+            return
+
+        unnumbered = [value for value in values if value["application_number"] is None]
+        for value, number in zip(unnumbered, application_numbers.allocate(self.organization_id, len(unnumbered))):
+            value["application_number"] = number
+        connection = self.db.connection()
+        connection.execute(insert(Application.__table__), values)
+        deltas: Counter = Counter()
+        for value in values:
+            deltas.update(application_deltas(
+                self.organization_id, value["status"], value.get("final_cost"), value["currency"]
+            ))
+        apply_stat_deltas(connection, deltas)
+        # Импортированные заявки без ответственного - во входящих нераспределённых
+        bump_inbox_versions(connection, [inbox_key(self.organization_id, None)])
+        self._inserted_in_batch = len(values)
+        self.report.inserted += len(values)
+
+    def rollback_batch(self) -> None:
+        self.report.inserted -= self._inserted_in_batch
+        self._inserted_in_batch = 0
+
+
+IMPORTERS = {CLIENTS: ClientImporter, APPLICATIONS: ApplicationImporter}
+
+
+def run_import(
+    db: Session,
+    kind: str,
+    stream: BinaryIO,
+    filename: str,
+    organization_id: int,
+    created_by: int,
+    batch_size: Optional[int] = None,
+    encoding: str = "utf-8-sig",
+) -> Iterator[ImportReport]:
+    """Импорт файла kind (clients / applications); отчёты о ходе после каждой пачки"""
+    records = read_records(stream, filename, kind, encoding)
+    importer = IMPORTERS[kind](db, organization_id, created_by, batch_size)
+    return importer.run(records)
+
+
+IMPORT_JOB = "imports.run"
+
+
+@job_handler(IMPORT_JOB)
+def import_job(payload: dict) -> dict:
+    """
+    Задача очереди: импорт файла из хранилища (object_key); результат -
+    итоговый отчёт. Файл удаляется из хранилища после импорта.
+    """
+    storage = get_storage()
+    fd, path = tempfile.mkstemp(prefix="import-", suffix=os.path.splitext(payload["filename"])[1])
+    os.close(fd)
+    db = SessionLocal()
+    try:
+        storage.download_file(payload["object_key"], path)
+        with open(path, "rb") as stream:
+            report = None
+            for report in run_import(
+                db, payload["kind"], stream, payload["filename"], payload["organization_id"],
+                payload["created_by"], payload.get("batch_size"), payload.get("encoding", "utf-8-sig"),
+            ):
+                pass
+        logger.info(
+            f"Import of {report.kind}: {report.inserted} inserted, "
+            f"{report.duplicates} duplicates, {report.failed} failed"
+        )
+        return report.model_dump(mode="json")
+    finally:
+        db.close()
+        os.unlink(path)
+        storage.delete([payload["object_key"]])
@@ -0,0 +1,179 @@
+"""
+Входящие заявки менеджера
+
+Список - заявки ответственного в заданных статусах в порядке даты вылета,
+выбираемые range scan по индексам ix_applications_*. Для условных запросов
+поддерживается версия входящих (application_inbox_versions): она
+увеличивается в той же транзакции, что и изменение любой заявки
+ответственного, так что ETag из версии одинаков на всех воркерах и
+проверка If-None-Match не читает сами заявки.
+
+Массовые операции в обход ORM должны сами вызывать bump_inbox_versions.
+"""
+import hashlib
+from typing import Iterable, List, Optional, Sequence, Set, Tuple
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from ..database import upsert
+from ..models.business import (
+    INBOX_COLUMNS,
+    OPEN_APPLICATION_STATUS_CLAUSE,
+    OPEN_APPLICATION_STATUSES,
+    Application,
+    ApplicationStatus,
+)
+from ..models.inbox import ApplicationInboxVersion
+from ._history import previous_value, track_previous_values
+from .pagination import MAX_PAGE_SIZE
+
+# Ключ версии для нераспределённых заявок
+UNASSIGNED = 0
+
+# Меняется вместе с форматом ответа, чтобы старые ETag не совпали
+_ETAG_FORMAT = "inbox-v1"
+_PENDING_KEY = "application_inbox_bumps"
+
+InboxKey = Tuple[int, int]
+
+
+def inbox_key(organization_id: Optional[int], assigned_to: Optional[int]) -> InboxKey:
+    return organization_id, assigned_to or UNASSIGNED
+
+
+def bump_inbox_versions(connection: Connection, keys: Iterable[InboxKey]) -> None:
+    """Увеличить версии входящих (organization_id, assignee_id)"""
+    rows = [
+        {"organization_id": org_id, "assignee_id": assignee_id, "version": 1}
+        for org_id, assignee_id in sorted(set(keys))
+        if org_id is not None
+    ]
+    if not rows:
+        return
+    table = ApplicationInboxVersion.__table__
+    upsert(
+        connection, table, rows,
+        index_elements=["organization_id", "assignee_id"],
+        set_=lambda excluded: {"version": table.c.version + 1},
+    )
+
+
+# Прежний ответственный нужен, чтобы сбросить и его входящие
+track_previous_values(Application.assigned_to)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_inbox_bumps(session: Session, flush_context, instances):
+    keys: Set[InboxKey] = set()
+    for obj in session.dirty:
+        if not isinstance(obj, Application) or not session.is_modified(obj, include_collections=False):
+            continue
+        state = inspect(obj)
+        keys.add(inbox_key(previous_value(state, "organization_id"), previous_value(state, "assigned_to")))
+        keys.add(inbox_key(obj.organization_id, obj.assigned_to))
+    for obj in session.deleted:
+        if isinstance(obj, Application):
+            keys.add(inbox_key(obj.organization_id, obj.assigned_to))
+    if keys:
+        session.info[_PENDING_KEY] = keys
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_inbox_versions(session: Session, flush_context):
+    keys = session.info.pop(_PENDING_KEY, set())
+    for obj in session.new:
+        if isinstance(obj, Application):
+            keys.add(inbox_key(obj.organization_id, obj.assigned_to))
+    if keys:
+        bump_inbox_versions(session.connection(), keys)
+
+
+def get_inbox_version(db: Session, organization_id: int, assigned_to: Optional[int]) -> int:
+    """Текущая версия входящих: одно чтение по первичному ключу"""
+    org_id, assignee_id = inbox_key(organization_id, assigned_to)
+    version = db.execute(
+        select(ApplicationInboxVersion.version).where(
+            ApplicationInboxVersion.organization_id == org_id,
+            ApplicationInboxVersion.assignee_id == assignee_id,
+        )
+    ).scalar()
+    return version or 0
+
+
+def inbox_etag(
+    organization_id: int,
+    assigned_to: Optional[int],
+    version: int,
+    statuses: Sequence[ApplicationStatus],
+    limit: int,
+) -> str:
+    """Сильный ETag списка: версия входящих плюс параметры выборки"""
+    raw = ":".join([
+        _ETAG_FORMAT,
+        str(organization_id),
+        str(assigned_to or UNASSIGNED),
+        str(version),
+        ",".join(sorted(status.name for status in statuses)),
+        str(limit),
+    ])
+    return '"{}"'.format(hashlib.sha1(raw.encode()).hexdigest()[:24])
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Сравнение If-None-Match (список или *) с ETag; W/ игнорируется (слабое сравнение)"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def _status_condition(statuses: Sequence[ApplicationStatus]):
+    if set(statuses) == set(OPEN_APPLICATION_STATUSES):
+        # Дословно условие ix_applications_open_inbox
+        return text(OPEN_APPLICATION_STATUS_CLAUSE)
+    return Application.status.in_(statuses)
+
+
+def list_inbox(
+    db: Session,
+    organization_id: int,
+    assigned_to: Optional[int],
+    statuses: Sequence[ApplicationStatus] = OPEN_APPLICATION_STATUSES,
+    limit: int = 50,
+) -> List:
+    """
+    Входящие ответственного (assigned_to=None - нераспределённые) в порядке
+    (departure_date, id); заявки без даты вылета - в конце.
+
+    Две выборки вместо ORDER BY ... NULLS LAST: так порядок берётся из
+    индекса и в SQLite, и в PostgreSQL, без сортировки всего множества.
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    if not statuses:
+        return []
+    columns = [getattr(Application, name) for name in INBOX_COLUMNS]
+    base = select(*columns).where(
+        Application.organization_id == organization_id,
+        Application.assigned_to == assigned_to if assigned_to else Application.assigned_to.is_(None),
+        _status_condition(statuses),
+    )
+
+    rows = list(db.execute(
+        base.where(Application.departure_date.is_not(None))
+        .order_by(Application.departure_date, Application.id)
+        .limit(limit)
+    ))
+    if len(rows) < limit:
+        rows.extend(db.execute(
+            base.where(Application.departure_date.is_(None))
+            .order_by(Application.id)
+            .limit(limit - len(rows))
+        ))
+    return rows
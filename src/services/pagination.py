@@ -0,0 +1,38 @@
+"""
+Курсоры keyset-пагинации
+
+Курсор - непрозрачная строка (urlsafe base64 от JSON) со значениями ключа
+сортировки последней строки страницы. Следующая страница выбирается
+условием (ключ) > (курсор) по индексу, поэтому глубина страницы не влияет
+на стоимость запроса.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException, status
+
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(*values) -> str:
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str], size: int) -> Optional[List]:
+    """Значения ключа из курсора; 400 для повреждённого курсора"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, UnicodeDecodeError):
+        values = None
+    if not isinstance(values, list) or len(values) != size:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Некорректный курсор пагинации"
+        )
+    return values
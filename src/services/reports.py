@@ -0,0 +1,502 @@
+"""
+Отчёты о выручке на материализованных дневных сводках
+
+revenue_daily_rollups хранит по дням агрегаты заявок в разрезе организации,
+типа, направления, менеджера и валюты. Сводка обновляется инкрементально:
+фоновая задача выбирает дни, в которых с прошлых водяных знаков появились
+(id больше учтённого) или изменились (updated_at не раньше учтённого)
+заявки, и пересчитывает эти дни целиком одним INSERT ... SELECT. Удаление заявки
+или перенос в другую организацию водяной знак не сдвигают, поэтому такие
+дни отмечаются в revenue_rollup_dirty_days обработчиком сессии.
+
+Массовые UPDATE в обход ORM попадают в сводку сами: onupdate проставляет
+updated_at. Удаления в обход ORM должны вызывать mark_rollup_days_dirty.
+
+Дни сводки - календарные дни created_at в UTC, независимо от часового
+пояса сессии БД.
+
+Месячные, квартальные и годовые отчёты (с прошлым годом для сравнения)
+строятся только по сводке задачами очереди "reports.build"; результат
+хранится в задаче, а ключ идемпотентности из параметров и версии сводки
+возвращает уже построенный (или строящийся) отчёт любому веб-процессу -
+таблица applications в отчётах не читается.
+"""
+import asyncio
+import hashlib
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Date, and_, case, delete, event, func, insert, inspect, or_, select, tuple_
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+from ..database import SessionLocal, insert_ignore
+from ..jobs import JobStatus, enqueue, get_job_queue, job_handler
+from ..models.business import Application, ApplicationType
+from ..models.reports import ReportRefreshState, RevenueDailyRollup, RevenueRollupDirtyDay
+from ..schemas.jobs import JobInfo
+from ..schemas.reports import ReportJob, RevenueReport, RevenueReportRequest, RevenueReportRow, RollupRefreshResult
+from ..settings import settings
+from .currency import fx_rates
+from .statistics import REVENUE_STATUSES
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_NAME = "revenue_daily"
+REVENUE = "revenue"
+
+# Дней организации на один пересчёт
+_DAYS_PER_STATEMENT = 64
+
+DayKey = Tuple[int, date]
+
+DIMENSION_COLUMNS = {
+    "type": RevenueDailyRollup.type,
+    "destination": RevenueDailyRollup.destination,
+    "manager": RevenueDailyRollup.manager_id,
+}
+
+_ROLLUP_COLUMNS = [
+    "organization_id", "day", "type", "destination", "manager_id", "currency",
+    "applications", "paid_applications", "revenue",
+]
+
+
+class utc_date(FunctionElement):
+    """Дата момента времени в UTC (func.date зависит от часового пояса сессии PostgreSQL)"""
+    type = Date()
+    name = "utc_date"
+    inherit_cache = True
+
+
+@compiles(utc_date)
+def _compile_utc_date(element, compiler, **kw):
+    # SQLite и остальные хранят время без пояса, в UTC
+    return f"date({compiler.process(element.clauses, **kw)})"
+
+
+@compiles(utc_date, "postgresql")
+def _compile_utc_date_postgresql(element, compiler, **kw):
+    return f"CAST(({compiler.process(element.clauses, **kw)}) AT TIME ZONE 'UTC' AS DATE)"
+
+
+def _rollup_select(*criteria):
+    """Агрегаты заявок по дням и разрезам сводки"""
+    day = utc_date(Application.created_at)
+    is_revenue = Application.status.in_(REVENUE_STATUSES)
+    dimensions = (
+        Application.organization_id,
+        day,
+        Application.type,
+        func.coalesce(Application.destination, ""),
+        func.coalesce(Application.assigned_to, 0),
+        Application.currency,
+    )
+    return (
+        select(
+            *dimensions,
+            func.count(),
+            func.sum(case((is_revenue, 1), else_=0)),
+            func.coalesce(func.sum(case((is_revenue, Application.final_cost), else_=None)), 0),
+        )
+        .where(Application.created_at.is_not(None), *criteria)
+        .group_by(*dimensions)
+    )
+
+
+def _insert_rollups(connection: Connection, *criteria) -> None:
+    connection.execute(
+        insert(RevenueDailyRollup.__table__).from_select(_ROLLUP_COLUMNS, _rollup_select(*criteria))
+    )
+
+
+def _day_range(day: date):
+    start = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return and_(Application.created_at >= start, Application.created_at < start + timedelta(days=1))
+
+
+def _rebuild_days(connection: Connection, days: Iterable[DayKey]) -> int:
+    """Пересчитать сводку за указанные дни организаций"""
+    by_organization: Dict[int, List[date]] = defaultdict(list)
+    for organization_id, day in days:
+        by_organization[organization_id].append(day)
+
+    rollups = RevenueDailyRollup.__table__
+    rebuilt = 0
+    for organization_id, org_days in sorted(by_organization.items()):
+        org_days.sort()
+        for i in range(0, len(org_days), _DAYS_PER_STATEMENT):
+            chunk = org_days[i:i + _DAYS_PER_STATEMENT]
+            connection.execute(
+                delete(rollups).where(rollups.c.organization_id == organization_id, rollups.c.day.in_(chunk))
+            )
+            _insert_rollups(
+                connection,
+                Application.organization_id == organization_id,
+                or_(*[_day_range(day) for day in chunk]),
+            )
+            rebuilt += len(chunk)
+    return rebuilt
+
+
+def _rollup_day(value: Optional[datetime]) -> Optional[date]:
+    if value is None:
+        return None
+    # SQLite возвращает время без пояса - оно уже в UTC
+    return value.astimezone(timezone.utc).date() if value.tzinfo is not None else value.date()
+
+
+def mark_rollup_days_dirty(connection: Connection, days: Iterable[DayKey]) -> None:
+    """Отметить дни для пересчёта (удаления и переносы заявок, не сдвигающие водяной знак)"""
+    rows = [
+        {"organization_id": organization_id, "day": day}
+        for organization_id, day in sorted(set(days))
+        if organization_id is not None and day is not None
+    ]
+    if not rows:
+        return
+    insert_ignore(connection, RevenueRollupDirtyDay.__table__, rows)
+
+
+_PENDING_KEY = "revenue_rollup_dirty_days"
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_dirty_rollup_days(session: Session, flush_context, instances):
+    days: Set[DayKey] = set()
+    for obj in session.deleted:
+        if isinstance(obj, Application):
+            days.add((obj.organization_id, _rollup_day(obj.created_at)))
+    for obj in session.dirty:
+        if not isinstance(obj, Application):
+            continue
+        # Прежнее значение сохраняется благодаря track_previous_values (см. statistics)
+        history = inspect(obj).attrs.organization_id.history
+        if history.deleted and history.deleted[0] != obj.organization_id:
+            days.add((history.deleted[0], _rollup_day(obj.created_at)))
+    if days:
+        session.info.setdefault(_PENDING_KEY, set()).update(days)
+
+
+@event.listens_for(Session, "after_flush")
+def _store_dirty_rollup_days(session: Session, flush_context):
+    days = session.info.pop(_PENDING_KEY, None)
+    if days:
+        mark_rollup_days_dirty(session.connection(), days)
+
+
+def _refresh_state(db: Session) -> ReportRefreshState:
+    # FOR UPDATE: параллельные обновления сводки выполняются по очереди
+    state = db.get(ReportRefreshState, ROLLUP_NAME, with_for_update=True)
+    if state is None:
+        state = ReportRefreshState(name=ROLLUP_NAME, version=0)
+        db.add(state)
+        db.flush()
+    return state
+
+
+def refresh_revenue_rollups(db: Session) -> RollupRefreshResult:
+    """
+    Инкрементально обновить дневную сводку.
+
+    При первом запуске сводка строится целиком. Дальше пересчитываются дни
+    новых заявок (id больше last_id, в том числе вставленных с прошлой датой
+    создания, например импортом) и заявок, изменённых не раньше watermark
+    минус report_refresh_overlap_seconds: перекрытие учитывает транзакции,
+    которые зафиксировались позже, чем проставили updated_at.
+    """
+    state = _refresh_state(db)
+    connection = db.connection()
+    # Оба максимума берутся из индексов
+    watermark = db.scalar(select(func.max(Application.updated_at)))
+    last_id = db.scalar(select(func.max(Application.id))) or 0
+
+    full_rebuild = state.refreshed_at is None
+    dirty = []
+    if full_rebuild:
+        connection.execute(delete(RevenueDailyRollup.__table__))
+        connection.execute(delete(RevenueRollupDirtyDay.__table__))
+        _insert_rollups(connection)
+        days = db.scalar(select(func.count()).select_from(
+            select(RevenueDailyRollup.organization_id, RevenueDailyRollup.day).distinct().subquery()
+        ))
+    else:
+        if state.watermark is not None:
+            since = state.watermark - timedelta(seconds=settings.report_refresh_overlap_seconds)
+            updated = Application.updated_at >= since
+        else:
+            updated = Application.updated_at.is_not(None)
+        changed = or_(Application.id > state.last_id, updated)
+        touched_query = select(
+            Application.organization_id, utc_date(Application.created_at)
+        ).where(changed).distinct()
+        dirty = [tuple(row) for row in db.execute(
+            select(RevenueRollupDirtyDay.organization_id, RevenueRollupDirtyDay.day)
+        )]
+        touched = {tuple(row) for row in db.execute(touched_query) if row[1] is not None}
+        touched.update(dirty)
+        days = _rebuild_days(connection, touched)
+        if dirty:
+            table = RevenueRollupDirtyDay.__table__
+            for i in range(0, len(dirty), _DAYS_PER_STATEMENT):
+                connection.execute(delete(table).where(
+                    tuple_(table.c.organization_id, table.c.day).in_(dirty[i:i + _DAYS_PER_STATEMENT])
+                ))
+
+    # Повторный пересчёт дней из окна перекрытия данных не меняет - версия
+    # (а с ней кэш отчётов) сдвигается, только когда продвинулись водяные знаки
+    advanced = last_id > (state.last_id or 0) or (
+        watermark is not None and (state.watermark is None or watermark > state.watermark)
+    )
+    if full_rebuild or advanced or dirty:
+        state.version += 1
+    if watermark is not None and (state.watermark is None or watermark > state.watermark):
+        state.watermark = watermark
+    state.last_id = max(state.last_id or 0, last_id)
+    state.refreshed_at = datetime.now(timezone.utc)
+    result = RollupRefreshResult(
+        days=days or 0, full_rebuild=full_rebuild, version=state.version,
+        watermark=state.watermark, last_id=state.last_id,
+    )
+    db.commit()
+    return result
+
+
+@job_handler("reports.refresh_rollups")
+def refresh_rollups_job(payload: dict) -> dict:
+    """Задача очереди: внеочередное обновление дневной сводки"""
+    db = SessionLocal()
+    try:
+        return refresh_revenue_rollups(db).model_dump(mode="json")
+    finally:
+        db.close()
+
+
+def get_rollup_version(db: Session) -> int:
+    state = db.get(ReportRefreshState, ROLLUP_NAME)
+    return state.version if state is not None else 0
+
+
+def _sync_rollups() -> None:
+    db = SessionLocal()
+    try:
+        result = refresh_revenue_rollups(db)
+        if result.days:
+            logger.info(f"Revenue rollups refreshed: {result.days} days, version {result.version}")
+    except Exception:
+        db.rollback()
+        logger.exception("Revenue rollup refresh failed")
+    finally:
+        db.close()
+
+
+async def run_rollup_refresh(stop: asyncio.Event) -> None:
+    """Фоновая задача: периодическое обновление дневной сводки"""
+    while not stop.is_set():
+        await run_in_threadpool(_sync_rollups)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=settings.report_refresh_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+def period_start(day: date, period: str) -> date:
+    if period == "month":
+        return day.replace(day=1)
+    if period == "quarter":
+        return date(day.year, 3 * ((day.month - 1) // 3) + 1, 1)
+    return date(day.year, 1, 1)
+
+
+def period_label(start: date, period: str) -> str:
+    if period == "month":
+        return f"{start.year}-{start.month:02d}"
+    if period == "quarter":
+        return f"{start.year}-Q{(start.month - 1) // 3 + 1}"
+    return str(start.year)
+
+
+def _shift_year(day: date, years: int) -> date:
+    try:
+        return day.replace(year=day.year + years)
+    except ValueError:
+        # 29 февраля
+        return day.replace(year=day.year + years, day=28)
+
+
+def _period_totals(
+    db: Session, organization_id: int, date_from: date, date_to: date, period: str, group_by: List[str],
+    convert_to: Optional[str] = None, missing_rates: Optional[Set[str]] = None,
+) -> Dict[tuple, list]:
+    """
+    (начало периода, разрезы, валюта) -> [заявки, оплаченные, выручка]
+
+    С convert_to выручка всех дней пересчитывается одним пакетом по курсу
+    своего дня; суммы валют без курса остаются в исходной валюте.
+    """
+    rollup = RevenueDailyRollup
+    dimensions = [DIMENSION_COLUMNS[name] for name in group_by]
+    query = (
+        select(
+            rollup.day, *dimensions, rollup.currency,
+            func.sum(rollup.applications), func.sum(rollup.paid_applications), func.sum(rollup.revenue),
+        )
+        .where(rollup.organization_id == organization_id, rollup.day >= date_from, rollup.day < date_to)
+        .group_by(rollup.day, *dimensions, rollup.currency)
+    )
+    rows = db.execute(query).all()
+    if convert_to:
+        width = len(dimensions)
+        converted, missing = fx_rates.get(db).convert_amounts(
+            [row[width + 4] for row in rows], [row[width + 1] for row in rows], [row[0] for row in rows], convert_to,
+        )
+        rows = [
+            (*row[:width + 1], convert_to, *row[width + 2:width + 4], amount) if amount is not None else row
+            for row, amount in zip(rows, converted)
+        ]
+        if missing_rates is not None:
+            missing_rates.update(missing)
+
+    totals: Dict[tuple, list] = {}
+    for day, *values in rows:
+        dims = tuple(values[:len(dimensions)])
+        currency, applications, paid, revenue = values[len(dimensions):]
+        entry = totals.setdefault((period_start(day, period), dims, currency), [0, 0, Decimal(0)])
+        entry[0] += int(applications or 0)
+        entry[1] += int(paid or 0)
+        entry[2] += Decimal(revenue or 0)
+    return totals
+
+
+def _dimension_values(group_by: List[str], dims: tuple) -> dict:
+    values = {}
+    for name, value in zip(group_by, dims):
+        if name == "type":
+            values["type"] = ApplicationType[value]
+        elif name == "destination":
+            values["destination"] = value or None
+        elif name == "manager":
+            values["manager_id"] = value or None
+    return values
+
+
+def build_revenue_report(db: Session, organization_id: int, params: RevenueReportRequest) -> RevenueReport:
+    """Отчёт о выручке по периодам из дневной сводки (с прошлым годом при compare_previous_year)"""
+    version = get_rollup_version(db)
+    missing_rates: Set[str] = set()
+    current = _period_totals(
+        db, organization_id, params.date_from, params.date_to, params.period, params.group_by,
+        params.convert_to, missing_rates,
+    )
+    previous: Dict[tuple, list] = {}
+    if params.compare_previous_year:
+        shifted = _period_totals(
+            db, organization_id, _shift_year(params.date_from, -1), _shift_year(params.date_to, -1),
+            params.period, params.group_by, params.convert_to, missing_rates,
+        )
+        for (start, dims, currency), entry in shifted.items():
+            previous[(period_start(_shift_year(start, 1), params.period), dims, currency)] = entry
+
+    rows = []
+    totals: Dict[str, Decimal] = defaultdict(Decimal)
+    for key in sorted(set(current) | set(previous), key=lambda k: (k[0], tuple(str(d) for d in k[1]), k[2])):
+        start, dims, currency = key
+        applications, paid, revenue = current.get(key, (0, 0, Decimal(0)))
+        row = RevenueReportRow(
+            period=period_label(start, params.period),
+            period_start=start,
+            currency=currency,
+            applications=applications,
+            paid_applications=paid,
+            revenue=revenue,
+            **_dimension_values(params.group_by, dims),
+        )
+        if params.compare_previous_year:
+            row.previous_revenue = previous[key][2] if key in previous else Decimal(0)
+            if row.previous_revenue:
+                row.change_percent = round(float((revenue - row.previous_revenue) / row.previous_revenue * 100), 1)
+        totals[currency] += revenue
+        rows.append(row)
+
+    return RevenueReport(
+        organization_id=organization_id,
+        period=params.period,
+        date_from=params.date_from,
+        date_to=params.date_to,
+        group_by=params.group_by,
+        rows=rows,
+        totals=dict(totals),
+        convert_to=params.convert_to,
+        missing_rates=sorted(missing_rates),
+        rollup_version=version,
+        generated_at=datetime.now(timezone.utc),
+    )
+
+
+REPORT_BUILDERS = {REVENUE: build_revenue_report}
+
+
+REPORT_JOB = "reports.build"
+
+_REPORT_JOB_STATUSES = {
+    JobStatus.QUEUED: "pending",
+    JobStatus.RUNNING: "running",
+    JobStatus.SUCCEEDED: "done",
+    JobStatus.DEAD: "failed",
+}
+
+
+@job_handler(REPORT_JOB)
+def build_report_job(payload: dict) -> dict:
+    """Задача очереди: построить отчёт; результат сохраняется в задаче"""
+    params = RevenueReportRequest.model_validate(payload["params"])
+    db = SessionLocal()
+    try:
+        return REPORT_BUILDERS[payload["kind"]](db, payload["organization_id"], params).model_dump(mode="json")
+    finally:
+        db.close()
+
+
+def report_job_info(job: JobInfo) -> Optional[ReportJob]:
+    """Задача отчёта в формате API; None - задача другого вида"""
+    if job.kind != REPORT_JOB:
+        return None
+    return ReportJob(
+        id=job.id,
+        kind=job.payload["kind"],
+        status=_REPORT_JOB_STATUSES[job.status],
+        organization_id=job.payload["organization_id"],
+        created_at=job.created_at or job.run_at,
+        finished_at=job.finished_at,
+        error=job.last_error if job.status == JobStatus.DEAD else None,
+        result=RevenueReport.model_validate(job.result) if job.status == JobStatus.SUCCEEDED else None,
+    )
+
+
+def submit_report(
+    kind: str, organization_id: int, params: RevenueReportRequest, version: int, created_by: Optional[int] = None,
+) -> ReportJob:
+    """
+    Поставить построение отчёта в очередь.
+
+    Ключ идемпотентности - вид, организация, параметры и версия сводки:
+    повторный запрос того же отчёта до следующего обновления сводки
+    получает уже построенную (или строящуюся) задачу. Упавшая задача
+    ставится заново. Обращается к очереди - из async-кода через run_in_threadpool.
+    """
+    digest = hashlib.sha256(params.model_dump_json().encode()).hexdigest()[:32]
+    key = f"{REPORT_JOB}:{kind}:{organization_id}:{version}:{digest}"
+    payload = {"kind": kind, "organization_id": organization_id, "params": params.model_dump(mode="json")}
+    job = enqueue(REPORT_JOB, payload, idempotency_key=key, created_by=created_by)
+    if job.status == JobStatus.DEAD:
+        job = enqueue(REPORT_JOB, payload, idempotency_key=f"{key}:{job.id}", created_by=created_by)
+    return report_job_info(job)
+
+
+def get_report_job(job_id: str) -> Optional[ReportJob]:
+    job = get_job_queue().get(job_id)
+    return report_job_info(job) if job is not None else None
@@ -0,0 +1,285 @@
+"""
+Инкрементальная статистика организаций для дашборда
+
+Счётчики organization_stat_counters обновляются в той же транзакции, что и
+изменения Client/Application: при flush вычисляются дельты по истории
+атрибутов и применяются одним upsert на счётчик. Чтение дашборда - выборка
+нескольких строк по первичному ключу, независимо от объёма данных.
+
+Массовые операции в обход ORM (bulk insert, set-based UPDATE) должны
+применять дельты сами через application_deltas/client_deltas и apply_stat_deltas.
+
+Готовая статистика кэшируется в пространстве имён "dashboard" и сбрасывается
+после коммита изменений счётчиков организации; изменения в обход ORM
+становятся видны по истечении dashboard_cache_ttl_seconds, если не вызвать
+invalidate_dashboards_on_commit.
+"""
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import event, func, inspect, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+from ..database import upsert
+from ..models.business import Application, ApplicationStatus, Client
+from ..models.stats import OrganizationStatCounter
+from ..settings import settings
+from ..cache import cache_namespace
+from ._history import previous_value, track_previous_values
+
+# Виды показателей
+CLIENTS = "clients"
+NEW_CLIENTS = "new_clients"
+APPLICATIONS = "applications"
+APPLICATIONS_BY_STATUS = "applications_by_status"
+REVENUE = "revenue"
+TOTAL = "total"
+
+# Заявки, сумма которых учитывается в выручке
+REVENUE_STATUSES = frozenset({ApplicationStatus.PAID, ApplicationStatus.COMPLETED})
+
+NEW_CLIENTS_DAYS = 30
+
+CURRENCY_SYMBOLS = {"RUB": "₽", "USD": "$", "EUR": "€"}
+
+StatKey = Tuple[int, str, str]
+
+
+@dataclass
+class DashboardStats:
+    clients: int = 0
+    applications: int = 0
+    applications_by_status: Dict[str, int] = field(default_factory=dict)
+    revenue_by_currency: Dict[str, Decimal] = field(default_factory=dict)
+    new_clients_by_day: Dict[str, int] = field(default_factory=dict)
+
+
+def _day(value: Optional[datetime]) -> str:
+    """День по UTC (значения без зоны уже в UTC)"""
+    value = value or datetime.now(timezone.utc)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.date().isoformat()
+
+
+def client_deltas(organization_id: int, created_at: Optional[datetime], sign: int = 1) -> Counter:
+    """Дельты счётчиков для появления (sign=1) или удаления (sign=-1) клиента"""
+    return Counter({
+        (organization_id, CLIENTS, TOTAL): sign,
+        (organization_id, NEW_CLIENTS, _day(created_at)): sign,
+    })
+
+
+def application_deltas(
+    organization_id: int,
+    status: Optional[ApplicationStatus],
+    final_cost: Optional[Decimal],
+    currency: Optional[str],
+    sign: int = 1,
+) -> Counter:
+    """Вклад заявки в счётчики; sign=-1 - снять вклад прежнего состояния"""
+    deltas = Counter({(organization_id, APPLICATIONS, TOTAL): sign})
+    if status is not None:
+        deltas[(organization_id, APPLICATIONS_BY_STATUS, status.value)] += sign
+    if status in REVENUE_STATUSES and final_cost:
+        deltas[(organization_id, REVENUE, currency or "RUB")] += sign * Decimal(final_cost)
+    return deltas
+
+
+_TRACKED_ATTRIBUTES = (
+    Client.organization_id,
+    Application.organization_id,
+    Application.status,
+    Application.final_cost,
+    Application.currency,
+)
+_PENDING_KEY = "organization_stat_deltas"
+_INVALIDATIONS_KEY = "dashboard_invalidations"
+# Ключ сводки по всем организациям (дашборд администратора)
+_ALL_ORGANIZATIONS = "all"
+
+dashboard_cache = cache_namespace(
+    "dashboard",
+    maxsize=settings.dashboard_cache_size,
+    ttl=settings.dashboard_cache_ttl_seconds,
+)
+
+
+def _application_changed(state) -> bool:
+    return any(
+        state.attrs[attr].history.has_changes()
+        for attr in ("organization_id", "status", "final_cost", "currency")
+    )
+
+
+def _changed_and_deleted_deltas(session: Session) -> Counter:
+    """Дельты для изменённых и удалённых объектов; вызывается до flush, пока строки на месте"""
+    deltas: Counter = Counter()
+    for obj in session.dirty:
+        if not isinstance(obj, (Client, Application)):
+            continue
+        state = inspect(obj)
+        if isinstance(obj, Client):
+            if state.attrs.organization_id.history.has_changes():
+                deltas.update(client_deltas(previous_value(state, "organization_id"), obj.created_at, -1))
+                deltas.update(client_deltas(obj.organization_id, obj.created_at))
+        elif _application_changed(state):
+            deltas.update(application_deltas(
+                previous_value(state, "organization_id"),
+                previous_value(state, "status"),
+                previous_value(state, "final_cost"),
+                previous_value(state, "currency"),
+                -1,
+            ))
+            deltas.update(application_deltas(obj.organization_id, obj.status, obj.final_cost, obj.currency))
+
+    for obj in session.deleted:
+        if isinstance(obj, Client):
+            deltas.update(client_deltas(obj.organization_id, obj.created_at, -1))
+        elif isinstance(obj, Application):
+            deltas.update(application_deltas(obj.organization_id, obj.status, obj.final_cost, obj.currency, -1))
+    return deltas
+
+
+def _new_object_deltas(session: Session) -> Counter:
+    """Дельты для вставленных объектов; вызывается после flush, когда применены значения по умолчанию"""
+    deltas: Counter = Counter()
+    for obj in session.new:
+        if isinstance(obj, Client):
+            # created_at заполняется сервером; не загружаем его посреди flush
+            deltas.update(client_deltas(obj.organization_id, inspect(obj).dict.get("created_at")))
+        elif isinstance(obj, Application):
+            deltas.update(application_deltas(obj.organization_id, obj.status, obj.final_cost, obj.currency))
+    return deltas
+
+
+def apply_stat_deltas(connection: Connection, deltas: Dict[StatKey, object]) -> None:
+    """Применить дельты к счётчикам (upsert value = value + delta)"""
+    rows = [
+        {"organization_id": org_id, "metric": metric, "key": key, "value": value}
+        for (org_id, metric, key), value in sorted(deltas.items())
+        if org_id is not None and value
+    ]
+    if not rows:
+        return
+    table = OrganizationStatCounter.__table__
+    upsert(
+        connection, table, rows,
+        index_elements=["organization_id", "metric", "key"],
+        set_=lambda excluded: {"value": table.c.value + excluded.value},
+    )
+
+
+# active_history: прежнее значение загружается при присваивании, даже если атрибут был expired
+track_previous_values(*_TRACKED_ATTRIBUTES)
+
+
+@event.listens_for(Session, "before_flush")
+def _collect_stat_deltas(session: Session, flush_context, instances):
+    deltas = _changed_and_deleted_deltas(session)
+    if deltas:
+        session.info[_PENDING_KEY] = deltas
+
+
+def invalidate_dashboards_on_commit(session: Session, organization_ids: Iterable[int]) -> None:
+    """Сбросить кэш дашборда организаций после коммита транзакции сессии"""
+    session.info.setdefault(_INVALIDATIONS_KEY, set()).update(organization_ids)
+
+
+@event.listens_for(Session, "after_flush")
+def _maintain_organization_stats(session: Session, flush_context):
+    deltas = session.info.pop(_PENDING_KEY, Counter())
+    deltas.update(_new_object_deltas(session))
+    deltas = {key: value for key, value in deltas.items() if value}
+    if deltas:
+        apply_stat_deltas(session.connection(), deltas)
+        invalidate_dashboards_on_commit(session, (org_id for org_id, _, _ in deltas))
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_dashboards(session: Session):
+    organizations = session.info.pop(_INVALIDATIONS_KEY, None)
+    if organizations:
+        for organization_id in organizations:
+            dashboard_cache.delete(organization_id)
+        dashboard_cache.delete(_ALL_ORGANIZATIONS)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_dashboard_invalidations(session: Session):
+    session.info.pop(_INVALIDATIONS_KEY, None)
+
+
+def _apply_rows(stats: DashboardStats, rows: Iterable) -> DashboardStats:
+    for metric, key, value in rows:
+        if not value:
+            continue
+        if metric == CLIENTS:
+            stats.clients += int(value)
+        elif metric == APPLICATIONS:
+            stats.applications += int(value)
+        elif metric == APPLICATIONS_BY_STATUS:
+            stats.applications_by_status[key] = stats.applications_by_status.get(key, 0) + int(value)
+        elif metric == REVENUE:
+            stats.revenue_by_currency[key] = stats.revenue_by_currency.get(key, Decimal(0)) + Decimal(value)
+        elif metric == NEW_CLIENTS:
+            stats.new_clients_by_day[key] = stats.new_clients_by_day.get(key, 0) + int(value)
+    return stats
+
+
+def get_dashboard_stats(db: Session, organization_id: Optional[int]) -> DashboardStats:
+    """
+    Статистика для дашборда из счётчиков.
+
+    organization_id=None - сводка по всем организациям (для администратора).
+    """
+    counters = OrganizationStatCounter
+    since = (datetime.now(timezone.utc).date() - timedelta(days=NEW_CLIENTS_DAYS)).isoformat()
+    query = select(counters.metric, counters.key, func.sum(counters.value)).where(
+        (counters.metric != NEW_CLIENTS) | (counters.key >= since)
+    )
+    if organization_id is not None:
+        query = query.where(counters.organization_id == organization_id)
+    query = query.group_by(counters.metric, counters.key)
+    return _apply_rows(DashboardStats(), db.execute(query).all())
+
+
+def get_cached_dashboard_stats(db: Session, organization_id: Optional[int]) -> DashboardStats:
+    """get_dashboard_stats через кэш "dashboard" (общий для воркеров при Redis)"""
+    key = _ALL_ORGANIZATIONS if organization_id is None else organization_id
+    stats = dashboard_cache.get(key)
+    if stats is None:
+        stats = get_dashboard_stats(db, organization_id)
+        dashboard_cache.set(key, stats)
+    return stats
+
+
+def rebuild_organization_stats(db: Session, organization_id: int) -> None:
+    """Полный пересчёт счётчиков организации (восстановление после ручных правок)"""
+    deltas: Counter = Counter()
+    for (created_at,) in db.query(Client.created_at).filter(Client.organization_id == organization_id):
+        deltas.update(client_deltas(organization_id, created_at))
+    applications = db.query(Application.status, Application.final_cost, Application.currency).filter(
+        Application.organization_id == organization_id
+    )
+    for status, final_cost, currency in applications:
+        deltas.update(application_deltas(organization_id, status, final_cost, currency))
+
+    db.query(OrganizationStatCounter).filter(
+        OrganizationStatCounter.organization_id == organization_id
+    ).delete(synchronize_session=False)
+    apply_stat_deltas(db.connection(), deltas)
+    db.commit()
+
+
+def format_revenue(revenue_by_currency: Dict[str, Decimal]) -> str:
+    """Выручка для плитки дашборда: '125 000 ₽ · 3 400 $'"""
+    parts = []
+    for currency, amount in sorted(revenue_by_currency.items()):
+        if not amount:
+            continue
+        symbol = CURRENCY_SYMBOLS.get(currency, currency)
+        parts.append(f"{amount:,.0f} {symbol}".replace(",", " "))
+    return " · ".join(parts) or "0 ₽"
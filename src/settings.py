@@ -12,11 +12,92 @@ class Settings(BaseSettings):
     postgres_password: str = "dummy"
     postgres_db: str = "dummy"
     
+    # Асинхронный слой БД (aiosqlite / asyncpg) для async-обработчиков
+    database_async: bool = False
+    
+    # Пул соединений
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800
+    db_pool_pre_ping: bool = True
+    db_statement_timeout_ms: int = 30000
+    
+    # SQLite
+    sqlite_journal_mode: str = "WAL"
+    sqlite_synchronous: str = "NORMAL"
+    sqlite_busy_timeout_ms: int = 5000
+    
     # JWT
     secret_key: str = "fallback-secret-key-for-development-only"
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_days: int = 7
+    token_cache_size: int = 10000
+    revocation_refresh_seconds: float = 5.0
+    revocation_prune_seconds: float = 3600.0
+    
+    # Password hashing (argon2 в отдельном пуле потоков)
+    password_hash_workers: int = 4
+    password_hash_queue_limit: int = 64
+    
+    # Кэш аутентифицированных пользователей
+    identity_cache_size: int = 10000
+    identity_cache_ttl_seconds: int = 60
+    
+    # Кэш статистики дашборда (сбрасывается при изменениях через ORM)
+    dashboard_cache_size: int = 1000
+    dashboard_cache_ttl_seconds: int = 30
+    
+    # Хранилище общих кэшей: memory | redis | two_tier (LRU процесса + Redis
+    # с pub/sub-инвалидацией); срок жизни локальной копии в two_tier
+    cache_backend: str = "memory"
+    cache_redis_url: str = "redis://localhost:6379/0"
+    cache_key_prefix: str = "travel-crm"
+    cache_local_ttl_seconds: float = 5.0
+    
+    # Импорт клиентов и заявок: строк на транзакцию, сколько ошибок строк хранить в отчёте
+    import_batch_size: int = 1000
+    import_max_errors: int = 1000
+    
+    # Отчёты: период обновления дневных сводок и перекрытие водяного знака (сек);
+    # отчёты строят воркеры очереди задач
+    report_refresh_seconds: float = 60.0
+    report_refresh_overlap_seconds: float = 300.0
+    
+    # Курсы валют: базовая валюта таблицы курсов, CSV для загрузки при старте
+    # (date,currency,rate[,nominal]) и время жизни кэша курсов в процессе
+    base_currency: str = "RUB"
+    fx_rates_file: Optional[str] = None
+    fx_cache_ttl_seconds: int = 600
+    
+    # Метрики Prometheus (/metrics); если задан metrics_token, нужен заголовок
+    # Authorization: Bearer <token>. Запросы дольше slow_request_ms пишутся
+    # в лог вместе с SQL (не больше slow_request_max_statements выражений)
+    metrics_enabled: bool = True
+    metrics_token: Optional[str] = None
+    slow_request_ms: float = 1000.0
+    slow_request_max_statements: int = 50
+    
+    # Веб-интерфейс: кэш байткода шаблонов на диске (каталог по умолчанию -
+    # во временной папке), язык страниц, сжатие HTML-ответов gzip
+    template_bytecode_cache: bool = True
+    template_cache_dir: Optional[str] = None
+    ui_locale: str = "ru"
+    html_gzip_min_size: int = 1000
+    html_gzip_level: int = 6
+    
+    # Поиск N+1 в development/test: off | log | raise и сколько ленивых
+    # загрузок одной связи за запрос считать N+1
+    nplusone_mode: str = "log"
+    nplusone_threshold: int = 5
+    
+    # Проверки готовности (/ready): период фоновой проверки, таймаут обращения
+    # к MinIO, допустимая загрузка пула, проверять ли хранилище файлов
+    readiness_check_seconds: float = 10.0
+    readiness_check_timeout_seconds: float = 3.0
+    readiness_max_pool_saturation: float = 0.9
+    readiness_check_storage: bool = True
     
     # MinIO
     minio_endpoint: str = "localhost:9000"
@@ -25,6 +106,42 @@ class Settings(BaseSettings):
     minio_bucket_name: str = "files"
     minio_secure: bool = False
     
+    # Вложения в хранилище S3/MinIO: регион и таймаут клиента, внешний адрес
+    # хранилища для presigned-ссылок (если из браузера он другой), размер
+    # части multipart-загрузки (не меньше 5 МБ), предельный размер файла,
+    # срок жизни ссылки на скачивание, миниатюры и удаление файлов без
+    # вложений (проход сборки мусора - каждые attachment_gc_every циклов)
+    storage_region: str = "us-east-1"
+    storage_timeout_seconds: float = 3.0
+    storage_public_endpoint: Optional[str] = None
+    attachment_part_size: int = 8 * 1024 * 1024
+    attachment_max_bytes: int = 50 * 1024 * 1024
+    attachment_url_ttl_seconds: int = 300
+    thumbnail_size: int = 256
+    thumbnail_max_source_bytes: int = 20 * 1024 * 1024
+    thumbnail_interval_seconds: float = 5.0
+    attachment_gc_every: int = 60
+    attachment_gc_grace_seconds: int = 3600
+    
+    # Номера заявок: сколько номеров воркер резервирует в счётчике за раз
+    application_number_block_size: int = 50
+    
+    # Очередь отложенных задач: database (таблица jobs) | redis; попытки,
+    # экспоненциальная задержка повтора, срок аренды задачи воркером, опрос
+    # очереди, потоки воркера, хранение завершённых задач; job_worker_embedded -
+    # запускать воркер внутри веб-процесса (для разработки без python -m src.worker)
+    job_backend: str = "database"
+    job_redis_url: str = "redis://localhost:6379/0"
+    job_key_prefix: str = "travel-crm:jobs"
+    job_max_attempts: int = 5
+    job_backoff_seconds: float = 5.0
+    job_backoff_max_seconds: float = 600.0
+    job_lease_seconds: int = 300
+    job_poll_seconds: float = 1.0
+    job_worker_concurrency: int = 4
+    job_retention_seconds: int = 7 * 24 * 3600
+    job_worker_embedded: bool = False
+    
     # Admin
     admin_password: str = "admin123"
     admin_email: str = "admin@test.com"
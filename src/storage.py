@@ -0,0 +1,148 @@
+"""
+Объектное хранилище файлов (MinIO или любой S3-совместимый сервер)
+
+Обёртка над клиентом boto3 с настройками minio_*: multipart-загрузка
+частями, выдача presigned-ссылок и служебные операции. Ссылки для браузера
+подписываются адресом storage_public_endpoint, если сервер доступен
+снаружи не по тому же адресу, что из приложения.
+
+Клиент создаётся лениво; configure_storage подключает готовое хранилище
+(например, локальный S3-совместимый сервер при проверках).
+"""
+import logging
+from typing import Iterable, List, Optional
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _endpoint_url(endpoint: str) -> str:
+    if endpoint.startswith(("http://", "https://")):
+        return endpoint
+    return f"{'https' if settings.minio_secure else 'http'}://{endpoint}"
+
+
+def create_s3_client(endpoint: Optional[str] = None):
+    import boto3
+    from botocore.config import Config
+
+    return boto3.client(
+        "s3",
+        endpoint_url=_endpoint_url(endpoint or settings.minio_endpoint),
+        aws_access_key_id=settings.minio_access_key,
+        aws_secret_access_key=settings.minio_secret_key,
+        region_name=settings.storage_region,
+        config=Config(
+            signature_version="s3v4",
+            s3={"addressing_style": "path"},
+            connect_timeout=settings.storage_timeout_seconds,
+            read_timeout=settings.storage_timeout_seconds * 10,
+            retries={"max_attempts": 2, "mode": "standard"},
+        ),
+    )
+
+
+class ObjectStorage:
+    """Операции над объектами одного бакета"""
+
+    def __init__(self, client, bucket: str, presign_client=None):
+        self.client = client
+        self.bucket = bucket
+        self.presign_client = presign_client or client
+
+    def check(self) -> bool:
+        """Бакет существует и доступен"""
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_bucket(Bucket=self.bucket)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchBucket"):
+                return False
+            raise
+        return True
+
+    def ensure_bucket(self) -> None:
+        if not self.check():
+            self.client.create_bucket(Bucket=self.bucket)
+            logger.info(f"Created storage bucket {self.bucket}")
+
+    def put(self, key: str, data: bytes, content_type: str) -> None:
+        self.client.put_object(Bucket=self.bucket, Key=key, Body=data, ContentType=content_type)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def upload_file(self, path: str, key: str, content_type: str) -> None:
+        """Загрузить файл с диска (крупные - multipart-загрузкой boto3)"""
+        self.client.upload_file(path, self.bucket, key, ExtraArgs={"ContentType": content_type})
+
+    def download_file(self, key: str, path: str) -> None:
+        """Скачать объект в файл, не держа его в памяти"""
+        self.client.download_file(self.bucket, key, path)
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        return self.client.create_multipart_upload(Bucket=self.bucket, Key=key, ContentType=content_type)["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, number: int, data: bytes) -> dict:
+        response = self.client.upload_part(Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=number, Body=data)
+        return {"PartNumber": number, "ETag": response["ETag"]}
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[dict]) -> None:
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts}
+        )
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        keys = [key for key in keys if key]
+        for i in range(0, len(keys), 1000):
+            self.client.delete_objects(
+                Bucket=self.bucket,
+                Delete={"Objects": [{"Key": key} for key in keys[i:i + 1000]], "Quiet": True},
+            )
+
+    def presigned_url(self, key: str, expires: int, filename: Optional[str] = None,
+                      content_type: Optional[str] = None) -> str:
+        """Временная ссылка на скачивание напрямую из хранилища"""
+        params = {"Bucket": self.bucket, "Key": key}
+        if filename:
+            params["ResponseContentDisposition"] = _content_disposition(filename)
+        if content_type:
+            params["ResponseContentType"] = content_type
+        return self.presign_client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires)
+
+
+def _content_disposition(filename: str) -> str:
+    from urllib.parse import quote
+
+    ascii_name = filename.encode("ascii", "replace").decode().replace('"', "").replace("?", "_")
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+_storage: Optional[ObjectStorage] = None
+
+
+def build_storage(client=None) -> ObjectStorage:
+    """Хранилище по настройкам minio_*; client - готовый клиент S3"""
+    if client is not None:
+        return ObjectStorage(client, settings.minio_bucket_name)
+    presign_client = None
+    if settings.storage_public_endpoint:
+        presign_client = create_s3_client(settings.storage_public_endpoint)
+    return ObjectStorage(create_s3_client(), settings.minio_bucket_name, presign_client)
+
+
+def get_storage() -> ObjectStorage:
+    global _storage
+    if _storage is None:
+        _storage = build_storage()
+    return _storage
+
+
+def configure_storage(storage: Optional[ObjectStorage]) -> None:
+    """Подключить хранилище (None - снова создать по настройкам при обращении)"""
+    global _storage
+    _storage = storage
@@ -0,0 +1,133 @@
+"""
+Шаблоны веб-интерфейса
+
+- Байткод шаблонов кэшируется на диске (FileSystemBytecodeCache), и при
+  старте все шаблоны компилируются заранее: первый просмотр страницы не
+  разбирает шаблон, а следующий запуск процесса берёт готовый байткод.
+- Вне development шаблоны не перепроверяются на изменение при каждом
+  рендере (auto_reload=False).
+- Части разметки, зависящие только от роли и языка (меню навигации),
+  рендерятся один раз на пару (роль, язык): {{ fragment("_nav_menu.html") }}.
+- HTML-ответы сжимаются gzip (HTMLGZipMiddleware), остальные типы - нет:
+  у выгрузок свой gzip, а JSON API отдаётся как есть.
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+from fastapi.templating import Jinja2Templates
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template, pass_context
+from markupsafe import Markup
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from .settings import settings
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIRECTORY = "templates"
+COMPRESSIBLE_TYPES = ("text/html",)
+
+
+class FragmentCache:
+    """
+    Отрендеренные фрагменты по (шаблон, роль, язык).
+
+    Фрагмент получает только role и locale, поэтому результат одинаков для
+    всех пользователей с этой ролью. Запись действительна, пока окружение
+    возвращает тот же объект шаблона - при auto_reload изменённый файл
+    даёт новый шаблон и фрагмент рендерится заново.
+    """
+
+    def __init__(self, env: Environment):
+        self.env = env
+        self._lock = threading.Lock()
+        self._fragments: Dict[Tuple[str, str, str], Tuple[Template, Markup]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, name: str, role: Optional[str], locale: str) -> Markup:
+        template = self.env.get_template(name)
+        key = (name, role or "", locale)
+        cached = self._fragments.get(key)
+        if cached is not None and cached[0] is template:
+            self.hits += 1
+            return cached[1]
+        self.misses += 1
+        markup = Markup(template.render(role=role, locale=locale))
+        with self._lock:
+            self._fragments[key] = (template, markup)
+        return markup
+
+    def clear(self) -> None:
+        with self._lock:
+            self._fragments.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._fragments)}
+
+
+def create_environment() -> Environment:
+    bytecode_cache = None
+    if settings.template_bytecode_cache:
+        # directory=None - каталог Jinja во временной папке пользователя
+        bytecode_cache = FileSystemBytecodeCache(directory=settings.template_cache_dir)
+    return Environment(
+        loader=FileSystemLoader(TEMPLATE_DIRECTORY),
+        autoescape=True,
+        bytecode_cache=bytecode_cache,
+        auto_reload=settings.environment == "development",
+        cache_size=-1,
+    )
+
+
+def create_templates() -> Tuple[Jinja2Templates, FragmentCache]:
+    env = create_environment()
+    fragments = FragmentCache(env)
+
+    @pass_context
+    def fragment(context, name: str) -> Markup:
+        user = context.get("current_user")
+        role = user.role.name if user is not None else None
+        return fragments.render(name, role, context.get("locale") or settings.ui_locale)
+
+    env.globals["fragment"] = fragment
+    return Jinja2Templates(env=env), fragments
+
+
+templates, fragment_cache = create_templates()
+
+
+def precompile_templates() -> int:
+    """Скомпилировать все шаблоны (и записать байткод); возвращает их число"""
+    env = templates.env
+    started = time.perf_counter()
+    names = env.list_templates(extensions=["html"])
+    for name in names:
+        env.get_template(name)
+    logger.info(f"Compiled {len(names)} templates in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return len(names)
+
+
+class _HTMLGZipResponder(GZipResponder):
+    passthrough = False
+
+    async def send_with_compression(self, message) -> None:
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            # Сжимается только HTML; остальное идёт мимо GZipResponder, не
+            # завися от того, как он откладывает заголовки ответа
+            self.passthrough = not content_type.startswith(COMPRESSIBLE_TYPES)
+        if self.passthrough:
+            await self.send(message)
+            return
+        await super().send_with_compression(message)
+
+
+class HTMLGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware, сжимающий только HTML-страницы"""
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or "gzip" not in Headers(scope=scope).get("Accept-Encoding", ""):
+            await self.app(scope, receive, send)
+            return
+        await _HTMLGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)(scope, receive, send)
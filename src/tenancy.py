@@ -0,0 +1,90 @@
+"""
+Изоляция данных организаций на уровне запросов ORM
+
+Модели с примесью TenantScoped (клиенты, заявки, пользователи, вложения,
+журнал статусов) принадлежат организации. Если у сессии задана
+организация (set_tenant_scope), обработчик "do_orm_execute" добавляет к
+каждому ORM SELECT, UPDATE и DELETE условие
+with_loader_criteria(organization_id = ...) - в том числе к подгрузке
+связей и db.get(): строки других организаций не видны, даже если запрос
+забыл отфильтровать их сам. Зависимость текущего пользователя задаёт
+организацию автоматически; администратор работает без ограничения.
+
+Ограничение не действует на Core-запросы через connection.execute (массовые
+операции сервисов фильтруют организацию явно) и на объекты, уже
+находящиеся в identity map. Запрос по всем организациям внутри
+ограниченной сессии - execution_options(all_tenants=True).
+"""
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Iterator, Optional
+from sqlalchemy import Column, Integer, event, false
+from sqlalchemy.orm import ORMExecuteState, Session, with_loader_criteria
+
+# Ключ session.info: id организации или None (пользователь без организации не видит ничего)
+TENANT_KEY = "tenant_organization_id"
+# Опция выполнения для запросов по всем организациям
+ALL_TENANTS = "all_tenants"
+
+
+class TenantScoped:
+    """Примесь моделей, строки которых принадлежат организации"""
+
+    # Модели объявляют organization_id сами (внешний ключ, nullable); колонка
+    # примеси нужна with_loader_criteria для разбора лямбды условия
+    organization_id = Column(Integer, nullable=False)
+
+
+def set_tenant_scope(session: Session, organization_id: Optional[int]) -> None:
+    """Ограничить ORM-запросы сессии данными организации"""
+    session.info[TENANT_KEY] = organization_id
+
+
+def clear_tenant_scope(session: Session) -> None:
+    """Снять ограничение: запросы видят все организации"""
+    session.info.pop(TENANT_KEY, None)
+
+
+def get_tenant_scope(session: Session) -> Optional[int]:
+    return session.info.get(TENANT_KEY)
+
+
+@contextmanager
+def tenant_scope(session: Session, organization_id: Optional[int]) -> Iterator[Session]:
+    """Временное ограничение сессии организацией (скрипты, фоновые задачи)"""
+    missing = object()
+    previous = session.info.get(TENANT_KEY, missing)
+    set_tenant_scope(session, organization_id)
+    try:
+        yield session
+    finally:
+        if previous is missing:
+            clear_tenant_scope(session)
+        else:
+            set_tenant_scope(session, previous)
+
+
+@lru_cache(maxsize=1024)
+def _tenant_criteria(organization_id: Optional[int]):
+    """Опция условия организации; создаётся один раз на организацию"""
+    if organization_id is None:
+        return with_loader_criteria(TenantScoped, lambda cls: false(), include_aliases=True)
+    return with_loader_criteria(
+        TenantScoped, lambda cls: cls.organization_id == organization_id, include_aliases=True
+    )
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_tenant(orm_execute_state: ORMExecuteState) -> None:
+    info = orm_execute_state.session.info
+    if TENANT_KEY not in info:
+        return
+    if not (orm_execute_state.is_select or orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    # Подгрузка колонок и связей получает условие от исходного запроса
+    if orm_execute_state.is_column_load or orm_execute_state.is_relationship_load:
+        return
+    if orm_execute_state.execution_options.get(ALL_TENANTS):
+        return
+
+    orm_execute_state.statement = orm_execute_state.statement.options(_tenant_criteria(info[TENANT_KEY]))
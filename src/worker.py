@@ -0,0 +1,63 @@
+"""
+Воркер отложенных задач
+
+    python -m src.worker [--concurrency N]
+
+Выполняет задачи из очереди (src/jobs.py), пока не получит SIGTERM или
+SIGINT; начатые задачи доводятся до конца. Воркеров можно запускать
+сколько угодно и независимо от веб-процессов.
+"""
+import argparse
+import importlib
+import logging
+import signal
+import threading
+from .cache import build_cache_backend, configure_cache
+from .jobs import JobWorker, build_job_queue, configure_job_queue
+from .settings import settings
+
+# Модули, регистрирующие обработчики задач
+HANDLER_MODULES = (
+    "src.services.reports",
+    "src.services.attachments",
+    "src.services.imports",
+)
+
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Travel CRM job worker")
+    parser.add_argument("--concurrency", type=int, default=settings.job_worker_concurrency)
+    args = parser.parse_args()
+
+    for module in HANDLER_MODULES:
+        importlib.import_module(module)
+    # Обработчики сбрасывают общие кэши так же, как веб-процессы
+    configure_cache(build_cache_backend(
+        settings.cache_backend,
+        settings.cache_redis_url,
+        settings.cache_key_prefix,
+        settings.cache_local_ttl_seconds,
+    ))
+    queue = build_job_queue(settings.job_backend, settings.job_redis_url, settings.job_key_prefix)
+    configure_job_queue(queue)
+
+    stop = threading.Event()
+
+    def shutdown(signum, frame):
+        logger.info(f"Received signal {signum}, finishing running jobs")
+        stop.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    JobWorker(queue, concurrency=args.concurrency).run(stop)
+    configure_job_queue(None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Общие фикстуры тестов
+
+База - временный файл SQLite, схема создаётся заново для каждого теста.
+Окружение задаётся до импорта приложения: настройки читаются при импорте
+src.settings.
+"""
+import os
+import tempfile
+
+_TMPDIR = tempfile.mkdtemp(prefix="travel-crm-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_TMPDIR}/tests.db"
+os.environ["ENVIRONMENT"] = "test"
+os.environ["READINESS_CHECK_STORAGE"] = "false"
+# Ленивая загрузка связи NPLUSONE_THRESHOLD раз за запрос - ошибка, а не предупреждение
+os.environ["NPLUSONE_MODE"] = "raise"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import src.models  # noqa: E402,F401  регистрирует все модели
+from src.auth import get_password_hash  # noqa: E402
+from src.database import Base, SessionLocal, engine  # noqa: E402
+from src.models.business import Organization, OrganizationType  # noqa: E402
+from src.models.user import User, UserRole  # noqa: E402
+
+PASSWORD = "pw-123456"
+
+
+@pytest.fixture(autouse=True)
+def schema():
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
+
+
+@pytest.fixture
+def db():
+    session = SessionLocal()
+    yield session
+    session.close()
+
+
+@pytest.fixture
+def organization(db) -> Organization:
+    organization = Organization(name="Test agency", type=OrganizationType.TRAVEL_AGENCY, code="TA")
+    db.add(organization)
+    db.commit()
+    return organization
+
+
+@pytest.fixture
+def admin(db, organization) -> User:
+    user = User(
+        email="admin@example.com", password_hash=get_password_hash(PASSWORD),
+        role=UserRole.ADMIN, organization_id=organization.id,
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def http():
+    from src.main import app
+
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def auth_headers(http, admin) -> dict:
+    response = http.post("/auth/login", data={"username": admin.email, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
@@ -0,0 +1,94 @@
+"""
+Номера заявок: выдача при вставке через ORM и отсутствие дубликатов
+между процессами и потоками (каждый процесс - свой аллокатор, как у
+отдельных воркеров uvicorn)
+"""
+import multiprocessing
+import threading
+from datetime import datetime, timezone
+
+import pytest
+
+import src.services.application_numbers  # noqa: F401  регистрирует нумерацию при flush
+from src.models.business import Application, ApplicationType, Client
+
+PROCESSES = 4
+THREADS = 4
+NUMBERS = 300
+BLOCK_SIZE = 50
+
+
+@pytest.fixture
+def client_record(db, organization, admin) -> Client:
+    client = Client(organization_id=organization.id, first_name="Иван", last_name="Иванов", created_by=admin.id)
+    db.add(client)
+    db.commit()
+    return client
+
+
+def _application(client_record, **values) -> Application:
+    return Application(
+        organization_id=client_record.organization_id, client_id=client_record.id,
+        type=ApplicationType.FLIGHT, title="Перелёт", created_by=client_record.created_by, **values,
+    )
+
+
+def test_orm_insert_assigns_numbers(db, client_record):
+    year = datetime.now(timezone.utc).year
+    applications = [_application(client_record) for _ in range(3)]
+    db.add_all(applications)
+    db.commit()
+    numbers = [application.application_number for application in applications]
+    assert numbers == [f"TA-{year}-{seq:06d}" for seq in range(1, 4)]
+
+    explicit = _application(client_record, application_number="MANUAL-1")
+    db.add(explicit)
+    db.commit()
+    assert explicit.application_number == "MANUAL-1"
+
+
+def test_rolled_back_numbers_are_not_reused_by_others(db, client_record):
+    first = _application(client_record)
+    db.add(first)
+    db.flush()
+    db.rollback()
+
+    applications = [_application(client_record) for _ in range(2)]
+    db.add_all(applications)
+    db.commit()
+    numbers = {application.application_number for application in applications}
+    assert len(numbers) == 2
+
+
+def _take_numbers(organization_id, queue):
+    from src.services.application_numbers import ApplicationNumberAllocator
+
+    allocator = ApplicationNumberAllocator(block_size=BLOCK_SIZE)
+    results = [[] for _ in range(THREADS)]
+
+    def take(bucket):
+        for _ in range(NUMBERS):
+            bucket.append(allocator.next_number(organization_id))
+
+    pool = [threading.Thread(target=take, args=(bucket,)) for bucket in results]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    queue.put([number for bucket in results for number in bucket])
+
+
+def test_no_duplicates_across_processes(organization):
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    processes = [
+        context.Process(target=_take_numbers, args=(organization.id, queue)) for _ in range(PROCESSES)
+    ]
+    for process in processes:
+        process.start()
+    numbers = [number for _ in processes for number in queue.get(timeout=120)]
+    for process in processes:
+        process.join()
+
+    assert len(numbers) == PROCESSES * THREADS * NUMBERS
+    assert len(set(numbers)) == len(numbers)
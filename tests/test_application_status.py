@@ -0,0 +1,80 @@
+import pytest
+from sqlalchemy import select
+
+from src.models.business import Application, ApplicationStatus, ApplicationType, Client
+from src.models.status_events import ApplicationStatusEvent
+from src.services.application_status import (
+    NOT_FOUND, InvalidTransition, list_status_events, transition_applications,
+)
+
+
+@pytest.fixture
+def applications(db, organization, admin):
+    client = Client(organization_id=organization.id, first_name="Иван", last_name="Иванов", created_by=admin.id)
+    db.add(client)
+    db.flush()
+
+    def create(status: ApplicationStatus) -> Application:
+        application = Application(
+            organization_id=organization.id, client_id=client.id, application_number=f"TA-{status.value}",
+            type=ApplicationType.FLIGHT, title="Перелёт", status=status, created_by=admin.id,
+        )
+        db.add(application)
+        return application
+
+    created = {status: create(status) for status in (
+        ApplicationStatus.DRAFT, ApplicationStatus.SUBMITTED, ApplicationStatus.REFUNDED,
+    )}
+    db.commit()
+    return created
+
+
+def _events(db):
+    return db.execute(
+        select(
+            ApplicationStatusEvent.application_id, ApplicationStatusEvent.from_status,
+            ApplicationStatusEvent.to_status, ApplicationStatusEvent.changed_by,
+        ).order_by(ApplicationStatusEvent.id)
+    ).all()
+
+
+def test_orm_status_change_is_checked_and_logged(db, applications):
+    draft = applications[ApplicationStatus.DRAFT]
+    with pytest.raises(InvalidTransition):
+        draft.status = ApplicationStatus.PAID
+    assert draft.status == ApplicationStatus.DRAFT
+
+    draft.status = ApplicationStatus.SUBMITTED
+    db.commit()
+    assert _events(db) == [(draft.id, ApplicationStatus.DRAFT, ApplicationStatus.SUBMITTED, None)]
+
+
+def test_bulk_transition_skips_disallowed_sources(db, organization, admin, applications):
+    draft = applications[ApplicationStatus.DRAFT]
+    submitted = applications[ApplicationStatus.SUBMITTED]
+    refunded = applications[ApplicationStatus.REFUNDED]
+
+    result = transition_applications(
+        db, organization.id,
+        [(draft.id, ApplicationStatus.CANCELLED), (submitted.id, ApplicationStatus.CANCELLED),
+         (refunded.id, ApplicationStatus.CANCELLED), (999, ApplicationStatus.CANCELLED)],
+        changed_by=admin.id, comment="Отмена тура",
+    )
+
+    assert sorted(item.application_id for item in result.applied) == sorted([draft.id, submitted.id])
+    assert [(item.application_id, item.status) for item in result.rejected] == [
+        (refunded.id, ApplicationStatus.REFUNDED), (999, None),
+    ]
+    assert result.rejected[1].reason == NOT_FOUND
+
+    db.expire_all()
+    assert refunded.status == ApplicationStatus.REFUNDED
+    assert draft.status == submitted.status == ApplicationStatus.CANCELLED
+
+    events = list_status_events(db, organization.id)
+    assert sorted((event.application_id, event.from_status) for event in events) == sorted([
+        (draft.id, ApplicationStatus.DRAFT), (submitted.id, ApplicationStatus.SUBMITTED),
+    ])
+    assert {(event.to_status, event.changed_by, event.batch_id, event.comment) for event in events} == {
+        (ApplicationStatus.CANCELLED, admin.id, result.batch_id, "Отмена тура"),
+    }
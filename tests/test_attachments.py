@@ -0,0 +1,214 @@
+"""
+Вложения на локальном S3-совместимом сервере (moto) вместо MinIO
+"""
+import hashlib
+import io
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+import requests
+from sqlalchemy import update
+
+from src.auth import get_password_hash
+from src.database import SessionLocal
+from src.models.attachments import AttachmentCategory, StoredFile
+from src.models.business import Client
+from src.models.user import User, UserRole
+from src.services.attachments import (
+    UploadedObject, _register_stored_file, attach_file, collect_garbage, process_thumbnails,
+)
+from src.settings import settings
+from src.storage import ObjectStorage, configure_storage, create_s3_client
+
+from .conftest import PASSWORD
+
+PART_SIZE = 5 * 1024 * 1024
+CHUNK = 64 * 1024
+
+
+@pytest.fixture(scope="session")
+def s3_endpoint():
+    from moto.server import ThreadedMotoServer
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = ThreadedMotoServer(ip_address="127.0.0.1", port=port)
+    server.start()
+    yield f"http://127.0.0.1:{port}"
+    server.stop()
+
+
+@pytest.fixture
+def storage(s3_endpoint, monkeypatch):
+    monkeypatch.setattr(settings, "attachment_part_size", PART_SIZE)
+    # Фоновый проход приложения не должен опередить проверки
+    monkeypatch.setattr(settings, "thumbnail_interval_seconds", 3600)
+    storage = ObjectStorage(create_s3_client(s3_endpoint), f"attachments-{uuid.uuid4().hex[:12]}")
+    storage.ensure_bucket()
+    configure_storage(storage)
+    yield storage
+    configure_storage(None)
+
+
+@pytest.fixture
+def supervisor(db, organization) -> User:
+    user = User(email="files@example.com", password_hash=get_password_hash(PASSWORD),
+                role=UserRole.SUPERVISOR, organization_id=organization.id)
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def client_ids(db, organization, supervisor):
+    clients = [
+        Client(organization_id=organization.id, first_name="Иван", last_name=f"Файлов{i}", created_by=supervisor.id)
+        for i in range(2)
+    ]
+    db.add_all(clients)
+    db.commit()
+    return [client.id for client in clients]
+
+
+@pytest.fixture
+def headers(http, supervisor, storage):
+    response = http.post("/auth/login", data={"username": supervisor.email, "password": PASSWORD})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _chunks(data: bytes):
+    for i in range(0, len(data), CHUNK):
+        yield data[i:i + CHUNK]
+
+
+def _bucket_keys(storage) -> list:
+    response = storage.client.list_objects_v2(Bucket=storage.bucket)
+    return sorted(item["Key"] for item in response.get("Contents", []))
+
+
+def _upload(http, headers, client_id, data, filename="паспорт.pdf", content_type="application/pdf", **params):
+    return http.post(
+        f"/api/clients/{client_id}/attachments",
+        params={"filename": filename, **params},
+        content=_chunks(data),
+        headers={**headers, "Content-Type": content_type},
+    )
+
+
+def test_streamed_multipart_upload(http, headers, storage, client_ids, monkeypatch):
+    sizes = []
+    upload_part = storage.upload_part
+
+    def recording_upload_part(key, upload_id, number, data):
+        sizes.append(len(data))
+        return upload_part(key, upload_id, number, data)
+
+    monkeypatch.setattr(storage, "upload_part", recording_upload_part)
+    payload = os.urandom(2 * PART_SIZE + 1000)
+    response = _upload(http, headers, client_ids[0], payload, category="passport_scan")
+
+    assert response.status_code == 201, response.text
+    assert response.json()["sha256"] == hashlib.sha256(payload).hexdigest()
+    assert len(sizes) == 3 and max(sizes) <= PART_SIZE
+
+
+def test_same_file_stored_once(http, headers, storage, client_ids):
+    payload = os.urandom(100_000)
+    first = _upload(http, headers, client_ids[0], payload)
+    second = _upload(http, headers, client_ids[1], payload, filename="copy.pdf")
+
+    assert first.status_code == 201 and second.status_code == 201
+    assert len([key for key in _bucket_keys(storage) if key.startswith("files/")]) == 1
+
+
+def test_presigned_download(http, headers, storage, client_ids):
+    payload = os.urandom(100_000)
+    attachment_id = _upload(http, headers, client_ids[0], payload).json()["id"]
+
+    response = http.get(f"/api/attachments/{attachment_id}/download", headers=headers, follow_redirects=False)
+    assert response.status_code == 307
+    downloaded = requests.get(response.headers["location"], timeout=30)
+    assert downloaded.status_code == 200 and downloaded.content == payload
+
+
+def test_image_thumbnail(http, headers, storage, client_ids):
+    from PIL import Image
+
+    image = io.BytesIO()
+    Image.new("RGB", (1200, 800), (30, 120, 200)).save(image, format="PNG")
+    attachment_id = _upload(
+        http, headers, client_ids[0], image.getvalue(), filename="visa.png", content_type="image/png", category="visa"
+    ).json()["id"]
+    process_thumbnails(storage)
+
+    items = http.get(f"/api/clients/{client_ids[0]}/attachments", headers=headers).json()["items"]
+    thumbnail = next(item for item in items if item["id"] == attachment_id)
+    assert thumbnail["thumbnail_status"] == "ready"
+    assert requests.get(thumbnail["thumbnail_url"], timeout=30).status_code == 200
+
+
+def test_unreferenced_files_collected(http, headers, storage, client_ids):
+    payload = os.urandom(100_000)
+    ids = [_upload(http, headers, client_id, payload).json()["id"] for client_id in client_ids]
+    _upload(http, headers, client_ids[0], os.urandom(1000), filename="kept.pdf")
+    for attachment_id in ids:
+        assert http.delete(f"/api/attachments/{attachment_id}", headers=headers).status_code == 204
+
+    assert collect_garbage(storage, grace=-60) == 1
+    assert len(_bucket_keys(storage)) == 1
+
+
+def _stale_orphan(db, storage, data: bytes) -> UploadedObject:
+    """Файл без вложений, на который давно никто не ссылался"""
+    uploaded = UploadedObject(
+        sha256=hashlib.sha256(data).hexdigest(), size=len(data),
+        content_type="application/pdf", object_key=f"files/{uuid.uuid4().hex}",
+    )
+    storage.put(uploaded.object_key, data, uploaded.content_type)
+    assert _register_stored_file(db, uploaded)
+    long_ago = datetime.now(timezone.utc) - timedelta(days=2)
+    db.execute(
+        update(StoredFile).where(StoredFile.sha256 == uploaded.sha256)
+        .values(created_at=long_ago, last_referenced_at=long_ago)
+    )
+    db.commit()
+    return uploaded
+
+
+def test_dedup_upload_protects_file_from_collection(db, storage, organization, supervisor, client_ids):
+    data = os.urandom(1000)
+    stored = _stale_orphan(db, storage, data)
+    copy = UploadedObject(stored.sha256, stored.size, stored.content_type, f"files/{uuid.uuid4().hex}")
+
+    # Загрузка нашла файл по sha256, но ещё не зафиксировала вложение
+    assert not _register_stored_file(db, copy)
+    db.commit()
+    assert collect_garbage(storage, grace=3600) == 0
+
+    attachment_id, duplicate = attach_file(
+        db, copy, organization.id, "copy.pdf", AttachmentCategory.OTHER, supervisor.id, client_id=client_ids[0]
+    )
+    assert duplicate == copy.object_key
+    assert storage.get(stored.object_key) == data
+
+
+def test_dedup_after_collection_keeps_own_copy(db, storage, organization, supervisor, client_ids):
+    data = os.urandom(1000)
+    stored = _stale_orphan(db, storage, data)
+    assert collect_garbage(storage, grace=3600) == 1
+
+    copy = UploadedObject(stored.sha256, stored.size, stored.content_type, f"files/{uuid.uuid4().hex}")
+    storage.put(copy.object_key, data, copy.content_type)
+    attachment_id, duplicate = attach_file(
+        db, copy, organization.id, "copy.pdf", AttachmentCategory.OTHER, supervisor.id, client_id=client_ids[0]
+    )
+    assert duplicate is None
+    fresh = SessionLocal()
+    try:
+        assert fresh.get(StoredFile, stored.sha256).object_key == copy.object_key
+    finally:
+        fresh.close()
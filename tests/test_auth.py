@@ -0,0 +1,50 @@
+from src.auth import revocation_index
+
+from .conftest import PASSWORD
+
+
+def _login(http, admin) -> dict:
+    response = http.post("/auth/login", data={"username": admin.email, "password": PASSWORD})
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_refresh_token_is_rotated(http, admin):
+    tokens = _login(http, admin)
+
+    response = http.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+    assert response.status_code == 200, response.text
+    assert http.post("/auth/refresh", json={"refresh_token": response.json()["refresh_token"]}).status_code == 200
+
+    # Использованный refresh-токен отозван по jti
+    assert http.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+
+
+def test_logout_revokes_refresh_token(http, admin):
+    tokens = _login(http, admin)
+    response = http.post(
+        "/auth/logout", json={"refresh_token": tokens["refresh_token"]},
+        headers={"Authorization": f"Bearer {tokens['access_token']}"},
+    )
+    assert response.status_code == 204
+
+    assert http.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]}).status_code == 401
+    assert http.get("/auth/me", headers={"Authorization": f"Bearer {tokens['access_token']}"}).status_code == 401
+
+
+def test_token_types_are_not_interchangeable(http, admin):
+    tokens = _login(http, admin)
+
+    assert http.get("/auth/me", headers={"Authorization": f"Bearer {tokens['refresh_token']}"}).status_code == 401
+    assert http.post("/auth/refresh", json={"refresh_token": tokens["access_token"]}).status_code == 401
+    # Отклонённый access-токен не отозван
+    assert http.get("/auth/me", headers={"Authorization": f"Bearer {tokens['access_token']}"}).status_code == 200
+
+
+def test_tokens_rejected_until_revocations_loaded(http, admin, monkeypatch):
+    tokens = _login(http, admin)
+    monkeypatch.setattr(revocation_index, "loaded", False)
+
+    response = http.get("/auth/me", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
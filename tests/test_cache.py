@@ -0,0 +1,107 @@
+import time
+from datetime import datetime, timezone
+
+import fakeredis
+import pytest
+
+from src.cache import (
+    MemoryBackend, RedisBackend, TwoTierBackend, build_cache_backend, cache_namespace, configure_cache,
+)
+
+PREFIX = "tcrm-test"
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def namespace():
+    yield cache_namespace("test.cache", maxsize=100, ttl=60)
+    configure_cache(MemoryBackend())
+
+
+@pytest.fixture
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(TwoTierBackend, "_RETRY_MIN", 0.05)
+
+
+def _two_tier(server) -> TwoTierBackend:
+    return TwoTierBackend(RedisBackend(fakeredis.FakeRedis(server=server), PREFIX), local_ttl=60)
+
+
+def _wait_for(condition, timeout=5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+def test_redis_backend_round_trips_values_under_prefix(server, namespace):
+    client = fakeredis.FakeRedis(server=server)
+    backend = build_cache_backend("redis", "", PREFIX, 5, client=client)
+    assert isinstance(backend, RedisBackend)
+    configure_cache(backend)
+
+    value = {"id": 7, "name": "Юлия", "at": datetime(2026, 1, 2, tzinfo=timezone.utc), "tags": ("a", "b")}
+    namespace.set(7, value)
+
+    assert namespace.get(7) == value
+    assert namespace.get(8, "missing") == "missing"
+    assert client.keys() == [f"{PREFIX}:test.cache:7".encode()]
+    assert 0 < client.pttl(f"{PREFIX}:test.cache:7") <= 60_000
+
+    namespace.clear()
+    assert client.keys() == []
+
+
+def test_two_tier_invalidates_other_process_local_copy(server, namespace):
+    writer, reader = _two_tier(server), _two_tier(server)
+    try:
+        writer.set(namespace, "k", "v1", 60)
+        assert reader.get(namespace, "k") == "v1"
+        assert reader.local.get(namespace, "k") == "v1"
+
+        writer.set(namespace, "k", "v2", 60)
+        assert _wait_for(lambda: reader.local.get(namespace, "k") != "v1")
+        assert reader.get(namespace, "k") == "v2"
+
+        writer.clear(namespace)
+        assert _wait_for(lambda: reader.get(namespace, "k") != "v2")
+    finally:
+        writer.close()
+        reader.close()
+
+
+def test_two_tier_resubscribes_after_redis_outage(server, namespace, fast_retry):
+    server.connected = False
+    backend = _two_tier(server)
+    try:
+        # Без Redis кэш работает только в процессе
+        assert not backend.subscribed
+        backend.set(namespace, "k", "local", 60)
+        assert backend.get(namespace, "k") == "local"
+
+        server.connected = True
+        assert _wait_for(lambda: backend.subscribed)
+        # Локальные копии за время простоя сброшены
+        assert backend.local.get(namespace, "k") != "local"
+
+        # Обрыв соединения у работающего слушателя: подписка восстанавливается
+        server.connected = False
+        assert _wait_for(lambda: not backend.subscribed)
+        server.connected = True
+        assert _wait_for(lambda: backend.subscribed)
+
+        other = _two_tier(server)
+        try:
+            backend.set(namespace, "k", "v1", 60)
+            other.set(namespace, "k", "v2", 60)
+            assert _wait_for(lambda: backend.get(namespace, "k") == "v2")
+        finally:
+            other.close()
+    finally:
+        backend.close()
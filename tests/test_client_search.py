@@ -0,0 +1,55 @@
+from src.models.business import Client, Organization, OrganizationType
+from src.services import client_search
+from src.services.client_search import name_keys, phone_keys, query_terms, search_clients
+
+
+def test_name_spellings_fold_to_one_key():
+    assert name_keys("Юлия") == name_keys("Yulia") == name_keys("Julia")
+    assert name_keys("Щукин") == name_keys("Schukin") == name_keys("Shukin")
+    assert name_keys("Алексей") == name_keys("Alexey")
+    assert name_keys("Петров-Водкин") == ["petrov", "vodkin"]
+
+
+def test_phone_trunk_prefix_8_becomes_7():
+    assert phone_keys("8 (916) 123-45-67") == phone_keys("+7 916 123 45 67") == ["79161234567", "9161234567"]
+    assert query_terms("8 (916) 12") == [("891612", "791612", "91612")]
+    assert query_terms("+7 916") == [("7916", "916")]
+
+
+def test_query_terms():
+    assert query_terms("Иванов ан") == [(name_keys("Иванов")[0],), ("an",)]
+    assert query_terms("Ivan.Petrov@Example.com") == [("ivan.petrov@example.com",)]
+    # Слова короче двух символов и повторы отбрасываются
+    assert query_terms("Иванов И ivanov") == [(name_keys("Иванов")[0],)]
+
+
+def _client(db, organization, admin, first_name, last_name, phone=None):
+    client = Client(
+        organization_id=organization.id, created_by=admin.id,
+        first_name=first_name, last_name=last_name, phone=phone,
+    )
+    db.add(client)
+    db.commit()
+    return client
+
+
+def test_search_matches_all_terms_within_organization(db, organization, admin):
+    julia = _client(db, organization, admin, "Юлия", "Щукина", "8 916 123 45 67")
+    _client(db, organization, admin, "Юлия", "Петрова")
+    other = Organization(name="Other agency", type=OrganizationType.TRAVEL_AGENCY, code="OA")
+    db.add(other)
+    db.commit()
+    _client(db, other, admin, "Julia", "Schukina")
+
+    for query in ("julia shchukina", "щукина юл", "+7 916 123", "8916"):
+        assert [client.id for client, _ in search_clients(db, organization.id, query)] == [julia.id], query
+    assert search_clients(db, organization.id, "julia ivanova") == []
+
+
+def test_candidate_cap_keeps_exact_key_matches(db, organization, admin, monkeypatch):
+    # Ключи просматриваются в порядке индекса: точное совпадение раньше продолжений
+    monkeypatch.setattr(client_search, "MAX_CANDIDATES", 1)
+    _client(db, organization, admin, "Анна", "Иванова")
+    exact = _client(db, organization, admin, "Анна", "Иванов")
+
+    assert [client.id for client, _ in search_clients(db, organization.id, "иванов")] == [exact.id]
@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import text
+
+from src.database import create_app_engine
+
+
+def test_memory_database_is_shared_between_threads():
+    engine = create_app_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+        conn.execute(text("INSERT INTO items (id) VALUES (1)"))
+
+    def count():
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT count(*) FROM items")).scalar_one()
+
+    # Как в threadpool FastAPI: другой поток видит ту же базу
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(count).result() == 1
+    engine.dispose()
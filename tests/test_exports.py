@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from src.models.business import Client
+
+
+def _add_clients(db, organization, admin):
+    db.add_all([
+        Client(organization_id=organization.id, first_name="Иван", last_name="Старый", created_by=admin.id,
+               created_at=datetime(2026, 1, 10, tzinfo=timezone.utc)),
+        Client(organization_id=organization.id, first_name="Анна", last_name="Новая", created_by=admin.id,
+               created_at=datetime(2026, 3, 10, tzinfo=timezone.utc)),
+    ])
+    db.commit()
+
+
+def test_export_form_with_blank_dates(http, auth_headers, db, organization, admin):
+    """Форма на странице отчётов отправляет незаполненные даты пустыми строками"""
+    _add_clients(db, organization, admin)
+    response = http.get("/api/exports/clients?created_from=&created_to=&format=csv", headers=auth_headers)
+    assert response.status_code == 200, response.text
+    assert "Старый" in response.text and "Новая" in response.text
+
+    response = http.get("/api/exports/applications?created_from=&created_to=&format=csv", headers=auth_headers)
+    assert response.status_code == 200, response.text
+
+
+def test_export_form_with_dates(http, auth_headers, db, organization, admin):
+    _add_clients(db, organization, admin)
+    response = http.get(
+        "/api/exports/clients?created_from=2026-02-01&created_to=&format=csv", headers=auth_headers
+    )
+    assert response.status_code == 200, response.text
+    assert "Новая" in response.text and "Старый" not in response.text
+
+
+def test_export_rejects_malformed_date(http, auth_headers):
+    response = http.get("/api/exports/clients?created_from=yesterday", headers=auth_headers)
+    assert response.status_code == 422
@@ -0,0 +1,93 @@
+import threading
+import time
+from datetime import timedelta
+
+import pytest
+
+from src.jobs import DatabaseJobQueue, JobWorker, _now, job_handler
+from src.models.jobs import Job, JobStatus
+
+
+@job_handler("test.flaky")
+def _flaky(payload):
+    raise RuntimeError("boom")
+
+
+@job_handler("test.slow")
+def _slow(payload):
+    time.sleep(payload["seconds"])
+    return {"done": True}
+
+
+@pytest.fixture
+def queue():
+    return DatabaseJobQueue()
+
+
+def _enqueue(queue, kind="test.slow", priority=0, max_attempts=3, payload=None):
+    return queue.enqueue(kind, payload or {"seconds": 0}, priority, _now(), max_attempts)
+
+
+def test_claim_takes_highest_priority_once(queue):
+    low = _enqueue(queue, priority=-10)
+    high = _enqueue(queue, priority=10)
+
+    first = queue.claim("w1", 60)
+    assert first.id == high.id
+    assert first.status == JobStatus.RUNNING and first.attempts == 1
+    assert queue.claim("w2", 60).id == low.id
+    assert queue.claim("w3", 60) is None
+
+
+def test_failed_job_is_retried_then_dead(queue, db):
+    job = _enqueue(queue, kind="test.flaky", max_attempts=2)
+    worker = JobWorker(queue, poll_seconds=0)
+
+    assert worker.run_once()
+    retried = queue.get(job.id)
+    assert retried.status == JobStatus.QUEUED
+    assert retried.last_error == "RuntimeError: boom"
+    assert retried.run_at > _now()
+    # Повтор ждёт задержки
+    assert queue.claim(worker.worker_id, 60) is None
+
+    db.query(Job).filter(Job.id == int(job.id)).update({Job.run_at: _now() - timedelta(seconds=1)})
+    db.commit()
+    assert worker.run_once()
+    dead = queue.get(job.id)
+    assert dead.status == JobStatus.DEAD and dead.attempts == 2
+
+
+def test_expired_lease_is_reclaimed(queue):
+    job = _enqueue(queue)
+    assert queue.claim("crashed", 0.05).id == job.id
+    assert queue.claim("w2", 60) is None
+
+    time.sleep(0.1)
+    reclaimed = queue.claim("w2", 60)
+    assert reclaimed.id == job.id and reclaimed.attempts == 2
+    # Упавший воркер аренду больше не продлит и результат не запишет
+    assert not queue.renew(job, "crashed", 60)
+    queue.complete(job, "crashed", {"stale": True})
+    assert queue.get(job.id).status == JobStatus.RUNNING
+
+
+def test_worker_renews_lease_of_long_job(queue):
+    # Обработчик работает в несколько раз дольше аренды, попытка единственная
+    job = _enqueue(queue, max_attempts=1, payload={"seconds": 0.6})
+    worker = JobWorker(queue, poll_seconds=0, lease_seconds=0.2)
+    thread = threading.Thread(target=worker.run_once)
+    thread.start()
+    try:
+        while queue.get(job.id).status != JobStatus.RUNNING:
+            time.sleep(0.01)
+        deadline = time.monotonic() + 0.5
+        while time.monotonic() < deadline:
+            assert queue.claim("other", 60) is None
+            time.sleep(0.05)
+    finally:
+        thread.join()
+
+    done = queue.get(job.id)
+    assert done.status == JobStatus.SUCCEEDED
+    assert done.result == {"done": True}
@@ -0,0 +1,45 @@
+"""
+/metrics в многопроцессном режиме (PROMETHEUS_MULTIPROC_DIR)
+
+Режим выбирается при импорте prometheus_client, поэтому воркеры - отдельные
+процессы интерпретатора.
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER = """
+from src.metrics import http_requests, http_requests_in_progress
+http_requests.labels("GET", "/api/clients", "200").inc({count})
+http_requests_in_progress.labels("GET").inc()
+"""
+SCRAPE = """
+from src.metrics import render_metrics
+print(render_metrics()[0].decode())
+"""
+
+
+def _run(code: str, directory: str) -> str:
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def _sample(text: str, prefix: str) -> float:
+    return float(next(line.split()[-1] for line in text.splitlines() if line.startswith(prefix)))
+
+
+def test_metrics_aggregate_worker_processes(tmp_path):
+    directory = str(tmp_path)
+    _run(WORKER.format(count=2), directory)
+    _run(WORKER.format(count=3), directory)
+    text = _run(SCRAPE, directory)
+
+    assert _sample(text, 'http_requests_total{method="GET",route="/api/clients",status="200"}') == 5.0
+    assert _sample(text, 'http_requests_in_progress{method="GET"}') == 2.0
+    assert "db_pool" in text
@@ -0,0 +1,113 @@
+"""
+Бюджет SQL-запросов основных списков
+
+Первый вызов каждого эндпоинта (кэши пользователя и токенов холодные)
+должен уложиться в бюджет, не зависящий от числа строк: список, число
+запросов которого растёт с данными, - это N+1. Ленивые загрузки в режиме
+raise (conftest) дают 500 раньше, чем бюджет будет превышен.
+"""
+from contextvars import ContextVar
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from src.auth import get_password_hash
+from src.database import engine
+from src.models.business import Application, ApplicationType, Client
+from src.models.user import User, UserRole
+
+from .conftest import PASSWORD
+
+ROWS = 200
+
+API_BUDGETS = [
+    ("/auth/me", {}, 2),
+    ("/api/clients", {"limit": 100}, 2),
+    ("/api/clients/search", {"q": "иван"}, 3),
+    ("/api/applications/inbox", {"limit": 100}, 4),
+]
+PAGE_BUDGETS = [
+    ("/dashboard", {}, 2),
+    ("/clients", {}, 2),
+    ("/applications", {}, 3),
+]
+
+
+class StatementCounter:
+    """SQL, выполненный при обработке HTTP-запросов (без фоновых задач lifespan)"""
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._active = ContextVar("query_budget_active", default=False)
+
+    def _count(self, *args):
+        if self._active.get():
+            self.count += 1
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        token = self._active.set(True)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self._active.reset(token)
+
+
+@pytest.fixture
+def supervisor(db, organization) -> User:
+    user = User(email="budget@example.com", password_hash=get_password_hash(PASSWORD),
+                role=UserRole.SUPERVISOR, organization_id=organization.id)
+    db.add(user)
+    db.flush()
+    clients = [
+        Client(organization_id=organization.id, first_name=f"Иван{i}", last_name=f"Иванов{i}", created_by=user.id)
+        for i in range(ROWS)
+    ]
+    db.add_all(clients)
+    db.flush()
+    db.add_all([
+        Application(organization_id=organization.id, client_id=client.id, application_number=f"QB-{i}",
+                    type=ApplicationType.TOUR_PACKAGE, title=f"Тур {i}", assigned_to=user.id, created_by=user.id)
+        for i, client in enumerate(clients)
+    ])
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def counted(supervisor):
+    from src.main import app
+
+    counter = StatementCounter(app)
+    event.listen(engine, "before_cursor_execute", counter._count)
+    try:
+        with TestClient(counter) as client:
+            yield client, counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._count)
+
+
+def _measure(client, counter, path, params, headers=None):
+    before = counter.count
+    response = client.get(path, params=params, headers=headers)
+    assert response.status_code == 200, response.text
+    return counter.count - before
+
+
+@pytest.mark.parametrize("path,params,budget", API_BUDGETS)
+def test_api_query_budget(counted, supervisor, path, params, budget):
+    client, counter = counted
+    response = client.post("/auth/login", data={"username": supervisor.email, "password": PASSWORD})
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    assert _measure(client, counter, path, params, headers) <= budget
+
+
+@pytest.mark.parametrize("path,params,budget", PAGE_BUDGETS)
+def test_page_query_budget(counted, supervisor, path, params, budget):
+    client, counter = counted
+    client.post("/login", data={"email": supervisor.email, "password": PASSWORD}, follow_redirects=False)
+    assert _measure(client, counter, path, params) <= budget
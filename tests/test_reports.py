@@ -0,0 +1,35 @@
+from datetime import date
+
+from src.auth import get_password_hash
+from src.models.business import Organization, OrganizationType
+from src.models.user import User, UserRole
+from src.schemas.reports import RevenueReportRequest
+from src.services.reports import REVENUE, submit_report
+
+from .conftest import PASSWORD
+
+
+def _accountant_headers(http, db, email, organization_id) -> dict:
+    db.add(User(
+        email=email, password_hash=get_password_hash(PASSWORD),
+        role=UserRole.ACCOUNTANT, organization_id=organization_id,
+    ))
+    db.commit()
+    response = http.post("/auth/login", data={"username": email, "password": PASSWORD})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def test_report_job_of_other_organization_is_not_found(http, db, organization):
+    other = Organization(name="Other agency", type=OrganizationType.TRAVEL_AGENCY, code="OA")
+    db.add(other)
+    db.commit()
+    params = RevenueReportRequest(date_from=date(2026, 1, 1), date_to=date(2026, 2, 1))
+    job = submit_report(REVENUE, organization.id, params, version=0)
+
+    own = _accountant_headers(http, db, "own@example.com", organization.id)
+    assert http.get(f"/api/reports/jobs/{job.id}", headers=own).status_code == 200
+
+    foreign = _accountant_headers(http, db, "foreign@example.com", other.id)
+    response = http.get(f"/api/reports/jobs/{job.id}", headers=foreign)
+    assert response.status_code == 404
+    assert http.get("/api/reports/jobs/999999", headers=foreign).json() == response.json()
@@ -0,0 +1,18 @@
+from datetime import datetime, timedelta, timezone
+
+from src.models.business import Client
+from src.services.statistics import NEW_CLIENTS, client_deltas, get_dashboard_stats
+
+
+def test_new_clients_counted_by_utc_day():
+    moscow = timezone(timedelta(hours=3))
+    deltas = client_deltas(1, datetime(2026, 3, 1, 1, 30, tzinfo=moscow))
+    assert deltas[(1, NEW_CLIENTS, "2026-02-28")] == 1
+
+
+def test_dashboard_includes_clients_created_today_utc(db, organization, admin):
+    db.add(Client(organization_id=organization.id, first_name="Анна", last_name="Новая", created_by=admin.id))
+    db.commit()
+
+    stats = get_dashboard_stats(db, organization.id)
+    assert stats.new_clients_by_day == {datetime.now(timezone.utc).date().isoformat(): 1}
@@ -0,0 +1,38 @@
+from sqlalchemy import select
+
+from src.models.business import Client, Organization, OrganizationType
+from src.tenancy import ALL_TENANTS, tenant_scope
+
+
+def _client(db, organization, creator, last_name):
+    client = Client(
+        organization_id=organization.id, created_by=creator.id,
+        first_name="Иван", last_name=last_name,
+    )
+    db.add(client)
+    return client
+
+
+def test_scope_hides_other_organization_rows(db, organization, admin):
+    other = Organization(name="Other agency", type=OrganizationType.TRAVEL_AGENCY, code="OA")
+    db.add(other)
+    db.flush()
+    _client(db, organization, admin, "Свой")
+    _client(db, other, admin, "Чужой")
+    db.commit()
+
+    with tenant_scope(db, organization.id):
+        assert [c.last_name for c in db.query(Client).all()] == ["Свой"]
+        # Загрузка по первичному ключу тоже ограничена
+        foreign_id = db.execute(
+            select(Client.id).where(Client.last_name == "Чужой").execution_options(**{ALL_TENANTS: True})
+        ).scalar_one()
+        db.expunge_all()
+        assert db.get(Client, foreign_id) is None
+
+    # Сотрудник без организации не видит ничего
+    with tenant_scope(db, None):
+        assert db.query(Client).all() == []
+
+        everything = db.execute(select(Client).execution_options(**{ALL_TENANTS: True})).scalars().all()
+        assert sorted(c.last_name for c in everything) == ["Свой", "Чужой"]
@@ -0,0 +1,72 @@
+from src.auth import get_password_hash
+from src.models.business import Organization, OrganizationType
+from src.models.user import User, UserRole
+
+from .conftest import PASSWORD
+
+
+def _supervisor(db, email, organization_id):
+    user = User(
+        email=email, password_hash=get_password_hash(PASSWORD),
+        role=UserRole.SUPERVISOR, organization_id=organization_id,
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def _web_login(http, user):
+    response = http.post(
+        "/login", data={"email": user.email, "password": PASSWORD}, follow_redirects=False,
+    )
+    assert response.status_code == 302, response.text
+
+
+def _register(http, email):
+    return http.post(
+        "/register",
+        data={"email": email, "password": PASSWORD, "password_confirm": PASSWORD, "role": "operator"},
+        follow_redirects=False,
+    )
+
+
+def test_supervisor_creates_user_in_own_organization(http, db, organization):
+    supervisor = _supervisor(db, "lead@example.com", organization.id)
+    _web_login(http, supervisor)
+
+    response = _register(http, "operator@example.com")
+    assert response.status_code == 302, response.text
+
+    created = db.query(User).filter(User.email == "operator@example.com").one()
+    assert created.organization_id == organization.id
+
+
+def test_register_detects_email_taken_in_other_organization(http, db, organization):
+    other = Organization(name="Other agency", type=OrganizationType.TRAVEL_AGENCY, code="OA")
+    db.add(other)
+    db.commit()
+    _supervisor(db, "taken@example.com", other.id)
+
+    # Сессия запроса ограничена организацией сотрудника, проверка email - нет
+    for email, organization_id in (("lead@example.com", organization.id), ("loner@example.com", None)):
+        supervisor = _supervisor(db, email, organization_id)
+        _web_login(http, supervisor)
+
+        response = _register(http, "taken@example.com")
+        assert response.status_code == 200
+        assert "уже существует" in response.text
+
+
+def test_api_register_assigns_creator_organization(http, db, organization):
+    supervisor = _supervisor(db, "lead@example.com", organization.id)
+    token = http.post("/auth/login", data={"username": supervisor.email, "password": PASSWORD}).json()["access_token"]
+
+    response = http.post(
+        "/auth/register",
+        json={"email": "operator@example.com", "password": PASSWORD, "role": "operator"},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    assert response.status_code == 201, response.text
+
+    created = db.query(User).filter(User.email == "operator@example.com").one()
+    assert created.organization_id == organization.id